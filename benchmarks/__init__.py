@@ -0,0 +1,3 @@
+"""
+Paquete de benchmarks reproducibles que no requieren una base de datos Oracle real.
+"""
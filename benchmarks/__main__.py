@@ -0,0 +1,192 @@
+"""
+__main__.py
+
+Suite de benchmarks reproducible con el driver simulado y resultados en JSON.
+
+Instala `benchmarks.fake_cx_oracle` como módulo `cx_Oracle` antes de importar `src`, de modo que
+se mide el código real del proyecto sin una base Oracle. Cada ida y vuelta al "servidor" cuesta
+la latencia simulada configurada. Mide:
+
+- conexion.*: coste de abrir y cerrar `medin_connection()` (pool) frente a un connect por bloque.
+- fetch.*: filas/segundo leyendo con `src.streaming` para varios `arraysize`.
+- concurrencia.*: operaciones/segundo de `medin_connection()` + consulta con 1, 2, 4 y 8 hilos.
+
+Con `--comparar` se contrasta con un JSON anterior y se sale con código 1 si algún resultado
+empeora más que la tolerancia, para detectar regresiones entre versiones.
+
+Uso:
+    python -m benchmarks --salida bench.json
+    python -m benchmarks --salida nuevo.json --comparar bench.json --tolerancia 0.2
+"""
+
+from benchmarks import fake_cx_oracle
+
+fake_cx_oracle.instalar()
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import os  # noqa: E402
+import platform  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Any, Callable, Dict, List, Optional, Sequence  # noqa: E402
+
+from src import pool  # noqa: E402
+from src.medin_connection import medin_connection  # noqa: E402
+from src.streaming import iterar_lotes  # noqa: E402
+
+Resultados = Dict[str, Dict[str, Any]]
+
+
+def _resultado(valor: float, unidad: str, mayor_es_mejor: bool) -> Dict[str, Any]:
+    return {"valor": valor, "unidad": unidad, "mayor_es_mejor": mayor_es_mejor}
+
+
+def _mediana(funcion: Callable[[], float], repeticiones: int) -> float:
+    return statistics.median(funcion() for _ in range(repeticiones))
+
+
+# ----------------------------------------
+# 1. Benchmarks
+# ----------------------------------------
+def bench_conexion(iteraciones: int, repeticiones: int) -> Resultados:
+    """Microsegundos por apertura/cierre de medin_connection() y de un connect por bloque."""
+    def con_pool() -> float:
+        pool.cerrar_pools()
+        with medin_connection():
+            pass  # el pool se crea fuera de la medida
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            with medin_connection():
+                pass
+        return (time.perf_counter() - inicio) / iteraciones * 1e6
+
+    def connect_por_bloque() -> float:
+        n = max(1, iteraciones // 50)
+        inicio = time.perf_counter()
+        for _ in range(n):
+            fake_cx_oracle.connect(user="u", password="p", dsn="d").close()
+        return (time.perf_counter() - inicio) / n * 1e6
+
+    return {
+        "conexion.medin_connection_us": _resultado(_mediana(con_pool, repeticiones), "us/op", False),
+        "conexion.connect_por_bloque_us": _resultado(_mediana(connect_por_bloque, repeticiones), "us/op", False),
+    }
+
+
+def bench_fetch(tamanos: Sequence[int], repeticiones: int) -> Resultados:
+    """Filas/segundo leyendo FILAS_POR_DEFECTO filas con cada arraysize."""
+    resultados: Resultados = {}
+    conn = fake_cx_oracle.Connection()
+    for arraysize in tamanos:
+        def medir() -> float:
+            inicio = time.perf_counter()
+            filas = sum(len(l) for l in iterar_lotes(conn, "SELECT * FROM eventos", arraysize=arraysize))
+            return filas / (time.perf_counter() - inicio)
+        resultados[f"fetch.arraysize_{arraysize}_filas_s"] = _resultado(_mediana(medir, repeticiones), "filas/s", True)
+    return resultados
+
+
+def bench_concurrencia(hilos: Sequence[int], iteraciones: int) -> Resultados:
+    """Operaciones/segundo (adquirir + consulta de una fila + devolver) con varios hilos."""
+    resultados: Resultados = {}
+    for n in hilos:
+        pool.cerrar_pools()
+
+        def trabajo() -> None:
+            for _ in range(iteraciones):
+                with medin_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT 1 FROM DUAL")
+
+        # Calienta el pool con n sesiones para medir el régimen estable y no el arranque
+        conexiones = [medin_connection() for _ in range(n)]
+        for cm in conexiones:
+            cm.__enter__()
+        for cm in conexiones:
+            cm.__exit__(None, None, None)
+
+        workers = [threading.Thread(target=trabajo) for _ in range(n)]
+        inicio = time.perf_counter()
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        ops = n * iteraciones / (time.perf_counter() - inicio)
+        resultados[f"concurrencia.hilos_{n}_ops_s"] = _resultado(ops, "ops/s", True)
+    pool.cerrar_pools()
+    return resultados
+
+
+# ----------------------------------------
+# 2. Comparación y salida
+# ----------------------------------------
+def comparar(actual: Resultados, anterior: Resultados, tolerancia: float) -> List[str]:
+    """
+    Devuelve la lista de regresiones: resultados que empeoran más de `tolerancia` (fracción).
+    """
+    regresiones = []
+    for nombre, r in actual.items():
+        previo = anterior.get(nombre)
+        if not previo or not previo["valor"]:
+            continue
+        cambio = (r["valor"] - previo["valor"]) / previo["valor"]
+        empeora = -cambio if r["mayor_es_mejor"] else cambio
+        if empeora > tolerancia:
+            regresiones.append(f"{nombre}: {previo['valor']:.6g} -> {r['valor']:.6g} {r['unidad']} ({empeora:+.0%} peor)")
+    return regresiones
+
+
+def ejecutar(latencia_ms: float, rapido: bool = False) -> Dict[str, Any]:
+    """Ejecuta toda la suite y devuelve el documento JSON (metadatos + resultados)."""
+    fake_cx_oracle.LATENCIA_IDA_VUELTA = latencia_ms / 1000
+    fake_cx_oracle.LATENCIA_LOGON = 10 * latencia_ms / 1000
+    fake_cx_oracle.FILAS_POR_DEFECTO = 20_000 if rapido else 200_000
+    os.environ.setdefault("pool_max_MEDIN", "8")
+    repeticiones = 1 if rapido else 3
+
+    resultados: Resultados = {}
+    resultados.update(bench_conexion(100 if rapido else 1000, repeticiones))
+    resultados.update(bench_fetch((10, 100, 1000, 10_000), repeticiones))
+    resultados.update(bench_concurrencia((1, 2, 4, 8), 10 if rapido else 100))
+    return {
+        "metadatos": {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "latencia_ms": latencia_ms,
+            "filas": fake_cx_oracle.FILAS_POR_DEFECTO,
+        },
+        "resultados": resultados,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n\n")[1])
+    parser.add_argument("--salida", type=Path, help="Fichero JSON donde guardar los resultados")
+    parser.add_argument("--comparar", type=Path, help="JSON de una ejecución anterior")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento permitido (0.2 = 20%%)")
+    parser.add_argument("--latencia-ms", type=float, default=0.5, help="Latencia simulada por ida y vuelta")
+    parser.add_argument("--rapido", action="store_true", help="Menos filas e iteraciones (para CI)")
+    args = parser.parse_args(argv)
+
+    documento = ejecutar(args.latencia_ms, args.rapido)
+    for nombre, r in documento["resultados"].items():
+        print(f"{nombre:40s} {r['valor']:14.1f} {r['unidad']}")
+    if args.salida:
+        args.salida.write_text(json.dumps(documento, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.comparar:
+        anterior = json.loads(args.comparar.read_text(encoding="utf-8"))["resultados"]
+        regresiones = comparar(documento["resultados"], anterior, args.tolerancia)
+        for linea in regresiones:
+            print("REGRESIÓN", linea)
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
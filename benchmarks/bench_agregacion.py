@@ -0,0 +1,66 @@
+"""
+bench_agregacion.py
+
+Compara el tiempo de `src.agregacion.AgregadorProcesos` agregando en el propio proceso frente a
+repartir los lotes entre procesos trabajadores, y el coste de serializar los lotes con pickle
+frente al de agregarlos: repartir entre N núcleos solo compensa si la serialización es pequeña
+frente a la agregación.
+
+Uso:
+    python -m benchmarks.bench_agregacion
+"""
+
+import os
+import pickle
+import random
+import time
+from typing import Dict, List
+
+from src.agregacion import AgregadorProcesos, agregar_lote
+
+NOMBRES = ["CENTRO", "PACIENTE", "IMPORTE"]
+FILAS = 400_000
+TAMANO_LOTE = 20_000
+
+
+def generar_lotes() -> List[List[tuple]]:
+    rnd = random.Random(1)
+    filas = [(i % 20, f"p{rnd.randrange(50_000)}", rnd.random() * 1000) for i in range(FILAS)]
+    return [filas[i:i + TAMANO_LOTE] for i in range(0, FILAS, TAMANO_LOTE)]
+
+
+def medir(lotes: List[List[tuple]], procesos: int) -> float:
+    inicio = time.perf_counter()
+    with AgregadorProcesos(NOMBRES, ["PACIENTE", "IMPORTE"], clave="CENTRO", max_procesos=procesos) as agregador:
+        for lote in lotes:
+            agregador.enviar(lote)
+        agregador.resultado()
+    return time.perf_counter() - inicio
+
+
+def medir_traspaso(lotes: List[List[tuple]]) -> Dict[str, float]:
+    """Segundos en pasar todos los lotes a otro proceso (pickle de ida y vuelta) y en agregarlos."""
+    inicio = time.perf_counter()
+    for lote in lotes:
+        pickle.loads(pickle.dumps(lote, protocol=pickle.HIGHEST_PROTOCOL))
+    pickle_s = time.perf_counter() - inicio
+    posiciones = {nombre: i for i, nombre in enumerate(NOMBRES)}
+    inicio = time.perf_counter()
+    for lote in lotes:
+        agregar_lote(lote, posiciones, ["PACIENTE", "IMPORTE"], "CENTRO")
+    return {"pickle_ida_vuelta_s": pickle_s, "agregar_lotes_s": time.perf_counter() - inicio}
+
+
+def main() -> Dict[str, float]:
+    lotes = generar_lotes()
+    resultados = {"en_proceso_s": medir(lotes, 0)}
+    for procesos in sorted({2, os.cpu_count() or 1}):
+        resultados[f"procesos_{procesos}_s"] = medir(lotes, procesos)
+    resultados.update(medir_traspaso(lotes))
+    for clave, valor in resultados.items():
+        print(f"{clave:25s} {valor:8.3f} s")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
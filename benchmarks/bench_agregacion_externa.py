@@ -0,0 +1,71 @@
+"""
+bench_agregacion_externa.py
+
+Compara tiempo y memoria máxima de "usuarios distintos por categoría" calculado con un diccionario
+de conjuntos en memoria frente a `src.agregacion_externa.AgregacionExterna` con un presupuesto fijo,
+para tamaños de entrada crecientes.
+
+El camino en memoria crece con la entrada; el externo se mantiene cerca de su presupuesto a
+cambio de escribir y releer los volcados. La memoria máxima se mide con tracemalloc.
+
+Uso:
+    python -m benchmarks.bench_agregacion_externa
+"""
+
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, Sequence
+
+from src.agregacion_externa import AgregacionExterna
+
+CATEGORIAS = 50_000
+MEMORIA_MAXIMA = 16 * 2**20
+
+
+def generar_filas(n: int) -> Iterator[tuple]:
+    """Filas (categoría, usuario) sin materializar la entrada."""
+    rnd = random.Random(1)
+    for _ in range(n):
+        yield rnd.randrange(CATEGORIAS), f"u{rnd.randrange(n // 4 or 1)}"
+
+
+def _medir(funcion: Callable[[], int]) -> Dict[str, float]:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    claves = funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"segundos": segundos, "pico_mb": pico / 2**20, "claves": claves}
+
+
+def medir_en_memoria(n: int) -> Dict[str, float]:
+    def agrupar() -> int:
+        distintos: Dict[int, set] = {}
+        for categoria, usuario in generar_filas(n):
+            distintos.setdefault(categoria, set()).add(usuario)
+        return len({c: len(u) for c, u in distintos.items()})
+    return _medir(agrupar)
+
+
+def medir_externa(n: int) -> Dict[str, float]:
+    def agrupar() -> int:
+        with AgregacionExterna((0,), {"usuarios": ("distintos", 1)}, memoria_maxima=MEMORIA_MAXIMA) as agregacion:
+            agregacion.agregar(generar_filas(n))
+            return sum(1 for _ in agregacion.resultados())
+    return _medir(agrupar)
+
+
+def main(tamanos: Sequence[int] = (250_000, 1_000_000, 2_000_000)) -> Dict[str, Dict[str, float]]:
+    resultados = {}
+    for n in tamanos:
+        resultados[f"memoria_{n}"] = medir_en_memoria(n)
+        resultados[f"externa_{n}"] = medir_externa(n)
+    for clave, valor in resultados.items():
+        print(f"{clave:18s} {valor['segundos']:8.2f} s  pico {valor['pico_mb']:8.1f} MB  {valor['claves']:8.0f} claves")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
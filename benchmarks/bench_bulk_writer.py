@@ -0,0 +1,77 @@
+"""
+bench_bulk_writer.py
+
+Compara filas/segundo de inserciones fila a fila frente a los escritores por lotes de
+`src.bulk_writer`, sobre el driver simulado (con latencia por ida y vuelta) y sobre SQLite local.
+
+Uso:
+    python -m benchmarks.bench_bulk_writer
+"""
+
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks import fake_cx_oracle
+from src.bulk_writer import EscritorOracle, EscritorSQLite
+
+SQL = "INSERT INTO stats VALUES (:1, :2, :3)"
+
+
+def _filas(n: int) -> List[tuple]:
+    return [(i, f"cat{i % 10}", i * 0.5) for i in range(n)]
+
+
+def oracle_fila_a_fila(n: int) -> float:
+    conn = fake_cx_oracle.Connection()
+    cursor = conn.cursor()
+    inicio = time.perf_counter()
+    for fila in _filas(n):
+        cursor.executemany(SQL, [fila])
+        conn.commit()
+    return n / (time.perf_counter() - inicio)
+
+
+def oracle_por_lotes(n: int, tamano_lote: int) -> float:
+    inicio = time.perf_counter()
+    with EscritorOracle(fake_cx_oracle.Connection(), SQL, tamano_lote=tamano_lote) as escritor:
+        escritor.escribir(_filas(n))
+    return n / (time.perf_counter() - inicio)
+
+
+def sqlite_fila_a_fila(n: int, ruta: Path) -> float:
+    db = sqlite3.connect(str(ruta))
+    db.execute("CREATE TABLE IF NOT EXISTS stats (id, categoria, importe)")
+    inicio = time.perf_counter()
+    for fila in _filas(n):
+        db.execute("INSERT INTO stats VALUES (?, ?, ?)", fila)
+        db.commit()
+    db.close()
+    return n / (time.perf_counter() - inicio)
+
+
+def sqlite_por_lotes(n: int, ruta: Path, tamano_lote: int) -> float:
+    inicio = time.perf_counter()
+    with EscritorSQLite(ruta, "stats", ["id", "categoria", "importe"], tamano_lote=tamano_lote) as escritor:
+        escritor.escribir(_filas(n))
+    return n / (time.perf_counter() - inicio)
+
+
+def main() -> Dict[str, float]:
+    fake_cx_oracle.LATENCIA_IDA_VUELTA = 0.0005  # 0,5 ms por ida y vuelta
+    with tempfile.TemporaryDirectory() as tmp:
+        resultados = {
+            "oracle_fila_a_fila": oracle_fila_a_fila(1000),
+            "oracle_lotes_1000": oracle_por_lotes(100_000, 1000),
+            "sqlite_fila_a_fila": sqlite_fila_a_fila(2000, Path(tmp) / "fila.sqlite"),
+            "sqlite_lotes_1000": sqlite_por_lotes(100_000, Path(tmp) / "lotes.sqlite", 1000),
+        }
+    for clave, valor in resultados.items():
+        print(f"{clave:22s} {valor:12.0f} filas/s")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+bench_columnar.py
+
+Compara memoria y tiempo de agregación de `src.columnar.TablaColumnar` frente a una lista de
+tuplas agregada con bucles Python, usando el cursor simulado de `benchmarks.fake_cx_oracle`.
+
+Uso:
+    python -m benchmarks.bench_columnar
+"""
+
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict
+
+from benchmarks import fake_cx_oracle
+from src.columnar import consultar_columnar
+
+SQL = "SELECT id, categoria, importe FROM eventos"
+
+
+def medir_tuplas() -> Dict[str, float]:
+    tracemalloc.start()
+    cursor = fake_cx_oracle.Connection().cursor()
+    cursor.arraysize = 10_000
+    cursor.execute(SQL)
+    filas = cursor.fetchall()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    inicio = time.perf_counter()
+    sumas: Dict[str, float] = defaultdict(float)
+    for _, categoria, importe in filas:
+        sumas[categoria] += importe
+    return {"pico_mb": pico / 2**20, "agrupar_s": time.perf_counter() - inicio}
+
+
+def medir_columnar() -> Dict[str, float]:
+    tracemalloc.start()
+    tabla = consultar_columnar(fake_cx_oracle.Connection(), SQL)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    inicio = time.perf_counter()
+    tabla.agrupar("CATEGORIA", "IMPORTE", "sum")
+    return {"pico_mb": pico / 2**20, "agrupar_s": time.perf_counter() - inicio}
+
+
+def main() -> Dict[str, Dict[str, float]]:
+    fake_cx_oracle.FILAS_POR_DEFECTO = 500_000
+    resultados = {"tuplas": medir_tuplas(), "columnar": medir_columnar()}
+    for clave, valor in resultados.items():
+        print(f"{clave:10s} pico {valor['pico_mb']:8.1f} MB  agrupar {valor['agrupar_s']*1000:8.1f} ms")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
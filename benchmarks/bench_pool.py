@@ -0,0 +1,63 @@
+"""
+bench_pool.py
+
+Mide el rendimiento de adquirir/devolver sesiones con `src.pool` frente a abrir una conexión
+nueva en cada bloque, usando el driver simulado `benchmarks.fake_cx_oracle`.
+
+Uso:
+    python -m benchmarks.bench_pool
+"""
+
+import threading
+import time
+from typing import Dict
+
+from benchmarks import fake_cx_oracle
+from src import pool
+
+CONF = {"user": "u", "password": "p", "dsn": "d"}
+
+
+def medir_conectar_por_bloque(iteraciones: int) -> float:
+    """Devuelve operaciones/segundo abriendo una conexión nueva por bloque (comportamiento anterior)."""
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        conn = fake_cx_oracle.Connection()
+        conn.close()
+    return iteraciones / (time.perf_counter() - inicio)
+
+
+def medir_pool(iteraciones: int, hilos: int = 1) -> float:
+    """Devuelve operaciones/segundo tomando y devolviendo sesiones del pool desde `hilos` hilos."""
+    pool.cerrar_pools()
+
+    def trabajo() -> None:
+        for _ in range(iteraciones):
+            with pool.sesion("BENCH", CONF, driver=fake_cx_oracle):
+                pass
+
+    workers = [threading.Thread(target=trabajo) for _ in range(hilos)]
+    inicio = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    transcurrido = time.perf_counter() - inicio
+    pool.cerrar_pools()
+    return iteraciones * hilos / transcurrido
+
+
+def main() -> Dict[str, float]:
+    fake_cx_oracle.LATENCIA_LOGON = 0.005  # 5 ms por logon
+    resultados = {
+        "conectar_por_bloque_ops_s": medir_conectar_por_bloque(200),
+        "pool_1_hilo_ops_s": medir_pool(2000),
+        "pool_4_hilos_ops_s": medir_pool(2000, hilos=4),
+    }
+    for clave, valor in resultados.items():
+        print(f"{clave:30s} {valor:12.0f}")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
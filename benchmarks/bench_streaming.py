@@ -0,0 +1,67 @@
+"""
+bench_streaming.py
+
+Compara filas/segundo y memoria máxima de `src.streaming` con distintos tamaños de lote frente a
+`fetchall()`, usando el cursor simulado de `benchmarks.fake_cx_oracle`.
+
+La memoria máxima se mide con tracemalloc (pico de memoria asignada durante cada recorrido) y
+se informa también el RSS máximo del proceso.
+
+Uso:
+    python -m benchmarks.bench_streaming
+"""
+
+import resource
+import time
+import tracemalloc
+from typing import Dict, Sequence
+
+from benchmarks import fake_cx_oracle
+from src.streaming import iterar_filas
+
+SQL = "SELECT id, categoria, importe FROM eventos"
+
+
+def _medir(funcion) -> Dict[str, float]:
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    filas = funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"filas_s": filas / segundos, "pico_mb": pico / 2**20}
+
+
+def medir_streaming(arraysize: int) -> Dict[str, float]:
+    """Recorre el resultado con iterar_filas sin retener las filas."""
+    def recorrer() -> int:
+        total = 0
+        for _ in iterar_filas(fake_cx_oracle.Connection(), SQL, arraysize=arraysize):
+            total += 1
+        return total
+    return _medir(recorrer)
+
+
+def medir_fetchall() -> Dict[str, float]:
+    """Carga el resultado completo con fetchall (camino ingenuo)."""
+    def cargar() -> int:
+        cursor = fake_cx_oracle.Connection().cursor()
+        cursor.execute(SQL)
+        return len(cursor.fetchall())
+    return _medir(cargar)
+
+
+def main(tamanos: Sequence[int] = (100, 1000, 10000)) -> Dict[str, Dict[str, float]]:
+    fake_cx_oracle.FILAS_POR_DEFECTO = 500_000
+    fake_cx_oracle.LATENCIA_IDA_VUELTA = 0.0005  # 0,5 ms por ida y vuelta
+    resultados = {f"streaming_{n}": medir_streaming(n) for n in tamanos}
+    resultados["fetchall"] = medir_fetchall()
+    for clave, valor in resultados.items():
+        print(f"{clave:18s} {valor['filas_s']:12.0f} filas/s  pico {valor['pico_mb']:8.1f} MB")
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"RSS máximo del proceso: {rss_mb:.1f} MB")
+    return resultados
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+fake_cx_oracle.py
+
+Sustituto en proceso del módulo `cx_Oracle` para benchmarks y pruebas sin base de datos real.
+
+Expone la parte mínima de la API que usa el proyecto (`SessionPool`, `Connection`, `Cursor`,
+`DatabaseError`, `SPOOL_ATTRVAL_WAIT`) con una latencia simulada configurable por operación.
+Las filas de cualquier consulta las produce `GENERADOR_FILAS`, una función que recibe el SQL
+y los parámetros y devuelve un iterable de tuplas; `DESCRIPCION` es el `cursor.description`
+que acompaña a esas filas.
+
+Se puede pasar explícitamente como `driver` a `src.pool`, o instalar con `instalar()` como
+módulo `cx_Oracle` del proceso antes de importar `src`, para medir el código real
+(`medin_connection()`, `connection()`...) sin cambiarlo.
+
+Uso:
+    from benchmarks import fake_cx_oracle
+    from src.pool import sesion
+    with sesion("MEDIN", conf, driver=fake_cx_oracle) as conn:
+        ...
+
+    fake_cx_oracle.instalar()        # antes de cualquier `import src...`
+    from src.medin_connection import medin_connection
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+SPOOL_ATTRVAL_WAIT = 0
+
+
+class DbType:
+    """Equivalente a cx_Oracle.DbType: solo interesa su nombre."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"<DbType {self.name}>"
+
+
+DB_TYPE_NUMBER = DbType("DB_TYPE_NUMBER")
+DB_TYPE_VARCHAR = DbType("DB_TYPE_VARCHAR")
+DB_TYPE_DATE = DbType("DB_TYPE_DATE")
+
+# Latencias simuladas (segundos); se pueden modificar antes de cada benchmark
+LATENCIA_LOGON = 0.0
+LATENCIA_PING = 0.0
+LATENCIA_IDA_VUELTA = 0.0  # por cada execute y cada lote de filas pedido al servidor
+LATENCIA_FILA = 0.0  # por cada fila transferida en un lote (ancho de banda)
+# Función con la que se simulan las latencias; las pruebas pueden sustituirla por un reloj virtual
+DORMIR: Callable[[float], None] = time.sleep
+
+# Número de filas que devuelve el generador por defecto
+FILAS_POR_DEFECTO = 10_000
+
+
+def filas_por_defecto(sql: str, params: Dict[str, Any]) -> Iterable[tuple]:
+    """Genera FILAS_POR_DEFECTO filas estrechas (id, categoría, importe)."""
+    return ((i, f"cat{i % 10}", i * 0.5) for i in range(FILAS_POR_DEFECTO))
+
+
+GENERADOR_FILAS: Callable[[str, Dict[str, Any]], Iterable[tuple]] = filas_por_defecto
+
+# (nombre, tipo, display_size, internal_size, precision, scale, null_ok)
+DESCRIPCION: List[tuple] = [
+    ("ID", DB_TYPE_NUMBER, 11, None, 10, 0, False),
+    ("CATEGORIA", DB_TYPE_VARCHAR, 20, 20, None, None, True),
+    ("IMPORTE", DB_TYPE_NUMBER, 14, None, 12, 2, True),
+]
+
+
+class DatabaseError(Exception):
+    """Equivalente a cx_Oracle.DatabaseError."""
+
+
+class _BatchError:
+    """Equivalente a los errores devueltos por Cursor.getbatcherrors()."""
+
+    def __init__(self, offset: int, message: str) -> None:
+        self.offset = offset
+        self.message = message
+
+
+class Cursor:
+    """
+    Cursor simulado: cada `execute` y cada lote de `arraysize` filas cuesta una ida y vuelta.
+    Con `prefetchrows` las primeras filas llegan junto con la respuesta del `execute`. Como en
+    cx_Oracle, `fetchmany(n)` con n mayor que `arraysize` hace varias idas y vueltas de
+    `arraysize` filas, y las filas sobrantes quedan en el buffer para la siguiente llamada.
+    Si la conexión tiene `callTimeout` y la latencia lo supera, la ida y vuelta falla con DPI-1067.
+    """
+
+    def __init__(self, conexion: Optional["Connection"] = None) -> None:
+        self._conexion = conexion
+        self.arraysize = 100
+        self.prefetchrows = 2
+        self.description: Optional[List[tuple]] = None
+        self.rowcount = 0
+        self.idas_vuelta = 0
+        self._filas: Iterator[tuple] = iter(())
+        self._buffer: List[tuple] = []
+        self._agotado = False
+        self.filas_insertadas: List[Any] = []
+        self._errores_lote: List[_BatchError] = []
+
+    def _ida_vuelta(self) -> None:
+        self.idas_vuelta += 1
+        limite = self._conexion.callTimeout / 1000 if self._conexion is not None else 0
+        if limite and LATENCIA_IDA_VUELTA > limite:
+            DORMIR(limite)
+            raise DatabaseError(f"DPI-1067: call timeout of {self._conexion.callTimeout} ms exceeded with ORA-3156")
+        DORMIR(LATENCIA_IDA_VUELTA)
+
+    def execute(self, sql: str, params: Optional[Dict[str, Any]] = None) -> None:
+        self._ida_vuelta()
+        self.description = DESCRIPCION
+        self._filas = iter(GENERADOR_FILAS(sql, params or {}))
+        self._buffer = list(itertools.islice(self._filas, self.prefetchrows))
+        self._agotado = len(self._buffer) < self.prefetchrows
+        self.rowcount = 0
+
+    def _siguientes(self, n: int) -> List[tuple]:
+        lote: List[tuple] = []
+        while len(lote) < n:
+            if not self._buffer:
+                if self._agotado:
+                    break
+                self._ida_vuelta()
+                self._buffer = list(itertools.islice(self._filas, self.arraysize))
+                if LATENCIA_FILA:
+                    DORMIR(len(self._buffer) * LATENCIA_FILA)
+                # Un lote incompleto indica al cliente que no quedan filas en el servidor
+                self._agotado = len(self._buffer) < self.arraysize
+                if not self._buffer:
+                    break
+            tomadas = self._buffer[:n - len(lote)]
+            del self._buffer[:len(tomadas)]
+            lote.extend(tomadas)
+        self.rowcount += len(lote)
+        return lote
+
+    def fetchone(self) -> Optional[tuple]:
+        lote = self._siguientes(1)
+        return lote[0] if lote else None
+
+    def fetchmany(self, numRows: Optional[int] = None) -> List[tuple]:
+        return self._siguientes(numRows or self.arraysize)
+
+    def fetchall(self) -> List[tuple]:
+        filas: List[tuple] = []
+        while True:
+            lote = self._siguientes(self.arraysize)
+            if not lote:
+                return filas
+            filas.extend(lote)
+
+    def __iter__(self) -> Iterator[tuple]:
+        while True:
+            lote = self._siguientes(self.arraysize)
+            if not lote:
+                return
+            yield from lote
+
+    def executemany(self, sql: str, filas: List[Any], batcherrors: bool = False) -> None:
+        """Una sola ida y vuelta por lote; las filas con algún None se rechazan como inválidas."""
+        self._ida_vuelta()
+        self._errores_lote = []
+        for posicion, fila in enumerate(filas):
+            if None in fila:
+                if not batcherrors:
+                    raise DatabaseError("ORA-01400: cannot insert NULL")
+                self._errores_lote.append(_BatchError(posicion, "ORA-01400: cannot insert NULL"))
+            else:
+                self.filas_insertadas.append(fila)
+        self.rowcount = len(filas) - len(self._errores_lote)
+
+    def getbatcherrors(self) -> List[_BatchError]:
+        return self._errores_lote
+
+    def close(self) -> None:
+        self._buffer = []
+
+
+class Connection:
+    """Conexión simulada: cuenta los ping recibidos y crea cursores simulados."""
+
+    def __init__(self) -> None:
+        DORMIR(LATENCIA_LOGON)
+        self.pings = 0
+        self.callTimeout = 0  # milisegundos; 0 sin límite
+
+    def ping(self) -> None:
+        DORMIR(LATENCIA_PING)
+        self.pings += 1
+
+    def cursor(self) -> Cursor:
+        return Cursor(self)
+
+    def commit(self) -> None:
+        DORMIR(LATENCIA_IDA_VUELTA)
+
+    def close(self) -> None:
+        pass
+
+
+class SessionPool:
+    """
+    Pool simulado con la semántica de `SPOOL_ATTRVAL_WAIT`: si no quedan sesiones
+    libres y se alcanzó `max`, `acquire()` espera a que otra se libere.
+    """
+
+    def __init__(self, user: str, password: str, dsn: str, min: int = 1, max: int = 4,
+                 increment: int = 1, threaded: bool = True, getmode: int = SPOOL_ATTRVAL_WAIT,
+                 **kwargs: Any) -> None:
+        self.dsn = dsn
+        self.max = max
+        self.increment = increment
+        self.stmtcachesize = kwargs.get("stmtcachesize", 20)
+        self._libres: List[Connection] = [Connection() for _ in range(min)]
+        self.opened = min
+        self._cond = threading.Condition()
+
+    @property
+    def busy(self) -> int:
+        return self.opened - len(self._libres)
+
+    def acquire(self) -> Connection:
+        with self._cond:
+            while not self._libres and self.opened >= self.max:
+                self._cond.wait()
+            if not self._libres:
+                nuevas = min(self.increment, self.max - self.opened)
+                self._libres.extend(Connection() for _ in range(nuevas))
+                self.opened += nuevas
+            return self._libres.pop()
+
+    def release(self, conn: Connection) -> None:
+        with self._cond:
+            self._libres.append(conn)
+            self._cond.notify()
+
+    def drop(self, conn: Connection) -> None:
+        with self._cond:
+            self.opened -= 1
+            self._cond.notify()
+
+    def close(self, force: bool = False) -> None:
+        with self._cond:
+            self._libres.clear()
+            self.opened = 0
+
+
+def connect(user: str, password: str, dsn: str, **kwargs: Any) -> Connection:
+    """Equivalente a cx_Oracle.connect: una conexión nueva con su logon."""
+    return Connection()
+
+
+def instalar(credenciales: bool = True) -> None:
+    """
+    Registra este módulo como `cx_Oracle` en `sys.modules`.
+
+    Debe llamarse antes de importar cualquier módulo de `src`, que enlazan el driver al importarse.
+
+    Args:
+        credenciales (bool): Si es True, define credenciales ficticias para MEDIN y Simbad
+            (sin sobrescribir las existentes), para que `obtener_configuracion()` no falle.
+    """
+    sys.modules["cx_Oracle"] = sys.modules[__name__]
+    if credenciales:
+        for prefijo in ("MEDIN", "Simbad"):
+            for clave in ("user", "password", "dsn"):
+                os.environ.setdefault(f"{clave}_{prefijo}", f"bench_{clave}")
@@ -2,22 +2,114 @@
 logger_config.py
 
 Función para inicializar logging de forma consistente en toda la aplicación.
+
+Modo en cola (opcional): los registros se encolan con un QueueHandler y un QueueListener los
+escribe a consola y a fichero desde un hilo propio, de modo que la E/S de disco y las
+comprobaciones de rotación salen del hilo que ejecuta las consultas. La cola es acotada y,
+cuando se llena, se bloquea al emisor o se descarta el registro (contando los descartes).
 """
 
+import atexit
 import logging
 import logging.handlers
+import queue
+import threading
 from logging import Logger
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
+
+from config import metricas
+
+POLITICAS_DESBORDE = ("bloquear", "descartar")
+
+# Handlers y listener instalados por la última llamada a setup_logging()
+_handlers_instalados: List[logging.Handler] = []
+_listener: Optional["_EscuchaCola"] = None
+_lock = threading.Lock()
+
 
-def setup_logging(log_level: int = logging.DEBUG) -> None:
+class _ManejadorCola(logging.handlers.QueueHandler):
+    """
+    QueueHandler sobre una cola acotada con política de desborde configurable.
+    """
+
+    def __init__(self, cola: "queue.Queue[logging.LogRecord]", politica: str) -> None:
+        super().__init__(cola)
+        self.politica = politica
+        self.descartados = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.politica == "bloquear":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class _EscuchaCola(logging.handlers.QueueListener):
+    """
+    QueueListener que encola la marca de parada esperando hueco.
+
+    El original usa `put_nowait`, que lanza queue.Full justo cuando la cola está llena (el caso de
+    sobrecarga para el que existe este modo) y deja el hilo del listener en marcha.
+    """
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def _desmontar() -> None:
+    """Detiene el listener y retira y cierra los handlers de una llamada anterior."""
+    global _listener
+    root = logging.getLogger()
+    # Primero se retiran los handlers, para que nadie siga llenando la cola mientras se vacía
+    for handler in _handlers_instalados:
+        root.removeHandler(handler)
+    if _listener is not None:
+        # stop() vacía la cola antes de volver
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    for handler in _handlers_instalados:
+        handler.close()
+    _handlers_instalados.clear()
+
+
+def setup_logging(
+    log_level: int = logging.DEBUG,
+    metricas_activas: Optional[bool] = None,
+    en_cola: bool = False,
+    tamano_cola: int = 10_000,
+    politica: str = "bloquear",
+) -> None:
     """
     Inicializa el sistema de logging:
       - Un StreamHandler a consola con nivel INFO+
       - Un FileHandler rotatorio en logs/app.log con nivel DEBUG+
+      - Opcionalmente, la instrumentación de latencias (ver config/metricas.py)
+
+    Llama a esta función al arrancar tu app. Es idempotente: si se llama de nuevo, sustituye
+    los handlers instalados la vez anterior en lugar de duplicarlos.
 
-    Llama a esta función al arrancar tu app (una sola vez).
+    Args:
+        log_level (int): Nivel del logger raíz.
+        metricas_activas (Optional[bool]): Activa o desactiva las métricas del camino caliente;
+            None conserva el valor actual (por defecto, el de la variable METRICAS).
+        en_cola (bool): Si es True, los registros pasan por una cola y se escriben desde un hilo aparte.
+        tamano_cola (int): Capacidad máxima de la cola (solo en modo en cola).
+        politica (str): Qué hacer con la cola llena: 'bloquear' al emisor o 'descartar' el registro.
+
+    Raises:
+        ValueError: Si la política o el tamaño de la cola no son válidos.
     """
+    if politica not in POLITICAS_DESBORDE:
+        raise ValueError(f"Política de desborde no válida '{politica}'; opciones: {POLITICAS_DESBORDE}")
+    if tamano_cola < 1:
+        raise ValueError(f"tamano_cola debe ser positivo: {tamano_cola}")
+
     # 1) Crea carpeta de logs
     log_dir = Path(__file__).parent.parent / "logs"
     log_dir.mkdir(exist_ok=True)
@@ -42,15 +134,49 @@ def setup_logging(log_level: int = logging.DEBUG) -> None:
         datefmt="%Y-%m-%d %H:%M:%S"
     ))
 
-    # 3) Configuración global
-    root = logging.getLogger()
-    root.setLevel(log_level)
-    root.addHandler(console)
-    root.addHandler(file)
+    # 3) Configuración global (sustituye la de una llamada anterior)
+    global _listener
+    with _lock:
+        _desmontar()
+        root = logging.getLogger()
+        root.setLevel(log_level)
+        if en_cola:
+            manejador = _ManejadorCola(queue.Queue(maxsize=tamano_cola), politica)
+            _listener = _EscuchaCola(
+                manejador.queue, console, file, respect_handler_level=True
+            )
+            _listener.start()
+            _handlers_instalados.append(manejador)
+        else:
+            _handlers_instalados.extend([console, file])
+        for handler in _handlers_instalados:
+            root.addHandler(handler)
+
+    # 4) Métricas de latencia y rendimiento
+    if metricas_activas is not None:
+        metricas.habilitar(metricas_activas)
+
+def detener_logging() -> None:
+    """
+    Escribe los registros pendientes en la cola y retira los handlers instalados.
+
+    Se ejecuta automáticamente al terminar el proceso.
+    """
+    with _lock:
+        _desmontar()
+
+def registros_descartados() -> int:
+    """
+    Devuelve cuántos registros se han descartado por cola llena (política 'descartar').
+    """
+    with _lock:
+        return sum(getattr(h, "descartados", 0) for h in _handlers_instalados)
 
 def get_logger(name: Optional[str] = None) -> Logger:
     """
     Devuelve un logger ya configurado.
     Úsalo siempre tras llamar a setup_logging().
     """
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
+
+atexit.register(detener_logging)
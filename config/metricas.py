@@ -0,0 +1,194 @@
+"""
+metricas.py
+
+Instrumentación de latencia y rendimiento del camino caliente (conexión, ejecución y lectura).
+
+Cada medida se registra como un registro de log estructurado (logger "metricas", nivel DEBUG,
+con el diccionario de la medida en el atributo `metrica` del registro) y se acumula en un
+histograma en memoria del que se obtienen p50/p95/p99 al final de la ejecución.
+
+Desactivada (valor por defecto) cuesta una comprobación de un booleano por medida, así que
+puede quedarse en el código de producción. Se activa con `habilitar()`, con
+`setup_logging(metricas_activas=True)` o con la variable de entorno METRICAS=1.
+
+Eventos que registra el proyecto:
+    pool.adquirir     segundos esperando una sesión del pool (incluye el ping de salud)
+    consulta.execute  segundos de `cursor.execute`
+    consulta.fetch    segundos de cada lote leído
+    consulta.filas    filas devueltas por consulta
+    consulta.bytes    bytes aproximados devueltos por consulta
+
+Uso:
+    from config import metricas
+    with metricas.cronometro("consulta.execute", base="MEDIN"):
+        cursor.execute(sql)
+    metricas.volcar()   # escribe el resumen por evento en el log
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from types import TracebackType
+from typing import Any, Dict, Iterable, Optional, Type
+
+logger = logging.getLogger("metricas")
+
+_habilitado = os.getenv("METRICAS", "").lower() in ("1", "true", "si", "sí")
+_lock = threading.Lock()
+_histogramas: Dict[str, "Histograma"] = {}
+
+# Cada cubeta del histograma abarca un 2 % de ancho relativo
+_FACTOR_CUBETA = 1.02
+_LOG_FACTOR = math.log(_FACTOR_CUBETA)
+
+
+class Histograma:
+    """
+    Histograma de cubetas logarítmicas: memoria constante y percentiles con un error relativo
+    inferior al 2 %.
+    """
+
+    def __init__(self) -> None:
+        self.cubetas: Dict[int, int] = {}
+        self.ceros = 0
+        self.cantidad = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def agregar(self, valor: float) -> None:
+        self.cantidad += 1
+        self.suma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+        if valor <= 0:
+            self.ceros += 1
+            return
+        indice = math.floor(math.log(valor) / _LOG_FACTOR)
+        self.cubetas[indice] = self.cubetas.get(indice, 0) + 1
+
+    def percentil(self, q: float) -> float:
+        """Valor aproximado del percentil `q` (0-100)."""
+        if self.cantidad == 0:
+            return math.nan
+        objetivo = max(1, math.ceil(self.cantidad * q / 100))
+        acumulado = self.ceros
+        if acumulado >= objetivo:
+            return 0.0
+        for indice in sorted(self.cubetas):
+            acumulado += self.cubetas[indice]
+            if acumulado >= objetivo:
+                # Punto medio geométrico de la cubeta, sin pasar del máximo observado
+                return min(_FACTOR_CUBETA ** (indice + 0.5), self.maximo)
+        return self.maximo
+
+    def resumen(self) -> Dict[str, float]:
+        return {
+            "cantidad": self.cantidad,
+            "suma": self.suma,
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99),
+            "max": self.maximo,
+        }
+
+
+def habilitar(activo: bool = True) -> None:
+    """Activa o desactiva la instrumentación."""
+    global _habilitado
+    _habilitado = activo
+
+
+def habilitado() -> bool:
+    """Indica si la instrumentación está activa."""
+    return _habilitado
+
+
+def registrar(evento: str, valor: float, **campos: Any) -> None:
+    """
+    Registra una medida: la acumula en el histograma de `evento` y emite un registro estructurado.
+
+    Args:
+        evento (str): Nombre del evento (por ejemplo, 'consulta.execute').
+        valor (float): Valor medido (segundos, filas, bytes...).
+        **campos: Contexto adicional del registro (base, consulta...).
+    """
+    if not _habilitado:
+        return
+    with _lock:
+        histograma = _histogramas.get(evento)
+        if histograma is None:
+            histograma = _histogramas[evento] = Histograma()
+        histograma.agregar(valor)
+    if logger.isEnabledFor(logging.DEBUG):
+        metrica = {"evento": evento, "valor": valor, **campos}
+        logger.debug("%s=%.6g %s", evento, valor, campos, extra={"metrica": metrica})
+
+
+class cronometro:
+    """
+    Context manager que mide los segundos del bloque y los registra como `evento`.
+
+    Es una clase (y no un generador) para que, desactivada, no cueste más que una llamada.
+    """
+
+    __slots__ = ("evento", "campos", "inicio")
+
+    def __init__(self, evento: str, **campos: Any) -> None:
+        self.evento = evento
+        self.campos = campos
+        self.inicio = 0.0
+
+    def __enter__(self) -> "cronometro":
+        if _habilitado:
+            self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        tipo: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if _habilitado and self.inicio:
+            registrar(self.evento, time.perf_counter() - self.inicio, **self.campos)
+
+
+def tamano_aproximado(filas: Iterable[tuple]) -> int:
+    """Bytes aproximados de un lote de filas: longitud de textos y binarios, 8 bytes para el resto."""
+    total = 0
+    for fila in filas:
+        for valor in fila:
+            total += len(valor) if isinstance(valor, (str, bytes)) else 8
+    return total
+
+
+def resumen() -> Dict[str, Dict[str, float]]:
+    """Devuelve cantidad, suma, p50, p95, p99 y máximo de cada evento registrado."""
+    with _lock:
+        return {evento: h.resumen() for evento, h in sorted(_histogramas.items())}
+
+
+def volcar(destino: Optional[logging.Logger] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Escribe en el log (nivel INFO) el resumen de cada evento y lo devuelve.
+
+    Args:
+        destino (Optional[logging.Logger]): Logger de destino; por defecto el logger "metricas".
+    """
+    datos = resumen()
+    destino = destino or logger
+    for evento, r in datos.items():
+        destino.info(
+            "%s: n=%d suma=%.6g p50=%.6g p95=%.6g p99=%.6g max=%.6g",
+            evento, r["cantidad"], r["suma"], r["p50"], r["p95"], r["p99"], r["max"],
+            extra={"metrica": {"evento": evento, **r}},
+        )
+    return datos
+
+
+def reiniciar() -> None:
+    """Borra todos los histogramas acumulados."""
+    with _lock:
+        _histogramas.clear()
@@ -0,0 +1,5 @@
+-- nombre: ping
+-- base: MEDIN
+-- descripcion: Comprobación de conectividad (una fila con el valor 1)
+-- parametros:
+SELECT 1 FROM DUAL
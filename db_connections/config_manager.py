@@ -5,26 +5,70 @@ Módulo de gestión de configuración de múltiples conexiones a bases de datos
 Lee parámetros de conexión desde un archivo .env ubicado en la raíz del proyecto.
 
 Funciones principales:
-- cargar_configuracion(): Devuelve un diccionario con las configuraciones de conexión.
+- obtener_configuracion(): Devuelve la configuración del proceso (leída una vez y memorizada).
+- recargar_configuracion(): Vuelve a leer el .env y el entorno, sustituye la configuración memorizada
+  y cierra los pools de las bases cuyas credenciales cambiaron.
+- cargar_configuracion(): Devuelve un diccionario con las configuraciones de conexión (sin memorizar).
+- prefijos_configurados(): Devuelve los prefijos de base de datos declarados en DB_PREFIJOS.
 - _leer_vars(prefijo): Lee y valida las variables de entorno para un prefijo dado.
 
+El .env no se lee al importar el módulo, sino la primera vez que se necesita la configuración,
+de modo que los comandos que no tocan la base de datos no pagan ese coste.
+
+Las bases de datos expuestas se declaran en la variable DB_PREFIJOS (separadas por comas,
+por defecto "MEDIN,Simbad"); añadir una tercera base solo requiere sus variables en el .env.
+
 Uso:
-    from db_connections.config_manager import cargar_configuracion
-    config = cargar_configuracion()
-    # config['MEDIN'] -> credenciales de MEDIN
+    from db_connections.config_manager import obtener_configuracion
+    config = obtener_configuracion()
+    # config['MEDIN'] -> credenciales de MEDIN (validadas la primera vez que se piden)
 """
 
 import os
-from dotenv import load_dotenv
+import threading
 from pathlib import Path
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Iterator, List, Mapping, Optional, Tuple
 
 # ----------------------------------------
 # 1. Carga de variables de entorno
 # ----------------------------------------
 # Asume que el .env está un nivel por encima de este archivo (en la raíz del proyecto)
 env_path = Path(__file__).parent.parent / ".env"
-load_dotenv(dotenv_path=env_path)
+
+# Bases de datos expuestas si DB_PREFIJOS no está definida
+PREFIJOS_POR_DEFECTO = "MEDIN,Simbad"
+
+_lock = threading.RLock()
+_env_cargado = False
+_env_mtime: Optional[float] = None
+_configuracion: Optional["Configuracion"] = None
+
+
+def _mtime_env() -> Optional[float]:
+    """Devuelve la fecha de modificación del .env, o None si no existe."""
+    try:
+        return env_path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def _cargar_env(forzar: bool = False) -> None:
+    """
+    Carga el .env en el entorno la primera vez que se llama (o siempre, con `forzar`).
+
+    python-dotenv se importa aquí para no pagar su importación en los comandos que no lo usan.
+    Al forzar la recarga, los valores del .env sustituyen a los ya cargados en el entorno.
+    """
+    global _env_cargado, _env_mtime
+    with _lock:
+        if _env_cargado and not forzar:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv(dotenv_path=env_path, override=forzar)
+        _env_mtime = _mtime_env()
+        _env_cargado = True
 
 
 # ----------------------------------------
@@ -39,12 +83,15 @@ def _leer_vars(prefijo: str) -> Dict[str, str]:
         password_{PREFIJO}
         dsn_{PREFIJO}
 
+    y, opcionalmente, dsn_failover_{PREFIJO} (DSN secundario si el principal no responde).
+
     Args:
         prefijo (str): Sufijo que identifica el bloque de variables
                         (por ejemplo, 'MEDIN' o 'Simbad').
 
     Returns:
-        Dict[str, str]: Diccionario con las claves 'user', 'password' y 'dsn'.
+        Dict[str, str]: Diccionario con las claves 'user', 'password' y 'dsn'
+            (y 'dsn_failover' si está definida).
 
     Raises:
         EnvironmentError: Si falta alguna de las variables esperadas.
@@ -59,17 +106,39 @@ def _leer_vars(prefijo: str) -> Dict[str, str]:
     if faltantes:
         raise EnvironmentError(f"Faltan variables {faltantes} para '{prefijo}'")
 
+    failover = os.getenv(f"dsn_failover_{prefijo}")
+    if failover:
+        valores["dsn_failover"] = failover
     return valores
 
 
 # ----------------------------------------
-# 3. Función pública
+# 3. Funciones públicas
 # ----------------------------------------
+def prefijos_configurados() -> List[str]:
+    """
+    Devuelve los prefijos de las bases de datos configuradas.
+
+    Se leen de la variable de entorno DB_PREFIJOS (lista separada por comas) y,
+    si no existe, se usan las bases históricas MEDIN y Simbad.
+
+    Returns:
+        List[str]: Prefijos en el orden declarado, sin espacios ni duplicados.
+    """
+    valor = os.getenv("DB_PREFIJOS") or PREFIJOS_POR_DEFECTO
+    prefijos: List[str] = []
+    for prefijo in valor.split(","):
+        prefijo = prefijo.strip()
+        if prefijo and prefijo not in prefijos:
+            prefijos.append(prefijo)
+    return prefijos
+
+
 def cargar_configuracion() -> Dict[str, Dict[str, Any]]:
     """
     Construye y devuelve la configuración de todas las conexiones configuradas.
 
-    Utiliza _leer_vars() para cada base de datos que queramos exponer.
+    Utiliza _leer_vars() para cada prefijo devuelto por prefijos_configurados().
 
     Returns:
         Dict[str, Dict[str, Any]]: Mapeo de nombre de conexión a sus credenciales,
@@ -78,7 +147,109 @@ def cargar_configuracion() -> Dict[str, Dict[str, Any]]:
     Raises:
         EnvironmentError: Si la lectura de variables falla en alguna conexión.
     """
-    return {
-        "MEDIN": _leer_vars("MEDIN"),
-        "Simbad": _leer_vars("Simbad"),
-    }
+    _cargar_env()
+    return {prefijo: _leer_vars(prefijo) for prefijo in prefijos_configurados()}
+
+
+# ----------------------------------------
+# 4. Configuración memorizada
+# ----------------------------------------
+class Configuracion(Mapping[str, Mapping[str, str]]):
+    """
+    Configuración inmutable de todas las bases, leída una sola vez por proceso.
+
+    Los prefijos se fijan al crearla; las credenciales de cada base se leen y validan la primera
+    vez que se piden, de modo que la falta de variables de Simbad no afecta a MEDIN.
+
+    Raises:
+        KeyError: Al pedir una base que no está en DB_PREFIJOS.
+        EnvironmentError: Al pedir una base a la que le faltan variables.
+    """
+
+    def __init__(self, prefijos: List[str]) -> None:
+        self._prefijos: Tuple[str, ...] = tuple(prefijos)
+        self._validadas: Dict[str, Mapping[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, prefijo: str) -> Mapping[str, str]:
+        conf = self._validadas.get(prefijo)
+        if conf is not None:
+            return conf
+        if prefijo not in self._prefijos:
+            raise KeyError(prefijo)
+        with self._lock:
+            if prefijo not in self._validadas:
+                self._validadas[prefijo] = MappingProxyType(_leer_vars(prefijo))
+            return self._validadas[prefijo]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._prefijos)
+
+    def __len__(self) -> int:
+        return len(self._prefijos)
+
+    def __repr__(self) -> str:
+        # Nunca mostrar contraseñas
+        return f"Configuracion(prefijos={list(self._prefijos)})"
+
+
+def obtener_configuracion(autorecarga: bool = False) -> Configuracion:
+    """
+    Devuelve la configuración del proceso, creándola la primera vez.
+
+    Args:
+        autorecarga (bool): Si es True, se comprueba la fecha de modificación del .env y,
+            si cambió desde la última lectura, se recarga la configuración.
+
+    Returns:
+        Configuracion: Configuración memorizada (la misma instancia mientras no se recargue).
+    """
+    conf = _configuracion
+    if conf is not None and not (autorecarga and _mtime_env() != _env_mtime):
+        return conf
+    with _lock:
+        if _configuracion is None:
+            _cargar_env()
+            return _nueva_configuracion()
+        if autorecarga and _mtime_env() != _env_mtime:
+            return recargar_configuracion()
+        return _configuracion
+
+
+def _nueva_configuracion() -> Configuracion:
+    global _configuracion
+    _configuracion = Configuracion(prefijos_configurados())
+    return _configuracion
+
+
+def recargar_configuracion() -> Configuracion:
+    """
+    Vuelve a leer el .env y el entorno y sustituye la configuración memorizada.
+
+    Los pools de sesiones de las bases cuyas credenciales o DSN cambian (o que dejan de estar
+    configuradas) se cierran con `src.pool.cerrar_pools`, de modo que el siguiente préstamo ya
+    usa los valores nuevos; las sesiones prestadas en ese momento terminan con los antiguos.
+    Los tamaños de pool (`pool_*_{PREFIJO}`) solo se aplican al crear un pool nuevo.
+
+    Returns:
+        Configuracion: La nueva configuración.
+    """
+    with _lock:
+        anterior = dict(_configuracion._validadas) if _configuracion is not None else {}
+        _cargar_env(forzar=True)
+        nueva = _nueva_configuracion()
+        cambiadas = [prefijo for prefijo, conf in anterior.items() if _conf_o_none(nueva, prefijo) != conf]
+    if cambiadas:
+        # Importación diferida: la configuración no depende del driver salvo al recargar
+        from src.pool import cerrar_pools
+
+        cerrar_pools(cambiadas)
+    return nueva
+
+
+def _conf_o_none(conf: Configuracion, prefijo: str) -> Optional[Mapping[str, str]]:
+    """Credenciales de `prefijo` en `conf`, o None si ya no está configurada o le faltan variables."""
+    try:
+        return conf[prefijo]
+    except (KeyError, EnvironmentError):
+        return None
@@ -1,25 +1,350 @@
-from src.medin_connection import medin_connection
-import cx_Oracle
+"""
+main.py
 
+Línea de comandos del proyecto, con un subcomando por tarea:
 
-def main():
+    python main.py [ping] [--base MEDIN]
+    python main.py collect [CONSULTA ...] [--dia AAAA-MM-DD] [--param NOMBRE=VALOR ...] [--hilos 8]
+    python main.py backfill NOMBRE CONSULTA --desde AAAA-MM-DD --hasta AAAA-MM-DD [--granularidad semana]
+    python main.py export CONSULTA SALIDA [CONSULTA SALIDA ...] [--formato jsonl] [--gzip] [--dia AAAA-MM-DD]
+    python main.py bench [ARGUMENTOS DE python -m benchmarks ...]
+
+Sin subcomando se ejecuta `ping` (la prueba de conexión a MEDIN de siempre).
+
+Para que las invocaciones cortas desde cron arranquen rápido, este módulo solo importa la
+biblioteca estándar: cx_Oracle, la configuración (.env) y los módulos de `src` se importan
+dentro del subcomando que los necesita. Así `--help` o `bench` no cargan el driver ni leen el `.env`.
+
+Con `--profile`, el subcomando se ejecuta bajo cProfile y se mide el tiempo de cada importación
+(propio y acumulado, como `python -X importtime`). Los informes se guardan en `perfiles/`
+(`<comando>.prof`, legible con `python -m pstats`, y `<comando>_importaciones.txt`) y se
+resumen por la salida de error.
+"""
+
+import argparse
+import datetime
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+DIRECTORIO_PERFILES = Path(__file__).parent / "perfiles"
+
+
+def medin_connection() -> Any:
+    """Context manager de conexión a MEDIN (ver `src/medin_connection.py`), importado al usarlo."""
+    from src.medin_connection import medin_connection as abrir
+
+    return abrir()
+
+
+# ----------------------------------------
+# 1. Subcomandos
+# ----------------------------------------
+def _ping(args: argparse.Namespace) -> int:
     """
-    Ejecuta una prueba de conexión a la base de datos MEDIN usando el context manager personalizado.
+    Ejecuta una prueba de conexión a la base de datos (MEDIN por defecto).
     Realiza una consulta simple a DUAL para verificar la conectividad y maneja errores comunes.
     """
+    import cx_Oracle
+
     try:
-        with medin_connection() as conn:
+        from src.catalogo import obtener_catalogo
+
+        if args.base == "MEDIN":
+            abrir = medin_connection()
+        else:
+            from src.connection import connection
+
+            abrir = connection(args.base)
+        with abrir as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM DUAL")
+            cursor.execute(obtener_catalogo()["ping"].sql)
             resultado = cursor.fetchone()
             print("Prueba OK, DUAL=>", resultado[0])
+            return 0
     except KeyError:
-        print("Error: No se encontró la configuración 'MEDIN' en el config manager.")
+        print(f"Error: No se encontró la configuración '{args.base}' en el config manager.")
     except cx_Oracle.DatabaseError as db_err:
         print("Error de conexión a Oracle:", db_err)
     except Exception as exc:
         print("Error inesperado:", exc)
+    return 1
+
+
+def _parametros(declarados: Sequence[str], args: argparse.Namespace) -> Optional[Dict[str, Any]]:
+    """Valores de las variables de enlace `declarados` tomados de --dia y --param (None si falta alguno)."""
+    disponibles: Dict[str, Any] = dict(args.param)
+    if args.dia is not None:
+        disponibles["dia"] = args.dia
+    if not set(declarados) <= set(disponibles):
+        return None
+    return {nombre: disponibles[nombre] for nombre in declarados}
+
+
+def _collect(args: argparse.Namespace) -> int:
+    """Ejecuta consultas del catálogo en paralelo y muestra la duración de cada una."""
+    from src.catalogo import obtener_catalogo
+
+    catalogo = obtener_catalogo()
+    nombres = args.consultas or list(catalogo)
+    peticiones = []
+    for nombre in nombres:
+        if nombre not in catalogo:
+            print(f"Error: la consulta '{nombre}' no está en el catálogo", file=sys.stderr)
+            return 2
+        params = _parametros(catalogo[nombre].parametros, args)
+        if params is None:
+            if args.consultas:
+                print(f"Error: faltan parámetros {list(catalogo[nombre].parametros)} para '{nombre}'", file=sys.stderr)
+                return 2
+            # Sin nombres explícitos se ejecutan las consultas cuyos parámetros se conocen
+            continue
+        peticiones.append((nombre, params))
+
+    informe = catalogo.recolectar(peticiones, max_hilos=args.hilos)
+    print(informe.resumen())
+    return 0 if all(r.ok for r in informe.resultados) else 1
+
+
+def _backfill(args: argparse.Namespace) -> int:
+    """Extrae un rango de fechas de una consulta del catálogo con `:desde` y `:hasta` (ver src/backfill.py)."""
+    from src.backfill import Backfill, TrabajoBackfill
+    from src.catalogo import obtener_catalogo
+
+    catalogo = obtener_catalogo()
+    if args.consulta not in catalogo:
+        print(f"Error: la consulta '{args.consulta}' no está en el catálogo", file=sys.stderr)
+        return 2
+    consulta = catalogo[args.consulta]
+    if set(consulta.parametros) != {"desde", "hasta"}:
+        print(f"Error: '{args.consulta}' debe declarar exactamente los parámetros desde y hasta", file=sys.stderr)
+        return 2
+    trabajo = TrabajoBackfill(args.nombre, consulta.base, consulta.sql, args.desde, args.hasta, args.granularidad)
+    resumen = Backfill(trabajo, reiniciar=args.reiniciar).ejecutar(max_hilos=args.hilos)
+    print(
+        f"Backfill {args.nombre}: {resumen.completadas}/{resumen.particiones} particiones "
+        f"({resumen.reanudadas} ya hechas), {resumen.filas} filas en {resumen.segundos:.1f}s"
+    )
+    for particion, error in resumen.fallidas:
+        print(f"  {particion.desde} - {particion.hasta}: {error}", file=sys.stderr)
+    return 0 if resumen.ok else 1
+
+
+def _export(args: argparse.Namespace) -> int:
+    """Exporta consultas del catálogo a ficheros en streaming, en paralelo (ver src/exportacion.py)."""
+    from src.catalogo import obtener_catalogo
+    from src.exportacion import Exportacion, exportar_en_paralelo
+
+    if len(args.pares) % 2:
+        print("Error: se esperaban pares CONSULTA SALIDA", file=sys.stderr)
+        return 2
+    catalogo = obtener_catalogo()
+    exportaciones = []
+    for nombre, salida in zip(args.pares[::2], args.pares[1::2]):
+        if nombre not in catalogo:
+            print(f"Error: la consulta '{nombre}' no está en el catálogo", file=sys.stderr)
+            return 2
+        consulta = catalogo[nombre]
+        params = _parametros(consulta.parametros, args)
+        if params is None:
+            print(f"Error: faltan parámetros {list(consulta.parametros)} para '{nombre}'", file=sys.stderr)
+            return 2
+        exportaciones.append(
+            Exportacion(nombre, consulta.base, consulta.sql, Path(salida), params, args.formato, args.gzip or None)
+        )
+    informe = exportar_en_paralelo(exportaciones, max_hilos=args.hilos)
+    print(informe.resumen())
+    return 0 if informe.ok else 1
+
+
+def _bench(args: argparse.Namespace) -> int:
+    """Ejecuta la suite de benchmarks (`python -m benchmarks`) con el driver simulado."""
+    # benchmarks.__main__ instala el driver simulado como cx_Oracle: debe importarse antes que src
+    import importlib
+
+    return importlib.import_module("benchmarks.__main__").main(args.argumentos)
+
+
+# ----------------------------------------
+# 2. Perfilado
+# ----------------------------------------
+class _CargadorMedido:
+    """Envuelve el loader de un módulo para medir cuánto tarda en ejecutarse."""
+
+    def __init__(self, cargador: Any, nombre: str, medidor: "_MedidorImportaciones") -> None:
+        self._cargador = cargador
+        self._nombre = nombre
+        self._medidor = medidor
+
+    def __getattr__(self, atributo: str) -> Any:
+        return getattr(self._cargador, atributo)
+
+    def create_module(self, spec: Any) -> Any:
+        return self._cargador.create_module(spec)
+
+    def exec_module(self, modulo: Any) -> None:
+        self._medidor.medir(self._nombre, lambda: self._cargador.exec_module(modulo))
+
+
+class _MedidorImportaciones:
+    """
+    Buscador de `sys.meta_path` que mide el tiempo propio y acumulado de cada importación.
+
+    Delega la búsqueda en el resto de buscadores y solo envuelve el loader encontrado.
+    """
+
+    def __init__(self) -> None:
+        # (módulo, segundos propios, segundos acumulados, profundidad), en orden de finalización
+        self.tiempos: List[tuple] = []
+        self._hijos: List[float] = [0.0]
+
+    def find_spec(self, nombre: str, ruta: Any, objetivo: Any = None) -> Any:
+        for buscador in sys.meta_path:
+            if buscador is self or not hasattr(buscador, "find_spec"):
+                continue
+            spec = buscador.find_spec(nombre, ruta, objetivo)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _CargadorMedido(spec.loader, nombre, self)
+                return spec
+        return None
+
+    def medir(self, nombre: str, ejecutar: Callable[[], None]) -> None:
+        import time
+
+        profundidad = len(self._hijos) - 1
+        self._hijos.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            ejecutar()
+        finally:
+            acumulado = time.perf_counter() - inicio
+            hijos = self._hijos.pop()
+            self._hijos[-1] += acumulado
+            self.tiempos.append((nombre, acumulado - hijos, acumulado, profundidad))
+
+    def informe(self) -> str:
+        lineas = ["import time: self [us] | cumulative | imported package"]
+        for nombre, propio, acumulado, profundidad in self.tiempos:
+            lineas.append(f"import time: {propio * 1e6:9.0f} | {acumulado * 1e6:10.0f} | {'  ' * profundidad}{nombre}")
+        return "\n".join(lineas)
+
+
+def _ejecutar_con_perfil(comando: str, funcion: Callable[[], int], directorio: Path) -> int:
+    """Ejecuta `funcion` con cProfile y el medidor de importaciones, y guarda ambos informes."""
+    import cProfile
+    import io
+    import pstats
+
+    medidor = _MedidorImportaciones()
+    perfil = cProfile.Profile()
+    sys.meta_path.insert(0, medidor)
+    perfil.enable()
+    try:
+        return funcion()
+    finally:
+        perfil.disable()
+        sys.meta_path.remove(medidor)
+        directorio.mkdir(parents=True, exist_ok=True)
+        perfil.dump_stats(str(directorio / f"{comando}.prof"))
+        (directorio / f"{comando}_importaciones.txt").write_text(medidor.informe() + "\n", encoding="utf-8")
+
+        texto = io.StringIO()
+        pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(20)
+        print(texto.getvalue(), file=sys.stderr)
+        print("Importaciones más costosas (acumulado):", file=sys.stderr)
+        for nombre, propio, acumulado, _ in sorted(medidor.tiempos, key=lambda t: -t[2])[:15]:
+            print(f"  {acumulado * 1000:9.1f} ms  (propio {propio * 1000:7.1f} ms)  {nombre}", file=sys.stderr)
+        print(f"Informes de perfil en {directorio}", file=sys.stderr)
+
+
+# ----------------------------------------
+# 3. Argumentos
+# ----------------------------------------
+def _fecha(texto: str) -> datetime.date:
+    try:
+        return datetime.date.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fecha no válida (AAAA-MM-DD): {texto}") from None
+
+
+def _par(texto: str) -> tuple:
+    nombre, separador, valor = texto.partition("=")
+    if not separador or not nombre:
+        raise argparse.ArgumentTypeError(f"se esperaba NOMBRE=VALOR: {texto}")
+    return nombre.lower(), valor
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Construye el parser de la línea de comandos."""
+    parser = argparse.ArgumentParser(prog="python main.py", description="Estadísticas MEDIN/Simbad")
+    parser.add_argument("--profile", action="store_true", help="perfila el subcomando (cProfile e importaciones)")
+    parser.add_argument("--directorio-perfil", type=Path, default=DIRECTORIO_PERFILES, help="destino de los informes de perfil")
+    subparsers = parser.add_subparsers(dest="comando")
+
+    def parametros(sub: argparse.ArgumentParser) -> None:
+        sub.add_argument("--dia", type=_fecha, help="valor de la variable de enlace :dia")
+        sub.add_argument("--param", type=_par, action="append", default=[], metavar="NOMBRE=VALOR",
+                         help="valor de otra variable de enlace (texto)")
+
+    ping = subparsers.add_parser("ping", help="prueba de conexión (por defecto)")
+    ping.add_argument("--base", default="MEDIN")
+    ping.set_defaults(funcion=_ping)
+
+    collect = subparsers.add_parser("collect", help="ejecuta consultas del catálogo en paralelo")
+    collect.add_argument("consultas", nargs="*", help="por defecto, todas las que tengan sus parámetros")
+    parametros(collect)
+    collect.add_argument("--hilos", type=int, default=8)
+    collect.set_defaults(funcion=_collect)
+
+    backfill = subparsers.add_parser("backfill", help="extrae un rango de fechas por particiones")
+    backfill.add_argument("nombre", help="identificador del backfill (estado/backfill/<nombre>)")
+    backfill.add_argument("consulta", help="consulta del catálogo con :desde y :hasta")
+    backfill.add_argument("--desde", type=_fecha, required=True)
+    backfill.add_argument("--hasta", type=_fecha, required=True)
+    backfill.add_argument("--granularidad", choices=("dia", "semana"), default="dia")
+    backfill.add_argument("--hilos", type=int)
+    backfill.add_argument("--reiniciar", action="store_true", help="descarta las particiones ya extraídas")
+    backfill.set_defaults(funcion=_backfill)
+
+    export = subparsers.add_parser("export", help="vuelca el resultado de consultas a ficheros CSV, JSONL o XLSX")
+    export.add_argument("pares", nargs="+", metavar="CONSULTA SALIDA", help="consulta del catálogo y fichero de salida")
+    export.add_argument("--formato", choices=("csv", "jsonl", "xlsx"), help="por defecto, según la extensión")
+    export.add_argument("--gzip", action="store_true", help="comprime con gzip (también si SALIDA termina en .gz)")
+    export.add_argument("--hilos", type=int, default=4)
+    parametros(export)
+    export.set_defaults(funcion=_export)
+
+    # Los argumentos de `bench` se pasan tal cual a `python -m benchmarks` (ver main)
+    bench = subparsers.add_parser("bench", help="suite de benchmarks con el driver simulado", add_help=False)
+    bench.set_defaults(funcion=_bench)
+    return parser
+
+
+def main(argumentos: Optional[Sequence[str]] = None) -> int:
+    """
+    Ejecuta el subcomando indicado en `argumentos` (sin argumentos, `ping`).
+
+    Args:
+        argumentos (Optional[Sequence[str]]): Argumentos de la línea de comandos, sin el nombre
+            del programa. None equivale a ninguno (no se lee sys.argv).
+
+    Returns:
+        int: Código de salida del subcomando.
+    """
+    parser = crear_parser()
+    argumentos = list(argumentos or [])
+    args, resto = parser.parse_known_args(argumentos)
+    if args.comando is None:
+        args, resto = parser.parse_known_args([*argumentos, "ping"])
+    if args.comando == "bench":
+        args.argumentos = resto
+    elif resto:
+        parser.error(f"argumentos no reconocidos: {' '.join(resto)}")
+    if args.profile:
+        return _ejecutar_con_perfil(args.comando, lambda: args.funcion(args), args.directorio_perfil)
+    return args.funcion(args)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,459 @@
+"""
+agregacion.py
+
+Agregación en paralelo por procesos para estadísticas que consumen CPU en Python.
+
+Una vez leídas las filas, los conteos de distintos, percentiles y tablas cruzadas se calculan en
+Python y el GIL los limita a un núcleo. Aquí cada lote se reparte a un `ProcessPoolExecutor`: los
+procesos calculan agregados parciales combinables y el proceso principal los combina.
+
+Los lotes viajan a los procesos serializados con pickle. Pasarlos en memoria compartida con un
+formato columnar no compensaba: empaquetar las columnas en el proceso principal costaba más que
+una ida y vuelta de pickle de las mismas tuplas.
+
+Repartir entre procesos solo acelera con varios núcleos libres y cuando el cálculo por fila
+domina. En `benchmarks/bench_agregacion.py` (400.000 filas, lotes de 20.000) la ida y vuelta de
+pickle cuesta 0,23 s y agregar los lotes 3 s: con N núcleos el tiempo tiende a 3/N s más el de
+serializar lotes y parciales. Con un solo núcleo es más lento que `max_procesos=0` (3,6 s frente
+a 3,1 s), y con lotes pequeños o pocas columnas agregadas el punto de equilibrio sube.
+
+Parciales por columna (ParcialColumna): conteo, nulos, suma, mínimo, máximo, un HyperLogLog para
+los distintos y, en las numéricas, un t-digest para los percentiles. Con `clave` se calcula un
+parcial por cada valor de la clave (tabla cruzada). Lo que devuelve cada trabajador crece con el
+número de grupos del lote, pero no con sus filas: el HyperLogLog es disperso mientras un grupo
+tiene pocos valores (como mucho 2^precision bytes) y el t-digest se queda en unos `compresion`
+centroides.
+
+Funciones principales:
+- AgregadorProcesos: Reparte lotes entre procesos y combina sus parciales.
+- HyperLogLog: Estimador combinable de valores distintos (error típico 1.04/sqrt(2^precision)).
+- TDigest: Resumen combinable de una distribución para percentiles aproximados.
+
+Uso:
+    from src.agregacion import AgregadorProcesos
+    with AgregadorProcesos(["CENTRO", "PACIENTE", "IMPORTE"], ["PACIENTE", "IMPORTE"], clave="CENTRO") as agregador:
+        for lote in iterar_lotes(conn, "SELECT centro, paciente, importe FROM altas"):
+            agregador.enviar(lote)
+        resultado = agregador.resultado()
+    resultado[7]["PACIENTE"].distintos(), resultado[7]["IMPORTE"].percentil(95)
+"""
+
+import hashlib
+import logging
+import math
+import os
+import struct
+from array import array
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from types import TracebackType
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+PRECISION_HLL = 12
+COMPRESION_TDIGEST = 100
+
+
+# ----------------------------------------
+# 1. Resúmenes combinables
+# ----------------------------------------
+def _hash64(datos: Any) -> int:
+    # hash() de Python cambia entre procesos para str; blake2b es estable
+    return int.from_bytes(hashlib.blake2b(datos, digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Estimador de valores distintos con memoria acotada (como mucho 2^precision bytes).
+
+    Mientras hay pocos registros no nulos se guardan en un diccionario disperso {índice: rango},
+    así que un grupo con pocos valores ocupa (y viaja entre procesos) en proporción a ellos; al
+    pasar de 2^precision / 8 registros se convierte a la forma densa de 2^precision bytes.
+
+    Args:
+        precision (int): Bits del índice de registro (4 a 16).
+    """
+
+    def __init__(self, precision: int = PRECISION_HLL) -> None:
+        if not 4 <= precision <= 16:
+            raise ValueError(f"precision debe estar entre 4 y 16: {precision}")
+        self.precision = precision
+        self.registros: Optional[bytearray] = None
+        self.dispersos: Dict[int, int] = {}
+
+    def _densificar(self) -> bytearray:
+        if self.registros is None:
+            self.registros = bytearray(1 << self.precision)
+            for indice, rango in self.dispersos.items():
+                self.registros[indice] = rango
+            self.dispersos = {}
+        return self.registros
+
+    def agregar_bytes(self, datos: Any) -> None:
+        """Añade un valor ya codificado en bytes (o un memoryview de ellos)."""
+        h = _hash64(datos)
+        resto_bits = 64 - self.precision
+        indice = h >> resto_bits
+        resto = h & ((1 << resto_bits) - 1)
+        rango = resto_bits - resto.bit_length() + 1
+        if self.registros is not None:
+            if rango > self.registros[indice]:
+                self.registros[indice] = rango
+        elif rango > self.dispersos.get(indice, 0):
+            self.dispersos[indice] = rango
+            if len(self.dispersos) > (1 << self.precision) // 8:
+                self._densificar()
+
+    def combinar(self, otro: "HyperLogLog") -> None:
+        if otro.precision != self.precision:
+            raise ValueError("No se pueden combinar HyperLogLog de distinta precisión")
+        if otro.registros is not None:
+            self.registros = bytearray(map(max, self._densificar(), otro.registros))
+            return
+        for indice, rango in otro.dispersos.items():
+            if self.registros is not None:
+                if rango > self.registros[indice]:
+                    self.registros[indice] = rango
+            elif rango > self.dispersos.get(indice, 0):
+                self.dispersos[indice] = rango
+        if self.registros is None and len(self.dispersos) > (1 << self.precision) // 8:
+            self._densificar()
+
+    def estimar(self) -> float:
+        m = 1 << self.precision
+        alfa = 0.7213 / (1 + 1.079 / m)
+        if self.registros is not None:
+            ceros = self.registros.count(0)
+            suma = sum(2.0 ** -r for r in self.registros)
+        else:
+            ceros = m - len(self.dispersos)
+            suma = ceros + sum(2.0 ** -r for r in self.dispersos.values())
+        estimacion = alfa * m * m / suma
+        if estimacion <= 2.5 * m and ceros:
+            # Corrección para cardinalidades pequeñas (conteo lineal)
+            return m * math.log(m / ceros)
+        return estimacion
+
+
+class TDigest:
+    """
+    Resumen de una distribución en centroides (media, peso) para percentiles aproximados.
+
+    Los centroides de los extremos son pequeños, de modo que los percentiles altos y bajos
+    (p95, p99) tienen más precisión que la mediana.
+
+    Args:
+        compresion (int): Controla el número de centroides (en torno a `compresion`).
+    """
+
+    def __init__(self, compresion: int = COMPRESION_TDIGEST) -> None:
+        self.compresion = compresion
+        self.medias: List[float] = []
+        self.pesos: List[float] = []
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self._pendientes: List[float] = []
+
+    @property
+    def total(self) -> float:
+        return sum(self.pesos) + len(self._pendientes)
+
+    def agregar(self, valor: float) -> None:
+        self._pendientes.append(valor)
+        if len(self._pendientes) >= 20 * self.compresion:
+            self._comprimir()
+
+    def combinar(self, otro: "TDigest") -> None:
+        otro._comprimir()
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._comprimir(list(zip(otro.medias, otro.pesos)))
+
+    def _k(self, q: float) -> float:
+        return self.compresion / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _comprimir(self, extra: Sequence[Tuple[float, float]] = ()) -> None:
+        if not self._pendientes and not extra:
+            return
+        if self._pendientes:
+            self.minimo = min(self.minimo, min(self._pendientes))
+            self.maximo = max(self.maximo, max(self._pendientes))
+        puntos = sorted(
+            [*zip(self.medias, self.pesos), *extra, *((v, 1.0) for v in self._pendientes)]
+        )
+        self._pendientes = []
+        total = sum(p for _, p in puntos)
+        medias: List[float] = []
+        pesos: List[float] = []
+        acumulado = 0.0
+        media_actual, peso_actual = puntos[0]
+        k_izquierda = self._k(0.0)
+        for media, peso in puntos[1:]:
+            if self._k((acumulado + peso_actual + peso) / total) - k_izquierda <= 1:
+                peso_actual += peso
+                media_actual += (media - media_actual) * peso / peso_actual
+            else:
+                medias.append(media_actual)
+                pesos.append(peso_actual)
+                acumulado += peso_actual
+                k_izquierda = self._k(acumulado / total)
+                media_actual, peso_actual = media, peso
+        medias.append(media_actual)
+        pesos.append(peso_actual)
+        self.medias, self.pesos = medias, pesos
+
+    def percentil(self, q: float) -> float:
+        """Valor aproximado del percentil `q` (0-100)."""
+        self._comprimir()
+        if not self.pesos:
+            return math.nan
+        total = sum(self.pesos)
+        objetivo = min(max(q, 0.0), 100.0) / 100 * total
+        # Centro de cada centroide en la distribución acumulada
+        centro_anterior, media_anterior = 0.0, self.minimo
+        acumulado = 0.0
+        for media, peso in zip(self.medias, self.pesos):
+            centro = acumulado + peso / 2
+            if objetivo < centro:
+                fraccion = (objetivo - centro_anterior) / (centro - centro_anterior) if centro > centro_anterior else 0.0
+                return media_anterior + fraccion * (media - media_anterior)
+            centro_anterior, media_anterior = centro, media
+            acumulado += peso
+        if total <= centro_anterior:
+            return self.maximo
+        fraccion = (objetivo - centro_anterior) / (total - centro_anterior)
+        return media_anterior + fraccion * (self.maximo - media_anterior)
+
+
+class ParcialColumna:
+    """
+    Agregado parcial y combinable de una columna.
+
+    Args:
+        numerica (bool): Si es True se calculan suma, mínimo, máximo y percentiles.
+        precision_hll (int): Precisión del HyperLogLog de distintos.
+        compresion (int): Compresión del t-digest.
+    """
+
+    def __init__(self, numerica: bool, precision_hll: int = PRECISION_HLL, compresion: int = COMPRESION_TDIGEST) -> None:
+        self.numerica = numerica
+        self.conteo = 0
+        self.nulos = 0
+        self.suma = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+        self.hll = HyperLogLog(precision_hll)
+        self.digest = TDigest(compresion) if numerica else None
+
+    def combinar(self, otro: "ParcialColumna") -> None:
+        self.conteo += otro.conteo
+        self.nulos += otro.nulos
+        self.suma += otro.suma
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self.hll.combinar(otro.hll)
+        if self.digest is not None and otro.digest is not None:
+            self.digest.combinar(otro.digest)
+        elif otro.digest is not None:
+            self.numerica, self.digest = True, otro.digest
+
+    @property
+    def media(self) -> float:
+        return self.suma / self.conteo if self.numerica and self.conteo else math.nan
+
+    def distintos(self) -> int:
+        """Número aproximado de valores distintos (sin contar nulos)."""
+        return round(self.hll.estimar())
+
+    def percentil(self, q: float) -> float:
+        """Percentil aproximado `q` (0-100); NaN en columnas de texto."""
+        return self.digest.percentil(q) if self.digest is not None else math.nan
+
+
+# ----------------------------------------
+# 2. Agregación de un lote
+# ----------------------------------------
+_empaquetar_doble = struct.Struct("d").pack
+
+
+def _codificar(columna: Sequence[Any]) -> Tuple[bool, List[Any]]:
+    """
+    Devuelve (numérica, valores) de una columna: floats si todos sus valores no nulos son números
+    y, si no, los textos codificados en UTF-8 (los nulos siguen siendo None).
+    """
+    sin_nulos = [v for v in columna if v is not None]
+    try:
+        # array() convierte toda la columna en C (falla si hay textos o fechas)
+        numeros = iter(array("d", sin_nulos))
+    except TypeError:
+        return False, [None if v is None else str(v).encode("utf-8") for v in columna]
+    return True, [None if v is None else next(numeros) for v in columna]
+
+
+def agregar_lote(
+    lote: Sequence[Sequence[Any]],
+    posiciones: Dict[str, int],
+    valores: Sequence[str],
+    clave: Optional[str],
+    precision_hll: int = PRECISION_HLL,
+    compresion: int = COMPRESION_TDIGEST,
+) -> Dict[Any, Dict[str, ParcialColumna]]:
+    """
+    Calcula los parciales de un lote de filas (se ejecuta en el proceso trabajador).
+
+    Args:
+        lote (Sequence[Sequence[Any]]): Filas del lote.
+        posiciones (Dict[str, int]): Posición de cada columna en la fila.
+        valores (Sequence[str]): Columnas a agregar.
+        clave (Optional[str]): Columna por la que agrupar; None para un único grupo.
+
+    Returns:
+        Dict[Any, Dict[str, ParcialColumna]]: {valor de la clave (None sin clave): {columna: parcial}}.
+    """
+    traspuesto = list(zip(*lote))
+    if clave is None:
+        grupos: Sequence[Any] = [None] * len(lote)
+    else:
+        numerica, codificados = _codificar(traspuesto[posiciones[clave]])
+        if numerica:
+            grupos = [None if v is None else (int(v) if v.is_integer() else v) for v in codificados]
+        else:
+            grupos = [None if v is None else v.decode("utf-8") for v in codificados]
+
+    parciales: Dict[Any, Dict[str, ParcialColumna]] = {}
+    for columna in valores:
+        numerica, codificados = _codificar(traspuesto[posiciones[columna]])
+        for grupo, v in zip(grupos, codificados):
+            por_columna = parciales.get(grupo)
+            if por_columna is None:
+                por_columna = parciales[grupo] = {}
+            parcial = por_columna.get(columna)
+            if parcial is None:
+                parcial = por_columna[columna] = ParcialColumna(numerica, precision_hll, compresion)
+            if v is None:
+                parcial.nulos += 1
+                continue
+            parcial.conteo += 1
+            if numerica:
+                parcial.hll.agregar_bytes(_empaquetar_doble(v))
+                parcial.suma += v
+                if v < parcial.minimo:
+                    parcial.minimo = v
+                if v > parcial.maximo:
+                    parcial.maximo = v
+                parcial.digest.agregar(v)
+            else:
+                parcial.hll.agregar_bytes(v)
+    for por_columna in parciales.values():
+        for parcial in por_columna.values():
+            if parcial.digest is not None:
+                parcial.digest._comprimir()
+    return parciales
+
+
+# ----------------------------------------
+# 3. Etapa de agregación
+# ----------------------------------------
+class AgregadorProcesos:
+    """
+    Reparte lotes de filas entre procesos y combina sus agregados parciales.
+
+    Como mucho hay `2 * max_procesos` lotes en vuelo, de modo que la memoria no crece si la
+    lectura es más rápida que la agregación.
+
+    Args:
+        nombres (Sequence[str]): Nombres de las columnas de cada fila, en orden.
+        valores (Sequence[str]): Columnas a agregar.
+        clave (Optional[str]): Columna por la que agrupar (tabla cruzada); None para un único grupo.
+        max_procesos (Optional[int]): Procesos trabajadores; por defecto os.cpu_count().
+            Con 0 los lotes se agregan en el propio proceso, sin paralelismo ni serialización.
+        precision_hll (int): Precisión de los HyperLogLog.
+        compresion (int): Compresión de los t-digest.
+
+    Raises:
+        ValueError: Si alguna columna no está en `nombres`.
+    """
+
+    def __init__(
+        self,
+        nombres: Sequence[str],
+        valores: Sequence[str],
+        clave: Optional[str] = None,
+        max_procesos: Optional[int] = None,
+        precision_hll: int = PRECISION_HLL,
+        compresion: int = COMPRESION_TDIGEST,
+    ) -> None:
+        desconocidas = [c for c in [*valores, *([clave] if clave else [])] if c not in nombres]
+        if desconocidas:
+            raise ValueError(f"Columnas desconocidas: {desconocidas}")
+        self.nombres = list(nombres)
+        self.valores = list(valores)
+        self.clave = clave
+        self.precision_hll = precision_hll
+        self.compresion = compresion
+        self._posiciones = {c: self.nombres.index(c) for c in [*valores, *([clave] if clave else [])]}
+        procesos = (os.cpu_count() or 1) if max_procesos is None else max_procesos
+        self._executor = ProcessPoolExecutor(max_workers=procesos) if procesos > 0 else None
+        self._max_en_vuelo = 2 * max(procesos, 1)
+        self._en_vuelo: Deque["Future[Dict[Any, Dict[str, ParcialColumna]]]"] = deque()
+        self._resultado: Dict[Any, Dict[str, ParcialColumna]] = {}
+        self.lotes = 0
+        self.filas = 0
+
+    def _combinar(self, parciales: Dict[Any, Dict[str, ParcialColumna]]) -> None:
+        for grupo, por_columna in parciales.items():
+            destino = self._resultado.setdefault(grupo, {})
+            for columna, parcial in por_columna.items():
+                if columna in destino:
+                    destino[columna].combinar(parcial)
+                else:
+                    destino[columna] = parcial
+
+    def _recoger_uno(self) -> None:
+        self._combinar(self._en_vuelo.popleft().result())
+
+    def enviar(self, lote: Sequence[Sequence[Any]]) -> None:
+        """Envía un lote de filas a agregar (se bloquea si hay demasiados lotes en vuelo)."""
+        if not lote:
+            return
+        self.lotes += 1
+        self.filas += len(lote)
+        argumentos = (lote, self._posiciones, self.valores, self.clave, self.precision_hll, self.compresion)
+        if self._executor is None:
+            self._combinar(agregar_lote(*argumentos))
+            return
+        self._en_vuelo.append(self._executor.submit(agregar_lote, *argumentos))
+        while len(self._en_vuelo) >= self._max_en_vuelo:
+            self._recoger_uno()
+
+    def resultado(self) -> Dict[Any, Dict[str, ParcialColumna]]:
+        """
+        Espera a los lotes pendientes y devuelve los agregados combinados.
+
+        Returns:
+            Dict[Any, Dict[str, ParcialColumna]]: {valor de la clave (None sin clave): {columna: parcial}}.
+        """
+        while self._en_vuelo:
+            self._recoger_uno()
+        return self._resultado
+
+    def cerrar(self) -> None:
+        """Cancela los lotes pendientes y detiene los procesos trabajadores."""
+        for futuro in self._en_vuelo:
+            futuro.cancel()
+        self._en_vuelo.clear()
+        if self._executor is not None:
+            self._executor.shutdown()
+        logger.debug("Agregación por procesos: %d lotes, %d filas", self.lotes, self.filas)
+
+    def __enter__(self) -> "AgregadorProcesos":
+        return self
+
+    def __exit__(
+        self,
+        tipo: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.cerrar()
@@ -0,0 +1,436 @@
+"""
+agregacion_externa.py
+
+Agrupación con memoria acotada para estadísticas que no caben en RAM (hash aggregation externa).
+
+Algunas agrupaciones diarias sobre extracciones de MEDIN y Simbad (por ejemplo, usuarios
+distintos por categoría durante un mes) tienen más claves, o más valores distintos por clave, de
+los que caben en la memoria del proceso, y al venir de dos bases no siempre se pueden resolver
+en Oracle. Aquí las filas llegan en streaming y se agregan en memoria mientras el estado no
+supere `memoria_maxima`; al superarlo, se vuelca a `particiones` ficheros temporales y se sigue:
+
+1. Los estados de tamaño fijo de cada clave (conteo, suma, mínimo, máximo) se reparten por el
+   hash de la clave. Son combinables, así que una clave puede aparecer en varios volcados.
+2. Los valores de 'distintos' no se guardan en un conjunto por clave (una clave muy frecuente
+   tendría un conjunto que no cabe en ninguna partición), sino como pares (clave, valor)
+   repartidos por el hash del par. Al terminar, cada partición de pares se deduplica por
+   separado (un par repetido cae siempre en la misma) y se cuentan sus pares por clave; esos
+   conteos parciales se suman como un estado más de la clave.
+3. Cada partición de claves se agrega por separado: todas las apariciones de una clave están en
+   la misma partición. Si una partición (de claves o de pares) tampoco cabe en memoria, se
+   vuelve a repartir con otra semilla del hash, hasta MAX_NIVELES veces.
+4. Los resultados de las particiones son disjuntos: se concatenan o, con `ordenado=True`, cada
+   partición se guarda ordenada y se mezclan con `heapq.merge` (ordenación externa).
+
+La memoria depende de `memoria_maxima` y no del tamaño de la entrada, salvo en casos extremos
+en los que una partición sigue sin caber tras MAX_NIVELES repartos (se agrega entonces tal cual).
+
+Agregados disponibles: 'conteo' (filas), 'suma', 'min', 'max' y 'distintos' (número exacto de
+valores distintos), cada uno sobre una posición de la fila.
+
+Funciones principales:
+- AgregacionExterna: Agrega lotes de filas y entrega (clave, {agregado: valor}).
+- agrupar_externo(filas, clave, agregados): Atajo para un iterable de filas.
+
+Uso:
+    from src.agregacion_externa import AgregacionExterna
+    with AgregacionExterna(clave=(0,), agregados={"usuarios": ("distintos", 1), "filas": ("conteo", None)},
+                           memoria_maxima=512 * 2**20) as agregacion:
+        for lote in iterar_lotes(conn, "SELECT categoria, usuario FROM accesos WHERE fecha >= :desde", params):
+            agregacion.agregar(lote)
+        for categoria, valores in agregacion.resultados(ordenado=True):
+            print(categoria, valores["usuarios"], valores["filas"])
+"""
+
+import heapq
+import logging
+import pickle
+import tempfile
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Any, Callable, Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Type
+
+from config import metricas
+from src.conciliacion import particion_de
+
+logger = logging.getLogger(__name__)
+
+MEMORIA_MAXIMA_POR_DEFECTO = 256 * 2**20
+PARTICIONES_POR_DEFECTO = 32
+# Veces que una partición demasiado grande se vuelve a repartir antes de agregarla tal cual
+MAX_NIVELES = 3
+
+# Bytes aproximados de cada clave en el diccionario además de su valor (entrada y lista de estados)
+_SOBRECARGA_CLAVE = 200
+# Bytes aproximados de cada par (agregado, clave, valor) de 'distintos' además de la clave y el valor
+_SOBRECARGA_PAR = 120
+
+FUNCIONES = ("conteo", "suma", "min", "max", "distintos")
+
+EspecAgregado = Tuple[str, Optional[int]]
+
+
+def _tamano(valor: Any) -> int:
+    if isinstance(valor, tuple):
+        return sum(_tamano(v) for v in valor)
+    return len(valor) if isinstance(valor, (str, bytes)) else 8
+
+
+# Par de 'distintos': (posición del agregado, clave, valor)
+Par = Tuple[int, Hashable, Any]
+
+
+def _tamano_par(par: Par) -> int:
+    return _SOBRECARGA_PAR + _tamano(par[1]) + _tamano(par[2])
+
+
+def _combinar(funcion: str, a: Any, b: Any) -> Any:
+    """Combina dos estados parciales de un mismo agregado ('distintos' lleva conteos parciales)."""
+    if funcion in ("conteo", "suma", "distintos"):
+        return a + b
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b) if funcion == "min" else max(a, b)
+
+
+class _Tabla:
+    """
+    Estados por clave más los pares de 'distintos' pendientes de contar, con su tamaño aproximado.
+    """
+
+    def __init__(self, funciones: Sequence[str]) -> None:
+        self.funciones = funciones
+        self.estados: Dict[Hashable, List[Any]] = {}
+        self.pares: Set[Par] = set()
+        self.bytes = 0
+
+    def vacio(self) -> List[Any]:
+        return [None if f in ("min", "max") else 0 for f in self.funciones]
+
+    def _nuevo(self, clave: Hashable) -> List[Any]:
+        estado = self.estados[clave] = self.vacio()
+        self.bytes += _SOBRECARGA_CLAVE + _tamano(clave)
+        return estado
+
+    def acumular(self, clave: Hashable, valores: Sequence[Any]) -> None:
+        """Agrega una fila: `valores` trae un valor por agregado (ignorado en 'conteo')."""
+        estado = self.estados.get(clave)
+        if estado is None:
+            estado = self._nuevo(clave)
+        for i, funcion in enumerate(self.funciones):
+            valor = valores[i]
+            if funcion == "conteo":
+                estado[i] += 1
+            elif valor is None:
+                continue  # como en SQL, los nulos no cuentan
+            elif funcion == "suma":
+                estado[i] += valor
+            elif funcion == "distintos":
+                par = (i, clave, valor)
+                if par not in self.pares:
+                    self.pares.add(par)
+                    self.bytes += _tamano_par(par)
+            elif estado[i] is None or (valor < estado[i] if funcion == "min" else valor > estado[i]):
+                estado[i] = valor
+
+    def fusionar(self, clave: Hashable, parcial: List[Any]) -> None:
+        """Combina un estado parcial leído de un volcado."""
+        estado = self.estados.get(clave)
+        if estado is None:
+            estado = self._nuevo(clave)
+        for i, funcion in enumerate(self.funciones):
+            estado[i] = _combinar(funcion, estado[i], parcial[i])
+
+    def contar_pares(self) -> None:
+        """Suma los pares en memoria al conteo de distintos de su clave (todos caben en memoria)."""
+        for i, clave, _ in self.pares:
+            self.estados[clave][i] += 1
+        self.pares = set()
+
+    def vaciar(self) -> None:
+        self.estados = {}
+        self.pares = set()
+        self.bytes = 0
+
+
+class _Particiones:
+    """Ficheros temporales con elementos repartidos por el hash de una clave de reparto."""
+
+    def __init__(self, directorio: Path, prefijo: str, n: int, semilla: int) -> None:
+        self.rutas = [directorio / f"{prefijo}_{i:03d}.pkl" for i in range(n)]
+        self.semilla = semilla
+        self._ficheros: List[IO[bytes]] = [open(r, "wb") for r in self.rutas]
+
+    def escribir(self, elemento: Any, reparto: Hashable) -> None:
+        i = particion_de(reparto, self.semilla, len(self._ficheros))
+        pickle.dump(elemento, self._ficheros[i], protocol=pickle.HIGHEST_PROTOCOL)
+
+    def cerrar(self) -> None:
+        for fichero in self._ficheros:
+            fichero.close()
+
+    def leer(self, i: int) -> Iterator[Any]:
+        yield from _leer_pickles(self.rutas[i])
+
+    def borrar(self, i: int) -> None:
+        self.rutas[i].unlink()
+
+
+def _leer_pickles(ruta: Path) -> Iterator[Any]:
+    with open(ruta, "rb") as fichero:
+        while True:
+            try:
+                yield pickle.load(fichero)
+            except EOFError:
+                return
+
+
+class AgregacionExterna:
+    """
+    Agrupación por clave con memoria acotada y volcado a disco por particiones.
+
+    Args:
+        clave (Sequence[int]): Posiciones de las columnas que forman la clave de agrupación.
+        agregados (Mapping[str, EspecAgregado]): Nombre del resultado -> (función, posición de la
+            columna). La posición se ignora en 'conteo'.
+        memoria_maxima (int): Bytes aproximados que pueden ocupar los estados en memoria.
+        particiones (int): Ficheros en los que se reparten los volcados.
+        directorio (Optional[Path]): Dónde crear los ficheros temporales (por defecto, el del sistema).
+    """
+
+    def __init__(
+        self,
+        clave: Sequence[int],
+        agregados: Mapping[str, EspecAgregado],
+        memoria_maxima: int = MEMORIA_MAXIMA_POR_DEFECTO,
+        particiones: int = PARTICIONES_POR_DEFECTO,
+        directorio: Optional[Path] = None,
+    ) -> None:
+        for nombre, (funcion, posicion) in agregados.items():
+            if funcion not in FUNCIONES:
+                raise ValueError(f"Agregado '{nombre}': función '{funcion}' no válida; opciones: {FUNCIONES}")
+            if funcion != "conteo" and posicion is None:
+                raise ValueError(f"Agregado '{nombre}': '{funcion}' necesita la posición de una columna")
+        if particiones < 2:
+            raise ValueError(f"Hacen falta al menos 2 particiones: {particiones}")
+        self.nombres = list(agregados)
+        self.funciones = [f for f, _ in agregados.values()]
+        self.memoria_maxima = memoria_maxima
+        self.n_particiones = particiones
+        self.filas = 0
+        self.volcados = 0
+        self.claves_volcadas = 0
+        self._clave = self._extractor(clave)
+        posiciones = [0 if p is None else p for _, p in agregados.values()]
+        self._valores: Callable[[tuple], List[Any]] = lambda fila: [fila[p] for p in posiciones]
+        self._tabla = _Tabla(self.funciones)
+        self._temporal = tempfile.TemporaryDirectory(prefix="agregacion_", dir=directorio)
+        self._particiones: Optional[_Particiones] = None
+        self._particiones_pares: Optional[_Particiones] = None
+        self._repartos = 0
+        self._terminado = False
+
+    @staticmethod
+    def _extractor(posiciones: Sequence[int]) -> Callable[[tuple], Hashable]:
+        if len(posiciones) == 1:
+            p = posiciones[0]
+            return lambda fila: fila[p]
+        return lambda fila: tuple(fila[p] for p in posiciones)
+
+    def _nuevas_particiones(self, prefijo: str, semilla: int) -> _Particiones:
+        self._repartos += 1
+        return _Particiones(Path(self._temporal.name), f"{prefijo}_{self._repartos}", self.n_particiones, semilla)
+
+    def _volcar(self) -> None:
+        """Escribe los estados y los pares en memoria en las particiones y vacía la tabla."""
+        tabla = self._tabla
+        if self._particiones is None:
+            self._particiones = self._nuevas_particiones("claves", 0)
+            logger.info(
+                "Agregación por encima de %d bytes: se vuelca a %d particiones en disco",
+                self.memoria_maxima, self.n_particiones,
+            )
+        for clave, estado in tabla.estados.items():
+            self._particiones.escribir((clave, estado), clave)
+        if tabla.pares:
+            if self._particiones_pares is None:
+                self._particiones_pares = self._nuevas_particiones("pares", 0)
+            for par in tabla.pares:
+                self._particiones_pares.escribir(par, par)
+        self.volcados += 1
+        self.claves_volcadas += len(tabla.estados)
+        metricas.registrar("agregacion.volcado", tabla.bytes, claves=len(tabla.estados), pares=len(tabla.pares))
+        tabla.vaciar()
+
+    def agregar(self, filas: Iterable[tuple]) -> None:
+        """Agrega un lote (o cualquier iterable) de filas."""
+        if self._terminado:
+            raise RuntimeError("La agregación ya entregó sus resultados")
+        tabla, clave, valores = self._tabla, self._clave, self._valores
+        for fila in filas:
+            tabla.acumular(clave(fila), valores(fila))
+            self.filas += 1
+            if tabla.bytes > self.memoria_maxima:
+                self._volcar()
+
+    def _finales(self, tabla: _Tabla) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+        for clave, estado in tabla.estados.items():
+            yield clave, dict(zip(self.nombres, estado))
+
+    def _agregar_particion(
+        self, lecturas: Iterator[Tuple[Hashable, List[Any]]], nivel: int
+    ) -> Iterator[Iterator[Tuple[Hashable, Dict[str, Any]]]]:
+        """
+        Agrega los estados de una partición; si no caben en memoria, los reparte de nuevo.
+
+        Entrega uno o varios grupos de resultados (uno por subpartición), cada uno con claves disjuntas.
+        """
+        tabla = _Tabla(self.funciones)
+        subparticiones: Optional[_Particiones] = None
+        for clave, parcial in lecturas:
+            if subparticiones is not None:
+                subparticiones.escribir((clave, parcial), clave)
+                continue
+            tabla.fusionar(clave, parcial)
+            if tabla.bytes > self.memoria_maxima and nivel < MAX_NIVELES:
+                logger.debug("Partición por encima de %d bytes: se reparte de nuevo (nivel %d)", self.memoria_maxima, nivel + 1)
+                subparticiones = self._nuevas_particiones("claves", nivel + 1)
+                for k, estado in tabla.estados.items():
+                    subparticiones.escribir((k, estado), k)
+                tabla.vaciar()
+        if subparticiones is None:
+            yield self._finales(tabla)
+            return
+        subparticiones.cerrar()
+        for i in range(self.n_particiones):
+            yield from self._agregar_particion(subparticiones.leer(i), nivel + 1)
+            subparticiones.borrar(i)
+
+    def _deduplicar(self, pares: Iterator[Par], nivel: int) -> Iterator[Set[Par]]:
+        """
+        Elimina los pares repetidos de una partición de pares; si no caben, los reparte de nuevo.
+
+        Entrega uno o varios conjuntos disjuntos (uno por subpartición).
+        """
+        vistos: Set[Par] = set()
+        bytes_vistos = 0
+        subparticiones: Optional[_Particiones] = None
+        for par in pares:
+            if subparticiones is not None:
+                subparticiones.escribir(par, par)
+            elif par not in vistos:
+                vistos.add(par)
+                bytes_vistos += _tamano_par(par)
+                if bytes_vistos > self.memoria_maxima and nivel < MAX_NIVELES:
+                    subparticiones = self._nuevas_particiones("pares", nivel + 1)
+                    for visto in vistos:
+                        subparticiones.escribir(visto, visto)
+                    vistos = set()
+        if subparticiones is None:
+            yield vistos
+            return
+        subparticiones.cerrar()
+        for i in range(self.n_particiones):
+            yield from self._deduplicar(subparticiones.leer(i), nivel + 1)
+            subparticiones.borrar(i)
+
+    def _contar_distintos(self, claves: _Particiones, pares_volcados: _Particiones) -> None:
+        """Convierte las particiones de pares en conteos parciales por clave, escritos con los demás estados."""
+        pares_volcados.cerrar()
+        for j in range(self.n_particiones):
+            for pares in self._deduplicar(pares_volcados.leer(j), 1):
+                parciales: Dict[Hashable, List[Any]] = {}
+                for i, clave, _ in pares:
+                    parcial = parciales.get(clave)
+                    if parcial is None:
+                        parcial = parciales[clave] = self._tabla.vacio()
+                    parcial[i] += 1
+                pares.clear()
+                for clave, parcial in parciales.items():
+                    claves.escribir((clave, parcial), clave)
+            pares_volcados.borrar(j)
+
+    def _grupos(self) -> Iterator[Iterator[Tuple[Hashable, Dict[str, Any]]]]:
+        if self._particiones is None:
+            self._tabla.contar_pares()
+            yield self._finales(self._tabla)
+            return
+        # Lo que queda en memoria se vuelca también: cada clave debe agregarse en una sola partición
+        self._volcar()
+        if self._particiones_pares is not None:
+            self._contar_distintos(self._particiones, self._particiones_pares)
+        self._particiones.cerrar()
+        for i in range(self.n_particiones):
+            yield from self._agregar_particion(self._particiones.leer(i), 1)
+            self._particiones.borrar(i)
+
+    def resultados(self, ordenado: bool = False) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+        """
+        Entrega (clave, {nombre del agregado: valor}) de cada clave.
+
+        Solo se puede llamar una vez, después de agregar todas las filas.
+
+        Args:
+            ordenado (bool): Si es True, las claves se entregan en orden (deben ser comparables).
+        """
+        if self._terminado:
+            raise RuntimeError("La agregación ya entregó sus resultados")
+        self._terminado = True
+        if not ordenado:
+            for grupo in self._grupos():
+                yield from grupo
+            return
+        if self._particiones is None:
+            self._tabla.contar_pares()
+            yield from sorted(self._finales(self._tabla), key=lambda r: r[0])
+            return
+        # Cada grupo se ordena en memoria (cabe) y se guarda; después se mezclan todos
+        rutas = []
+        for n, grupo in enumerate(self._grupos()):
+            ruta = Path(self._temporal.name) / f"ordenado_{n:04d}.pkl"
+            with open(ruta, "wb") as fichero:
+                for resultado in sorted(grupo, key=lambda r: r[0]):
+                    pickle.dump(resultado, fichero, protocol=pickle.HIGHEST_PROTOCOL)
+            rutas.append(ruta)
+        yield from heapq.merge(*(_leer_pickles(r) for r in rutas), key=lambda r: r[0])
+
+    def cerrar(self) -> None:
+        """Borra los ficheros temporales."""
+        for particiones in (self._particiones, self._particiones_pares):
+            if particiones is not None:
+                particiones.cerrar()
+        self._temporal.cleanup()
+
+    def __enter__(self) -> "AgregacionExterna":
+        return self
+
+    def __exit__(
+        self,
+        tipo: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.cerrar()
+
+
+def agrupar_externo(
+    filas: Iterable[tuple],
+    clave: Sequence[int],
+    agregados: Mapping[str, EspecAgregado],
+    ordenado: bool = False,
+    **opciones: Any,
+) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+    """
+    Agrupa `filas` con memoria acotada y entrega los resultados (ver AgregacionExterna).
+
+    Args:
+        filas (Iterable[tuple]): Filas de entrada (por ejemplo, `iterar_filas(conn, sql)`).
+        clave, agregados: Como en AgregacionExterna.
+        ordenado (bool): Entregar las claves en orden.
+        **opciones: memoria_maxima, particiones o directorio.
+    """
+    with AgregacionExterna(clave, agregados, **opciones) as agregacion:
+        agregacion.agregar(filas)
+        yield from agregacion.resultados(ordenado)
@@ -0,0 +1,277 @@
+"""
+ajuste_fetch.py
+
+Ajuste automático de `arraysize` y `prefetchrows` a partir del tamaño de fila y la latencia observados.
+
+Elegir a mano el tamaño de lote de cada consulta es adivinar: las filas anchas necesitan lotes
+pequeños para no disparar la memoria, y los conteos estrechos, lotes enormes para no pagar una
+ida y vuelta cada pocas filas. El modo automático mide los primeros lotes de la consulta:
+
+- Bytes por fila (aproximados, ver `metricas.tamano_aproximado`).
+- Tiempo de cada lote, con dos tamaños distintos (el segundo, el doble del primero), para
+  separar el coste fijo de la ida y vuelta del coste por fila: t = ida_vuelta + filas * por_fila.
+
+El tamaño elegido es el mínimo que deja el coste fijo por debajo de `sobrecarga_objetivo` del
+tiempo de cada lote, acotado por la memoria de un lote (`memoria_lote`) y por [minimo, maximo].
+El resto de la consulta se lee con ese tamaño y la decisión se guarda por consulta en
+`estado/ajuste_fetch.json`, de modo que la siguiente ejecución empieza ya con el tamaño (y el
+`prefetchrows`) correctos. Cada decisión se registra en el log (nivel INFO).
+
+Funciones principales:
+- AjustadorFetch: Mide, decide y recuerda los parámetros de cada consulta.
+- obtener_ajustador(): Ajustador compartido del proceso (estado en `estado/`).
+- iterar_lotes_ajustados(conn, sql, params): Como `iterar_lotes`, con ajuste automático.
+
+Uso:
+    from src.streaming import iterar_lotes
+    for lote in iterar_lotes(conn, sql, params, arraysize="auto"):
+        ...
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import metricas
+from src.incremental import DIRECTORIO_ESTADO
+
+logger = logging.getLogger(__name__)
+
+ARRAYSIZE_INICIAL = 1000
+
+
+class ParametrosFetch(NamedTuple):
+    """
+    Parámetros aprendidos para una consulta.
+
+    Atributos:
+        arraysize: Filas por ida y vuelta.
+        bytes_fila: Bytes aproximados por fila observados.
+        segundos_ida_vuelta: Coste fijo estimado de cada ida y vuelta.
+        segundos_fila: Coste estimado por fila transferida.
+    """
+
+    arraysize: int
+    bytes_fila: float = 0.0
+    segundos_ida_vuelta: float = 0.0
+    segundos_fila: float = 0.0
+
+    @property
+    def prefetchrows(self) -> int:
+        # El primer lote completo llega con la respuesta del execute
+        return self.arraysize + 1
+
+
+def clave_consulta(sql: str) -> str:
+    """Identificador estable de una consulta: hash de su texto sin diferencias de espaciado."""
+    return hashlib.sha1(" ".join(sql.split()).encode("utf-8")).hexdigest()[:16]
+
+
+class AjustadorFetch:
+    """
+    Decide el tamaño de lote de cada consulta y recuerda lo aprendido entre ejecuciones.
+
+    Args:
+        ruta (Optional[Path]): Fichero JSON de estado (None: solo en memoria).
+        memoria_lote (int): Bytes aproximados máximos de un lote.
+        minimo, maximo (int): Límites del arraysize.
+        sobrecarga_objetivo (float): Fracción máxima del tiempo de un lote dedicada al coste fijo
+            de la ida y vuelta.
+        reloj (Callable[[], float]): Reloj con el que se miden los lotes (inyectable en pruebas).
+    """
+
+    def __init__(
+        self,
+        ruta: Optional[Path] = None,
+        memoria_lote: int = 16 * 2**20,
+        minimo: int = 100,
+        maximo: int = 100_000,
+        sobrecarga_objetivo: float = 0.05,
+        reloj: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        if not 0 < sobrecarga_objetivo < 1:
+            raise ValueError(f"sobrecarga_objetivo debe estar entre 0 y 1: {sobrecarga_objetivo}")
+        self.ruta = ruta
+        self.memoria_lote = memoria_lote
+        self.minimo = minimo
+        self.maximo = maximo
+        self.sobrecarga_objetivo = sobrecarga_objetivo
+        self.reloj = reloj
+        self._lock = threading.Lock()
+        self._aprendido: Dict[str, ParametrosFetch] = self._leer()
+
+    def _leer(self) -> Dict[str, ParametrosFetch]:
+        if self.ruta is None or not self.ruta.exists():
+            return {}
+        try:
+            datos = json.loads(self.ruta.read_text(encoding="utf-8"))
+            return {
+                clave: ParametrosFetch(**{k: v for k, v in valores.items() if k in ParametrosFetch._fields})
+                for clave, valores in datos.items()
+            }
+        except (ValueError, TypeError, AttributeError) as exc:
+            # Un estado corrupto no debe romper las consultas: se empieza de cero y se sobrescribe
+            logger.warning("Estado de ajuste de fetch ilegible en %s (%s); se empieza sin datos", self.ruta, exc)
+            return {}
+
+    def _escribir(self) -> None:
+        """
+        Guarda lo aprendido (fichero temporal + os.replace). Se llama con el lock tomado.
+
+        El temporal tiene un nombre único, porque varios procesos (el cron y el servicio) pueden
+        escribir el mismo estado a la vez; gana el último `os.replace`, pero nunca queda mezclado.
+        """
+        if self.ruta is None:
+            return
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        ahora = datetime.datetime.now().isoformat(timespec="seconds")
+        datos = {clave: {**p._asdict(), "actualizado": ahora} for clave, p in sorted(self._aprendido.items())}
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=self.ruta.parent, prefix=self.ruta.stem + ".", suffix=".tmp", delete=False
+        ) as temporal:
+            temporal.write(json.dumps(datos, indent=2))
+        try:
+            os.replace(temporal.name, self.ruta)
+        except OSError:
+            os.unlink(temporal.name)
+            raise
+
+    def parametros(self, clave: str) -> ParametrosFetch:
+        """Parámetros aprendidos para `clave` o, si no hay, los iniciales."""
+        with self._lock:
+            return self._aprendido.get(clave) or ParametrosFetch(ARRAYSIZE_INICIAL)
+
+    def recomendar(self, bytes_fila: float, segundos_ida_vuelta: float, segundos_fila: float) -> int:
+        """
+        Tamaño de lote para una consulta con los costes indicados.
+
+        Si el coste por fila es despreciable frente al fijo, la consulta está dominada por la
+        latencia y se usa el mayor tamaño que permite la memoria.
+        """
+        limite_memoria = self.memoria_lote // bytes_fila if bytes_fila > 0 else self.maximo
+        if segundos_fila > 0:
+            # ida_vuelta / (ida_vuelta + n * por_fila) <= s  =>  n >= ida_vuelta * (1 - s) / (s * por_fila)
+            s = self.sobrecarga_objetivo
+            necesario = round(segundos_ida_vuelta * (1 - s) / (s * segundos_fila))
+        else:
+            necesario = self.maximo
+        return int(max(self.minimo, min(self.maximo, limite_memoria, necesario)))
+
+    def aprender(self, clave: str, muestras: List[Tuple[int, float, int]], anterior: int) -> Optional[ParametrosFetch]:
+        """
+        Decide el tamaño de lote a partir de las muestras (filas, segundos, bytes) de varios lotes.
+
+        Returns:
+            Optional[ParametrosFetch]: Los nuevos parámetros, o None si las muestras no bastan
+            (hacen falta al menos dos lotes completos de tamaños distintos).
+        """
+        filas_total = sum(m[0] for m in muestras)
+        if filas_total == 0:
+            return None
+        bytes_fila = sum(m[2] for m in muestras) / filas_total
+        tamanos = sorted({m[0] for m in muestras})
+        if len(tamanos) < 2:
+            return None
+        # Recta entre el tiempo medio del lote más pequeño y el del más grande
+        pequeno = [m[1] for m in muestras if m[0] == tamanos[0]]
+        grande = [m[1] for m in muestras if m[0] == tamanos[-1]]
+        t_pequeno, t_grande = sum(pequeno) / len(pequeno), sum(grande) / len(grande)
+        segundos_fila = max(0.0, (t_grande - t_pequeno) / (tamanos[-1] - tamanos[0]))
+        segundos_ida_vuelta = max(0.0, t_pequeno - segundos_fila * tamanos[0])
+
+        nuevo = ParametrosFetch(
+            self.recomendar(bytes_fila, segundos_ida_vuelta, segundos_fila),
+            bytes_fila, segundos_ida_vuelta, segundos_fila,
+        )
+        logger.info(
+            "Ajuste de fetch %s: %.0f bytes/fila, ida y vuelta %.2f ms, %.2f us/fila -> arraysize %d (antes %d)",
+            clave, bytes_fila, segundos_ida_vuelta * 1e3, segundos_fila * 1e6, nuevo.arraysize, anterior,
+        )
+        metricas.registrar("fetch.arraysize", nuevo.arraysize, consulta=clave)
+        with self._lock:
+            self._aprendido[clave] = nuevo
+            self._escribir()
+        return nuevo
+
+
+@lru_cache(maxsize=None)
+def obtener_ajustador() -> AjustadorFetch:
+    """Ajustador compartido del proceso, con estado en `estado/ajuste_fetch.json`."""
+    return AjustadorFetch(DIRECTORIO_ESTADO / "ajuste_fetch.json")
+
+
+def iterar_lotes_ajustados(
+    conn: Any,
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    clave: Optional[str] = None,
+    ajustador: Optional[AjustadorFetch] = None,
+    lotes_medidos: int = 4,
+) -> Iterator[List[tuple]]:
+    """
+    Ejecuta la consulta y entrega sus filas por lotes, ajustando el tamaño de lote sobre la marcha.
+
+    Los primeros `lotes_medidos` lotes (después del que llega con el execute) se piden alternando
+    el tamaño actual y el doble; con sus tiempos y tamaños se decide el tamaño del resto. Antes de
+    cada lote medido se fija `cursor.arraysize` a su tamaño: el driver pide al servidor
+    `arraysize` filas por ida y vuelta, y un `fetchmany` mayor se serviría en varias, lo que
+    ocultaría el coste fijo.
+
+    Args:
+        conn: Conexión abierta.
+        sql (str): Consulta con variables de enlace.
+        params (Optional[Dict[str, Any]]): Valores de las variables de enlace.
+        clave (Optional[str]): Nombre con el que se recuerda la consulta (por defecto, un hash del SQL).
+        ajustador (Optional[AjustadorFetch]): Por defecto, el compartido del proceso.
+        lotes_medidos (int): Lotes que se miden antes de decidir.
+
+    Yields:
+        List[tuple]: Lotes de filas no vacíos.
+    """
+    ajustador = ajustador or obtener_ajustador()
+    clave = clave or clave_consulta(sql)
+    inicial = ajustador.parametros(clave)
+    arraysize = inicial.arraysize
+
+    cursor = conn.cursor()
+    try:
+        cursor.arraysize = arraysize
+        cursor.prefetchrows = inicial.prefetchrows
+        with metricas.cronometro("consulta.execute"):
+            cursor.execute(sql, params or {})
+        # El primer lote llega con el execute (prefetch): no mide la ida y vuelta
+        lote = cursor.fetchmany(arraysize)
+        if not lote:
+            return
+        yield lote
+        muestras: List[Tuple[int, float, int]] = []
+        decidido = len(lote) < arraysize
+        while True:
+            if decidido:
+                pedir = arraysize
+            else:
+                pedir = cursor.arraysize = arraysize * (2 if len(muestras) % 2 else 1)
+            inicio = ajustador.reloj()
+            lote = cursor.fetchmany(pedir)
+            segundos = ajustador.reloj() - inicio
+            if not lote:
+                break
+            if not decidido:
+                if len(lote) == pedir:
+                    muestras.append((len(lote), segundos, metricas.tamano_aproximado(lote)))
+                if len(muestras) >= lotes_medidos or len(lote) < pedir:
+                    decidido = True
+                    nuevo = ajustador.aprender(clave, muestras, arraysize)
+                    # Los lotes siguientes ya usan el tamaño elegido (o el inicial si no se decidió)
+                    arraysize = cursor.arraysize = nuevo.arraysize if nuevo is not None else arraysize
+            yield lote
+    finally:
+        cursor.close()
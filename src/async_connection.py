@@ -0,0 +1,241 @@
+"""
+async_connection.py
+
+API asíncrona (asyncio) sobre las conexiones del pool, para el planificador y el dashboard HTTP.
+
+cx_Oracle es bloqueante, así que cada operación (adquirir sesión, ejecutar, leer filas, devolver
+sesión) se lanza en un executor de hilos dedicado y el bucle de eventos solo espera su resultado.
+Muchas peticiones concurrentes comparten así unas pocas sesiones Oracle sin bloquear el bucle.
+
+Esperar una sesión libre también bloquea un hilo. Para que las tareas que esperan no ocupen todos
+los hilos del executor (y las que ya tienen sesión no puedan consultar ni devolverla), cada base
+tiene un `asyncio.Semaphore` con su número máximo de sesiones (`pool_max_{BASE}`): las tareas que
+sobran esperan en el bucle de eventos, sin hilo.
+
+Cancelación y timeouts: si la tarea se cancela o vence su timeout, se llama a `conn.cancel()`
+(también en el executor, porque es una llamada de red) para interrumpir la consulta en el servidor y se espera a que el hilo termine antes de devolver
+la sesión al pool, de modo que nunca se devuelve una sesión ocupada.
+
+Funciones principales:
+- aconnection(nombre): Context manager asíncrono que presta una sesión de la base `nombre`.
+- amedin_connection(): Atajo para la base MEDIN.
+- fetch_all(sql, params, base, timeout): Adquiere una sesión, ejecuta la consulta y devuelve las filas.
+- cerrar_executor(): Detiene el executor dedicado.
+
+Hilos del executor (opcional):
+    ASYNC_MAX_HILOS  (por defecto 8)
+
+Uso:
+    async with amedin_connection() as conn:
+        filas = await conn.fetch_all("SELECT * FROM t WHERE fecha = :f", {"f": dia}, timeout=30)
+
+    filas = await fetch_all("SELECT COUNT(*) FROM usuarios", base="Simbad")
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncGenerator, Dict, List, Optional
+
+from config import metricas
+from src.connection import connection
+from src.pool import limite_sesiones
+
+HILOS_POR_DEFECTO = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+# Semáforos por bucle de eventos y base (un asyncio.Semaphore solo sirve en su bucle)
+_semaforos: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+# ----------------------------------------
+# 1. Executor dedicado
+# ----------------------------------------
+def _obtener_executor() -> ThreadPoolExecutor:
+    """
+    Devuelve el executor dedicado a las llamadas a Oracle, creándolo la primera vez.
+
+    Raises:
+        EnvironmentError: Si ASYNC_MAX_HILOS no es un entero positivo.
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            valor = os.getenv("ASYNC_MAX_HILOS")
+            try:
+                hilos = int(valor) if valor else HILOS_POR_DEFECTO
+            except ValueError:
+                raise EnvironmentError(f"Valor no entero '{valor}' en ASYNC_MAX_HILOS") from None
+            if hilos < 1:
+                raise EnvironmentError(f"ASYNC_MAX_HILOS debe ser positivo: {hilos}")
+            _executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="oracle-async")
+        return _executor
+
+
+def cerrar_executor() -> None:
+    """
+    Detiene el executor dedicado; se volverá a crear si se usa de nuevo.
+    """
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def _semaforo(nombre: str) -> asyncio.Semaphore:
+    """Semáforo del bucle actual que limita las sesiones de `nombre` prestadas a la vez."""
+    por_base = _semaforos.setdefault(asyncio.get_running_loop(), {})
+    if nombre not in por_base:
+        por_base[nombre] = asyncio.Semaphore(limite_sesiones(nombre))
+    return por_base[nombre]
+
+
+def _ejecutar(conn: Any, sql: str, params: Dict[str, Any]) -> List[tuple]:
+    """Ejecuta `sql` con variables de enlace y devuelve todas las filas (en un hilo del executor)."""
+    cursor = conn.cursor()
+    try:
+        with metricas.cronometro("consulta.execute"):
+            cursor.execute(sql, params)
+        with metricas.cronometro("consulta.fetch"):
+            filas = cursor.fetchall()
+        metricas.registrar("consulta.filas", len(filas))
+        return filas
+    finally:
+        cursor.close()
+
+
+# ----------------------------------------
+# 2. Conexión asíncrona
+# ----------------------------------------
+class ConexionAsincrona:
+    """
+    Envoltorio asíncrono de una sesión del pool.
+
+    Solo admite una operación en curso a la vez, igual que una conexión cx_Oracle.
+    """
+
+    def __init__(self, conn: Any, executor: ThreadPoolExecutor) -> None:
+        self.conn = conn
+        self._executor = executor
+
+    async def fetch_all(
+        self, sql: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None
+    ) -> List[tuple]:
+        """
+        Ejecuta la consulta en el executor y devuelve todas las filas.
+
+        Args:
+            sql (str): Consulta con variables de enlace (`:nombre`).
+            params (Optional[Dict[str, Any]]): Valores de las variables de enlace.
+            timeout (Optional[float]): Segundos máximos de espera; None para no limitar.
+
+        Returns:
+            List[tuple]: Filas devueltas por la consulta.
+
+        Raises:
+            asyncio.TimeoutError: Si la consulta supera `timeout` (la consulta se cancela en el servidor).
+            cx_Oracle.DatabaseError: Si la consulta falla.
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.run_in_executor(self._executor, _ejecutar, self.conn, sql, params or {})
+        try:
+            return await asyncio.wait_for(asyncio.shield(futuro), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Interrumpe la llamada en curso (un viaje de red: también en el executor) y espera a que
+            # el hilo la abandone
+            await asyncio.shield(loop.run_in_executor(self._executor, self.conn.cancel))
+            await asyncio.wait([futuro])
+            raise
+
+
+@asynccontextmanager
+async def aconnection(nombre: str) -> AsyncGenerator[ConexionAsincrona, None]:
+    """
+    Context manager asíncrono que presta una sesión del pool de `nombre` y la devuelve al salir.
+
+    Args:
+        nombre (str): Prefijo de la base de datos (por ejemplo, 'MEDIN' o 'Simbad').
+
+    Yields:
+        ConexionAsincrona: Sesión envuelta con métodos `await`-ables.
+
+    Raises:
+        KeyError: Si `nombre` no está entre las bases configuradas.
+        cx_Oracle.DatabaseError: Si no se puede adquirir una sesión.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _obtener_executor()
+    semaforo = _semaforo(nombre)
+    await semaforo.acquire()
+    cm = connection(nombre)
+    futuro = loop.run_in_executor(executor, cm.__enter__)
+    try:
+        conn = await asyncio.shield(futuro)
+    except asyncio.CancelledError:
+        # La adquisición sigue en curso en el hilo: la sesión (y el semáforo) se devuelven cuando termine
+        def devolver(f: "asyncio.Future[Any]") -> None:
+            if f.cancelled() or f.exception() is not None:
+                semaforo.release()
+                return
+            salida = executor.submit(cm.__exit__, None, None, None)
+            salida.add_done_callback(lambda _: loop.is_closed() or loop.call_soon_threadsafe(semaforo.release))
+        futuro.add_done_callback(devolver)
+        raise
+    except BaseException:
+        semaforo.release()
+        raise
+
+    try:
+        try:
+            yield ConexionAsincrona(conn, executor)
+        except BaseException as exc:
+            # El error llega a `connection`, que descarta la sesión si perdió la conexión
+            await loop.run_in_executor(executor, cm.__exit__, type(exc), exc, exc.__traceback__)
+            raise
+        await loop.run_in_executor(executor, cm.__exit__, None, None, None)
+    finally:
+        semaforo.release()
+
+
+def amedin_connection() -> AsyncContextManager[ConexionAsincrona]:
+    """
+    Context manager asíncrono para la base de datos MEDIN; equivale a `aconnection("MEDIN")`.
+    """
+    return aconnection("MEDIN")
+
+
+async def fetch_all(
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    base: str = "MEDIN",
+    timeout: Optional[float] = None,
+) -> List[tuple]:
+    """
+    Adquiere una sesión de `base`, ejecuta la consulta y devuelve todas las filas.
+
+    Args:
+        sql (str): Consulta con variables de enlace.
+        params (Optional[Dict[str, Any]]): Valores de las variables de enlace.
+        base (str): Base de datos contra la que ejecutar.
+        timeout (Optional[float]): Segundos máximos, incluida la espera por una sesión libre.
+
+    Returns:
+        List[tuple]: Filas devueltas por la consulta.
+
+    Raises:
+        asyncio.TimeoutError: Si se supera `timeout`.
+        KeyError: Si `base` no está configurada.
+        cx_Oracle.DatabaseError: Si la consulta falla.
+    """
+    async def _consultar() -> List[tuple]:
+        async with aconnection(base) as conn:
+            return await conn.fetch_all(sql, params)
+
+    return await asyncio.wait_for(_consultar(), timeout)
@@ -0,0 +1,313 @@
+"""
+backfill.py
+
+Extracción de rangos de fechas largos (backfills) en particiones paralelas y reanudables.
+
+Una única consulta `WHERE fecha BETWEEN ...` sobre meses de datos es un recorrido en serie por
+una sola sesión. Aquí el rango se divide en particiones de un día o una semana que se ejecutan
+en paralelo, cada una con su propia sesión del pool, y se fusionan después en orden de fecha.
+
+Cada partición terminada se guarda en disco y se anota en un punto de control JSON, de modo
+que si el backfill se interrumpe (o fallan algunas particiones), la siguiente ejecución solo
+procesa las particiones pendientes.
+
+Contrato de la consulta: debe aceptar las variables de enlace `:desde` y `:hasta` y filtrar
+`fecha >= :desde AND fecha < :hasta` (intervalo semiabierto, para no repetir filas en los bordes).
+
+El estado se guarda por defecto en `estado/backfill/<nombre>/`:
+    control.json        definición del trabajo y particiones completadas
+    particion_00003.pkl filas de la partición 3 (lotes serializados con pickle)
+
+Funciones principales:
+- particionar(inicio, fin, granularidad): Divide un rango de días en particiones.
+- TrabajoBackfill: Definición de un backfill (consulta, base, rango y granularidad).
+- Backfill: Ejecuta las particiones pendientes y lee o vuelca las filas en orden.
+
+Uso:
+    from src.backfill import Backfill, TrabajoBackfill
+    trabajo = TrabajoBackfill(
+        "eventos_2024", "MEDIN",
+        "SELECT * FROM eventos WHERE fecha >= :desde AND fecha < :hasta",
+        date(2024, 1, 1), date(2024, 6, 30), granularidad="semana",
+    )
+    backfill = Backfill(trabajo)
+    resumen = backfill.ejecutar()
+    with EscritorCSV(Path("eventos.csv"), columnas) as escritor:
+        backfill.volcar(escritor)
+"""
+
+import datetime
+import json
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from src.bulk_writer import EscritorLotes
+from src.collector import Abridor
+from src.connection import connection
+from src.incremental import DIRECTORIO_ESTADO
+from src.pool import limite_sesiones
+from src.streaming import iterar_lotes
+
+logger = logging.getLogger(__name__)
+
+GRANULARIDADES: Dict[str, int] = {"dia": 1, "semana": 7}
+
+
+class Particion(NamedTuple):
+    """Rango semiabierto de días [desde, hasta) de un backfill."""
+
+    indice: int
+    desde: datetime.date
+    hasta: datetime.date
+
+
+class TrabajoBackfill(NamedTuple):
+    """
+    Definición de un backfill.
+
+    Atributos:
+        nombre: Identificador del trabajo (nombre del directorio de estado).
+        base: Base de datos de origen.
+        sql: Consulta con `:desde` y `:hasta`.
+        inicio: Primer día del rango.
+        fin: Último día del rango (inclusive).
+        granularidad: Tamaño de cada partición ('dia' o 'semana').
+    """
+
+    nombre: str
+    base: str
+    sql: str
+    inicio: datetime.date
+    fin: datetime.date
+    granularidad: str = "dia"
+
+
+class ResumenBackfill(NamedTuple):
+    """Resultado de una ejecución de backfill."""
+
+    particiones: int
+    completadas: int
+    reanudadas: int
+    filas: int
+    segundos: float
+    fallidas: List[Tuple[Particion, str]]
+
+    @property
+    def ok(self) -> bool:
+        return self.completadas == self.particiones
+
+
+def particionar(inicio: datetime.date, fin: datetime.date, granularidad: str = "dia") -> List[Particion]:
+    """
+    Divide los días de `inicio` a `fin` (ambos incluidos) en particiones consecutivas.
+
+    Raises:
+        ValueError: Si la granularidad no es válida o `fin` es anterior a `inicio`.
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad no válida '{granularidad}'; opciones: {list(GRANULARIDADES)}")
+    if fin < inicio:
+        raise ValueError(f"El rango termina ({fin}) antes de empezar ({inicio})")
+    paso = datetime.timedelta(days=GRANULARIDADES[granularidad])
+    limite = fin + datetime.timedelta(days=1)
+    particiones = []
+    desde = inicio
+    while desde < limite:
+        hasta = min(desde + paso, limite)
+        particiones.append(Particion(len(particiones), desde, hasta))
+        desde = hasta
+    return particiones
+
+
+class Backfill:
+    """
+    Ejecuta un TrabajoBackfill en particiones paralelas con puntos de control en disco.
+
+    Args:
+        trabajo (TrabajoBackfill): Trabajo a ejecutar.
+        directorio (Optional[Path]): Directorio de estado; por defecto `estado/backfill/<nombre>`.
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+        reiniciar (bool): Si es True, descarta el estado guardado y empieza desde cero.
+
+    Raises:
+        ValueError: Si el directorio contiene el estado de un trabajo distinto con el mismo nombre
+            (usa `reiniciar=True` para descartarlo).
+    """
+
+    def __init__(
+        self,
+        trabajo: TrabajoBackfill,
+        directorio: Optional[Path] = None,
+        abrir: Abridor = connection,
+        reiniciar: bool = False,
+    ) -> None:
+        self.trabajo = trabajo
+        self.abrir = abrir
+        self.directorio = directorio or DIRECTORIO_ESTADO / "backfill" / trabajo.nombre
+        if reiniciar:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+        self._particiones = particionar(trabajo.inicio, trabajo.fin, trabajo.granularidad)
+        self._lock = threading.Lock()
+        self._completadas: Set[int] = self._leer_control()
+
+    # ---------------- Estado en disco ----------------
+    def _definicion(self) -> Dict[str, Any]:
+        t = self.trabajo
+        return {
+            "base": t.base, "sql": t.sql, "inicio": t.inicio.isoformat(),
+            "fin": t.fin.isoformat(), "granularidad": t.granularidad,
+        }
+
+    def _ruta_control(self) -> Path:
+        return self.directorio / "control.json"
+
+    def _ruta_particion(self, particion: Particion) -> Path:
+        return self.directorio / f"particion_{particion.indice:05d}.pkl"
+
+    def _leer_control(self) -> Set[int]:
+        ruta = self._ruta_control()
+        if not ruta.exists():
+            return set()
+        control = json.loads(ruta.read_text(encoding="utf-8"))
+        if control["trabajo"] != self._definicion():
+            raise ValueError(
+                f"{ruta} pertenece a otra definición del backfill '{self.trabajo.nombre}'; "
+                "usa reiniciar=True para empezar de nuevo"
+            )
+        # Solo cuentan las particiones cuyo fichero sigue existiendo
+        return {i for i in control["completadas"] if self._ruta_particion(self._particiones[i]).exists()}
+
+    def _escribir_control(self) -> None:
+        """Escribe el punto de control de forma atómica (fichero temporal + os.replace)."""
+        ruta = self._ruta_control()
+        temporal = ruta.with_suffix(".tmp")
+        control = {"trabajo": self._definicion(), "completadas": sorted(self._completadas)}
+        temporal.write_text(json.dumps(control, indent=2), encoding="utf-8")
+        os.replace(temporal, ruta)
+
+    # ---------------- Ejecución ----------------
+    def particiones(self) -> List[Particion]:
+        """Todas las particiones del trabajo, en orden de fecha."""
+        return list(self._particiones)
+
+    def pendientes(self) -> List[Particion]:
+        """Particiones que aún no se han completado."""
+        with self._lock:
+            return [p for p in self._particiones if p.indice not in self._completadas]
+
+    def _extraer(self, particion: Particion, arraysize: int) -> int:
+        """Lee una partición y la guarda en disco; devuelve el número de filas."""
+        ruta = self._ruta_particion(particion)
+        temporal = ruta.with_suffix(".tmp")
+        filas = 0
+        params = {"desde": particion.desde, "hasta": particion.hasta}
+        with self.abrir(self.trabajo.base) as conn, open(temporal, "wb") as fichero:
+            for lote in iterar_lotes(conn, self.trabajo.sql, params, arraysize=arraysize):
+                pickle.dump(lote, fichero, protocol=pickle.HIGHEST_PROTOCOL)
+                filas += len(lote)
+        os.replace(temporal, ruta)
+        with self._lock:
+            self._completadas.add(particion.indice)
+            self._escribir_control()
+        return filas
+
+    def ejecutar(self, max_hilos: Optional[int] = None, arraysize: int = 5000) -> ResumenBackfill:
+        """
+        Ejecuta en paralelo las particiones pendientes.
+
+        Los errores de una partición no detienen las demás: se devuelven en `fallidas` y la
+        partición queda pendiente para la siguiente ejecución.
+
+        Args:
+            max_hilos (Optional[int]): Particiones simultáneas; por defecto, el tamaño máximo
+                del pool de sesiones de la base (pool_max_{BASE}).
+            arraysize (int): Filas por ida y vuelta al leer cada partición.
+
+        Returns:
+            ResumenBackfill: Particiones totales, completadas y reanudadas, filas leídas y errores.
+        """
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        pendientes = self.pendientes()
+        reanudadas = len(self._particiones) - len(pendientes)
+        if reanudadas:
+            logger.info(
+                "Backfill %s: %d de %d particiones ya completadas, se reanuda",
+                self.trabajo.nombre, reanudadas, len(self._particiones),
+            )
+        hilos = max_hilos or limite_sesiones(self.trabajo.base)
+        fallidas: List[Tuple[Particion, str]] = []
+        filas = 0
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, hilos), thread_name_prefix="backfill") as executor:
+            futuros = {executor.submit(self._extraer, p, arraysize): p for p in pendientes}
+            for futuro in as_completed(futuros):
+                particion = futuros[futuro]
+                try:
+                    filas += futuro.result()
+                except Exception as exc:
+                    logger.error("Backfill %s: partición %s falló: %s", self.trabajo.nombre, particion, exc)
+                    fallidas.append((particion, str(exc)))
+        segundos = time.perf_counter() - inicio
+        resumen = ResumenBackfill(
+            particiones=len(self._particiones),
+            completadas=len(self._completadas),
+            reanudadas=reanudadas,
+            filas=filas,
+            segundos=segundos,
+            fallidas=sorted(fallidas),
+        )
+        logger.info(
+            "Backfill %s: %d/%d particiones, %d filas nuevas en %.3fs (%d fallidas)",
+            self.trabajo.nombre, resumen.completadas, resumen.particiones, filas, segundos, len(fallidas),
+        )
+        return resumen
+
+    # ---------------- Resultados ----------------
+    def iterar_lotes(self) -> Iterator[List[tuple]]:
+        """
+        Entrega las filas guardadas en lotes, partición a partición en orden de fecha.
+
+        Raises:
+            RuntimeError: Si quedan particiones pendientes.
+        """
+        pendientes = self.pendientes()
+        if pendientes:
+            raise RuntimeError(f"Backfill '{self.trabajo.nombre}' incompleto: {len(pendientes)} particiones pendientes")
+        for particion in self._particiones:
+            with open(self._ruta_particion(particion), "rb") as fichero:
+                while True:
+                    try:
+                        yield pickle.load(fichero)
+                    except EOFError:
+                        break
+
+    def iterar_filas(self) -> Iterator[tuple]:
+        """Entrega las filas guardadas una a una, en orden de fecha."""
+        for lote in self.iterar_lotes():
+            yield from lote
+
+    def volcar(self, escritor: EscritorLotes) -> int:
+        """
+        Escribe todas las filas, en orden de fecha, con un escritor por lotes (src/bulk_writer.py).
+
+        Returns:
+            int: Filas enviadas al escritor.
+        """
+        total = 0
+        for lote in self.iterar_lotes():
+            escritor.escribir(lote)
+            total += len(lote)
+        return total
+
+    def reiniciar(self) -> None:
+        """Borra el punto de control y las particiones guardadas."""
+        with self._lock:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+            self._completadas.clear()
@@ -0,0 +1,205 @@
+"""
+bulk_writer.py
+
+Escritura masiva de estadísticas calculadas, por lotes en lugar de fila a fila.
+
+Insertar fila a fila con un cursor cuesta una ida y vuelta (y a menudo un commit) por fila.
+Los escritores de este módulo acumulan filas y las envían en lotes:
+
+- EscritorOracle: `cursor.executemany` con array binding, `batcherrors` para que una fila
+  inválida no aborte el lote, y un único commit por lote.
+- EscritorSQLite: mismo interfaz sobre un fichero SQLite local.
+- EscritorCSV: mismo interfaz sobre un fichero CSV.
+
+Todos son context managers: al salir se vuelca el lote pendiente, salvo que el bloque `with`
+termine con una excepción; entonces las filas pendientes se descartan sin confirmarlas (los lotes
+ya enviados siguen confirmados). Las filas rechazadas se registran en `errores` como (posición
+global de la fila, mensaje).
+
+Uso:
+    from src.bulk_writer import EscritorOracle
+    with medin_connection() as conn, EscritorOracle(conn, "INSERT INTO stats VALUES (:1, :2, :3)") as escritor:
+        escritor.escribir(filas)
+    escritor.filas_escritas, escritor.errores
+"""
+
+import csv
+import logging
+import sqlite3
+from abc import ABC, abstractmethod
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_POR_DEFECTO = 1000
+
+
+class EscritorLotes(ABC):
+    """
+    Base de los escritores: acumula filas y llama a `_volcar` cada `tamano_lote` filas.
+
+    Args:
+        tamano_lote (int): Filas por lote.
+    """
+
+    def __init__(self, tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> None:
+        if tamano_lote < 1:
+            raise ValueError(f"tamano_lote debe ser positivo: {tamano_lote}")
+        self.tamano_lote = tamano_lote
+        self.filas_escritas = 0
+        self.lotes = 0
+        self.errores: List[Tuple[int, str]] = []
+        self._pendientes: List[Sequence[Any]] = []
+        self._filas_enviadas = 0  # filas enviadas a _volcar, incluidas las rechazadas
+
+    def escribir(self, filas: Iterable[Sequence[Any]]) -> None:
+        """Añade filas; se envían en cuanto se completa un lote."""
+        for fila in filas:
+            self._pendientes.append(fila)
+            if len(self._pendientes) >= self.tamano_lote:
+                self.vaciar()
+
+    def vaciar(self) -> None:
+        """Envía el lote pendiente, aunque esté incompleto."""
+        if not self._pendientes:
+            return
+        lote, self._pendientes = self._pendientes, []
+        rechazadas = self._volcar(lote)
+        for posicion, mensaje in rechazadas:
+            self.errores.append((self._filas_enviadas + posicion, mensaje))
+        if rechazadas:
+            logger.warning("%d filas rechazadas en el lote %d", len(rechazadas), self.lotes + 1)
+        self.filas_escritas += len(lote) - len(rechazadas)
+        self._filas_enviadas += len(lote)
+        self.lotes += 1
+
+    @abstractmethod
+    def _volcar(self, lote: List[Sequence[Any]]) -> List[Tuple[int, str]]:
+        """Escribe un lote y devuelve las filas rechazadas como (posición en el lote, mensaje)."""
+
+    def _liberar(self) -> None:
+        """Libera los recursos del escritor (cursor, conexión, fichero)."""
+
+    def cerrar(self) -> None:
+        """Vuelca el lote pendiente y libera recursos."""
+        try:
+            self.vaciar()
+        finally:
+            self._liberar()
+
+    def descartar(self) -> None:
+        """Libera recursos sin enviar ni confirmar el lote pendiente."""
+        if self._pendientes:
+            logger.warning("%d filas pendientes descartadas sin escribir", len(self._pendientes))
+        self._pendientes = []
+        self._liberar()
+
+    def __enter__(self) -> "EscritorLotes":
+        return self
+
+    def __exit__(
+        self,
+        tipo: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if tipo is None:
+            self.cerrar()
+        else:
+            self.descartar()
+
+
+class EscritorOracle(EscritorLotes):
+    """
+    Escritor sobre una conexión Oracle con `executemany` y un commit por lote.
+
+    Args:
+        conn: Conexión abierta (por ejemplo, la de `medin_connection()`).
+        sql (str): Sentencia DML con variables de enlace posicionales o con nombre.
+        tamano_lote (int): Filas por lote.
+        batcherrors (bool): Si es True, las filas inválidas se registran y el resto del lote se confirma.
+    """
+
+    def __init__(self, conn: Any, sql: str, tamano_lote: int = TAMANO_LOTE_POR_DEFECTO, batcherrors: bool = True) -> None:
+        super().__init__(tamano_lote)
+        self.conn = conn
+        self.sql = sql
+        self.batcherrors = batcherrors
+        self._cursor = conn.cursor()
+
+    def _volcar(self, lote: List[Sequence[Any]]) -> List[Tuple[int, str]]:
+        self._cursor.executemany(self.sql, lote, batcherrors=self.batcherrors)
+        rechazadas = []
+        if self.batcherrors:
+            rechazadas = [(e.offset, e.message) for e in self._cursor.getbatcherrors()]
+        self.conn.commit()
+        return rechazadas
+
+    def _liberar(self) -> None:
+        self._cursor.close()
+
+
+class EscritorSQLite(EscritorLotes):
+    """
+    Escritor sobre una tabla SQLite local con el mismo interfaz que EscritorOracle.
+
+    Si un lote falla por una fila inválida, ese lote se reintenta fila a fila para registrar
+    solo las filas rechazadas (equivalente a `batcherrors`).
+
+    Args:
+        ruta (Path): Fichero SQLite (se crea si no existe).
+        tabla (str): Nombre de la tabla (se crea si no existe, con columnas sin tipo).
+        columnas (Sequence[str]): Nombres de las columnas.
+        tamano_lote (int): Filas por lote.
+    """
+
+    def __init__(self, ruta: Path, tabla: str, columnas: Sequence[str], tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> None:
+        super().__init__(tamano_lote)
+        self._db = sqlite3.connect(str(ruta))
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {tabla} ({', '.join(columnas)})")
+        self.sql = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' for _ in columnas)})"
+
+    def _volcar(self, lote: List[Sequence[Any]]) -> List[Tuple[int, str]]:
+        try:
+            with self._db:
+                self._db.executemany(self.sql, lote)
+            return []
+        except sqlite3.Error:
+            rechazadas = []
+            with self._db:
+                for posicion, fila in enumerate(lote):
+                    try:
+                        self._db.execute(self.sql, fila)
+                    except sqlite3.Error as exc:
+                        rechazadas.append((posicion, str(exc)))
+            return rechazadas
+
+    def _liberar(self) -> None:
+        self._db.close()
+
+
+class EscritorCSV(EscritorLotes):
+    """
+    Escritor sobre un fichero CSV con el mismo interfaz que EscritorOracle.
+
+    Args:
+        ruta (Path): Fichero de salida (se sobrescribe).
+        columnas (Sequence[str]): Cabecera del CSV.
+        tamano_lote (int): Filas por lote.
+    """
+
+    def __init__(self, ruta: Path, columnas: Sequence[str], tamano_lote: int = TAMANO_LOTE_POR_DEFECTO) -> None:
+        super().__init__(tamano_lote)
+        self._fichero = open(ruta, "w", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._fichero)
+        self._csv.writerow(columnas)
+
+    def _volcar(self, lote: List[Sequence[Any]]) -> List[Tuple[int, str]]:
+        self._csv.writerows(lote)
+        self._fichero.flush()
+        return []
+
+    def _liberar(self) -> None:
+        self._fichero.close()
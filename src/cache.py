@@ -0,0 +1,323 @@
+"""
+cache.py
+
+Caché de resultados de consultas de estadísticas, con TTL, desalojo LRU y nivel opcional en disco.
+
+Las estadísticas de días cerrados no cambian, así que no hace falta volver a consultarlas a
+MEDIN/Simbad en cada ejecución o en cada visita al dashboard. Cada resultado se guarda bajo la
+clave (base, texto SQL, parámetros enlazados):
+
+- Nivel en memoria: un OrderedDict con desalojo LRU, limitado en entradas y en bytes
+  aproximados (`metricas.tamano_aproximado`), para que un resultado enorme no agote la memoria.
+  Un resultado que por sí solo supera el límite de bytes no se guarda en memoria.
+- Nivel en disco (opcional): una base SQLite en `cache/` (junto a `logs/`) que sobrevive entre
+  ejecuciones; los valores se serializan con pickle. Las filas caducadas se borran al leerlas y
+  en cada escritura, y al superar `max_entradas_disco` o `max_bytes_disco` se borran las menos
+  usadas recientemente.
+
+Cada entrada tiene su propio TTL; las marcadas como inmutables (días cerrados) no caducan.
+Los contadores de aciertos, fallos y desalojos permiten comprobar cuánta carga se quita a Oracle.
+
+Funciones principales:
+- CacheResultados: La caché en sí (obtener / guardar / invalidar / estadisticas).
+- consulta_cacheada(cache, base, sql, params): Devuelve las filas de la caché o las consulta.
+
+Uso:
+    from src.cache import CacheResultados, consulta_cacheada
+    cache = CacheResultados(max_entradas=1000, en_disco=True)
+    filas = consulta_cacheada(cache, "MEDIN", "SELECT COUNT(*) FROM t WHERE fecha = :f", {"f": ayer}, inmutable=True)
+"""
+
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, NamedTuple, Optional, Tuple
+
+from config import metricas
+from src.connection import connection
+
+DIRECTORIO_CACHE = Path(__file__).parent.parent / "cache"
+
+Abridor = Callable[[str], ContextManager[Any]]
+
+MAX_BYTES_MEMORIA_POR_DEFECTO = 256 * 2**20
+MAX_ENTRADAS_DISCO_POR_DEFECTO = 100_000
+MAX_BYTES_DISCO_POR_DEFECTO = 2**30
+
+
+class _Entrada(NamedTuple):
+    valor: Any
+    expira: Optional[float]  # instante (time.time) de caducidad; None si es inmutable
+    bytes: int = 0
+
+
+def _tamano(valor: Any) -> int:
+    """Bytes aproximados de un valor: las filas con `metricas.tamano_aproximado`; el resto, su pickle."""
+    if isinstance(valor, list) and all(isinstance(fila, tuple) for fila in valor):
+        return metricas.tamano_aproximado(valor)
+    return len(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def clave_consulta(base: str, sql: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Construye la clave de caché de una consulta.
+
+    Args:
+        base (str): Base de datos consultada.
+        sql (str): Texto SQL (se normalizan los espacios).
+        params (Optional[Dict[str, Any]]): Variables de enlace.
+
+    Returns:
+        str: Hash SHA-256 estable de (base, SQL, parámetros ordenados).
+    """
+    sql_normalizado = " ".join(sql.split())
+    parametros = sorted((params or {}).items())
+    material = repr((base, sql_normalizado, parametros)).encode("utf-8")
+    return hashlib.sha256(material).hexdigest()
+
+
+class CacheResultados:
+    """
+    Caché LRU de dos niveles (memoria y, opcionalmente, SQLite en disco) segura entre hilos.
+
+    Args:
+        max_entradas (int): Entradas máximas en memoria; al superarlo se desaloja la menos usada.
+        ttl_por_defecto (Optional[float]): Segundos de vida de las entradas mutables; None para no caducar.
+        en_disco (bool): Si es True, también se guardan los resultados en SQLite.
+        directorio (Path): Carpeta del fichero SQLite.
+        max_bytes_memoria (int): Bytes aproximados máximos de los valores en memoria.
+        max_entradas_disco (int): Filas máximas del fichero SQLite.
+        max_bytes_disco (int): Bytes máximos de los valores serializados en el fichero SQLite.
+    """
+
+    def __init__(
+        self,
+        max_entradas: int = 1000,
+        ttl_por_defecto: Optional[float] = 3600,
+        en_disco: bool = False,
+        directorio: Path = DIRECTORIO_CACHE,
+        max_bytes_memoria: int = MAX_BYTES_MEMORIA_POR_DEFECTO,
+        max_entradas_disco: int = MAX_ENTRADAS_DISCO_POR_DEFECTO,
+        max_bytes_disco: int = MAX_BYTES_DISCO_POR_DEFECTO,
+    ) -> None:
+        if min(max_entradas, max_bytes_memoria, max_entradas_disco, max_bytes_disco) < 1:
+            raise ValueError("Los límites de la caché deben ser positivos")
+        self.max_entradas = max_entradas
+        self.max_bytes_memoria = max_bytes_memoria
+        self.max_entradas_disco = max_entradas_disco
+        self.max_bytes_disco = max_bytes_disco
+        self.ttl_por_defecto = ttl_por_defecto
+        self._memoria: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.desalojos_disco = 0
+        self._disco: Optional[sqlite3.Connection] = None
+        if en_disco:
+            directorio.mkdir(parents=True, exist_ok=True)
+            self._disco = sqlite3.connect(str(directorio / "resultados.sqlite"), check_same_thread=False)
+            columnas = [c[1] for c in self._disco.execute("PRAGMA table_info(resultados)")]
+            if columnas and "usado" not in columnas:
+                # Fichero de una versión anterior, sin uso ni tamaño: al ser una caché, se empieza de cero
+                self._disco.execute("DROP TABLE resultados")
+            self._disco.execute(
+                "CREATE TABLE IF NOT EXISTS resultados "
+                "(clave TEXT PRIMARY KEY, expira REAL, usado REAL, bytes INTEGER, valor BLOB)"
+            )
+            self._disco.execute("CREATE INDEX IF NOT EXISTS resultados_expira ON resultados (expira)")
+            self._disco.execute("CREATE INDEX IF NOT EXISTS resultados_usado ON resultados (usado)")
+            self._disco.commit()
+
+    # --- nivel en memoria ---
+    def _guardar_en_memoria(self, clave: str, entrada: _Entrada) -> None:
+        self._quitar_de_memoria(clave)
+        if entrada.bytes > self.max_bytes_memoria:
+            # No cabe ni sola: desalojar todo lo demás no bastaría
+            return
+        self._memoria[clave] = entrada
+        self._bytes_memoria += entrada.bytes
+        while len(self._memoria) > self.max_entradas or self._bytes_memoria > self.max_bytes_memoria:
+            _, desalojada = self._memoria.popitem(last=False)
+            self._bytes_memoria -= desalojada.bytes
+            self.desalojos += 1
+
+    def _quitar_de_memoria(self, clave: str) -> None:
+        entrada = self._memoria.pop(clave, None)
+        if entrada is not None:
+            self._bytes_memoria -= entrada.bytes
+
+    # --- nivel en disco ---
+    def _leer_disco(self, clave: str) -> Optional[_Entrada]:
+        if self._disco is None:
+            return None
+        fila = self._disco.execute("SELECT expira, valor FROM resultados WHERE clave = ?", (clave,)).fetchone()
+        if fila is None:
+            return None
+        if fila[0] is None or fila[0] > time.time():
+            # Solo se anota el uso de las vigentes; las caducadas las borra obtener()
+            self._disco.execute("UPDATE resultados SET usado = ? WHERE clave = ?", (time.time(), clave))
+            self._disco.commit()
+        valor = pickle.loads(fila[1])
+        return _Entrada(valor, fila[0], _tamano(valor))
+
+    def _escribir_disco(self, clave: str, entrada: _Entrada) -> None:
+        if self._disco is None:
+            return
+        datos = pickle.dumps(entrada.valor, protocol=pickle.HIGHEST_PROTOCOL)
+        ahora = time.time()
+        self._disco.execute(
+            "INSERT OR REPLACE INTO resultados (clave, expira, usado, bytes, valor) VALUES (?, ?, ?, ?, ?)",
+            (clave, entrada.expira, ahora, len(datos), datos),
+        )
+        self._disco.execute("DELETE FROM resultados WHERE expira IS NOT NULL AND expira <= ?", (ahora,))
+        self._recortar_disco()
+        self._disco.commit()
+
+    def _recortar_disco(self) -> None:
+        """Borra las filas menos usadas recientemente hasta respetar los límites de filas y bytes."""
+        filas, total = self._disco.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM resultados").fetchone()
+        if filas <= self.max_entradas_disco and total <= self.max_bytes_disco:
+            return
+        borrar = []
+        for clave, tamano in self._disco.execute("SELECT clave, bytes FROM resultados ORDER BY usado"):
+            if filas <= self.max_entradas_disco and total <= self.max_bytes_disco:
+                break
+            borrar.append((clave,))
+            filas -= 1
+            total -= tamano
+        self._disco.executemany("DELETE FROM resultados WHERE clave = ?", borrar)
+        self.desalojos_disco += len(borrar)
+
+    def _borrar_disco(self, clave: Optional[str]) -> None:
+        if self._disco is None:
+            return
+        if clave is None:
+            self._disco.execute("DELETE FROM resultados")
+        else:
+            self._disco.execute("DELETE FROM resultados WHERE clave = ?", (clave,))
+        self._disco.commit()
+
+    # --- API pública ---
+    def obtener(self, clave: str) -> Tuple[bool, Any]:
+        """
+        Busca una clave en memoria y, si no está, en disco.
+
+        Returns:
+            Tuple[bool, Any]: (encontrado, valor). Las entradas caducadas cuentan como fallo y se borran.
+        """
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            desde_disco = False
+            if entrada is None:
+                entrada = self._leer_disco(clave)
+                desde_disco = entrada is not None
+            if entrada is not None and entrada.expira is not None and entrada.expira <= ahora:
+                self._quitar_de_memoria(clave)
+                self._borrar_disco(clave)
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return False, None
+            self.aciertos += 1
+            if desde_disco:
+                self.aciertos_disco += 1
+                self._guardar_en_memoria(clave, entrada)
+            else:
+                self._memoria.move_to_end(clave)
+            return True, entrada.valor
+
+    def guardar(self, clave: str, valor: Any, ttl: Optional[float] = None, inmutable: bool = False) -> None:
+        """
+        Guarda un valor en la caché.
+
+        Args:
+            clave (str): Clave (ver `clave_consulta`).
+            valor (Any): Valor serializable con pickle.
+            ttl (Optional[float]): Segundos de vida; por defecto `ttl_por_defecto`.
+            inmutable (bool): Si es True, la entrada no caduca (resultados de días cerrados).
+        """
+        ttl = self.ttl_por_defecto if ttl is None else ttl
+        expira = None if inmutable or ttl is None else time.time() + ttl
+        entrada = _Entrada(valor, expira, _tamano(valor))
+        with self._lock:
+            self._guardar_en_memoria(clave, entrada)
+            self._escribir_disco(clave, entrada)
+
+    def invalidar(self, clave: Optional[str] = None) -> None:
+        """
+        Borra una entrada (o toda la caché si `clave` es None) de memoria y de disco.
+        """
+        with self._lock:
+            if clave is None:
+                self._memoria.clear()
+                self._bytes_memoria = 0
+            else:
+                self._quitar_de_memoria(clave)
+            self._borrar_disco(clave)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Devuelve los contadores de aciertos, fallos, desalojos y entradas y bytes en memoria."""
+        with self._lock:
+            return {
+                "aciertos": self.aciertos,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "desalojos_disco": self.desalojos_disco,
+                "entradas": len(self._memoria),
+                "bytes": self._bytes_memoria,
+            }
+
+    def cerrar(self) -> None:
+        """Cierra el fichero SQLite del nivel en disco, si existe."""
+        with self._lock:
+            if self._disco is not None:
+                self._disco.close()
+                self._disco = None
+
+
+def consulta_cacheada(
+    cache: CacheResultados,
+    base: str,
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    ttl: Optional[float] = None,
+    inmutable: bool = False,
+    abrir: Abridor = connection,
+) -> List[tuple]:
+    """
+    Devuelve las filas de la consulta desde la caché o, si no están, consultando la base.
+
+    Args:
+        cache (CacheResultados): Caché a usar.
+        base (str): Base de datos ('MEDIN', 'Simbad', ...).
+        sql (str): Consulta con variables de enlace.
+        params (Optional[Dict[str, Any]]): Valores de las variables de enlace.
+        ttl (Optional[float]): Segundos de vida del resultado.
+        inmutable (bool): Si es True, el resultado no caduca (días cerrados).
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+
+    Returns:
+        List[tuple]: Filas del resultado.
+
+    Raises:
+        cx_Oracle.DatabaseError: Si la consulta falla (los errores no se guardan en caché).
+    """
+    clave = clave_consulta(base, sql, params)
+    encontrado, filas = cache.obtener(clave)
+    if encontrado:
+        return filas
+    with abrir(base) as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params or {})
+        filas = cursor.fetchall()
+    cache.guardar(clave, filas, ttl=ttl, inmutable=inmutable)
+    return filas
@@ -0,0 +1,270 @@
+"""
+catalogo.py
+
+Catálogo declarativo de consultas de estadísticas, cargado una vez por proceso.
+
+Cada consulta es un fichero `.sql` del directorio `consultas/` con una cabecera de metadatos
+en comentarios, seguida del SQL:
+
+    -- nombre: altas_diarias
+    -- base: MEDIN
+    -- descripcion: Altas registradas en un día
+    -- parametros: dia, centro
+    SELECT COUNT(*) FROM altas WHERE fecha = :dia AND centro = :centro
+
+Las consultas se ejecutan siempre con variables de enlace: el texto SQL es fijo y los valores
+viajan aparte, de modo que Oracle reconoce la misma sentencia en cada ejecución y la sesión la
+reutiliza desde su caché de sentencias (`pool_stmtcache_{PREFIJO}`, ver src/pool.py) sin volver
+a analizarla. Al cargar se comprueba que las variables declaradas coinciden con las del SQL, y
+al ejecutar, que se pasan exactamente esas.
+
+El catálogo acumula además la duración de cada consulta para localizar las más costosas.
+
+Funciones principales:
+- obtener_catalogo(): Devuelve el catálogo de `consultas/` (cargado la primera vez).
+- cargar_catalogo(directorio): Lee y valida todos los `.sql` de un directorio.
+- Catalogo.ejecutar(nombre, params): Ejecuta una consulta y devuelve sus filas.
+- Catalogo.recolectar(peticiones): Ejecuta varias consultas en paralelo (ver src/collector.py).
+- Catalogo.tiempos(): Resumen de duraciones por consulta, de mayor a menor tiempo total.
+
+Uso:
+    from src.catalogo import obtener_catalogo
+    catalogo = obtener_catalogo()
+    filas = catalogo.ejecutar("altas_diarias", {"dia": date(2024, 1, 1), "centro": 7})
+"""
+
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from config import metricas
+from src.collector import Abridor, ConsultaEstadistica, InformeRecoleccion, recolectar
+from src.connection import connection
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_CONSULTAS = Path(__file__).parent.parent / "consultas"
+
+_CABECERA = re.compile(r"^--\s*(\w+)\s*:(.*)$")
+# Literales y comentarios, que no pueden contener variables de enlace
+_NO_SQL = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_VARIABLE = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+Parametros = Optional[Mapping[str, Any]]
+
+
+class DefinicionConsulta(NamedTuple):
+    """Consulta del catálogo: SQL fijo y variables de enlace que espera."""
+
+    nombre: str
+    base: str
+    sql: str
+    parametros: Tuple[str, ...]
+    descripcion: str = ""
+    ruta: Optional[Path] = None
+
+
+def variables_enlace(sql: str) -> List[str]:
+    """
+    Devuelve las variables de enlace (`:nombre`) de una sentencia, sin repetir y en orden.
+
+    Se ignoran las que aparecen dentro de literales o comentarios.
+    """
+    nombres = _VARIABLE.findall(_NO_SQL.sub(" ", sql))
+    return list(dict.fromkeys(n.lower() for n in nombres))
+
+
+def leer_consulta(ruta: Path) -> DefinicionConsulta:
+    """
+    Lee un fichero `.sql` con cabecera de metadatos.
+
+    Args:
+        ruta (Path): Fichero a leer. Si la cabecera no indica `nombre`, se usa el del fichero.
+
+    Returns:
+        DefinicionConsulta: Consulta validada.
+
+    Raises:
+        ValueError: Si falta la base, el SQL está vacío o las variables declaradas no coinciden
+            con las del SQL.
+    """
+    metadatos: Dict[str, str] = {}
+    lineas = ruta.read_text(encoding="utf-8").splitlines()
+    inicio_sql = 0
+    for inicio_sql, linea in enumerate(lineas):
+        coincidencia = _CABECERA.match(linea.strip())
+        if not coincidencia:
+            break
+        metadatos[coincidencia.group(1).lower()] = coincidencia.group(2).strip()
+    else:
+        inicio_sql = len(lineas)
+    sql = "\n".join(lineas[inicio_sql:]).strip().rstrip(";").strip()
+
+    if not sql:
+        raise ValueError(f"{ruta}: no contiene SQL")
+    if not metadatos.get("base"):
+        raise ValueError(f"{ruta}: falta la cabecera '-- base:'")
+    declarados = tuple(p.strip().lower() for p in metadatos.get("parametros", "").split(",") if p.strip())
+    encontrados = variables_enlace(sql)
+    if sorted(declarados) != sorted(encontrados):
+        raise ValueError(
+            f"{ruta}: parámetros declarados {sorted(declarados)} no coinciden con los del SQL {sorted(encontrados)}"
+        )
+    return DefinicionConsulta(
+        nombre=metadatos.get("nombre") or ruta.stem,
+        base=metadatos["base"],
+        sql=sql,
+        parametros=declarados,
+        descripcion=metadatos.get("descripcion", ""),
+        ruta=ruta,
+    )
+
+
+class Catalogo(Mapping[str, DefinicionConsulta]):
+    """
+    Conjunto de consultas por nombre, con la duración acumulada de cada una.
+
+    Args:
+        consultas (Sequence[DefinicionConsulta]): Consultas del catálogo.
+
+    Raises:
+        ValueError: Si hay dos consultas con el mismo nombre.
+    """
+
+    def __init__(self, consultas: Sequence[DefinicionConsulta]) -> None:
+        self._consultas: Dict[str, DefinicionConsulta] = {}
+        for consulta in consultas:
+            if consulta.nombre in self._consultas:
+                raise ValueError(f"Consulta duplicada en el catálogo: '{consulta.nombre}'")
+            self._consultas[consulta.nombre] = consulta
+        self._tiempos: Dict[str, metricas.Histograma] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, nombre: str) -> DefinicionConsulta:
+        return self._consultas[nombre]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._consultas)
+
+    def __len__(self) -> int:
+        return len(self._consultas)
+
+    def _enlazar(self, nombre: str, params: Parametros) -> Tuple[DefinicionConsulta, Dict[str, Any]]:
+        """Comprueba que `params` trae exactamente las variables de la consulta."""
+        consulta = self[nombre]
+        valores = {k.lower(): v for k, v in (params or {}).items()}
+        if set(valores) != set(consulta.parametros):
+            raise ValueError(
+                f"La consulta '{nombre}' espera los parámetros {sorted(consulta.parametros)}, "
+                f"recibió {sorted(valores)}"
+            )
+        return consulta, valores
+
+    def registrar_tiempo(self, nombre: str, segundos: float) -> None:
+        """Acumula la duración de una ejecución de la consulta `nombre`."""
+        with self._lock:
+            histograma = self._tiempos.get(nombre)
+            if histograma is None:
+                histograma = self._tiempos[nombre] = metricas.Histograma()
+            histograma.agregar(segundos)
+
+    def consulta_estadistica(self, nombre: str, params: Parametros = None) -> ConsultaEstadistica:
+        """
+        Devuelve la consulta `nombre` con sus parámetros como ConsultaEstadistica.
+
+        Raises:
+            KeyError: Si la consulta no está en el catálogo.
+            ValueError: Si los parámetros no coinciden con los declarados.
+        """
+        consulta, valores = self._enlazar(nombre, params)
+        return ConsultaEstadistica(consulta.nombre, consulta.base, consulta.sql, valores)
+
+    def ejecutar(self, nombre: str, params: Parametros = None, abrir: Abridor = connection) -> List[tuple]:
+        """
+        Ejecuta una consulta del catálogo con variables de enlace y devuelve todas sus filas.
+
+        Args:
+            nombre (str): Nombre de la consulta.
+            params (Parametros): Valor de cada variable de enlace.
+            abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+
+        Returns:
+            List[tuple]: Filas devueltas.
+
+        Raises:
+            KeyError: Si la consulta no está en el catálogo.
+            ValueError: Si los parámetros no coinciden con los declarados.
+            cx_Oracle.DatabaseError: Si falla la consulta.
+        """
+        consulta, valores = self._enlazar(nombre, params)
+        inicio = time.perf_counter()
+        with abrir(consulta.base) as conn:
+            cursor = conn.cursor()
+            with metricas.cronometro("consulta.execute", base=consulta.base, consulta=nombre):
+                cursor.execute(consulta.sql, valores)
+            with metricas.cronometro("consulta.fetch", base=consulta.base, consulta=nombre):
+                filas = cursor.fetchall()
+        segundos = time.perf_counter() - inicio
+        self.registrar_tiempo(nombre, segundos)
+        logger.debug("Consulta de catálogo %s: %d filas en %.3fs", nombre, len(filas), segundos)
+        return filas
+
+    def recolectar(
+        self,
+        peticiones: Sequence[Tuple[str, Parametros]],
+        max_hilos: int = 8,
+        abrir: Abridor = connection,
+    ) -> InformeRecoleccion:
+        """
+        Ejecuta varias consultas del catálogo en paralelo con `src.collector.recolectar`.
+
+        Args:
+            peticiones (Sequence[Tuple[str, Parametros]]): Pares (nombre de consulta, parámetros).
+            max_hilos (int): Número máximo de hilos.
+            abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+
+        Returns:
+            InformeRecoleccion: Resultados en el orden de `peticiones`.
+
+        Raises:
+            KeyError, ValueError: Si alguna petición no es válida (antes de ejecutar ninguna).
+        """
+        consultas = [self.consulta_estadistica(nombre, params) for nombre, params in peticiones]
+        informe = recolectar(consultas, max_hilos=max_hilos, abrir=abrir)
+        for resultado in informe.resultados:
+            if resultado.ok:
+                self.registrar_tiempo(resultado.nombre, resultado.segundos)
+        return informe
+
+    def tiempos(self) -> Dict[str, Dict[str, float]]:
+        """
+        Devuelve cantidad, suma, p50, p95, p99 y máximo (segundos) de cada consulta ejecutada,
+        ordenadas de mayor a menor tiempo total.
+        """
+        with self._lock:
+            datos = {nombre: h.resumen() for nombre, h in self._tiempos.items()}
+        return dict(sorted(datos.items(), key=lambda item: item[1]["suma"], reverse=True))
+
+
+def cargar_catalogo(directorio: Path = DIRECTORIO_CONSULTAS) -> Catalogo:
+    """
+    Lee y valida todos los ficheros `.sql` de `directorio` (no recursivo).
+
+    Raises:
+        ValueError: Si algún fichero no es válido o hay nombres duplicados.
+    """
+    consultas = [leer_consulta(ruta) for ruta in sorted(Path(directorio).glob("*.sql"))]
+    logger.debug("Catálogo cargado de %s: %d consultas", directorio, len(consultas))
+    return Catalogo(consultas)
+
+
+@lru_cache(maxsize=None)
+def obtener_catalogo(directorio: Path = DIRECTORIO_CONSULTAS) -> Catalogo:
+    """
+    Devuelve el catálogo de `directorio`, cargándolo solo la primera vez en el proceso.
+    """
+    return cargar_catalogo(directorio)
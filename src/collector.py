@@ -0,0 +1,230 @@
+"""
+collector.py
+
+Motor de recolección concurrente de estadísticas sobre varias bases de datos.
+
+Las consultas de estadísticas son independientes entre sí, así que se reparten en un pool de
+hilos acotado. cx_Oracle libera el GIL durante la E/S de red, por lo que el tiempo total se
+acerca al de la consulta más lenta en lugar de a la suma de todas. Cada base tiene además un
+límite de concurrencia propio (por defecto, el tamaño máximo de su pool de sesiones), para no
+dejar hilos bloqueados esperando una sesión.
+
+Cada consulta puede llevar límites de tiempo, filas, bytes y memoria (ver `src/limites.py`), y la
+recolección entera un presupuesto compartido: una estadística descontrolada se corta y queda
+como error en su resultado sin retener al resto.
+
+Funciones principales:
+- recolectar(consultas): Ejecuta las consultas en paralelo y devuelve un InformeRecoleccion.
+- recolectar_en_serie(consultas): Ejecuta las consultas una tras otra (camino anterior).
+- ejecutar_consulta(consulta): Ejecuta una única consulta y mide su duración.
+
+Uso:
+    from src.collector import ConsultaEstadistica, recolectar
+    informe = recolectar([
+        ConsultaEstadistica("altas", "MEDIN", "SELECT COUNT(*) FROM altas WHERE fecha = :f", {"f": dia}),
+        ConsultaEstadistica("usuarios", "Simbad", "SELECT COUNT(*) FROM usuarios"),
+    ])
+    print(informe.resumen())
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, ContextManager, Dict, List, NamedTuple, Optional, Sequence
+
+from config import metricas
+from src.connection import connection
+from src.limites import LimitesConsulta, PresupuestoEjecucion, consultar_con_limites, leer_limites
+from src.pool import limite_sesiones
+
+logger = logging.getLogger(__name__)
+
+# Función que abre una conexión a partir del nombre de la base (por defecto, `connection`)
+Abridor = Callable[[str], ContextManager[Any]]
+
+
+# ----------------------------------------
+# 1. Estructuras de datos
+# ----------------------------------------
+class ConsultaEstadistica(NamedTuple):
+    """Consulta de estadística a ejecutar sobre una base concreta, con sus límites opcionales."""
+
+    nombre: str
+    base: str
+    sql: str
+    params: Optional[Dict[str, Any]] = None
+    limites: Optional[LimitesConsulta] = None
+
+
+@dataclass
+class ResultadoConsulta:
+    """Resultado de una consulta: filas obtenidas (o error) y duración en segundos."""
+
+    nombre: str
+    base: str
+    filas: List[tuple]
+    segundos: float
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class InformeRecoleccion:
+    """Resultados de una recolección junto con su tiempo total de reloj."""
+
+    resultados: List[ResultadoConsulta] = field(default_factory=list)
+    segundos_totales: float = 0.0
+
+    @property
+    def segundos_en_serie(self) -> float:
+        """Tiempo estimado del camino en serie: la suma de la duración de cada consulta."""
+        return sum(r.segundos for r in self.resultados)
+
+    @property
+    def aceleracion(self) -> float:
+        """Cociente entre el tiempo en serie estimado y el tiempo total real."""
+        if self.segundos_totales <= 0:
+            return 1.0
+        return self.segundos_en_serie / self.segundos_totales
+
+    def resumen(self) -> str:
+        """Devuelve un texto con la duración de cada consulta y la aceleración global."""
+        lineas = [
+            f"{r.base}/{r.nombre}: {r.segundos:.3f}s "
+            + (f"{len(r.filas)} filas" if r.ok else f"ERROR {r.error}")
+            for r in self.resultados
+        ]
+        lineas.append(
+            f"Total {self.segundos_totales:.3f}s (en serie {self.segundos_en_serie:.3f}s, "
+            f"aceleración x{self.aceleracion:.2f})"
+        )
+        return "\n".join(lineas)
+
+
+# ----------------------------------------
+# 2. Ejecución de consultas
+# ----------------------------------------
+def ejecutar_consulta(
+    consulta: ConsultaEstadistica,
+    abrir: Abridor = connection,
+    limites: Optional[LimitesConsulta] = None,
+    presupuesto: Optional[PresupuestoEjecucion] = None,
+) -> ResultadoConsulta:
+    """
+    Ejecuta una consulta y mide su duración, incluida la adquisición de la sesión.
+
+    Los errores no se propagan: se guardan en el resultado para que una consulta fallida
+    no impida recoger las demás. Un límite superado se guarda como LimiteExcedido.
+
+    Args:
+        consulta (ConsultaEstadistica): Consulta a ejecutar.
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+        limites (Optional[LimitesConsulta]): Límites si la consulta no trae los suyos; por
+            defecto, los configurados para su base (ver `leer_limites`).
+        presupuesto (Optional[PresupuestoEjecucion]): Presupuesto compartido de la ejecución.
+
+    Returns:
+        ResultadoConsulta: Filas obtenidas o el error producido.
+    """
+    inicio = time.perf_counter()
+    descripcion = f"{consulta.base}/{consulta.nombre}"
+    try:
+        limites = consulta.limites or limites or leer_limites(consulta.base)
+        if presupuesto is not None:
+            # Con el presupuesto agotado no se llega a pedir una sesión
+            presupuesto.comprobar(descripcion)
+        with abrir(consulta.base) as conn:
+            if limites.vacios and presupuesto is None:
+                cursor = conn.cursor()
+                with metricas.cronometro("consulta.execute", base=consulta.base, consulta=consulta.nombre):
+                    cursor.execute(consulta.sql, consulta.params or {})
+                with metricas.cronometro("consulta.fetch", base=consulta.base, consulta=consulta.nombre):
+                    filas = cursor.fetchall()
+                metricas.registrar("consulta.filas", len(filas), base=consulta.base, consulta=consulta.nombre)
+            else:
+                filas = consultar_con_limites(
+                    conn, consulta.sql, consulta.params, limites, presupuesto, descripcion
+                ).filas
+    except Exception as exc:
+        segundos = time.perf_counter() - inicio
+        logger.error("Consulta %s falló tras %.3fs: %s", descripcion, segundos, exc)
+        return ResultadoConsulta(consulta.nombre, consulta.base, [], segundos, exc)
+    segundos = time.perf_counter() - inicio
+    logger.debug("Consulta %s: %d filas en %.3fs", descripcion, len(filas), segundos)
+    return ResultadoConsulta(consulta.nombre, consulta.base, filas, segundos)
+
+
+def recolectar_en_serie(
+    consultas: Sequence[ConsultaEstadistica],
+    abrir: Abridor = connection,
+    limites_consulta: Optional[LimitesConsulta] = None,
+    presupuesto: Optional[PresupuestoEjecucion] = None,
+) -> InformeRecoleccion:
+    """
+    Ejecuta las consultas una tras otra en el hilo actual.
+
+    Args:
+        consultas (Sequence[ConsultaEstadistica]): Consultas a ejecutar.
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+        limites_consulta, presupuesto: Como en `recolectar`.
+
+    Returns:
+        InformeRecoleccion: Resultados en el orden de `consultas`.
+    """
+    inicio = time.perf_counter()
+    resultados = [ejecutar_consulta(c, abrir, limites_consulta, presupuesto) for c in consultas]
+    return InformeRecoleccion(resultados, time.perf_counter() - inicio)
+
+
+def recolectar(
+    consultas: Sequence[ConsultaEstadistica],
+    max_hilos: int = 8,
+    limites: Optional[Dict[str, int]] = None,
+    abrir: Abridor = connection,
+    limites_consulta: Optional[LimitesConsulta] = None,
+    presupuesto: Optional[PresupuestoEjecucion] = None,
+) -> InformeRecoleccion:
+    """
+    Ejecuta las consultas en un pool de hilos acotado, con un límite de concurrencia por base.
+
+    Args:
+        consultas (Sequence[ConsultaEstadistica]): Consultas independientes a ejecutar.
+        max_hilos (int): Número máximo de hilos en total.
+        limites (Optional[Dict[str, int]]): Consultas simultáneas permitidas por base. Las bases
+            que no aparezcan usan el tamaño máximo de su pool (pool_max_{BASE}).
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+        limites_consulta (Optional[LimitesConsulta]): Límites de las consultas que no traen los
+            suyos; por defecto, los configurados para cada base.
+        presupuesto (Optional[PresupuestoEjecucion]): Segundos, filas y bytes para toda la recolección.
+
+    Returns:
+        InformeRecoleccion: Resultados en el orden de `consultas` y tiempo total de reloj.
+
+    Raises:
+        EnvironmentError: Si el tamaño de pool configurado para alguna base no es válido.
+    """
+    limites = dict(limites or {})
+    semaforos: Dict[str, threading.BoundedSemaphore] = {}
+    for consulta in consultas:
+        if consulta.base not in semaforos:
+            limite = limites.get(consulta.base) or limite_sesiones(consulta.base)
+            semaforos[consulta.base] = threading.BoundedSemaphore(limite)
+
+    def tarea(consulta: ConsultaEstadistica) -> ResultadoConsulta:
+        with semaforos[consulta.base]:
+            return ejecutar_consulta(consulta, abrir, limites_consulta, presupuesto)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_hilos), thread_name_prefix="recolector") as executor:
+        resultados = list(executor.map(tarea, consultas))
+    informe = InformeRecoleccion(resultados, time.perf_counter() - inicio)
+    logger.info(
+        "Recolectadas %d consultas en %.3fs (aceleración x%.2f)",
+        len(resultados), informe.segundos_totales, informe.aceleracion,
+    )
+    return informe
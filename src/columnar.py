@@ -0,0 +1,368 @@
+"""
+columnar.py
+
+Materialización columnar de resultados y agregados vectorizados para las estadísticas diarias.
+
+En lugar de convertir cada fila en una tupla de objetos Python y agregar con bucles, los lotes
+del cursor se vuelcan directamente en arrays tipados por columna: arrays de NumPy si está
+instalado o, si no, buffers del módulo `array`. Los textos se codifican con diccionario y las
+fechas se guardan como datetime64 (listas sin NumPy). El tipo de cada columna se decide a partir
+de `cursor.description`. Sobre esas columnas se calculan conteos,
+sumas, percentiles y agrupaciones sin recorrer filas en Python (con NumPy).
+
+Funciones principales:
+- leer_columnar(cursor): Vuelca un cursor ya ejecutado en una TablaColumnar.
+- consultar_columnar(conn, sql, params): Ejecuta la consulta y devuelve una TablaColumnar.
+
+Uso:
+    from src.columnar import consultar_columnar
+    with medin_connection() as conn:
+        tabla = consultar_columnar(conn, "SELECT categoria, importe FROM eventos WHERE fecha = :f", {"f": dia})
+    tabla.sumar("IMPORTE"), tabla.percentil("IMPORTE", 95), tabla.agrupar("CATEGORIA", "IMPORTE", "sum")
+"""
+
+import math
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: se usan buffers del módulo array
+    np = None
+
+# ----------------------------------------
+# 1. Tipos de columna
+# ----------------------------------------
+TIPO_ENTERO = "entero"
+TIPO_REAL = "real"
+TIPO_TEXTO = "texto"
+TIPO_FECHA = "fecha"
+
+# Nombres de los tipos de cx_Oracle (DbType.name) agrupados por tipo de columna
+_TIPOS_NUMERICOS = {"DB_TYPE_NUMBER", "DB_TYPE_BINARY_INTEGER", "DB_TYPE_BINARY_FLOAT", "DB_TYPE_BINARY_DOUBLE"}
+_TIPOS_FECHA = {"DB_TYPE_DATE", "DB_TYPE_TIMESTAMP", "DB_TYPE_TIMESTAMP_TZ", "DB_TYPE_TIMESTAMP_LTZ"}
+
+# Mayor precisión de NUMBER(p, 0) que cabe en un entero de 64 bits
+_PRECISION_MAXIMA_ENTERO = 18
+
+AGREGADOS = ("count", "sum", "mean", "min", "max")
+
+
+def tipo_columna(descripcion: Sequence[Any]) -> str:
+    """
+    Decide el tipo de una columna a partir de su entrada en `cursor.description`.
+
+    Las columnas NUMBER(p, 0) con p <= 18 y BINARY_INTEGER son enteras; el resto de numéricas
+    (incluidas las NUMBER sin precisión, como COUNT(*)) son reales.
+
+    Args:
+        descripcion (Sequence[Any]): Tupla (nombre, tipo, display_size, internal_size, precision, scale, null_ok).
+
+    Returns:
+        str: TIPO_ENTERO, TIPO_REAL, TIPO_FECHA o TIPO_TEXTO.
+    """
+    tipo = descripcion[1]
+    nombre_tipo = getattr(tipo, "name", str(tipo))
+    if nombre_tipo in _TIPOS_FECHA:
+        return TIPO_FECHA
+    if nombre_tipo not in _TIPOS_NUMERICOS:
+        return TIPO_TEXTO
+    if nombre_tipo == "DB_TYPE_BINARY_INTEGER":
+        return TIPO_ENTERO
+    precision, escala = descripcion[4], descripcion[5]
+    if nombre_tipo == "DB_TYPE_NUMBER" and escala == 0 and precision and 0 < precision <= _PRECISION_MAXIMA_ENTERO:
+        return TIPO_ENTERO
+    return TIPO_REAL
+
+
+# ----------------------------------------
+# 2. Construcción de columnas
+# ----------------------------------------
+class _Columna:
+    """
+    Acumula los valores de una columna lote a lote en un buffer tipado.
+
+    Los textos se codifican con diccionario: cada valor distinto se guarda una vez y la columna
+    es un array de códigos enteros, lo que abarata tanto la memoria como las agrupaciones.
+    """
+
+    def __init__(self, tipo: str) -> None:
+        self.tipo = tipo
+        self.diccionario: Optional[Dict[Any, int]] = None
+        if tipo == TIPO_ENTERO:
+            self.valores: Any = array("q")
+        elif tipo == TIPO_REAL:
+            self.valores = array("d")
+        elif tipo == TIPO_TEXTO:
+            self.valores = array("q")
+            self.diccionario = {}
+        else:
+            self.valores = []
+
+    def extender(self, valores: Sequence[Any]) -> None:
+        if self.tipo == TIPO_ENTERO:
+            if None in valores:
+                # Un nulo no cabe en un entero: la columna pasa a real con NaN
+                self.tipo = TIPO_REAL
+                self.valores = array("d", self.valores)
+            else:
+                self.valores.extend(valores)
+                return
+        if self.tipo == TIPO_REAL:
+            if None in valores:
+                valores = [math.nan if v is None else v for v in valores]
+            self.valores.extend(valores)
+        elif self.diccionario is not None:
+            diccionario = self.diccionario
+            for v in dict.fromkeys(valores):
+                if v not in diccionario:
+                    diccionario[v] = len(diccionario)
+            self.valores.extend(map(diccionario.__getitem__, valores))
+        else:
+            self.valores.extend(valores)
+
+    def finalizar(self) -> Tuple[Any, Optional[List[Any]]]:
+        """Devuelve la columna final y, para textos, la lista de valores distintos."""
+        diccionario = list(self.diccionario) if self.diccionario is not None else None
+        if np is None:
+            return self.valores, diccionario
+        if self.tipo in (TIPO_ENTERO, TIPO_TEXTO):
+            return np.frombuffer(self.valores, dtype=np.int64), diccionario
+        if self.tipo == TIPO_REAL:
+            return np.frombuffer(self.valores, dtype=np.float64), None
+        return np.array(
+            [np.datetime64("NaT") if v is None else np.datetime64(v, "us") for v in self.valores],
+            dtype="datetime64[us]",
+        ), None
+
+
+def leer_columnar(cursor: Any, arraysize: int = 10_000) -> "TablaColumnar":
+    """
+    Vuelca las filas pendientes de un cursor ya ejecutado en columnas tipadas.
+
+    Args:
+        cursor: Cursor sobre el que ya se llamó a `execute`.
+        arraysize (int): Filas pedidas en cada ida y vuelta.
+
+    Returns:
+        TablaColumnar: Tabla con una columna por entrada de `cursor.description`.
+
+    Raises:
+        ValueError: Si el cursor no tiene descripción (no era una consulta).
+    """
+    if not cursor.description:
+        raise ValueError("El cursor no tiene resultados: ¿se ejecutó una consulta SELECT?")
+    nombres = [d[0] for d in cursor.description]
+    columnas = [_Columna(tipo_columna(d)) for d in cursor.description]
+    while True:
+        lote = cursor.fetchmany(arraysize)
+        if not lote:
+            break
+        for columna, valores in zip(columnas, zip(*lote)):
+            columna.extender(valores)
+    finales = [c.finalizar() for c in columnas]
+    return TablaColumnar(
+        {n: valores for n, (valores, _) in zip(nombres, finales)},
+        {n: c.tipo for n, c in zip(nombres, columnas)},
+        {n: dic for n, (_, dic) in zip(nombres, finales) if dic is not None},
+    )
+
+
+def consultar_columnar(
+    conn: Any, sql: str, params: Optional[Dict[str, Any]] = None, arraysize: int = 10_000
+) -> "TablaColumnar":
+    """
+    Ejecuta la consulta con variables de enlace y devuelve el resultado en formato columnar.
+
+    Args:
+        conn: Conexión abierta.
+        sql (str): Consulta con variables de enlace.
+        params (Optional[Dict[str, Any]]): Valores de las variables de enlace.
+        arraysize (int): Filas pedidas en cada ida y vuelta.
+
+    Returns:
+        TablaColumnar: Resultado de la consulta.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.arraysize = arraysize
+        cursor.prefetchrows = arraysize + 1
+        cursor.execute(sql, params or {})
+        return leer_columnar(cursor, arraysize)
+    finally:
+        cursor.close()
+
+
+# ----------------------------------------
+# 3. Tabla columnar y agregados
+# ----------------------------------------
+def _percentil_lineal(ordenados: Sequence[float], q: float) -> float:
+    """Percentil con interpolación lineal (mismo criterio que numpy.percentile por defecto)."""
+    if not ordenados:
+        return math.nan
+    posicion = (len(ordenados) - 1) * q / 100
+    inferior = math.floor(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def _no_nulos(valores: Iterable[Any]) -> List[Any]:
+    return [v for v in valores if v is not None and v == v]  # v == v descarta NaN
+
+
+class TablaColumnar:
+    """
+    Resultado de una consulta almacenado por columnas.
+
+    Cada columna es un array de NumPy (o un `array.array`/lista sin NumPy) y ocupa una fracción
+    de la memoria de una lista de tuplas. Los nulos numéricos se guardan como NaN y las columnas
+    de texto como códigos enteros más un diccionario de valores distintos (`diccionarios`).
+    """
+
+    def __init__(
+        self, columnas: Dict[str, Any], tipos: Dict[str, str], diccionarios: Optional[Dict[str, List[Any]]] = None
+    ) -> None:
+        self.columnas = columnas
+        self.tipos = tipos
+        self.diccionarios = diccionarios or {}
+
+    def __len__(self) -> int:
+        for valores in self.columnas.values():
+            return len(valores)
+        return 0
+
+    def __getitem__(self, nombre: str) -> Any:
+        """Devuelve la columna `nombre` con sus valores reales (los textos, decodificados)."""
+        valores = self.columnas[nombre]
+        diccionario = self.diccionarios.get(nombre)
+        if diccionario is None:
+            return valores
+        if np is not None:
+            return np.array(diccionario, dtype=object)[valores]
+        return [diccionario[c] for c in valores]
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria aproximada ocupada por los buffers de la tabla."""
+        total = 0
+        for valores in self.columnas.values():
+            total += valores.nbytes if np is not None else getattr(valores, "itemsize", 8) * len(valores)
+        return total
+
+    def filas(self) -> Iterable[tuple]:
+        """Reconstruye las filas como tuplas (para exportar o depurar)."""
+        return zip(*(self[nombre] for nombre in self.columnas))
+
+    def contar(self, columna: Optional[str] = None) -> int:
+        """Número de filas, o de valores no nulos de `columna`."""
+        if columna is None:
+            return len(self)
+        valores = self.columnas[columna]
+        if columna in self.diccionarios:
+            nulo = self.diccionarios[columna].index(None) if None in self.diccionarios[columna] else -1
+            if np is not None:
+                return int(np.count_nonzero(valores != nulo))
+            return sum(1 for c in valores if c != nulo)
+        if np is not None and self.tipos[columna] == TIPO_REAL:
+            return int(np.count_nonzero(~np.isnan(valores)))
+        if np is not None and self.tipos[columna] == TIPO_ENTERO:
+            return len(valores)
+        return len(_no_nulos(valores))
+
+    def sumar(self, columna: str) -> float:
+        """Suma de los valores no nulos de una columna numérica."""
+        valores = self._numerica(columna)
+        if np is not None:
+            return float(np.nansum(valores))
+        return float(math.fsum(_no_nulos(valores)))
+
+    def percentil(self, columna: str, q: float) -> float:
+        """Percentil `q` (0-100) de los valores no nulos, con interpolación lineal."""
+        if not 0 <= q <= 100:
+            raise ValueError(f"El percentil debe estar entre 0 y 100: {q}")
+        valores = self._numerica(columna)
+        if np is not None:
+            limpios = valores[~np.isnan(valores)] if valores.dtype.kind == "f" else valores
+            return float(np.percentile(limpios, q)) if len(limpios) else math.nan
+        return float(_percentil_lineal(sorted(_no_nulos(valores)), q))
+
+    def agrupar(self, clave: str, valor: Optional[str] = None, agregado: str = "count") -> Dict[Any, float]:
+        """
+        Agrupa por `clave` y agrega `valor` con `agregado` ('count', 'sum', 'mean', 'min' o 'max').
+
+        Los nulos de `valor` se ignoran; 'count' sin `valor` cuenta filas.
+
+        Returns:
+            Dict[Any, float]: Resultado por cada valor distinto de la clave.
+        """
+        if agregado not in AGREGADOS:
+            raise ValueError(f"Agregado no soportado '{agregado}'; opciones: {AGREGADOS}")
+        if valor is None and agregado != "count":
+            raise ValueError(f"El agregado '{agregado}' necesita una columna de valores")
+        unicos, codigos = self._factorizar(clave)
+        if np is not None:
+            return self._agrupar_numpy(unicos, codigos, valor, agregado)
+
+        grupos: List[List[float]] = [[] for _ in unicos]
+        if valor is None:
+            valores: Sequence[Any] = [1] * len(codigos)
+        elif agregado == "count":
+            valores = self[valor]
+        else:
+            valores = self._numerica(valor)
+        for codigo, v in zip(codigos, valores):
+            grupos[codigo].append(v)
+        funciones: Dict[str, Callable[[List[float]], float]] = {
+            "count": len,
+            "sum": math.fsum,
+            "mean": lambda g: math.fsum(g) / len(g) if g else math.nan,
+            "min": lambda g: min(g) if g else math.nan,
+            "max": lambda g: max(g) if g else math.nan,
+        }
+        return {k: float(funciones[agregado](_no_nulos(g))) for k, g in zip(unicos, grupos)}
+
+    # --- auxiliares ---
+    def _numerica(self, columna: str) -> Any:
+        if self.tipos[columna] not in (TIPO_ENTERO, TIPO_REAL):
+            raise TypeError(f"La columna '{columna}' no es numérica ({self.tipos[columna]})")
+        return self.columnas[columna]
+
+    def _factorizar(self, clave: str) -> Tuple[List[Any], Any]:
+        """Devuelve los valores distintos de la clave y el código de grupo de cada fila."""
+        valores = self.columnas[clave]
+        if clave in self.diccionarios:
+            # Los textos ya están codificados: los códigos son los grupos
+            return self.diccionarios[clave], valores
+        if np is not None:
+            unicos, codigos = np.unique(valores, return_inverse=True)
+            return unicos.tolist(), codigos
+        indice: Dict[Any, int] = {}
+        for v in valores:
+            if v not in indice:
+                indice[v] = len(indice)
+        return list(indice), array("q", map(indice.__getitem__, valores))
+
+    def _agrupar_numpy(self, unicos: List[Any], codigos: Any, valor: Optional[str], agregado: str) -> Dict[Any, float]:
+        n = len(unicos)
+        if valor is None:
+            return dict(zip(unicos, np.bincount(codigos, minlength=n).astype(float).tolist()))
+        if agregado == "count" and self.tipos[valor] not in (TIPO_ENTERO, TIPO_REAL):
+            no_nulos = np.array([v is not None for v in self[valor]], dtype=bool)
+            return dict(zip(unicos, np.bincount(codigos[no_nulos], minlength=n).astype(float).tolist()))
+        valores = np.asarray(self._numerica(valor), dtype=np.float64)
+        validos = ~np.isnan(valores)
+        codigos, valores = codigos[validos], valores[validos]
+        conteos = np.bincount(codigos, minlength=n).astype(float)
+        if agregado == "count":
+            resultado = conteos
+        elif agregado in ("sum", "mean"):
+            resultado = np.bincount(codigos, weights=valores, minlength=n)
+            if agregado == "mean":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    resultado = np.where(conteos > 0, resultado / conteos, np.nan)
+        else:
+            inicial = np.inf if agregado == "min" else -np.inf
+            resultado = np.full(n, inicial)
+            (np.minimum if agregado == "min" else np.maximum).at(resultado, codigos, valores)
+            resultado[conteos == 0] = np.nan
+        return dict(zip(unicos, resultado.tolist()))
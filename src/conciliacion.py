@@ -0,0 +1,374 @@
+"""
+conciliacion.py
+
+Conciliación de registros entre dos bases (por ejemplo, MEDIN y Simbad) con un hash join en Python.
+
+MEDIN y Simbad son bases Oracle distintas, así que no se pueden cruzar en SQL, y comparar cada
+registro con todos los del otro lado es cuadrático. Aquí se lee en streaming el lado izquierdo
+para construir un índice hash por la clave de cruce y después se lee el derecho consultando el
+índice fila a fila: el coste es lineal en el número de filas de ambos lados.
+
+Si el índice supera el presupuesto de memoria, se pasa a un hash join por particiones: las filas
+de ambos lados se reparten por el hash de su clave en ficheros temporales y cada par de
+particiones se cruza por separado, con un índice que cabe en memoria. Si el índice de una
+partición tampoco cabe (claves repartidas de forma desigual), ese par de particiones se vuelve a
+repartir con otra semilla del hash, hasta MAX_NIVELES veces.
+
+Conteos del informe (en filas):
+    coincidentes     filas de la derecha cuya clave está en la izquierda
+    solo_derecha     filas de la derecha cuya clave no está en la izquierda
+    solo_izquierda   filas de la izquierda cuya clave no aparece en la derecha
+    duplicadas_izquierda filas de la izquierda con una clave repetida
+
+Las claves se normalizan antes de cruzarlas (textos sin espacios en los extremos y números
+enteros iguales aunque uno llegue como float), porque cada sistema las puede guardar con tipos
+distintos.
+
+Funciones principales:
+- LadoConciliacion: Consulta y columnas de la clave de un lado.
+- conciliar(izquierda, derecha): Ejecuta ambas consultas y devuelve un InformeConciliacion.
+- conciliar_filas(filas_izq, filas_der, ...): Igual, sobre iterables de filas ya obtenidos.
+
+Uso:
+    from src.conciliacion import LadoConciliacion, conciliar
+    informe = conciliar(
+        LadoConciliacion("MEDIN", "SELECT nhc, nombre FROM pacientes", clave=(0,)),
+        LadoConciliacion("Simbad", "SELECT historia, nombre FROM personas", clave=(0,)),
+    )
+    print(informe.resumen())
+"""
+
+import logging
+import pickle
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import metricas
+from src.collector import Abridor
+from src.connection import connection
+from src.streaming import iterar_filas
+
+logger = logging.getLogger(__name__)
+
+# Presupuesto de memoria del índice por defecto
+MEMORIA_MAXIMA_POR_DEFECTO = 256 * 2**20
+# Bytes aproximados de cada entrada del índice además de la fila (dict, lista y tupla de clave)
+_SOBRECARGA_ENTRADA = 200
+PARTICIONES_POR_DEFECTO = 32
+# Veces que una partición demasiado grande se vuelve a repartir antes de cruzarla tal cual
+MAX_NIVELES = 3
+MUESTRAS_POR_DEFECTO = 10
+
+Normalizador = Callable[[Any], Hashable]
+
+
+class LadoConciliacion(NamedTuple):
+    """
+    Un lado de la conciliación.
+
+    Atributos:
+        base: Base de datos de origen.
+        sql: Consulta que devuelve los registros.
+        clave: Posiciones de las columnas que forman la clave de cruce.
+        params: Valores de las variables de enlace.
+    """
+
+    base: str
+    sql: str
+    clave: Tuple[int, ...] = (0,)
+    params: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class InformeConciliacion:
+    """Conteos y registros de ejemplo de una conciliación."""
+
+    filas_izquierda: int = 0
+    filas_derecha: int = 0
+    coincidentes: int = 0
+    solo_izquierda: int = 0
+    solo_derecha: int = 0
+    duplicadas_izquierda: int = 0
+    particiones: int = 0
+    repartos: int = 0
+    segundos: float = 0.0
+    muestras_coincidentes: List[Tuple[tuple, tuple]] = field(default_factory=list)
+    muestras_solo_izquierda: List[tuple] = field(default_factory=list)
+    muestras_solo_derecha: List[tuple] = field(default_factory=list)
+
+    def resumen(self) -> str:
+        """Devuelve un texto con los conteos de la conciliación."""
+        modo = f"{self.particiones} particiones en disco" if self.particiones else "en memoria"
+        if self.repartos:
+            modo += f", {self.repartos} repartidas de nuevo"
+        return (
+            f"Izquierda {self.filas_izquierda} filas, derecha {self.filas_derecha} filas ({modo}, {self.segundos:.3f}s)\n"
+            f"Coincidentes {self.coincidentes}, solo izquierda {self.solo_izquierda}, "
+            f"solo derecha {self.solo_derecha}, duplicadas izquierda {self.duplicadas_izquierda}"
+        )
+
+
+def normalizar_valor(valor: Any) -> Hashable:
+    """Normaliza un valor de clave: textos sin espacios en los extremos y floats enteros como int."""
+    if isinstance(valor, str):
+        return valor.strip()
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return valor
+
+
+def _extractor(posiciones: Sequence[int], normalizar: Normalizador) -> Callable[[tuple], Hashable]:
+    if len(posiciones) == 1:
+        p = posiciones[0]
+        return lambda fila: normalizar(fila[p])
+    return lambda fila: tuple(normalizar(fila[p]) for p in posiciones)
+
+
+class _Indice:
+    """Índice hash de un lado: clave -> [filas con esa clave, coincidió, primera fila]."""
+
+    def __init__(self) -> None:
+        self.entradas: Dict[Hashable, List[Any]] = {}
+        self.bytes = 0
+
+    def agregar(self, clave: Hashable, fila: tuple, informe: InformeConciliacion) -> None:
+        entrada = self.entradas.get(clave)
+        if entrada is None:
+            self.entradas[clave] = [1, False, fila]
+            self.bytes += _SOBRECARGA_ENTRADA + metricas.tamano_aproximado((fila,))
+        else:
+            entrada[0] += 1
+            informe.duplicadas_izquierda += 1
+
+    def sondear(self, clave: Hashable, fila: tuple, informe: InformeConciliacion, muestras: int) -> None:
+        entrada = self.entradas.get(clave)
+        if entrada is None:
+            informe.solo_derecha += 1
+            if len(informe.muestras_solo_derecha) < muestras:
+                informe.muestras_solo_derecha.append(fila)
+            return
+        entrada[1] = True
+        informe.coincidentes += 1
+        if len(informe.muestras_coincidentes) < muestras:
+            informe.muestras_coincidentes.append((entrada[2], fila))
+
+    def cerrar(self, informe: InformeConciliacion, muestras: int) -> None:
+        """Cuenta las claves de la izquierda que no coincidieron."""
+        for conteo, coincidio, fila in self.entradas.values():
+            if not coincidio:
+                informe.solo_izquierda += conteo
+                if len(informe.muestras_solo_izquierda) < muestras:
+                    informe.muestras_solo_izquierda.append(fila)
+        self.entradas.clear()
+        self.bytes = 0
+
+
+_MASCARA_64 = (1 << 64) - 1
+
+
+def particion_de(clave: Hashable, semilla: int, n: int) -> int:
+    """
+    Partición (0 a n-1) de una clave para una semilla dada.
+
+    `hash()` de un entero es el propio número y el de una tupla pequeña apenas mezcla los bits
+    bajos, así que `hash((semilla, clave)) % n` da repartos muy desiguales para claves como
+    múltiplos de n y repartos casi iguales con semillas distintas. Se mezcla el hash con el
+    finalizador de splitmix64 para que cada semilla reparta de forma independiente.
+    """
+    h = (hash(clave) + (semilla + 1) * 0x9E3779B97F4A7C15) & _MASCARA_64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASCARA_64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASCARA_64
+    return (h ^ (h >> 31)) % n
+
+
+class _Particiones:
+    """Ficheros temporales con las filas de un lado repartidas por el hash de su clave."""
+
+    def __init__(self, directorio: Path, lado: str, n: int, semilla: int = 0) -> None:
+        self.rutas = [directorio / f"{lado}_{i:03d}.pkl" for i in range(n)]
+        self.semilla = semilla
+        self._ficheros: List[IO[bytes]] = [open(r, "wb") for r in self.rutas]
+
+    def escribir(self, clave: Hashable, fila: tuple) -> None:
+        i = particion_de(clave, self.semilla, len(self._ficheros))
+        pickle.dump((clave, fila), self._ficheros[i], protocol=pickle.HIGHEST_PROTOCOL)
+
+    def cerrar(self) -> None:
+        for fichero in self._ficheros:
+            fichero.close()
+
+    def leer(self, i: int) -> Iterator[Tuple[Hashable, tuple]]:
+        with open(self.rutas[i], "rb") as fichero:
+            while True:
+                try:
+                    yield pickle.load(fichero)
+                except EOFError:
+                    return
+
+    def borrar(self, i: int) -> None:
+        self.rutas[i].unlink()
+
+
+def _volcar_indice(indice: _Indice, destino: _Particiones, informe: InformeConciliacion) -> None:
+    """Reparte las filas ya indexadas (las duplicadas se descuentan: se contarán al releerlas)."""
+    informe.duplicadas_izquierda -= sum(e[0] - 1 for e in indice.entradas.values())
+    for clave, (conteo, _, primera) in indice.entradas.items():
+        for _ in range(conteo):
+            destino.escribir(clave, primera)
+    indice.entradas.clear()
+    indice.bytes = 0
+
+
+def _cruzar_particion(
+    izquierda: Iterable[Tuple[Hashable, tuple]],
+    derecha: Iterable[Tuple[Hashable, tuple]],
+    informe: InformeConciliacion,
+    memoria_maxima: int,
+    particiones: int,
+    muestras: int,
+    directorio: Path,
+    nivel: int,
+) -> None:
+    """Cruza un par de particiones; si el índice de la izquierda no cabe, reparte ambas de nuevo."""
+    indice = _Indice()
+    sub_izquierda: Optional[_Particiones] = None
+    for clave, fila in izquierda:
+        if sub_izquierda is not None:
+            sub_izquierda.escribir(clave, fila)
+            continue
+        indice.agregar(clave, fila, informe)
+        if indice.bytes > memoria_maxima and nivel < MAX_NIVELES:
+            logger.debug("Partición de conciliación por encima de %d bytes: se reparte de nuevo (nivel %d)",
+                         memoria_maxima, nivel + 1)
+            informe.repartos += 1
+            prefijo = f"n{nivel + 1}_{informe.repartos}"
+            sub_izquierda = _Particiones(directorio, f"izquierda_{prefijo}", particiones, nivel + 1)
+            _volcar_indice(indice, sub_izquierda, informe)
+    if sub_izquierda is None:
+        for clave, fila in derecha:
+            indice.sondear(clave, fila, informe, muestras)
+        indice.cerrar(informe, muestras)
+        return
+    sub_izquierda.cerrar()
+    sub_derecha = _Particiones(directorio, f"derecha_{prefijo}", particiones, nivel + 1)
+    for clave, fila in derecha:
+        sub_derecha.escribir(clave, fila)
+    sub_derecha.cerrar()
+    for i in range(particiones):
+        _cruzar_particion(sub_izquierda.leer(i), sub_derecha.leer(i), informe, memoria_maxima, particiones,
+                          muestras, directorio, nivel + 1)
+        sub_izquierda.borrar(i)
+        sub_derecha.borrar(i)
+
+
+def conciliar_filas(
+    filas_izquierda: Iterable[tuple],
+    filas_derecha: Iterable[tuple],
+    clave_izquierda: Sequence[int] = (0,),
+    clave_derecha: Sequence[int] = (0,),
+    memoria_maxima: int = MEMORIA_MAXIMA_POR_DEFECTO,
+    particiones: int = PARTICIONES_POR_DEFECTO,
+    muestras: int = MUESTRAS_POR_DEFECTO,
+    normalizar: Normalizador = normalizar_valor,
+    directorio: Optional[Path] = None,
+) -> InformeConciliacion:
+    """
+    Concilia dos secuencias de filas por su clave con un hash join.
+
+    Args:
+        filas_izquierda (Iterable[tuple]): Filas del lado con el que se construye el índice
+            (conviene que sea el más pequeño).
+        filas_derecha (Iterable[tuple]): Filas que se sondean contra el índice.
+        clave_izquierda, clave_derecha (Sequence[int]): Posiciones de las columnas de la clave.
+        memoria_maxima (int): Bytes aproximados que puede ocupar el índice antes de pasar a disco.
+        particiones (int): Número de particiones en disco si se supera `memoria_maxima`.
+        muestras (int): Registros de ejemplo que se guardan de cada categoría.
+        normalizar (Normalizador): Función aplicada a cada columna de la clave.
+        directorio (Optional[Path]): Dónde crear los ficheros temporales (por defecto, el del sistema).
+
+    Returns:
+        InformeConciliacion: Conteos y muestras.
+    """
+    inicio = time.perf_counter()
+    informe = InformeConciliacion()
+    clave_izq = _extractor(clave_izquierda, normalizar)
+    clave_der = _extractor(clave_derecha, normalizar)
+    indice = _Indice()
+
+    with tempfile.TemporaryDirectory(prefix="conciliacion_", dir=directorio) as temporal:
+        izquierda: Optional[_Particiones] = None
+        for fila in filas_izquierda:
+            informe.filas_izquierda += 1
+            clave = clave_izq(fila)
+            if izquierda is not None:
+                izquierda.escribir(clave, fila)
+                continue
+            indice.agregar(clave, fila, informe)
+            if indice.bytes > memoria_maxima:
+                logger.info(
+                    "Índice de conciliación por encima de %d bytes: se reparte en %d particiones en disco",
+                    memoria_maxima, particiones,
+                )
+                izquierda = _Particiones(Path(temporal), "izquierda", particiones)
+                _volcar_indice(indice, izquierda, informe)
+
+        if izquierda is None:
+            for fila in filas_derecha:
+                informe.filas_derecha += 1
+                indice.sondear(clave_der(fila), fila, informe, muestras)
+            indice.cerrar(informe, muestras)
+        else:
+            izquierda.cerrar()
+            derecha = _Particiones(Path(temporal), "derecha", particiones)
+            for fila in filas_derecha:
+                informe.filas_derecha += 1
+                derecha.escribir(clave_der(fila), fila)
+            derecha.cerrar()
+            for i in range(particiones):
+                _cruzar_particion(izquierda.leer(i), derecha.leer(i), informe, memoria_maxima, particiones,
+                                  muestras, Path(temporal), 0)
+                izquierda.borrar(i)
+                derecha.borrar(i)
+            informe.particiones = particiones
+
+    informe.segundos = time.perf_counter() - inicio
+    logger.info("Conciliación: %s", informe.resumen().replace("\n", "; "))
+    return informe
+
+
+def conciliar(
+    izquierda: LadoConciliacion,
+    derecha: LadoConciliacion,
+    abrir: Abridor = connection,
+    arraysize: int = 5000,
+    **opciones: Any,
+) -> InformeConciliacion:
+    """
+    Ejecuta las consultas de ambos lados y concilia sus filas (ver `conciliar_filas`).
+
+    Cada lado se lee en streaming con su propia sesión; el izquierdo se lee completo antes de
+    empezar con el derecho.
+
+    Args:
+        izquierda (LadoConciliacion): Lado con el que se construye el índice.
+        derecha (LadoConciliacion): Lado que se sondea contra el índice.
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+        arraysize (int): Filas por ida y vuelta al leer cada lado.
+        **opciones: memoria_maxima, particiones, muestras, normalizar o directorio.
+
+    Returns:
+        InformeConciliacion: Conteos y muestras.
+
+    Raises:
+        cx_Oracle.DatabaseError: Si falla alguna de las consultas.
+    """
+    def filas(lado: LadoConciliacion) -> Iterator[tuple]:
+        with abrir(lado.base) as conn:
+            yield from iterar_filas(conn, lado.sql, lado.params, arraysize=arraysize)
+
+    return conciliar_filas(
+        filas(izquierda), filas(derecha), izquierda.clave, derecha.clave, **opciones
+    )
@@ -0,0 +1,145 @@
+"""
+connection.py
+
+Punto de entrada único para obtener conexiones a cualquier base de datos configurada.
+
+Las bases disponibles son las declaradas en DB_PREFIJOS (ver `db_connections/config_manager.py`)
+y cada una tiene su propio pool de sesiones compartido (ver `src/pool.py`), de modo que los
+trabajos de MEDIN y de Simbad reutilizan sesiones ya abiertas en lugar de pagar cada uno su logon.
+
+Resiliencia (ver `src/resiliencia.py`): la adquisición de la sesión se reintenta ante errores
+transitorios con espera exponencial y un plazo total; si la base tiene `dsn_failover_{PREFIJO}`,
+cada intento prueba también el DSN secundario; y una sesión que pierde la conexión dentro del
+bloque se descarta del pool en lugar de devolverse.
+
+Límite de tiempo (ver `src/limites.py`): si la base tiene `timeout_consulta_{PREFIJO}`, la sesión
+se presta con ese `callTimeout`, de modo que ninguna llamada a la base la retiene más tiempo.
+
+Funciones principales:
+- connection(nombre): Context manager que presta una sesión de la base `nombre`.
+- con_reintentos(nombre, funcion): Ejecuta una unidad de trabajo repetible, reintentándola entera.
+- simbad_connection(): Atajo para la base Simbad (análogo a `medin_connection()`).
+
+Uso:
+    from src.connection import connection
+    with connection("Simbad") as conn:
+        cursor = conn.cursor()
+"""
+
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Generator, Mapping, Optional, Tuple, TypeVar
+
+import cx_Oracle
+from db_connections.config_manager import obtener_configuracion
+from src.limites import leer_limites, limitar_tiempo
+from src.pool import adquirir, liberar
+from src.resiliencia import (
+    PoliticaReintentos, es_reintentable, es_sesion_perdida, politica_reintentos, reintentar,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _adquirir_con_failover(nombre: str, conf: Mapping[str, str]) -> Tuple[Any, Any]:
+    """Adquiere una sesión del DSN principal y, si falla de forma transitoria, del secundario."""
+    try:
+        return adquirir(nombre, conf)
+    except Exception as exc:
+        if not conf.get("dsn_failover") or not es_reintentable(exc):
+            raise
+        logger.warning("%s: DSN principal no disponible (%s); se prueba el DSN secundario", nombre, exc)
+        return adquirir(nombre, conf, failover=True)
+
+
+@contextmanager
+def connection(
+    nombre: str, politica: Optional[PoliticaReintentos] = None
+) -> Generator[cx_Oracle.Connection, None, None]:
+    """
+    Context manager que presta una sesión del pool de la base `nombre` y la devuelve al salir.
+
+    Solo se reintenta la adquisición de la sesión: el código del bloque `with` se ejecuta una vez
+    (para repetirlo entero, usa `con_reintentos`).
+
+    Args:
+        nombre (str): Prefijo de la base de datos (por ejemplo, 'MEDIN' o 'Simbad').
+        politica (Optional[PoliticaReintentos]): Reintentos de la adquisición; por defecto, los
+            de reintentos_{PREFIJO} y plazo_reintentos_{PREFIJO}.
+
+    Yields:
+        cx_Oracle.Connection:
+            Sesión abierta y lista para ejecutar consultas.
+
+    Raises:
+        KeyError:
+            Si `nombre` no está entre las bases configuradas.
+        EnvironmentError:
+            Si faltan variables de entorno para `nombre` o algún límite no es válido.
+        cx_Oracle.DatabaseError:
+            Si ocurre un error al crear el pool o adquirir una sesión (tras los reintentos).
+    """
+    # Configuración memorizada: solo se validan las credenciales de `nombre`.
+    # Puede lanzar KeyError si la base no está configurada
+    conf = obtener_configuracion()[nombre]
+    segundos = leer_limites(nombre).segundos
+    pool, conn = reintentar(
+        lambda: _adquirir_con_failover(nombre, conf),
+        politica or politica_reintentos(nombre),
+        f"conexión a {nombre}",
+    )
+    descartar = False
+    try:
+        with limitar_tiempo(conn, segundos):
+            yield conn
+    except Exception as exc:
+        # Una sesión que perdió la conexión no vuelve al pool
+        descartar = es_sesion_perdida(exc)
+        raise
+    finally:
+        liberar(pool, conn, descartar)
+
+
+def con_reintentos(
+    nombre: str, funcion: Callable[[cx_Oracle.Connection], T], politica: Optional[PoliticaReintentos] = None
+) -> T:
+    """
+    Ejecuta `funcion(conn)` con una sesión de `nombre` y la repite entera ante errores transitorios.
+
+    Cada intento usa una sesión nueva. `funcion` debe poder repetirse (por ejemplo, una consulta
+    de lectura o una escritura idempotente).
+
+    Args:
+        nombre (str): Prefijo de la base de datos.
+        funcion (Callable[[Connection], T]): Unidad de trabajo.
+        politica (Optional[PoliticaReintentos]): Por defecto, la configurada para la base.
+
+    Returns:
+        T: Lo que devuelva `funcion`.
+    """
+    def intento() -> T:
+        # La adquisición no se reintenta por separado: el plazo es el de la unidad completa
+        with connection(nombre, PoliticaReintentos(intentos=1)) as conn:
+            return funcion(conn)
+
+    return reintentar(intento, politica or politica_reintentos(nombre), f"trabajo en {nombre}")
+
+
+@contextmanager
+def simbad_connection() -> Generator[cx_Oracle.Connection, None, None]:
+    """
+    Context manager para conexiones a la base de datos Simbad.
+
+    Equivale a `connection("Simbad")`.
+
+    Yields:
+        cx_Oracle.Connection: Sesión del pool de Simbad.
+
+    Raises:
+        KeyError: Si la base Simbad no está configurada.
+        cx_Oracle.DatabaseError: Si no se puede adquirir una sesión.
+    """
+    with connection("Simbad") as conn:
+        yield conn
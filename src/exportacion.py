@@ -0,0 +1,422 @@
+"""
+exportacion.py
+
+Exportación de resultados a ficheros CSV, JSON Lines o XLSX en streaming.
+
+Hacer `fetchall()` y escribir después el fichero retiene el informe entero en memoria. Aquí el
+cursor se lee por lotes y cada lote se escribe en cuanto llega, así que la memoria depende del
+tamaño del lote y no del número de filas:
+
+- CSV y JSON Lines (un objeto por fila, con los nombres de columna como claves), opcionalmente
+  comprimidos con gzip (`.csv.gz`, `.jsonl.gz`).
+- XLSX con openpyxl en modo `write_only`, que escribe cada fila a disco al añadirla. openpyxl es
+  opcional (`pip install openpyxl`); XLSX ya va comprimido y no admite gzip.
+
+El fichero se escribe primero como `<ruta>.tmp` en el mismo directorio y se renombra al final
+con `os.replace`: quien lea la ruta nunca ve un fichero a medias, y si la exportación falla el
+temporal se borra y el fichero anterior (si había) queda intacto.
+
+Cada exportación informa de filas, bytes escritos, filas/s y la memoria máxima aproximada de un
+lote; el informe conjunto añade el pico de memoria residente del proceso. Las exportaciones de
+varias bases (MEDIN y Simbad) se ejecutan en paralelo, con el mismo límite de concurrencia por
+base que la recolección (ver `src/collector.py`).
+
+Funciones principales:
+- exportar_cursor(cursor, ruta): Escribe un cursor ya ejecutado en un fichero.
+- exportar(exportacion): Abre la conexión, ejecuta la consulta y la exporta.
+- exportar_en_paralelo(exportaciones): Varias exportaciones en un pool de hilos.
+
+Uso:
+    from src.exportacion import Exportacion, exportar_en_paralelo
+    informe = exportar_en_paralelo([
+        Exportacion("altas", "MEDIN", "SELECT * FROM altas WHERE fecha = :f", Path("altas.csv.gz"), {"f": dia}),
+        Exportacion("usuarios", "Simbad", "SELECT * FROM usuarios", Path("usuarios.xlsx")),
+    ])
+    print(informe.resumen())
+"""
+
+import csv
+import datetime
+import decimal
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import metricas
+from src.collector import Abridor
+from src.connection import connection
+from src.pool import limite_sesiones
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl es opcional: solo hace falta para XLSX
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("csv", "jsonl", "xlsx")
+ARRAYSIZE_EXPORTACION = 5000
+# Filas por hoja de Excel, cabecera incluida
+MAX_FILAS_XLSX = 1_048_576
+
+
+# ----------------------------------------
+# 1. Estructuras de datos
+# ----------------------------------------
+class Exportacion(NamedTuple):
+    """
+    Consulta a exportar a un fichero.
+
+    Atributos:
+        nombre: Identificador de la exportación en el informe.
+        base: Base de datos (MEDIN, Simbad...).
+        sql: Consulta con variables de enlace.
+        ruta: Fichero de salida.
+        params: Valores de las variables de enlace.
+        formato: 'csv', 'jsonl' o 'xlsx'; por defecto, según la extensión de `ruta`.
+        comprimir: Comprimir con gzip; por defecto, si `ruta` termina en `.gz`.
+    """
+
+    nombre: str
+    base: str
+    sql: str
+    ruta: Path
+    params: Optional[Dict[str, Any]] = None
+    formato: Optional[str] = None
+    comprimir: Optional[bool] = None
+
+
+@dataclass
+class ResumenExportacion:
+    """Resultado de una exportación: filas y bytes escritos (o error), duración y memoria del mayor lote."""
+
+    nombre: str
+    ruta: Path
+    filas: int = 0
+    bytes: int = 0
+    segundos: float = 0.0
+    pico_lote_bytes: int = 0
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def filas_s(self) -> float:
+        return self.filas / self.segundos if self.segundos > 0 else 0.0
+
+    def linea(self) -> str:
+        if not self.ok:
+            return f"{self.nombre}: ERROR {self.error}"
+        return (
+            f"{self.nombre}: {self.filas} filas -> {self.ruta} ({self.bytes / 2**20:.1f} MB) en {self.segundos:.2f}s, "
+            f"{self.filas_s:.0f} filas/s, lote máximo {self.pico_lote_bytes / 2**20:.1f} MB"
+        )
+
+
+@dataclass
+class InformeExportacion:
+    """Resúmenes de varias exportaciones, tiempo total y pico de memoria residente del proceso."""
+
+    resumenes: List[ResumenExportacion] = field(default_factory=list)
+    segundos_totales: float = 0.0
+    pico_rss_mb: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return all(r.ok for r in self.resumenes)
+
+    def resumen(self) -> str:
+        """Devuelve un texto con una línea por exportación y los totales."""
+        lineas = [r.linea() for r in self.resumenes]
+        filas = sum(r.filas for r in self.resumenes)
+        lineas.append(
+            f"Total {filas} filas en {self.segundos_totales:.2f}s "
+            f"({filas / self.segundos_totales if self.segundos_totales > 0 else 0:.0f} filas/s), "
+            f"memoria máxima del proceso {self.pico_rss_mb:.1f} MB"
+        )
+        return "\n".join(lineas)
+
+
+# ----------------------------------------
+# 2. Escritores por formato
+# ----------------------------------------
+def formato_de_ruta(ruta: Path) -> str:
+    """Formato deducido de la extensión de `ruta`, sin contar `.gz`."""
+    sufijos = [s.lower() for s in ruta.suffixes if s.lower() != ".gz"]
+    formato = sufijos[-1].lstrip(".") if sufijos else ""
+    if formato == "json":
+        formato = "jsonl"
+    if formato not in FORMATOS:
+        raise ValueError(f"No se reconoce el formato de '{ruta}'; opciones: {FORMATOS}")
+    return formato
+
+
+def _opciones(ruta: Path, formato: Optional[str], comprimir: Optional[bool]) -> Tuple[str, bool]:
+    """Formato y compresión efectivos; falla antes de ejecutar la consulta si no son válidos."""
+    formato = formato or formato_de_ruta(ruta)
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' no válido; opciones: {FORMATOS}")
+    if comprimir is None:
+        comprimir = ruta.suffix.lower() == ".gz"
+    if comprimir and formato == "xlsx":
+        raise ValueError("XLSX ya está comprimido: no se puede exportar con gzip")
+    if formato == "xlsx" and openpyxl is None:
+        raise ImportError("La exportación a XLSX necesita openpyxl (pip install openpyxl)")
+    return formato, comprimir
+
+
+# Tipos que CSV y JSON Lines escriben con la misma representación de texto
+_A_TEXTO = (bytes, datetime.date, datetime.time)
+
+
+def _valor_texto(valor: Any) -> Any:
+    """Fechas en ISO 8601 y binarios en hexadecimal; el resto, sin cambios."""
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, bytes):
+        return valor.hex()
+    return valor
+
+
+def _valor_json(valor: Any) -> Any:
+    if isinstance(valor, decimal.Decimal):
+        return float(valor)
+    if isinstance(valor, _A_TEXTO):
+        return _valor_texto(valor)
+    return str(valor)
+
+
+class _Salida(ABC):
+    """Escritor de un formato sobre un fichero ya abierto en modo binario."""
+
+    def __init__(self, fichero: IO[bytes], columnas: Sequence[str]) -> None:
+        self.fichero = fichero
+        self.columnas = list(columnas)
+
+    @abstractmethod
+    def escribir(self, lote: Sequence[tuple]) -> None:
+        """Escribe un lote de filas."""
+
+    def cerrar(self) -> None:
+        pass
+
+
+class _SalidaTexto(_Salida):
+    def __init__(self, fichero: IO[bytes], columnas: Sequence[str]) -> None:
+        super().__init__(fichero, columnas)
+        self.texto = io.TextIOWrapper(fichero, encoding="utf-8", newline="")
+
+    def cerrar(self) -> None:
+        # Vacía el buffer sin cerrar el fichero subyacente (lo cierra exportar_cursor)
+        self.texto.flush()
+        self.texto.detach()
+
+
+class _SalidaCSV(_SalidaTexto):
+    def __init__(self, fichero: IO[bytes], columnas: Sequence[str]) -> None:
+        super().__init__(fichero, columnas)
+        self.csv = csv.writer(self.texto)
+        self.csv.writerow(self.columnas)
+
+    def escribir(self, lote: Sequence[tuple]) -> None:
+        self.csv.writerows([_valor_texto(v) if isinstance(v, _A_TEXTO) else v for v in fila] for fila in lote)
+
+
+class _SalidaJSONL(_SalidaTexto):
+    def escribir(self, lote: Sequence[tuple]) -> None:
+        columnas = self.columnas
+        self.texto.write("".join(
+            json.dumps(dict(zip(columnas, fila)), ensure_ascii=False, default=_valor_json) + "\n" for fila in lote
+        ))
+
+
+class _SalidaXLSX(_Salida):
+    def __init__(self, fichero: IO[bytes], columnas: Sequence[str]) -> None:
+        super().__init__(fichero, columnas)
+        self.libro = openpyxl.Workbook(write_only=True)
+        self.hoja = self.libro.create_sheet("datos")
+        self.hoja.append(self.columnas)
+        self.filas = 1
+
+    def escribir(self, lote: Sequence[tuple]) -> None:
+        self.filas += len(lote)
+        if self.filas > MAX_FILAS_XLSX:
+            raise ValueError(f"XLSX admite como máximo {MAX_FILAS_XLSX} filas por hoja; use CSV o JSON Lines")
+        for fila in lote:
+            self.hoja.append(fila)
+
+    def cerrar(self) -> None:
+        self.libro.save(self.fichero)
+
+
+_SALIDAS = {"csv": _SalidaCSV, "jsonl": _SalidaJSONL, "xlsx": _SalidaXLSX}
+
+
+# ----------------------------------------
+# 3. Exportación
+# ----------------------------------------
+def exportar_cursor(
+    cursor: Any,
+    ruta: Path,
+    formato: Optional[str] = None,
+    comprimir: Optional[bool] = None,
+    nombre: Optional[str] = None,
+) -> ResumenExportacion:
+    """
+    Escribe en `ruta` todas las filas de un cursor ya ejecutado, lote a lote (`cursor.arraysize`).
+
+    El fichero se escribe como `<ruta>.tmp` y se renombra al terminar; si algo falla se borra el
+    temporal y el error se propaga.
+
+    Args:
+        cursor: Cursor con la consulta ejecutada (se usa su `description` como cabecera).
+        ruta (Path): Fichero de salida.
+        formato (Optional[str]): 'csv', 'jsonl' o 'xlsx'; por defecto, según la extensión.
+        comprimir (Optional[bool]): gzip; por defecto, si la ruta termina en `.gz`.
+        nombre (Optional[str]): Nombre en el resumen (por defecto, el del fichero).
+
+    Returns:
+        ResumenExportacion: Filas, bytes, duración y tamaño del mayor lote.
+
+    Raises:
+        ValueError: Si el formato no es válido o se pide gzip para XLSX.
+        ImportError: Si se pide XLSX sin openpyxl instalado.
+    """
+    formato, comprimir = _opciones(ruta, formato, comprimir)
+    resumen = ResumenExportacion(nombre or ruta.name, ruta)
+    columnas = [d[0] for d in cursor.description]
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    inicio = time.perf_counter()
+    try:
+        with open(temporal, "wb") as bruto:
+            # Nivel 6: casi la compresión del 9 con bastante menos CPU
+            fichero = gzip.GzipFile(fileobj=bruto, mode="wb", compresslevel=6) if comprimir else bruto
+            try:
+                salida = _SALIDAS[formato](fichero, columnas)
+                while True:
+                    with metricas.cronometro("consulta.fetch"):
+                        lote = cursor.fetchmany()
+                    if not lote:
+                        break
+                    salida.escribir(lote)
+                    resumen.filas += len(lote)
+                    resumen.pico_lote_bytes = max(resumen.pico_lote_bytes, metricas.tamano_aproximado(lote))
+                salida.cerrar()
+            finally:
+                if comprimir:
+                    fichero.close()
+        os.replace(temporal, ruta)
+    except BaseException:
+        temporal.unlink(missing_ok=True)
+        raise
+    resumen.segundos = time.perf_counter() - inicio
+    resumen.bytes = ruta.stat().st_size
+    metricas.registrar("exportacion.filas_s", resumen.filas_s, nombre=resumen.nombre, formato=formato)
+    logger.info(resumen.linea())
+    return resumen
+
+
+def exportar(
+    exportacion: Exportacion, abrir: Abridor = connection, arraysize: int = ARRAYSIZE_EXPORTACION
+) -> ResumenExportacion:
+    """
+    Ejecuta la consulta de `exportacion` y escribe su resultado en streaming.
+
+    Los errores no se propagan: se guardan en el resumen para que una exportación fallida no
+    impida terminar las demás.
+
+    Args:
+        exportacion (Exportacion): Consulta y fichero de salida.
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+        arraysize (int): Filas por ida y vuelta (y por lote escrito).
+
+    Returns:
+        ResumenExportacion: Resumen de la exportación, con `error` si falló.
+    """
+    inicio = time.perf_counter()
+    try:
+        _opciones(exportacion.ruta, exportacion.formato, exportacion.comprimir)
+        with abrir(exportacion.base) as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.arraysize = arraysize
+                cursor.prefetchrows = arraysize + 1
+                with metricas.cronometro("consulta.execute"):
+                    cursor.execute(exportacion.sql, exportacion.params or {})
+                resumen = exportar_cursor(
+                    cursor, exportacion.ruta, exportacion.formato, exportacion.comprimir, exportacion.nombre
+                )
+            finally:
+                cursor.close()
+    except Exception as exc:
+        logger.error("Exportación %s fallida: %s", exportacion.nombre, exc)
+        resumen = ResumenExportacion(exportacion.nombre, exportacion.ruta, error=exc)
+    # Incluye la adquisición de la sesión y el execute
+    resumen.segundos = time.perf_counter() - inicio
+    return resumen
+
+
+def pico_rss_mb() -> float:
+    """
+    Memoria residente máxima del proceso hasta ahora, en MB (ru_maxrss está en KB en Linux).
+
+    El módulo `resource` solo existe en Unix; en Windows se usa psutil si está instalado y,
+    si no, se devuelve 0.0.
+    """
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return 0.0
+        memoria = psutil.Process().memory_info()
+        return getattr(memoria, "peak_wset", memoria.rss) / 2**20
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def exportar_en_paralelo(
+    exportaciones: Sequence[Exportacion],
+    max_hilos: int = 4,
+    abrir: Abridor = connection,
+    arraysize: int = ARRAYSIZE_EXPORTACION,
+) -> InformeExportacion:
+    """
+    Ejecuta las exportaciones en un pool de hilos, sin superar el límite de sesiones de cada base.
+
+    Args:
+        exportaciones (Sequence[Exportacion]): Exportaciones independientes.
+        max_hilos (int): Número máximo de hilos en total.
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+        arraysize (int): Filas por ida y vuelta.
+
+    Returns:
+        InformeExportacion: Resúmenes en el orden de `exportaciones`.
+    """
+    rutas = [e.ruta.resolve() for e in exportaciones]
+    if len(set(rutas)) != len(rutas):
+        raise ValueError("Dos exportaciones no pueden escribir en el mismo fichero")
+    semaforos = {base: threading.BoundedSemaphore(limite_sesiones(base)) for base in {e.base for e in exportaciones}}
+
+    def tarea(exportacion: Exportacion) -> ResumenExportacion:
+        with semaforos[exportacion.base]:
+            return exportar(exportacion, abrir, arraysize)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, max_hilos), thread_name_prefix="exportador") as executor:
+        resumenes = list(executor.map(tarea, exportaciones))
+    informe = InformeExportacion(resumenes, time.perf_counter() - inicio, pico_rss_mb())
+    logger.info("Exportaciones terminadas en %.2fs", informe.segundos_totales)
+    return informe
@@ -0,0 +1,239 @@
+"""
+incremental.py
+
+Cálculo incremental de estadísticas diarias: cada ejecución solo procesa los días nuevos.
+
+Para cada estadística y base se guarda una marca de agua (el último día procesado) y los
+agregados parciales de cada día y clave (conteo, suma, mínimo y máximo). En cada ejecución:
+
+1. Se consulta solo desde `marca - ventana_dias` (la ventana recoge datos que llegan tarde).
+2. Se agregan esas filas por (día, clave).
+3. Se sustituyen los agregados guardados de esos días y se avanza la marca.
+
+Los totales acumulados se obtienen combinando los agregados por día, de modo que el coste de una
+ejecución depende del tamaño del delta del día y no del tamaño de la tabla.
+
+El estado se guarda en SQLite, por defecto en `estado/incremental.sqlite`.
+
+Contrato de la consulta: debe aceptar la variable de enlace `:desde` (filtrar `fecha >= :desde`)
+y devolver filas (día, clave, valor). `valor` puede ser None si solo interesa contar.
+
+Funciones principales:
+- EstadisticaIncremental: Definición de una estadística incremental.
+- MotorIncremental: Ejecuta estadísticas y consulta totales acumulados.
+
+Uso:
+    from src.incremental import EstadisticaIncremental, MotorIncremental
+    altas = EstadisticaIncremental(
+        "altas_por_centro", "MEDIN",
+        "SELECT TRUNC(fecha), centro, importe FROM altas WHERE fecha >= :desde",
+        ventana_dias=3,
+    )
+    motor = MotorIncremental()
+    motor.ejecutar(altas)
+    motor.totales(altas)  # {centro: {"conteo": ..., "suma": ..., ...}}
+"""
+
+import datetime
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, NamedTuple, Optional, Tuple
+
+from src.connection import connection
+from src.streaming import iterar_lotes
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_ESTADO = Path(__file__).parent.parent / "estado"
+
+Abridor = Callable[[str], ContextManager[Any]]
+
+
+class EstadisticaIncremental(NamedTuple):
+    """
+    Estadística calculada de forma incremental.
+
+    Atributos:
+        nombre: Identificador de la estadística.
+        base: Base de datos de origen.
+        sql: Consulta con `:desde` que devuelve (día, clave, valor).
+        ventana_dias: Días anteriores a la marca que se recalculan en cada ejecución.
+        inicio: Primer día a procesar cuando todavía no hay marca.
+    """
+
+    nombre: str
+    base: str
+    sql: str
+    ventana_dias: int = 2
+    inicio: datetime.date = datetime.date(2000, 1, 1)
+
+
+class ResumenEjecucion(NamedTuple):
+    """Resultado de una ejecución incremental."""
+
+    filas_leidas: int
+    dias_recalculados: int
+    desde: datetime.date
+    marca: Optional[datetime.date]
+
+
+def _como_fecha(valor: Any) -> datetime.date:
+    """Convierte un DATE/TIMESTAMP de Oracle (datetime) o una cadena ISO en `date`."""
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    return datetime.date.fromisoformat(str(valor)[:10])
+
+
+class MotorIncremental:
+    """
+    Mantiene marcas de agua y agregados por día en SQLite y ejecuta estadísticas incrementales.
+
+    Args:
+        ruta (Optional[Path]): Fichero SQLite de estado; por defecto `estado/incremental.sqlite`.
+    """
+
+    def __init__(self, ruta: Optional[Path] = None) -> None:
+        if ruta is None:
+            DIRECTORIO_ESTADO.mkdir(parents=True, exist_ok=True)
+            ruta = DIRECTORIO_ESTADO / "incremental.sqlite"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(ruta), check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS marcas (
+                estadistica TEXT, base TEXT, ultimo_dia TEXT,
+                PRIMARY KEY (estadistica, base)
+            );
+            CREATE TABLE IF NOT EXISTS agregados (
+                estadistica TEXT, base TEXT, dia TEXT, clave TEXT,
+                conteo INTEGER, suma REAL, minimo REAL, maximo REAL,
+                PRIMARY KEY (estadistica, base, dia, clave)
+            );
+            """
+        )
+        self._db.commit()
+
+    def marca(self, estadistica: EstadisticaIncremental) -> Optional[datetime.date]:
+        """Devuelve el último día procesado de la estadística, o None si nunca se ejecutó."""
+        with self._lock:
+            fila = self._db.execute(
+                "SELECT ultimo_dia FROM marcas WHERE estadistica = ? AND base = ?",
+                (estadistica.nombre, estadistica.base),
+            ).fetchone()
+        return datetime.date.fromisoformat(fila[0]) if fila else None
+
+    def ejecutar(
+        self, estadistica: EstadisticaIncremental, abrir: Abridor = connection, arraysize: int = 5000
+    ) -> ResumenEjecucion:
+        """
+        Procesa los días nuevos (más la ventana de recálculo) de una estadística.
+
+        Args:
+            estadistica (EstadisticaIncremental): Estadística a ejecutar.
+            abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+            arraysize (int): Filas por ida y vuelta al leer el delta.
+
+        Returns:
+            ResumenEjecucion: Filas leídas, días recalculados, inicio del delta y nueva marca.
+
+        Raises:
+            cx_Oracle.DatabaseError: Si la consulta falla (el estado no se modifica).
+        """
+        marca = self.marca(estadistica)
+        if marca is None:
+            desde = estadistica.inicio
+        else:
+            desde = max(estadistica.inicio, marca - datetime.timedelta(days=estadistica.ventana_dias))
+
+        # (día, clave) -> [conteo, suma, mínimo, máximo]
+        parciales: Dict[Tuple[str, str], List[Any]] = {}
+        filas_leidas = 0
+        with abrir(estadistica.base) as conn:
+            for lote in iterar_lotes(conn, estadistica.sql, {"desde": desde}, arraysize=arraysize):
+                filas_leidas += len(lote)
+                for dia, clave, valor in lote:
+                    k = (_como_fecha(dia).isoformat(), "" if clave is None else str(clave))
+                    p = parciales.get(k)
+                    if p is None:
+                        p = parciales[k] = [0, 0.0, None, None]
+                    p[0] += 1
+                    if valor is not None:
+                        p[1] += valor
+                        p[2] = valor if p[2] is None or valor < p[2] else p[2]
+                        p[3] = valor if p[3] is None or valor > p[3] else p[3]
+
+        dias = {dia for dia, _ in parciales}
+        fechas = [datetime.date.fromisoformat(d) for d in dias]
+        if marca is not None:
+            fechas.append(marca)
+        nueva_marca = max(fechas, default=None)
+        with self._lock, self._db:
+            # Los días de la ventana se sustituyen por completo
+            self._db.execute(
+                "DELETE FROM agregados WHERE estadistica = ? AND base = ? AND dia >= ?",
+                (estadistica.nombre, estadistica.base, desde.isoformat()),
+            )
+            self._db.executemany(
+                "INSERT INTO agregados VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(estadistica.nombre, estadistica.base, dia, clave, *p) for (dia, clave), p in parciales.items()],
+            )
+            if nueva_marca is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO marcas VALUES (?, ?, ?)",
+                    (estadistica.nombre, estadistica.base, nueva_marca.isoformat()),
+                )
+        logger.info(
+            "Estadística %s/%s: %d filas desde %s, %d días recalculados, marca %s",
+            estadistica.base, estadistica.nombre, filas_leidas, desde, len(dias), nueva_marca,
+        )
+        return ResumenEjecucion(filas_leidas, len(dias), desde, nueva_marca)
+
+    def totales(
+        self,
+        estadistica: EstadisticaIncremental,
+        desde: Optional[datetime.date] = None,
+        hasta: Optional[datetime.date] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Combina los agregados por día en totales por clave para un rango de días (inclusive).
+
+        Returns:
+            Dict[str, Dict[str, Any]]: {clave: {"conteo", "suma", "minimo", "maximo"}}.
+        """
+        with self._lock:
+            filas = self._db.execute(
+                """
+                SELECT clave, SUM(conteo), SUM(suma), MIN(minimo), MAX(maximo)
+                FROM agregados
+                WHERE estadistica = ? AND base = ? AND dia >= ? AND dia <= ?
+                GROUP BY clave
+                """,
+                (
+                    estadistica.nombre,
+                    estadistica.base,
+                    (desde or datetime.date.min).isoformat(),
+                    (hasta or datetime.date.max).isoformat(),
+                ),
+            ).fetchall()
+        return {
+            clave: {"conteo": conteo, "suma": suma, "minimo": minimo, "maximo": maximo}
+            for clave, conteo, suma, minimo, maximo in filas
+        }
+
+    def reiniciar(self, estadistica: EstadisticaIncremental) -> None:
+        """Borra la marca y los agregados de la estadística; la próxima ejecución parte de `inicio`."""
+        with self._lock, self._db:
+            for tabla in ("marcas", "agregados"):
+                self._db.execute(
+                    f"DELETE FROM {tabla} WHERE estadistica = ? AND base = ?",
+                    (estadistica.nombre, estadistica.base),
+                )
+
+    def cerrar(self) -> None:
+        """Cierra el fichero de estado."""
+        with self._lock:
+            self._db.close()
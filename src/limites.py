@@ -0,0 +1,336 @@
+"""
+limites.py
+
+Límites de recursos para consultas de estadísticas descontroladas.
+
+Un mal plan de ejecución puede retener una sesión durante una hora y detener el lote diario
+entero. Estos límites cortan la consulta a tiempo:
+
+- Tiempo: se fija `callTimeout` en la sesión, de modo que Oracle interrumpe cualquier ida y
+  vuelta que supere lo que queda de plazo (DPI-1067); además se comprueba el plazo total de la
+  consulta entre lote y lote.
+- Filas y bytes: máximo de filas o de bytes aproximados leídos por consulta.
+- Memoria: máximo de bytes retenidos en memoria. Al superarlo, si hay un `consumidor`, la
+  consulta pasa a streaming (las filas se le entregan por lotes en lugar de acumularse); si no,
+  se aborta.
+- Presupuesto de la ejecución: segundos, filas y bytes compartidos por todas las consultas de
+  una ejecución (por ejemplo, una recolección); agotado, las consultas pendientes ni empiezan.
+
+Cada límite superado se registra en el log (nivel WARNING), se cuenta en la métrica
+`limite.excedido` y se señala con LimiteExcedido.
+
+Límites por base (opcionales):
+    timeout_consulta_{PREFIJO}      segundos por consulta; también es el callTimeout de cada sesión de `connection()`
+    max_filas_consulta_{PREFIJO}    filas máximas por consulta
+    max_bytes_consulta_{PREFIJO}    bytes máximos leídos por consulta
+    memoria_consulta_{PREFIJO}      bytes máximos retenidos en memoria por consulta
+
+Funciones principales:
+- LimitesConsulta: Límites de una consulta.
+- leer_limites(prefijo): Límites configurados para una base.
+- PresupuestoEjecucion: Presupuesto compartido por una ejecución.
+- limitar_tiempo(conn, segundos): Fija el callTimeout de la sesión dentro de un bloque.
+- consultar_con_limites(conn, sql, params, limites): Ejecuta una consulta aplicando los límites.
+
+Uso:
+    from src.limites import LimitesConsulta, consultar_con_limites
+    with connection("MEDIN") as conn:
+        lectura = consultar_con_limites(conn, sql, params, LimitesConsulta(segundos=300, max_filas=10**7))
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import closing, contextmanager, suppress
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional, Union
+
+from config import metricas
+from src.resiliencia import es_tiempo_agotado
+from src.streaming import ARRAYSIZE_POR_DEFECTO, iterar_lotes
+
+logger = logging.getLogger(__name__)
+
+Consumidor = Callable[[List[tuple]], None]
+
+
+class LimiteExcedido(RuntimeError):
+    """
+    Una consulta superó uno de sus límites.
+
+    Atributos:
+        limite: 'tiempo', 'filas', 'bytes', 'memoria' o 'presupuesto'.
+    """
+
+    def __init__(self, limite: str, mensaje: str) -> None:
+        super().__init__(mensaje)
+        self.limite = limite
+
+
+class LimitesConsulta(NamedTuple):
+    """
+    Límites de una consulta (None: sin límite).
+
+    Atributos:
+        segundos: Tiempo máximo de la consulta, desde el execute hasta el último lote.
+        max_filas: Filas máximas leídas.
+        max_bytes: Bytes aproximados máximos leídos.
+        memoria_maxima: Bytes aproximados máximos retenidos en memoria.
+    """
+
+    segundos: Optional[float] = None
+    max_filas: Optional[int] = None
+    max_bytes: Optional[int] = None
+    memoria_maxima: Optional[int] = None
+
+    @property
+    def vacios(self) -> bool:
+        """Indica si no hay ningún límite."""
+        return all(valor is None for valor in self)
+
+
+class LecturaLimitada(NamedTuple):
+    """
+    Resultado de `consultar_con_limites`.
+
+    Atributos:
+        filas: Filas retenidas en memoria (vacía si la consulta pasó a streaming).
+        total_filas: Filas leídas en total.
+        bytes: Bytes aproximados leídos (0 si ningún límite necesitaba medirlos).
+        en_streaming: True si se superó la memoria y las filas se entregaron al consumidor.
+    """
+
+    filas: List[tuple]
+    total_filas: int
+    bytes: int
+    en_streaming: bool
+
+
+def _leer_numero(variable: str, tipo: Callable[[str], Any]) -> Any:
+    valor = os.getenv(variable)
+    if not valor:
+        return None
+    try:
+        numero = tipo(valor)
+    except ValueError:
+        raise EnvironmentError(f"Valor no válido '{valor}' en {variable}") from None
+    if numero <= 0:
+        raise EnvironmentError(f"{variable} debe ser positivo: {numero}")
+    return numero
+
+
+def leer_limites(prefijo: str) -> LimitesConsulta:
+    """
+    Lee los límites por consulta configurados para una base.
+
+    Args:
+        prefijo (str): Nombre de la base de datos.
+
+    Returns:
+        LimitesConsulta: Límites (None en los que no estén configurados).
+
+    Raises:
+        EnvironmentError: Si algún valor no es un número positivo.
+    """
+    return LimitesConsulta(
+        segundos=_leer_numero(f"timeout_consulta_{prefijo}", float),
+        max_filas=_leer_numero(f"max_filas_consulta_{prefijo}", int),
+        max_bytes=_leer_numero(f"max_bytes_consulta_{prefijo}", int),
+        memoria_maxima=_leer_numero(f"memoria_consulta_{prefijo}", int),
+    )
+
+
+def _exceder(limite: str, descripcion: str, detalle: str) -> LimiteExcedido:
+    """Registra un límite superado y devuelve la excepción que hay que lanzar."""
+    logger.warning("%s: límite de %s superado (%s)", descripcion, limite, detalle)
+    metricas.registrar("limite.excedido", 1, limite=limite, consulta=descripcion)
+    return LimiteExcedido(limite, f"{descripcion}: límite de {limite} superado ({detalle})")
+
+
+class PresupuestoEjecucion:
+    """
+    Presupuesto de segundos, filas y bytes compartido por las consultas de una ejecución.
+
+    Es seguro usarlo desde varios hilos (por ejemplo, desde `recolectar`).
+    """
+
+    def __init__(
+        self,
+        segundos: Optional[float] = None,
+        filas: Optional[int] = None,
+        bytes: Optional[int] = None,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.segundos = segundos
+        self.max_filas = filas
+        self.max_bytes = bytes
+        self.filas = 0
+        self.bytes = 0
+        self._reloj = reloj
+        self._limite = None if segundos is None else reloj() + segundos
+        self._lock = threading.Lock()
+
+    @property
+    def mide_bytes(self) -> bool:
+        return self.max_bytes is not None
+
+    def segundos_restantes(self) -> Optional[float]:
+        """Segundos que quedan del presupuesto (None si no tiene límite de tiempo)."""
+        if self._limite is None:
+            return None
+        return self._limite - self._reloj()
+
+    def comprobar(self, descripcion: str) -> None:
+        """
+        Lanza LimiteExcedido si el presupuesto ya está agotado.
+
+        Raises:
+            LimiteExcedido: Si no quedan segundos, filas o bytes.
+        """
+        restantes = self.segundos_restantes()
+        if restantes is not None and restantes <= 0:
+            raise _exceder("presupuesto", descripcion, f"plazo de la ejecución de {self.segundos}s agotado")
+        with self._lock:
+            agotado = (self.max_filas is not None and self.filas >= self.max_filas) or (
+                self.max_bytes is not None and self.bytes >= self.max_bytes
+            )
+        if agotado:
+            raise _exceder("presupuesto", descripcion, f"{self.filas} filas y {self.bytes} bytes leídos en la ejecución")
+
+    def consumir(self, filas: int, bytes: int, descripcion: str) -> None:
+        """
+        Descuenta filas y bytes leídos del presupuesto.
+
+        Raises:
+            LimiteExcedido: Si se supera el presupuesto de filas o de bytes.
+        """
+        with self._lock:
+            self.filas += filas
+            self.bytes += bytes
+            excedido = (self.max_filas is not None and self.filas > self.max_filas) or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            )
+            total_filas, total_bytes = self.filas, self.bytes
+        if excedido:
+            raise _exceder(
+                "presupuesto", descripcion,
+                f"{total_filas}/{self.max_filas} filas y {total_bytes}/{self.max_bytes} bytes leídos en la ejecución",
+            )
+
+
+def _milisegundos(segundos: float) -> int:
+    # callTimeout=0 significa "sin límite": el mínimo es 1 ms
+    return max(1, int(segundos * 1000))
+
+
+@contextmanager
+def limitar_tiempo(conn: Any, segundos: Optional[float]) -> Generator[Any, None, None]:
+    """
+    Fija `conn.callTimeout` durante el bloque y restaura el valor anterior al salir.
+
+    Las sesiones vuelven al pool, así que el límite no debe sobrevivir al bloque. Con `segundos`
+    None no se toca la sesión.
+    """
+    if segundos is None:
+        yield conn
+        return
+    anterior = conn.callTimeout
+    conn.callTimeout = _milisegundos(segundos)
+    try:
+        yield conn
+    finally:
+        # Si la sesión quedó inservible no se puede restaurar; la descartará quien la libere
+        with suppress(Exception):
+            conn.callTimeout = anterior
+
+
+def consultar_con_limites(
+    conn: Any,
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    limites: LimitesConsulta = LimitesConsulta(),
+    presupuesto: Optional[PresupuestoEjecucion] = None,
+    descripcion: str = "consulta",
+    consumidor: Optional[Consumidor] = None,
+    arraysize: Union[int, str] = ARRAYSIZE_POR_DEFECTO,
+    reloj: Callable[[], float] = time.monotonic,
+) -> LecturaLimitada:
+    """
+    Ejecuta una consulta leyendo por lotes y aplicando sus límites y el presupuesto de la ejecución.
+
+    Args:
+        conn: Conexión abierta.
+        sql (str): Consulta con variables de enlace.
+        params (Optional[Dict[str, Any]]): Valores de las variables de enlace.
+        limites (LimitesConsulta): Límites de esta consulta.
+        presupuesto (Optional[PresupuestoEjecucion]): Presupuesto compartido de la ejecución.
+        descripcion (str): Nombre de la consulta en los mensajes de log.
+        consumidor (Optional[Consumidor]): Destino de los lotes si se supera `memoria_maxima`;
+            sin consumidor, superar la memoria aborta la consulta.
+        arraysize (Union[int, str]): Filas por ida y vuelta, o "auto" (ver `src/ajuste_fetch.py`).
+        reloj: Sustituible en pruebas.
+
+    Returns:
+        LecturaLimitada: Filas retenidas y totales leídos.
+
+    Raises:
+        LimiteExcedido: Si se supera algún límite (la sesión sigue siendo utilizable).
+        cx_Oracle.DatabaseError: Si la consulta falla por otro motivo.
+    """
+    segundos = limites.segundos
+    if presupuesto is not None:
+        presupuesto.comprobar(descripcion)
+        restantes = presupuesto.segundos_restantes()
+        if restantes is not None and (segundos is None or restantes < segundos):
+            segundos = restantes
+    limite_reloj = None if segundos is None else reloj() + segundos
+    medir = limites.max_bytes is not None or limites.memoria_maxima is not None or (
+        presupuesto is not None and presupuesto.mide_bytes
+    )
+
+    filas: List[tuple] = []
+    total_filas = total_bytes = en_memoria = 0
+    en_streaming = False
+    try:
+        with limitar_tiempo(conn, segundos), closing(iterar_lotes(conn, sql, params, arraysize)) as lotes:
+            for lote in lotes:
+                tamano = metricas.tamano_aproximado(lote) if medir else 0
+                total_filas += len(lote)
+                total_bytes += tamano
+                if presupuesto is not None:
+                    presupuesto.consumir(len(lote), tamano, descripcion)
+                if limites.max_filas is not None and total_filas > limites.max_filas:
+                    raise _exceder("filas", descripcion, f"{total_filas} filas leídas, máximo {limites.max_filas}")
+                if limites.max_bytes is not None and total_bytes > limites.max_bytes:
+                    raise _exceder("bytes", descripcion, f"{total_bytes} bytes leídos, máximo {limites.max_bytes}")
+                if limite_reloj is not None:
+                    restantes = limite_reloj - reloj()
+                    if restantes <= 0:
+                        raise _exceder("tiempo", descripcion, f"más de {segundos:.1f}s")
+                    # callTimeout limita cada ida y vuelta: la siguiente solo dispone de lo que queda
+                    conn.callTimeout = _milisegundos(restantes)
+
+                if en_streaming:
+                    consumidor(lote)
+                    continue
+                filas.extend(lote)
+                en_memoria += tamano
+                if limites.memoria_maxima is not None and en_memoria > limites.memoria_maxima:
+                    if consumidor is None:
+                        raise _exceder(
+                            "memoria", descripcion, f"{en_memoria} bytes en memoria, máximo {limites.memoria_maxima}"
+                        )
+                    logger.warning(
+                        "%s: %d bytes en memoria superan el máximo de %d; se pasa a streaming",
+                        descripcion, en_memoria, limites.memoria_maxima,
+                    )
+                    metricas.registrar("limite.excedido", 1, limite="memoria", consulta=descripcion)
+                    consumidor(filas)
+                    filas = []
+                    en_streaming = True
+    except Exception as exc:
+        if es_tiempo_agotado(exc):
+            detalle = str(exc) if segundos is None else f"más de {segundos:.1f}s: {exc}"
+            raise _exceder("tiempo", descripcion, detalle) from exc
+        raise
+    return LecturaLimitada(filas, total_filas, total_bytes, en_streaming)
@@ -0,0 +1,355 @@
+"""
+pool.py
+
+Pools de sesiones Oracle compartidos por todo el proceso, uno por base de datos configurada.
+
+En lugar de abrir una conexión nueva (con su handshake de logon completo) en cada bloque `with`,
+las conexiones se toman prestadas de un `cx_Oracle.SessionPool` que se crea de forma perezosa
+la primera vez que se necesita y se reutiliza durante toda la vida del proceso.
+
+Funciones principales:
+- obtener_pool(nombre, conf): Devuelve (creándolo si hace falta) el pool de la base `nombre`.
+- sesion(nombre, conf): Context manager que adquiere una sesión del pool y la devuelve al salir.
+- adquirir(nombre, conf) / liberar(pool, conn): Las dos mitades de `sesion`, por separado.
+- limite_sesiones(prefijo): Número máximo de sesiones simultáneas configurado para una base.
+- cerrar_pools(nombres): Cierra los pools de `nombres`, o todos (se registra automáticamente con atexit).
+
+Tamaños del pool (opcionales, por base de datos):
+    pool_min_{PREFIJO}        (por defecto 1)
+    pool_max_{PREFIJO}        (por defecto 4)
+    pool_increment_{PREFIJO}  (por defecto 1)
+    pool_stmtcache_{PREFIJO}  (por defecto 50) sentencias que cada sesión mantiene preparadas
+    pool_ping_{PREFIJO}       (por defecto 60) segundos de inactividad tras los que una sesión
+                              se comprueba con ping antes de prestarla (0: siempre)
+
+Las sesiones no se comprueban en cada préstamo, que costaría una ida y vuelta más por consulta:
+con cx_Oracle >= 8.2 lo hace el propio pool (`ping_interval`) y, con drivers anteriores, solo se
+hace `ping()` a las sesiones que llevan inactivas más de `pool_ping_{PREFIJO}` segundos.
+
+Uso:
+    from src.pool import sesion
+    with sesion("MEDIN", conf_medin) as conn:
+        cursor = conn.cursor()
+"""
+
+import atexit
+import os
+import threading
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Dict, Generator, Iterable, Optional, Tuple
+
+import cx_Oracle
+from config import metricas
+
+# ----------------------------------------
+# 1. Estado global del módulo
+# ----------------------------------------
+# Un pool por nombre de base de datos; el lock evita crear dos pools en paralelo
+_pools: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+TAMANOS_POR_DEFECTO: Dict[str, int] = {"min": 1, "max": 4, "increment": 1}
+
+# Sentencias preparadas por sesión: al menos tantas como consultas distintas del catálogo
+STMTCACHE_POR_DEFECTO = 50
+
+# Número máximo de sesiones muertas que se descartan en un único `acquire`
+MAX_SESIONES_DESCARTADAS = 3
+
+# Segundos de inactividad tras los que una sesión se comprueba antes de prestarla
+PING_INTERVALO_POR_DEFECTO = 60
+
+# Momento (time.monotonic) en que se devolvió cada sesión, para los pools sin `ping_interval`
+_liberadas: Dict[int, float] = {}
+
+
+# ----------------------------------------
+# 2. Funciones auxiliares
+# ----------------------------------------
+def _leer_tamanos(prefijo: str) -> Dict[str, int]:
+    """
+    Lee los tamaños del pool para un prefijo dado desde las variables de entorno.
+
+    Args:
+        prefijo (str): Nombre de la base de datos (por ejemplo, 'MEDIN' o 'Simbad').
+
+    Returns:
+        Dict[str, int]: Diccionario con las claves 'min', 'max' e 'increment'.
+
+    Raises:
+        EnvironmentError: Si algún valor no es un entero válido o los tamaños son incoherentes.
+    """
+    tamanos: Dict[str, int] = {}
+    for clave, defecto in TAMANOS_POR_DEFECTO.items():
+        valor = os.getenv(f"pool_{clave}_{prefijo}")
+        try:
+            tamanos[clave] = int(valor) if valor else defecto
+        except ValueError:
+            raise EnvironmentError(
+                f"Valor no entero '{valor}' en pool_{clave}_{prefijo}"
+            ) from None
+
+    if tamanos["min"] < 0 or tamanos["max"] < max(tamanos["min"], 1) or tamanos["increment"] < 1:
+        raise EnvironmentError(f"Tamaños de pool incoherentes para '{prefijo}': {tamanos}")
+    return tamanos
+
+
+def _leer_stmtcache(prefijo: str) -> int:
+    """
+    Lee el tamaño de la caché de sentencias de las sesiones de un prefijo.
+
+    Cada sesión guarda las sentencias ya analizadas; una consulta cuyo texto está en la caché
+    se reutiliza sin volver a analizarse (ni siquiera un soft parse).
+
+    Args:
+        prefijo (str): Nombre de la base de datos.
+
+    Returns:
+        int: Valor de pool_stmtcache_{PREFIJO} (o STMTCACHE_POR_DEFECTO).
+
+    Raises:
+        EnvironmentError: Si el valor no es un entero no negativo.
+    """
+    valor = os.getenv(f"pool_stmtcache_{prefijo}")
+    try:
+        tamano = int(valor) if valor else STMTCACHE_POR_DEFECTO
+    except ValueError:
+        raise EnvironmentError(f"Valor no entero '{valor}' en pool_stmtcache_{prefijo}") from None
+    if tamano < 0:
+        raise EnvironmentError(f"pool_stmtcache_{prefijo} no puede ser negativo: {tamano}")
+    return tamano
+
+
+def _leer_ping_intervalo(prefijo: str) -> int:
+    """
+    Lee los segundos de inactividad tras los que una sesión se comprueba antes de prestarla.
+
+    Args:
+        prefijo (str): Nombre de la base de datos.
+
+    Returns:
+        int: Valor de pool_ping_{PREFIJO} (o PING_INTERVALO_POR_DEFECTO).
+
+    Raises:
+        EnvironmentError: Si el valor no es un entero no negativo.
+    """
+    valor = os.getenv(f"pool_ping_{prefijo}")
+    try:
+        intervalo = int(valor) if valor else PING_INTERVALO_POR_DEFECTO
+    except ValueError:
+        raise EnvironmentError(f"Valor no entero '{valor}' en pool_ping_{prefijo}") from None
+    if intervalo < 0:
+        raise EnvironmentError(f"pool_ping_{prefijo} no puede ser negativo: {intervalo}")
+    return intervalo
+
+
+def _admite_ping_interval(driver: ModuleType) -> bool:
+    """Indica si el `SessionPool` del driver comprueba él mismo las sesiones (cx_Oracle >= 8.2)."""
+    try:
+        return tuple(int(p) for p in driver.version.split(".")[:2]) >= (8, 2)
+    except (AttributeError, ValueError):
+        return False
+
+
+def _inactiva(conn: Any, intervalo: int) -> bool:
+    """Indica si la sesión lleva `intervalo` segundos o más sin usarse (o no se ha prestado nunca)."""
+    liberada = _liberadas.pop(id(conn), None)
+    return liberada is None or time.monotonic() - liberada >= intervalo
+
+
+def _adquirir_sana(pool: Any, driver: ModuleType, intervalo: int = PING_INTERVALO_POR_DEFECTO) -> Any:
+    """
+    Adquiere una sesión del pool comprobando que sigue viva si lleva tiempo sin usarse.
+
+    Si el pool tiene `ping_interval`, él mismo comprueba y sustituye las sesiones inactivas. Si no,
+    se hace `ping()` a las sesiones inactivas desde hace `intervalo` segundos o más (y a las que
+    aún no se han prestado nunca); si la sesión está muerta (por ejemplo, tras un corte de red o
+    un reinicio del servidor) se descarta del pool con `drop()` y se pide otra.
+
+    Args:
+        pool: Pool de sesiones del que adquirir.
+        driver (ModuleType): Módulo del driver (cx_Oracle o un sustituto de pruebas).
+        intervalo (int): Segundos de inactividad a partir de los que se hace ping.
+
+    Returns:
+        Conexión viva tomada del pool.
+
+    Raises:
+        cx_Oracle.DatabaseError: Si el pool no puede entregar una sesión sana.
+    """
+    if getattr(pool, "ping_interval", None) is not None:
+        return pool.acquire()
+    for _ in range(MAX_SESIONES_DESCARTADAS):
+        conn = pool.acquire()
+        if not _inactiva(conn, intervalo):
+            return conn
+        try:
+            conn.ping()
+            return conn
+        except driver.DatabaseError:
+            pool.drop(conn)
+    # Último intento: si también falla, el error se propaga al llamador
+    conn = pool.acquire()
+    if _inactiva(conn, intervalo):
+        try:
+            conn.ping()
+        except driver.DatabaseError:
+            pool.drop(conn)
+            raise
+    return conn
+
+
+# ----------------------------------------
+# 3. Funciones públicas
+# ----------------------------------------
+def obtener_pool(
+    nombre: str, conf: Dict[str, str], driver: ModuleType = cx_Oracle, failover: bool = False
+) -> Any:
+    """
+    Devuelve el pool de sesiones de la base `nombre`, creándolo la primera vez.
+
+    Args:
+        nombre (str): Nombre de la base de datos (clave en la configuración).
+        conf (Dict[str, str]): Credenciales con las claves 'user', 'password' y 'dsn'.
+        driver (ModuleType): Módulo que expone `SessionPool` (cx_Oracle por defecto).
+        failover (bool): Si es True, se usa el pool del DSN secundario (`conf['dsn_failover']`),
+            que se registra aparte como '<nombre>:failover'.
+
+    Returns:
+        cx_Oracle.SessionPool: Pool compartido por todo el proceso.
+
+    Raises:
+        EnvironmentError: Si los tamaños configurados no son válidos.
+        cx_Oracle.DatabaseError: Si no se puede crear el pool.
+    """
+    clave = f"{nombre}:failover" if failover else nombre
+    pool = _pools.get(clave)
+    if pool is not None:
+        return pool
+
+    with _lock:
+        # Otro hilo pudo crearlo mientras esperábamos el lock
+        pool = _pools.get(clave)
+        if pool is None:
+            tamanos = _leer_tamanos(nombre)
+            stmtcache = _leer_stmtcache(nombre)
+            opciones = {"ping_interval": _leer_ping_intervalo(nombre)} if _admite_ping_interval(driver) else {}
+            pool = driver.SessionPool(
+                user=conf["user"],
+                password=conf["password"],
+                dsn=conf["dsn_failover"] if failover else conf["dsn"],
+                min=tamanos["min"],
+                max=tamanos["max"],
+                increment=tamanos["increment"],
+                threaded=True,
+                getmode=driver.SPOOL_ATTRVAL_WAIT,
+                stmtcachesize=stmtcache,
+                **opciones,
+            )
+            _pools[clave] = pool
+    return pool
+
+
+def adquirir(
+    nombre: str, conf: Dict[str, str], driver: ModuleType = cx_Oracle, failover: bool = False
+) -> Tuple[Any, Any]:
+    """
+    Adquiere una sesión del pool de `nombre` (o de su DSN secundario), comprobada si estaba inactiva.
+
+    Returns:
+        Tuple[pool, conexión]: La sesión y el pool al que hay que devolverla con `liberar`.
+
+    Raises:
+        cx_Oracle.DatabaseError: Si no se puede crear el pool o adquirir una sesión.
+    """
+    pool = obtener_pool(nombre, conf, driver, failover)
+    with metricas.cronometro("pool.adquirir", base=nombre):
+        return pool, _adquirir_sana(pool, driver, _leer_ping_intervalo(nombre))
+
+
+def liberar(pool: Any, conn: Any, descartar: bool = False) -> None:
+    """
+    Devuelve una sesión al pool, o la descarta si ya no sirve (por ejemplo, tras perder la conexión).
+    """
+    if descartar:
+        pool.drop(conn)
+    else:
+        _liberadas[id(conn)] = time.monotonic()
+        pool.release(conn)
+
+
+@contextmanager
+def sesion(
+    nombre: str, conf: Dict[str, str], driver: ModuleType = cx_Oracle
+) -> Generator[Any, None, None]:
+    """
+    Context manager que presta una sesión del pool de `nombre` y la devuelve al salir.
+
+    Args:
+        nombre (str): Nombre de la base de datos.
+        conf (Dict[str, str]): Credenciales de la base de datos.
+        driver (ModuleType): Módulo del driver (cx_Oracle por defecto).
+
+    Yields:
+        cx_Oracle.Connection: Sesión del pool lista para ejecutar consultas.
+
+    Raises:
+        cx_Oracle.DatabaseError: Si no se puede crear el pool o adquirir una sesión.
+    """
+    pool, conn = adquirir(nombre, conf, driver)
+    try:
+        yield conn
+    finally:
+        # La sesión vuelve al pool en lugar de cerrarse
+        liberar(pool, conn)
+
+
+def limite_sesiones(prefijo: str) -> int:
+    """
+    Devuelve el número máximo de sesiones simultáneas configurado para una base.
+
+    Args:
+        prefijo (str): Nombre de la base de datos.
+
+    Returns:
+        int: Valor de pool_max_{PREFIJO} (o el tamaño por defecto).
+
+    Raises:
+        EnvironmentError: Si los tamaños configurados no son válidos.
+    """
+    return _leer_tamanos(prefijo)["max"]
+
+
+def cerrar_pools(nombres: Optional[Iterable[str]] = None) -> None:
+    """
+    Cierra los pools abiertos y los quita del registro.
+
+    Es seguro llamarla varias veces; se ejecuta automáticamente al terminar el proceso.
+
+    Args:
+        nombres (Optional[Iterable[str]]): Bases cuyos pools (incluido el de failover) se cierran;
+            None para cerrarlos todos. Al cerrar solo algunas, los pools no se fuerzan: si aún
+            tienen sesiones prestadas, esas sesiones siguen funcionando y el pool se libera cuando
+            se devuelven, mientras que los préstamos nuevos ya crean un pool nuevo.
+    """
+    with _lock:
+        if nombres is None:
+            pools = list(_pools.values())
+            _pools.clear()
+            _liberadas.clear()
+        else:
+            nombres = set(nombres)
+            pools = [_pools.pop(c) for c in list(_pools) if c.split(":")[0] in nombres]
+    for pool in pools:
+        if nombres is None:
+            pool.close(force=True)
+            continue
+        try:
+            pool.close()
+        except cx_Oracle.DatabaseError:
+            pass  # sesiones aún prestadas: el pool se libera al perder la última referencia
+
+
+atexit.register(cerrar_pools)
@@ -0,0 +1,209 @@
+"""
+resiliencia.py
+
+Clasificación de errores de Oracle y reintentos con espera exponencial, jitter y plazo total.
+
+Un corte de red de un par de segundos no debería hacer fallar el trabajo diario entero. Los
+errores se clasifican por su código (ORA-xxxxx o DPI-xxxx):
+
+- Sesión perdida (ORA-03113, ORA-03114, DPI-1080...): la sesión ya no sirve; se descarta del
+  pool en lugar de devolverla y la operación se puede reintentar con otra.
+- Reintentables (los anteriores más arranques/paradas de la instancia, listener caído,
+  tiempos de espera de red...): la misma operación puede funcionar unos instantes después.
+- Tiempo agotado (DPI-1067): la llamada superó su callTimeout; la sesión sigue sirviendo y la
+  operación no se reintenta (ver `src/limites.py`).
+- El resto (errores de SQL, permisos, credenciales) se propagan sin reintentar.
+
+Cada reintento espera un tiempo aleatorio entre 0 y `espera_inicial * 2^intento` (con tope
+`espera_maxima`), para que varios procesos no reintenten a la vez; y nunca se empieza una espera
+que termine después del plazo total de la operación.
+
+Política por base (opcional):
+    reintentos_{PREFIJO}          intentos totales (por defecto 4; 1 desactiva los reintentos)
+    plazo_reintentos_{PREFIJO}    segundos máximos entre el primer intento y el último (por defecto 30)
+
+Funciones principales:
+- codigo_error(exc): Código 'ORA-03113' / 'DPI-1080' de una excepción, o None.
+- es_reintentable(exc) / es_sesion_perdida(exc) / es_tiempo_agotado(exc): Clasificación de errores.
+- politica_reintentos(prefijo): Política de reintentos configurada para una base.
+- reintentar(funcion, politica): Ejecuta `funcion` reintentando los errores transitorios.
+"""
+
+import logging
+import os
+import random
+import re
+import time
+from typing import Callable, NamedTuple, Optional, TypeVar
+
+from config import metricas
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# La sesión está rota: hay que descartarla del pool
+ERRORES_SESION_PERDIDA = frozenset({
+    "ORA-00028",  # sesión eliminada
+    "ORA-01012",  # no conectado
+    "ORA-02396",  # tiempo máximo de inactividad superado
+    "ORA-03113",  # fin de fichero en el canal de comunicación
+    "ORA-03114",  # no conectado a Oracle
+    "ORA-03135",  # conexión perdida
+    "ORA-12153",  # TNS: no conectado
+    "ORA-12537",  # TNS: conexión cerrada
+    "ORA-12547",  # TNS: contacto perdido
+    "ORA-12571",  # TNS: fallo al escribir paquete
+    "DPI-1010",   # no conectado
+    "DPI-1080",   # conexión cerrada por ORA-%d
+})
+
+# Errores transitorios: la operación puede funcionar si se repite
+ERRORES_REINTENTABLES = ERRORES_SESION_PERDIDA | frozenset({
+    "ORA-01033",  # instancia arrancando o parando
+    "ORA-01034",  # Oracle no disponible
+    "ORA-01089",  # parada inmediata en curso
+    "ORA-01090",  # parada en curso
+    "ORA-12170",  # TNS: tiempo de conexión agotado
+    "ORA-12528",  # TNS: la instancia bloquea conexiones nuevas
+    "ORA-12541",  # TNS: no hay listener
+    "ORA-12543",  # TNS: destino inalcanzable
+    "ORA-24459",  # tiempo agotado esperando sesiones nuevas en el pool
+    "ORA-25408",  # no se puede repetir la llamada de forma segura
+})
+
+# Tiempo máximo de la llamada (callTimeout) superado: la sesión sigue siendo utilizable, pero la
+# operación no se repite (volvería a agotar el tiempo)
+ERRORES_TIEMPO_AGOTADO = frozenset({
+    "DPI-1067",   # tiempo de llamada superado
+    "ORA-03156",  # llamada OCI fuera de tiempo
+})
+
+_PATRON_CODIGO = re.compile(r"\b(ORA|DPI)-(\d+)")
+
+INTENTOS_POR_DEFECTO = 4
+PLAZO_POR_DEFECTO = 30.0
+
+
+def codigo_error(exc: BaseException) -> Optional[str]:
+    """
+    Devuelve el código de error de Oracle de una excepción ('ORA-03113', 'DPI-1080'), o None.
+
+    Usa el atributo `code` del error de cx_Oracle si existe y, si no, lo busca en el mensaje.
+    """
+    for arg in exc.args:
+        codigo = getattr(arg, "code", None)
+        if isinstance(codigo, int) and codigo > 0:
+            return f"ORA-{codigo:05d}"
+    coincidencia = _PATRON_CODIGO.search(str(exc))
+    if coincidencia is None:
+        return None
+    prefijo, numero = coincidencia.groups()
+    return f"ORA-{int(numero):05d}" if prefijo == "ORA" else f"DPI-{int(numero)}"
+
+
+def es_sesion_perdida(exc: BaseException) -> bool:
+    """Indica si el error deja la sesión inservible (hay que descartarla del pool)."""
+    return codigo_error(exc) in ERRORES_SESION_PERDIDA
+
+
+def es_tiempo_agotado(exc: BaseException) -> bool:
+    """Indica si el error es un tiempo de llamada (callTimeout) superado."""
+    return codigo_error(exc) in ERRORES_TIEMPO_AGOTADO
+
+
+def es_reintentable(exc: BaseException) -> bool:
+    """Indica si el error es transitorio y la operación se puede repetir."""
+    if any(getattr(arg, "isrecoverable", False) for arg in exc.args):
+        return True
+    return codigo_error(exc) in ERRORES_REINTENTABLES
+
+
+class PoliticaReintentos(NamedTuple):
+    """
+    Parámetros de los reintentos.
+
+    Atributos:
+        intentos: Intentos totales, incluido el primero.
+        espera_inicial: Espera máxima (segundos) antes del primer reintento.
+        espera_maxima: Tope de la espera entre intentos.
+        plazo: Segundos máximos desde el primer intento hasta el último.
+    """
+
+    intentos: int = INTENTOS_POR_DEFECTO
+    espera_inicial: float = 0.2
+    espera_maxima: float = 5.0
+    plazo: float = PLAZO_POR_DEFECTO
+
+    def espera(self, intento: int, aleatorio: Callable[[], float] = random.random) -> float:
+        """Espera antes del reintento número `intento` (desde 0), con jitter completo."""
+        return aleatorio() * min(self.espera_maxima, self.espera_inicial * 2 ** intento)
+
+
+def politica_reintentos(prefijo: str) -> PoliticaReintentos:
+    """
+    Lee la política de reintentos de una base (reintentos_{PREFIJO}, plazo_reintentos_{PREFIJO}).
+
+    Raises:
+        EnvironmentError: Si algún valor no es un número válido.
+    """
+    intentos = os.getenv(f"reintentos_{prefijo}")
+    plazo = os.getenv(f"plazo_reintentos_{prefijo}")
+    try:
+        politica = PoliticaReintentos(
+            intentos=int(intentos) if intentos else INTENTOS_POR_DEFECTO,
+            plazo=float(plazo) if plazo else PLAZO_POR_DEFECTO,
+        )
+    except ValueError:
+        raise EnvironmentError(
+            f"Valor no válido en reintentos_{prefijo} ('{intentos}') o plazo_reintentos_{prefijo} ('{plazo}')"
+        ) from None
+    if politica.intentos < 1 or politica.plazo < 0:
+        raise EnvironmentError(f"Política de reintentos incoherente para '{prefijo}': {politica}")
+    return politica
+
+
+def reintentar(
+    funcion: Callable[[], T],
+    politica: PoliticaReintentos = PoliticaReintentos(),
+    descripcion: str = "operación",
+    dormir: Callable[[float], None] = time.sleep,
+    reloj: Callable[[], float] = time.monotonic,
+) -> T:
+    """
+    Ejecuta `funcion` y la repite mientras falle con errores reintentables.
+
+    Args:
+        funcion (Callable[[], T]): Operación a ejecutar (debe poder repetirse sin efectos duplicados).
+        politica (PoliticaReintentos): Intentos, esperas y plazo total.
+        descripcion (str): Texto para los mensajes de log.
+        dormir, reloj: Sustituibles en pruebas.
+
+    Returns:
+        T: Lo que devuelva `funcion`.
+
+    Raises:
+        Exception: El último error si no es reintentable, se agotan los intentos o no queda plazo.
+    """
+    limite = reloj() + politica.plazo
+    intento = 0
+    while True:
+        try:
+            return funcion()
+        except Exception as exc:
+            if not es_reintentable(exc):
+                raise
+            intento += 1
+            if intento >= politica.intentos:
+                logger.error("%s: %s tras %d intentos", descripcion, exc, intento)
+                raise
+            espera = politica.espera(intento - 1)
+            if reloj() + espera > limite:
+                logger.error("%s: %s; plazo de %.1fs agotado tras %d intentos", descripcion, exc, politica.plazo, intento)
+                raise
+            logger.warning(
+                "%s: %s (%s); reintento %d/%d en %.2fs",
+                descripcion, codigo_error(exc), exc, intento, politica.intentos - 1, espera,
+            )
+            metricas.registrar("conexion.reintento", espera, operacion=descripcion, codigo=codigo_error(exc))
+            dormir(espera)
@@ -0,0 +1,491 @@
+"""
+servicio.py
+
+Modo servicio: un proceso de larga duración que mantiene los pools calientes, ejecuta las
+estadísticas diarias con un planificador interno y sirve los resultados por HTTP local.
+
+Cada ejecución de `main.py` paga el arranque del intérprete, la lectura del `.env`, la
+configuración del logging y un logon nuevo a Oracle antes de hacer nada útil. El servicio lo
+paga una sola vez:
+
+- Al iniciar lee la configuración y abre los pools de cada base (ver `src/pool.py`), que se
+  reutilizan en todas las ejecuciones posteriores.
+- Cada trabajo diario se ejecuta a su hora para el día `hoy - desfase_dias`. La fecha del último
+  día completado se guarda en `estado/servicio.json`; al arrancar (o si el proceso estuvo parado)
+  se recuperan los días pendientes, hasta `max_recuperacion_dias`.
+- Los resultados se guardan en memoria (los últimos `dias_retenidos` por trabajo) y se sirven en
+  milisegundos por HTTP en 127.0.0.1:
+      GET /salud                            estado del servicio y de cada trabajo
+      GET /resultados                       trabajos y días disponibles
+      GET /resultados/<trabajo>             último resultado del trabajo
+      GET /resultados/<trabajo>?dia=AAAA-MM-DD
+                                            resultado de ese día (se calcula si no estaba)
+  A demanda solo se calculan días entre `hoy - dias_retenidos` y el último completado por el
+  planificador (400 en otro caso), y las peticiones simultáneas del mismo día comparten un cálculo.
+
+Trabajos del catálogo: cada consulta de `consultas/` cuyo único parámetro declarado es `dia`
+(`-- parametros: dia`) se programa como trabajo diario. La consulta recibe en `:dia` la fecha
+(datetime.date) del día que se calcula y sus filas son el resultado, por ejemplo:
+    -- nombre: altas_por_centro
+    -- base: MEDIN
+    -- parametros: dia
+    SELECT centro, COUNT(*) FROM altas WHERE fecha = :dia GROUP BY centro
+Si ninguna consulta cumple el contrato, `python -m src.servicio` no arranca.
+
+Funciones principales:
+- TrabajoDiario: Trabajo programado (nombre, hora y función que calcula un día).
+- trabajos_del_catalogo(catalogo): Un trabajo por cada consulta del catálogo con parámetro `dia`.
+- AlmacenResultados: Resultados en memoria por trabajo y día.
+- Servicio: Planificador, pools y servidor HTTP.
+
+Uso:
+    python -m src.servicio --puerto 8750
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from config.logger_config import setup_logging
+from db_connections.config_manager import obtener_configuracion
+from src.catalogo import Catalogo, obtener_catalogo
+from src.collector import Abridor
+from src.connection import connection
+from src.incremental import DIRECTORIO_ESTADO
+from src.pool import cerrar_pools
+
+logger = logging.getLogger(__name__)
+
+PUERTO_POR_DEFECTO = 8750
+HORA_POR_DEFECTO = datetime.time(6, 0)
+# Segundos entre comprobaciones del planificador
+INTERVALO_POR_DEFECTO = 30.0
+
+
+class TrabajoDiario(NamedTuple):
+    """
+    Estadística que se calcula una vez al día.
+
+    Atributos:
+        nombre: Identificador del trabajo (y de sus resultados).
+        calcular: Función que recibe el día y devuelve el resultado (serializable a JSON).
+        hora: Hora local a partir de la cual se calcula el día.
+        desfase_dias: El trabajo de la fecha F calcula el día F - desfase_dias (1: el día anterior).
+    """
+
+    nombre: str
+    calcular: Callable[[datetime.date], Any]
+    hora: datetime.time = HORA_POR_DEFECTO
+    desfase_dias: int = 1
+
+
+class Resultado(NamedTuple):
+    """Resultado de un trabajo para un día."""
+
+    trabajo: str
+    dia: datetime.date
+    valor: Any
+    generado: datetime.datetime
+    segundos: float
+
+
+def trabajos_del_catalogo(
+    catalogo: Optional[Catalogo] = None,
+    hora: datetime.time = HORA_POR_DEFECTO,
+    abrir: Abridor = connection,
+) -> List[TrabajoDiario]:
+    """
+    Crea un trabajo diario por cada consulta del catálogo cuyo único parámetro es `dia`.
+
+    Args:
+        catalogo (Optional[Catalogo]): Catálogo de consultas (por defecto, el de `consultas/`).
+        hora (datetime.time): Hora de ejecución de todos los trabajos.
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+
+    Returns:
+        List[TrabajoDiario]: Trabajos cuyo resultado son las filas de la consulta.
+    """
+    catalogo = catalogo if catalogo is not None else obtener_catalogo()
+
+    def trabajo(nombre: str) -> TrabajoDiario:
+        return TrabajoDiario(nombre, lambda dia: catalogo.ejecutar(nombre, {"dia": dia}, abrir), hora)
+
+    return [trabajo(d.nombre) for d in catalogo.values() if d.parametros == ("dia",)]
+
+
+class AlmacenResultados:
+    """
+    Resultados en memoria por trabajo y día, con los `dias_retenidos` más recientes de cada trabajo.
+
+    Es seguro usarlo desde varios hilos (planificador y peticiones HTTP).
+    """
+
+    def __init__(self, dias_retenidos: int = 31) -> None:
+        self.dias_retenidos = dias_retenidos
+        self._resultados: Dict[str, "OrderedDict[datetime.date, Resultado]"] = {}
+        self._lock = threading.Lock()
+
+    def guardar(self, resultado: Resultado) -> None:
+        with self._lock:
+            dias = self._resultados.setdefault(resultado.trabajo, OrderedDict())
+            dias[resultado.dia] = resultado
+            # Los días se recuperan en orden, pero un cálculo a demanda puede ser de un día anterior:
+            # nunca se descarta el que se acaba de guardar
+            antiguos = sorted(d for d in dias if d != resultado.dia)
+            for dia in antiguos[:max(len(antiguos) - self.dias_retenidos + 1, 0)]:
+                del dias[dia]
+
+    def obtener(self, trabajo: str, dia: Optional[datetime.date] = None) -> Optional[Resultado]:
+        """Resultado del día `dia` o, sin día, el del día más reciente."""
+        with self._lock:
+            dias = self._resultados.get(trabajo)
+            if not dias:
+                return None
+            return dias.get(dia if dia is not None else max(dias))
+
+    def indice(self) -> Dict[str, List[str]]:
+        """Trabajos con los días disponibles de cada uno, ordenados."""
+        with self._lock:
+            return {t: sorted(d.isoformat() for d in dias) for t, dias in self._resultados.items()}
+
+
+class Servicio:
+    """
+    Servicio de estadísticas: pools calientes, planificador con recuperación y servidor HTTP.
+
+    Args:
+        trabajos (Sequence[TrabajoDiario]): Trabajos diarios.
+        bases (Optional[Sequence[str]]): Bases cuyos pools se abren al iniciar; por defecto, todas
+            las configuradas en DB_PREFIJOS.
+        puerto (int): Puerto HTTP en 127.0.0.1 (0: cualquiera libre; None: sin servidor).
+        max_recuperacion_dias (int): Días pendientes que se recuperan como máximo por trabajo.
+        intervalo (float): Segundos entre comprobaciones del planificador.
+        ruta_estado (Optional[Path]): Fichero con el último día completado de cada trabajo.
+        abrir (Abridor): Función que abre la conexión (para calentar los pools).
+        reloj: Devuelve la fecha y hora actuales (sustituible en pruebas).
+    """
+
+    def __init__(
+        self,
+        trabajos: Sequence[TrabajoDiario],
+        bases: Optional[Sequence[str]] = None,
+        puerto: Optional[int] = PUERTO_POR_DEFECTO,
+        max_recuperacion_dias: int = 7,
+        intervalo: float = INTERVALO_POR_DEFECTO,
+        ruta_estado: Optional[Path] = None,
+        abrir: Abridor = connection,
+        reloj: Callable[[], datetime.datetime] = datetime.datetime.now,
+        almacen: Optional[AlmacenResultados] = None,
+    ) -> None:
+        nombres = [t.nombre for t in trabajos]
+        if len(set(nombres)) != len(nombres):
+            raise ValueError(f"Nombres de trabajo repetidos: {nombres}")
+        self.trabajos = {t.nombre: t for t in trabajos}
+        self.bases = tuple(bases) if bases is not None else None
+        self.puerto = puerto
+        self.max_recuperacion_dias = max_recuperacion_dias
+        self.intervalo = intervalo
+        self.ruta_estado = ruta_estado or DIRECTORIO_ESTADO / "servicio.json"
+        self.abrir = abrir
+        self.reloj = reloj
+        self.almacen = almacen or AlmacenResultados()
+        self.completados: Dict[str, datetime.date] = self._leer_estado()
+        self.errores: Dict[str, str] = {}
+        self.iniciado: Optional[datetime.datetime] = None
+        self._parar = threading.Event()
+        self._lock_trabajos = threading.Lock()
+        self._en_curso: Dict[Tuple[str, datetime.date], "Future[Resultado]"] = {}
+        self._lock_en_curso = threading.Lock()
+        self._hilos: List[threading.Thread] = []
+        self._servidor: Optional[ThreadingHTTPServer] = None
+
+    # ----------------------------------------
+    # Estado persistente
+    # ----------------------------------------
+    def _leer_estado(self) -> Dict[str, datetime.date]:
+        if not self.ruta_estado.exists():
+            return {}
+        datos = json.loads(self.ruta_estado.read_text(encoding="utf-8"))
+        return {t: datetime.date.fromisoformat(d) for t, d in datos.get("completados", {}).items()}
+
+    def _escribir_estado(self) -> None:
+        """Escribe el último día completado de cada trabajo (fichero temporal + os.replace)."""
+        self.ruta_estado.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta_estado.with_suffix(".tmp")
+        datos = {"completados": {t: d.isoformat() for t, d in sorted(self.completados.items())}}
+        temporal.write_text(json.dumps(datos, indent=2), encoding="utf-8")
+        os.replace(temporal, self.ruta_estado)
+
+    # ----------------------------------------
+    # Planificador
+    # ----------------------------------------
+    def pendientes(self, ahora: Optional[datetime.datetime] = None) -> List[Tuple[str, datetime.date]]:
+        """
+        Días pendientes de cada trabajo, en orden de fecha.
+
+        Un día está pendiente si ya pasó su hora de ejecución y es posterior al último completado.
+        Sin ejecuciones previas solo se calcula el día más reciente.
+        """
+        ahora = ahora or self.reloj()
+        pendientes = []
+        for trabajo in self.trabajos.values():
+            fecha = ahora.date() if ahora.time() >= trabajo.hora else ahora.date() - datetime.timedelta(days=1)
+            ultimo = fecha - datetime.timedelta(days=trabajo.desfase_dias)
+            anterior = self.completados.get(trabajo.nombre, ultimo - datetime.timedelta(days=1))
+            primero = max(anterior + datetime.timedelta(days=1), ultimo - datetime.timedelta(days=self.max_recuperacion_dias - 1))
+            dia = primero
+            while dia <= ultimo:
+                pendientes.append((trabajo.nombre, dia))
+                dia += datetime.timedelta(days=1)
+        return sorted(pendientes, key=lambda p: (p[1], p[0]))
+
+    def calcular(self, nombre: str, dia: datetime.date) -> Resultado:
+        """
+        Ejecuta el trabajo `nombre` para `dia` y guarda el resultado en el almacén.
+
+        Raises:
+            KeyError: Si el trabajo no existe.
+            Exception: El error del trabajo, si falla.
+        """
+        trabajo = self.trabajos[nombre]
+        inicio = time.perf_counter()
+        valor = trabajo.calcular(dia)
+        resultado = Resultado(nombre, dia, valor, self.reloj(), time.perf_counter() - inicio)
+        self.almacen.guardar(resultado)
+        logger.info("Trabajo %s del %s calculado en %.3fs", nombre, dia, resultado.segundos)
+        return resultado
+
+    def intervalo_a_demanda(self, nombre: str) -> Optional[Tuple[datetime.date, datetime.date]]:
+        """
+        Primer y último día que se pueden calcular a demanda (None si el trabajo aún no completó ninguno).
+
+        Un día anterior a `hoy - dias_retenidos` se descartaría del almacén en cuanto se guardase, y
+        uno posterior al último completado pasaría a ser el "último" resultado del trabajo.
+        """
+        ultimo = self.completados.get(nombre)
+        if ultimo is None:
+            return None
+        return self.reloj().date() - datetime.timedelta(days=self.almacen.dias_retenidos), ultimo
+
+    def calcular_a_demanda(self, nombre: str, dia: datetime.date) -> Resultado:
+        """
+        Resultado de `dia` desde el almacén o, si no estaba, calculado una sola vez.
+
+        Las peticiones simultáneas del mismo trabajo y día esperan al mismo cálculo.
+
+        Raises:
+            KeyError: Si el trabajo no existe.
+            ValueError: Si el día está fuera de `intervalo_a_demanda`.
+            Exception: El error del trabajo, si falla.
+        """
+        if nombre not in self.trabajos:
+            raise KeyError(nombre)
+        intervalo = self.intervalo_a_demanda(nombre)
+        if intervalo is None or not intervalo[0] <= dia <= intervalo[1]:
+            raise ValueError(f"El día {dia} de {nombre} está fuera de los días disponibles: {intervalo}")
+        resultado = self.almacen.obtener(nombre, dia)
+        if resultado is not None:
+            return resultado
+        clave = (nombre, dia)
+        with self._lock_en_curso:
+            futuro = self._en_curso.get(clave)
+            propio = futuro is None
+            if propio:
+                futuro = self._en_curso[clave] = Future()
+        if not propio:
+            return futuro.result()
+        try:
+            # Otra petición pudo terminar el cálculo entre la consulta al almacén y el registro
+            resultado = self.almacen.obtener(nombre, dia) or self.calcular(nombre, dia)
+        except BaseException as exc:
+            futuro.set_exception(exc)
+            raise
+        else:
+            futuro.set_result(resultado)
+        finally:
+            with self._lock_en_curso:
+                del self._en_curso[clave]
+        return resultado
+
+    def ejecutar_pendientes(self, ahora: Optional[datetime.datetime] = None) -> int:
+        """
+        Ejecuta los días pendientes de todos los trabajos y devuelve cuántos se completaron.
+
+        Si un día falla, no se avanza ese trabajo: se reintenta en la siguiente comprobación.
+        """
+        completados = 0
+        with self._lock_trabajos:
+            fallidos = set()
+            for nombre, dia in self.pendientes(ahora):
+                if nombre in fallidos or self._parar.is_set():
+                    continue
+                try:
+                    self.calcular(nombre, dia)
+                except Exception as exc:
+                    logger.error("Trabajo %s del %s falló: %s", nombre, dia, exc)
+                    self.errores[nombre] = f"{dia}: {exc}"
+                    fallidos.add(nombre)
+                    continue
+                self.errores.pop(nombre, None)
+                self.completados[nombre] = dia
+                self._escribir_estado()
+                completados += 1
+        return completados
+
+    def _bucle(self) -> None:
+        while not self._parar.is_set():
+            self.ejecutar_pendientes()
+            self._parar.wait(self.intervalo)
+
+    # ----------------------------------------
+    # Ciclo de vida
+    # ----------------------------------------
+    def calentar(self) -> None:
+        """Lee la configuración y abre el pool (y una sesión) de cada base."""
+        configuracion = obtener_configuracion()
+        for base in self.bases if self.bases is not None else tuple(configuracion):
+            try:
+                with self.abrir(base) as conn:
+                    conn.ping()
+                logger.info("Pool de %s listo", base)
+            except Exception as exc:
+                # Una base caída no impide servir los trabajos de las demás
+                logger.error("No se pudo abrir el pool de %s: %s", base, exc)
+
+    def iniciar(self) -> None:
+        """Calienta los pools, arranca el servidor HTTP y el planificador en segundo plano."""
+        self.iniciado = self.reloj()
+        self.calentar()
+        if self.puerto is not None:
+            self._servidor = ThreadingHTTPServer(("127.0.0.1", self.puerto), _crear_manejador(self))
+            self._servidor.daemon_threads = True
+            self.puerto = self._servidor.server_address[1]
+            self._hilos.append(threading.Thread(target=self._servidor.serve_forever, name="servicio-http", daemon=True))
+            logger.info("Servicio escuchando en http://127.0.0.1:%d", self.puerto)
+        self._hilos.append(threading.Thread(target=self._bucle, name="servicio-planificador", daemon=True))
+        for hilo in self._hilos:
+            hilo.start()
+
+    def detener(self) -> None:
+        """Detiene el planificador y el servidor, y cierra los pools."""
+        self._parar.set()
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+        for hilo in self._hilos:
+            hilo.join()
+        self._hilos.clear()
+        cerrar_pools()
+        logger.info("Servicio detenido")
+
+    def solicitar_parada(self) -> None:
+        """Pide al planificador y a `esperar` que terminen (seguro desde un manejador de señales)."""
+        self._parar.set()
+
+    def esperar(self) -> None:
+        """Bloquea hasta que se llame a `detener` (por ejemplo, desde una señal)."""
+        while not self._parar.wait(1.0):
+            pass
+
+    def salud(self) -> Dict[str, Any]:
+        """Estado del servicio y de cada trabajo."""
+        return {
+            "estado": "ok" if not self.errores else "degradado",
+            "iniciado": self.iniciado,
+            "trabajos": {
+                nombre: {"completado": self.completados.get(nombre), "error": self.errores.get(nombre)}
+                for nombre in self.trabajos
+            },
+        }
+
+
+def _crear_manejador(servicio: Servicio) -> type:
+    """Crea la clase de manejador HTTP enlazada a `servicio`."""
+
+    class Manejador(BaseHTTPRequestHandler):
+        def log_message(self, formato: str, *args: Any) -> None:
+            logger.debug("HTTP %s", formato % args)
+
+        def _responder(self, estado: int, cuerpo: Any) -> None:
+            datos = json.dumps(cuerpo, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            partes = [p for p in url.path.split("/") if p]
+            if partes == ["salud"]:
+                return self._responder(200, servicio.salud())
+            if partes == ["resultados"]:
+                return self._responder(200, servicio.almacen.indice())
+            if len(partes) != 2 or partes[0] != "resultados":
+                return self._responder(404, {"error": f"Ruta desconocida: {url.path}"})
+            nombre = partes[1]
+            if nombre not in servicio.trabajos:
+                return self._responder(404, {"error": f"Trabajo desconocido: {nombre}"})
+            dia = None
+            texto = parse_qs(url.query).get("dia", [None])[0]
+            if texto is not None:
+                try:
+                    dia = datetime.date.fromisoformat(texto)
+                except ValueError:
+                    return self._responder(400, {"error": f"Día no válido: {texto}"})
+            if dia is None:
+                resultado = servicio.almacen.obtener(nombre)
+            else:
+                intervalo = servicio.intervalo_a_demanda(nombre)
+                if intervalo is None or not intervalo[0] <= dia <= intervalo[1]:
+                    disponibles = f"de {intervalo[0]} a {intervalo[1]}" if intervalo else "ninguno todavía"
+                    return self._responder(400, {"error": f"Día fuera del intervalo ({disponibles}): {dia}"})
+                try:
+                    resultado = servicio.calcular_a_demanda(nombre, dia)
+                except Exception as exc:
+                    logger.error("Cálculo a demanda de %s del %s falló: %s", nombre, dia, exc)
+                    return self._responder(502, {"error": str(exc)})
+            if resultado is None:
+                return self._responder(404, {"error": f"Sin resultados de {nombre}"})
+            return self._responder(200, resultado._asdict())
+
+    return Manejador
+
+
+def main(argumentos: Optional[Sequence[str]] = None) -> None:
+    """Arranca el servicio con los trabajos del catálogo hasta recibir SIGINT o SIGTERM."""
+    parser = argparse.ArgumentParser(description="Servicio de estadísticas con pools calientes")
+    parser.add_argument("--puerto", type=int, default=PUERTO_POR_DEFECTO)
+    parser.add_argument("--hora", type=datetime.time.fromisoformat, default=HORA_POR_DEFECTO,
+                        help="hora de los trabajos diarios (HH:MM)")
+    parser.add_argument("--recuperar", type=int, default=7, help="días pendientes que se recuperan como máximo")
+    args = parser.parse_args(argumentos)
+
+    setup_logging()
+    trabajos = trabajos_del_catalogo(hora=args.hora)
+    if not trabajos:
+        logger.warning("Ninguna consulta del catálogo declara como único parámetro `dia`: no hay trabajos diarios")
+        raise SystemExit(2)
+    servicio = Servicio(trabajos, puerto=args.puerto, max_recuperacion_dias=args.recuperar)
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(senal, lambda *_: servicio.solicitar_parada())
+    servicio.iniciar()
+    try:
+        servicio.esperar()
+    finally:
+        servicio.detener()
+
+
+if __name__ == "__main__":
+    main()
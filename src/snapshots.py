@@ -0,0 +1,280 @@
+"""
+snapshots.py
+
+Copias locales (snapshots) de los datos extraídos cada día, en formato columnar, para volver a
+calcular estadísticas sin consultar la base de producción.
+
+Cada snapshot es una TablaColumnar (ver src/columnar.py) guardada en un directorio particionado:
+
+    snapshots/<base>/<consulta>/dia=2024-01-31/
+        meta.json                tipos, diccionarios de las columnas de texto y número de filas
+        <COLUMNA>.npy            una columna por fichero (formato 'npy'), o bien
+        datos.parquet            todas las columnas comprimidas (formato 'parquet')
+
+El formato 'npy' se lee con memoria mapeada (`numpy.load(mmap_mode="r")`): abrir un snapshot
+no copia los datos, y el sistema operativo solo carga las páginas que usa cada agregado. Las
+columnas de texto ya están codificadas con diccionario, así que ocupan 8 bytes por fila. El
+formato 'parquet' (si pyarrow está instalado) comprime las columnas y también se lee mapeado.
+
+Los snapshots se escriben en un directorio temporal que se renombra al terminar, de modo que
+nunca se lee uno a medio escribir.
+
+Funciones principales:
+- guardar_snapshot(tabla, base, consulta, dia): Guarda una TablaColumnar.
+- leer_snapshot(base, consulta, dia): Devuelve la TablaColumnar guardada.
+- tabla_del_dia(base, consulta, sql, params, dia): Lee el snapshot o, si no existe, consulta la
+  base y lo guarda.
+- dias_disponibles(base, consulta): Días con snapshot.
+
+Uso:
+    from src.snapshots import tabla_del_dia
+    tabla = tabla_del_dia("MEDIN", "altas", "SELECT centro, importe FROM altas WHERE TRUNC(fecha) = :dia",
+                          {"dia": dia}, dia)
+    tabla.agrupar("CENTRO", "IMPORTE", "sum")
+"""
+
+import datetime
+import decimal
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.collector import Abridor
+from src.columnar import TIPO_FECHA, TablaColumnar, consultar_columnar
+from src.connection import connection
+
+try:
+    import numpy as np
+except ImportError:  # sin NumPy no se pueden guardar ni leer snapshots
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: se usa el formato 'npy'
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_SNAPSHOTS = Path(__file__).parent.parent / "snapshots"
+
+FORMATOS = ("auto", "npy", "parquet")
+
+# Etiquetas de meta.json para los valores de diccionario que JSON no representa
+_ETIQUETAS = {
+    "$fechahora": datetime.datetime.fromisoformat,
+    "$fecha": datetime.date.fromisoformat,
+    "$hora": datetime.time.fromisoformat,
+    "$decimal": decimal.Decimal,
+    "$bytes": bytes.fromhex,
+}
+
+
+def _directorio_dia(base: str, consulta: str, dia: datetime.date, directorio: Optional[Path]) -> Path:
+    return (directorio or DIRECTORIO_SNAPSHOTS) / base / consulta / f"dia={dia.isoformat()}"
+
+
+def _codificar_valor(valor: Any) -> Any:
+    """Convierte un valor de diccionario a JSON; los tipos no nativos van como {etiqueta: texto}."""
+    if isinstance(valor, datetime.datetime):  # antes que date: datetime es subclase de date
+        return {"$fechahora": valor.isoformat()}
+    if isinstance(valor, datetime.date):
+        return {"$fecha": valor.isoformat()}
+    if isinstance(valor, datetime.time):
+        return {"$hora": valor.isoformat()}
+    if isinstance(valor, decimal.Decimal):
+        return {"$decimal": str(valor)}
+    if isinstance(valor, (bytes, bytearray)):
+        return {"$bytes": bytes(valor).hex()}
+    if valor is None or isinstance(valor, (str, int, float, bool)):
+        return valor
+    raise TypeError(f"Valor no serializable en un snapshot: {type(valor).__name__}")
+
+
+def _decodificar_valor(valor: Any) -> Any:
+    """Inversa de `_codificar_valor`."""
+    if isinstance(valor, dict):
+        ((etiqueta, texto),) = valor.items()
+        return _ETIQUETAS[etiqueta](texto)
+    return valor
+
+
+def _resolver_formato(formato: str) -> str:
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no válido '{formato}'; opciones: {FORMATOS}")
+    if np is None:
+        raise RuntimeError("Los snapshots necesitan NumPy (pip install numpy)")
+    if formato == "auto":
+        return "parquet" if pq is not None else "npy"
+    if formato == "parquet" and pq is None:
+        raise RuntimeError("El formato 'parquet' necesita pyarrow (pip install pyarrow)")
+    return formato
+
+
+def guardar_snapshot(
+    tabla: TablaColumnar,
+    base: str,
+    consulta: str,
+    dia: datetime.date,
+    formato: str = "auto",
+    directorio: Optional[Path] = None,
+) -> Path:
+    """
+    Guarda una TablaColumnar como snapshot del día, sustituyendo el anterior si existía.
+
+    Args:
+        tabla (TablaColumnar): Datos a guardar (construida con NumPy).
+        base (str): Base de datos de origen.
+        consulta (str): Nombre de la consulta o estadística.
+        dia (datetime.date): Día al que corresponden los datos.
+        formato (str): 'npy', 'parquet' o 'auto' (parquet si pyarrow está instalado).
+        directorio (Optional[Path]): Raíz de los snapshots; por defecto `snapshots/`.
+
+    Returns:
+        Path: Directorio del snapshot.
+
+    Raises:
+        RuntimeError: Si falta NumPy (o pyarrow para 'parquet').
+        ValueError: Si el formato no es válido.
+        TypeError: Si un diccionario contiene valores de un tipo que no se sabe guardar.
+    """
+    formato = _resolver_formato(formato)
+    destino = _directorio_dia(base, consulta, dia, directorio)
+    temporal = destino.with_name(destino.name + ".tmp")
+    shutil.rmtree(temporal, ignore_errors=True)
+    temporal.mkdir(parents=True)
+
+    columnas = {nombre: np.asarray(valores) for nombre, valores in tabla.columnas.items()}
+    if formato == "npy":
+        for nombre, valores in columnas.items():
+            np.save(temporal / f"{nombre}.npy", valores, allow_pickle=False)
+    else:
+        pq.write_table(
+            pa.table({nombre: pa.array(valores) for nombre, valores in columnas.items()}),
+            temporal / "datos.parquet",
+            compression="zstd",
+        )
+    meta = {
+        "formato": formato,
+        "filas": len(tabla),
+        "columnas": list(tabla.columnas),
+        "tipos": tabla.tipos,
+        # Fechas, decimales y binarios se guardan etiquetados para leerlos con su tipo
+        "diccionarios": {
+            nombre: [_codificar_valor(v) for v in valores] for nombre, valores in tabla.diccionarios.items()
+        },
+        "creado": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+    (temporal / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+    if destino.exists():
+        anterior = destino.with_name(destino.name + ".old")
+        shutil.rmtree(anterior, ignore_errors=True)
+        os.replace(destino, anterior)
+        os.replace(temporal, destino)
+        shutil.rmtree(anterior, ignore_errors=True)
+    else:
+        os.replace(temporal, destino)
+    logger.info("Snapshot %s/%s %s: %d filas (%s) en %s", base, consulta, dia, len(tabla), formato, destino)
+    return destino
+
+
+def leer_snapshot(
+    base: str, consulta: str, dia: datetime.date, directorio: Optional[Path] = None
+) -> TablaColumnar:
+    """
+    Lee un snapshot con memoria mapeada.
+
+    Returns:
+        TablaColumnar: Tabla cuyas columnas son arrays mapeados de solo lectura.
+
+    Raises:
+        FileNotFoundError: Si no hay snapshot de ese día.
+        RuntimeError: Si falta NumPy (o pyarrow para un snapshot 'parquet').
+    """
+    ruta = _directorio_dia(base, consulta, dia, directorio)
+    meta_ruta = ruta / "meta.json"
+    if not meta_ruta.exists():
+        raise FileNotFoundError(f"No hay snapshot de {base}/{consulta} para {dia} en {ruta}")
+    meta = json.loads(meta_ruta.read_text(encoding="utf-8"))
+    _resolver_formato(meta["formato"])
+
+    if meta["formato"] == "npy":
+        columnas = {n: np.load(ruta / f"{n}.npy", mmap_mode="r", allow_pickle=False) for n in meta["columnas"]}
+    else:
+        datos = pq.read_table(ruta / "datos.parquet", memory_map=True)
+        columnas = {}
+        for n in meta["columnas"]:
+            valores = datos.column(n).to_numpy()
+            if meta["tipos"][n] == TIPO_FECHA:
+                valores = valores.astype("datetime64[us]")
+            columnas[n] = valores
+    diccionarios = {
+        nombre: [_decodificar_valor(v) for v in valores] for nombre, valores in meta["diccionarios"].items()
+    }
+    return TablaColumnar(columnas, meta["tipos"], diccionarios)
+
+
+def dias_disponibles(base: str, consulta: str, directorio: Optional[Path] = None) -> List[datetime.date]:
+    """Devuelve, ordenados, los días que tienen snapshot completo."""
+    raiz = (directorio or DIRECTORIO_SNAPSHOTS) / base / consulta
+    if not raiz.exists():
+        return []
+    return sorted(
+        datetime.date.fromisoformat(d.name[len("dia="):])
+        for d in raiz.iterdir()
+        if d.name.startswith("dia=") and d.suffix == "" and (d / "meta.json").exists()
+    )
+
+
+def iterar_snapshots(
+    base: str,
+    consulta: str,
+    desde: Optional[datetime.date] = None,
+    hasta: Optional[datetime.date] = None,
+    directorio: Optional[Path] = None,
+) -> Iterator[Tuple[datetime.date, TablaColumnar]]:
+    """Entrega (día, tabla) de los snapshots entre `desde` y `hasta` (inclusive), en orden."""
+    for dia in dias_disponibles(base, consulta, directorio):
+        if (desde is None or dia >= desde) and (hasta is None or dia <= hasta):
+            yield dia, leer_snapshot(base, consulta, dia, directorio)
+
+
+def tabla_del_dia(
+    base: str,
+    consulta: str,
+    sql: str,
+    params: Optional[Dict[str, Any]],
+    dia: datetime.date,
+    abrir: Abridor = connection,
+    refrescar: bool = False,
+    formato: str = "auto",
+    directorio: Optional[Path] = None,
+) -> TablaColumnar:
+    """
+    Devuelve los datos del día desde su snapshot o, si no existe, los consulta y los guarda.
+
+    Args:
+        base, consulta, dia: Identifican el snapshot.
+        sql (str): Consulta con variables de enlace que devuelve los datos del día.
+        params (Optional[Dict[str, Any]]): Valores de las variables de enlace.
+        abrir (Abridor): Función que abre la conexión a partir del nombre de la base.
+        refrescar (bool): Si es True, consulta la base aunque exista el snapshot y lo sustituye.
+        formato (str): Formato del snapshot nuevo.
+        directorio (Optional[Path]): Raíz de los snapshots.
+
+    Returns:
+        TablaColumnar: Datos del día (mapeados desde disco).
+    """
+    if not refrescar:
+        try:
+            return leer_snapshot(base, consulta, dia, directorio)
+        except FileNotFoundError:
+            pass
+    with abrir(base) as conn:
+        tabla = consultar_columnar(conn, sql, params)
+    guardar_snapshot(tabla, base, consulta, dia, formato, directorio)
+    return leer_snapshot(base, consulta, dia, directorio)
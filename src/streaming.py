@@ -0,0 +1,112 @@
+"""
+streaming.py
+
+Lectura en streaming de resultados grandes, por lotes y con memoria acotada.
+
+Recorrer un cursor con `for fila in cursor` usa el `arraysize` por defecto (100 filas por ida y
+vuelta), y `fetchall()` carga el resultado entero en memoria. Para extracciones diarias de
+millones de filas, estas funciones piden las filas en lotes de tamaño ajustable y las entregan
+a medida que llegan, de modo que la memoria depende del tamaño del lote y no del número de filas.
+
+Funciones principales:
+- iterar_lotes(conn, sql, params): Generador de listas de filas de `arraysize` elementos.
+- iterar_filas(conn, sql, params): Generador de filas individuales (aplana iterar_lotes).
+
+Con `arraysize="auto"` el tamaño de lote se ajusta solo a partir del tamaño de fila y la
+latencia observados, y se recuerda por consulta (ver `src/ajuste_fetch.py`).
+
+Uso:
+    from src.streaming import iterar_filas
+    with medin_connection() as conn:
+        for fila in iterar_filas(conn, "SELECT * FROM eventos WHERE fecha = :f", {"f": dia}, arraysize=5000):
+            procesar(fila)
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from config import metricas
+
+# Filas por ida y vuelta si no se indica otra cosa
+ARRAYSIZE_POR_DEFECTO = 1000
+# Valor de `arraysize` que activa el ajuste automático
+ARRAYSIZE_AUTO = "auto"
+
+
+def iterar_lotes(
+    conn: Any,
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    arraysize: Union[int, str] = ARRAYSIZE_POR_DEFECTO,
+    prefetchrows: Optional[int] = None,
+) -> Iterator[List[tuple]]:
+    """
+    Ejecuta la consulta y entrega las filas en lotes de hasta `arraysize` elementos.
+
+    Args:
+        conn: Conexión abierta (por ejemplo, la de `medin_connection()`).
+        sql (str): Consulta con variables de enlace.
+        params (Optional[Dict[str, Any]]): Valores de las variables de enlace.
+        arraysize (Union[int, str]): Filas pedidas al servidor en cada ida y vuelta, o "auto"
+            para ajustarlas automáticamente (se ignora entonces `prefetchrows`).
+        prefetchrows (Optional[int]): Filas que llegan junto con la respuesta del execute.
+            Por defecto `arraysize + 1`, para que un resultado que cabe en un lote no necesite
+            una ida y vuelta adicional.
+
+    Yields:
+        List[tuple]: Lotes de filas no vacíos.
+
+    Raises:
+        ValueError: Si `arraysize` o `prefetchrows` no son válidos.
+        cx_Oracle.DatabaseError: Si la consulta falla.
+    """
+    if arraysize == ARRAYSIZE_AUTO:
+        # Importación diferida: ajuste_fetch depende de módulos que a su vez usan este
+        from src.ajuste_fetch import iterar_lotes_ajustados
+
+        yield from iterar_lotes_ajustados(conn, sql, params)
+        return
+    if not isinstance(arraysize, int) or arraysize < 1:
+        raise ValueError(f"arraysize debe ser positivo: {arraysize}")
+    if prefetchrows is None:
+        prefetchrows = arraysize + 1
+    if prefetchrows < 0:
+        raise ValueError(f"prefetchrows no puede ser negativo: {prefetchrows}")
+
+    cursor = conn.cursor()
+    try:
+        # Ambos valores deben fijarse antes del execute para que surtan efecto
+        cursor.arraysize = arraysize
+        cursor.prefetchrows = prefetchrows
+        with metricas.cronometro("consulta.execute"):
+            cursor.execute(sql, params or {})
+        filas = bytes_leidos = 0
+        while True:
+            with metricas.cronometro("consulta.fetch"):
+                lote = cursor.fetchmany(arraysize)
+            if not lote:
+                break
+            if metricas.habilitado():
+                filas += len(lote)
+                bytes_leidos += metricas.tamano_aproximado(lote)
+            yield lote
+        metricas.registrar("consulta.filas", filas)
+        metricas.registrar("consulta.bytes", bytes_leidos)
+    finally:
+        cursor.close()
+
+
+def iterar_filas(
+    conn: Any,
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    arraysize: Union[int, str] = ARRAYSIZE_POR_DEFECTO,
+    prefetchrows: Optional[int] = None,
+) -> Iterator[tuple]:
+    """
+    Igual que `iterar_lotes`, pero entrega las filas de una en una.
+
+    Yields:
+        tuple: Cada fila del resultado.
+    """
+    for lote in iterar_lotes(conn, sql, params, arraysize, prefetchrows):
+        yield from lote
@@ -0,0 +1,112 @@
+"""
+Archivo de pruebas automáticas para agregacion.py
+
+Este archivo valida la agregación en paralelo por procesos:
+- Comprueba que HyperLogLog y t-digest estiman distintos y percentiles con error acotado y se pueden combinar.
+- Verifica que los lotes se agregan igual en el propio proceso que en procesos trabajadores.
+- Asegura que los agregados se calculan por cada valor de la clave (tabla cruzada).
+"""
+import pickle
+import random
+
+import pytest
+
+from src import agregacion
+
+
+def test_resumenes_combinables():
+    """
+    Prueba que los resúmenes calculados por partes y combinados dan el resultado del conjunto completo.
+
+    Teoría:
+    Un agregado es combinable si el resultado de dos partes se puede unir sin volver a ver los datos.
+    Es lo que permite repartir los lotes entre procesos y juntar solo los resúmenes.
+
+    ¿Qué hace este test?
+    - Construye dos HyperLogLog y dos t-digest con mitades de los datos y los combina.
+    - Verifica que el número de distintos tiene un error inferior al 5 %.
+    - Verifica que la mediana y el p99 están cerca de los exactos.
+    """
+    rnd = random.Random(7)
+    valores = [rnd.random() * 1000 for _ in range(20000)]
+    hll_a, hll_b = agregacion.HyperLogLog(), agregacion.HyperLogLog()
+    td_a, td_b = agregacion.TDigest(), agregacion.TDigest()
+    for i, v in enumerate(valores):
+        (hll_a if i % 2 else hll_b).agregar_bytes(str(int(v)).encode())
+        (td_a if i % 2 else td_b).agregar(v)
+    hll_a.combinar(hll_b)
+    td_a.combinar(td_b)
+    assert hll_a.estimar() == pytest.approx(len({int(v) for v in valores}), rel=0.05)
+    ordenados = sorted(valores)
+    assert td_a.percentil(50) == pytest.approx(ordenados[10000], rel=0.02)
+    assert td_a.percentil(99) == pytest.approx(ordenados[19800], rel=0.01)
+    assert td_a.percentil(100) == max(valores)
+    with pytest.raises(ValueError):
+        hll_a.combinar(agregacion.HyperLogLog(precision=10))
+
+
+def test_hyperloglog_disperso():
+    """
+    Prueba que un HyperLogLog con pocos valores ocupa poco y da la misma estimación que el denso.
+
+    Teoría:
+    Con clave, cada grupo lleva su propio HyperLogLog y todos viajan de vuelta desde los procesos.
+    Guardar solo los registros no nulos mientras son pocos hace que un grupo pequeño no pague los
+    2^precision bytes del registro denso.
+
+    ¿Qué hace este test?
+    - Añade 50 valores y verifica que se serializa en menos de 1 KB (el denso ocupa 4 KB).
+    - Añade 5.000 valores a otro y verifica que pasa a la forma densa.
+    - Combina disperso con denso en ambos sentidos y compara con el conjunto completo.
+    """
+    pequeno, grande = agregacion.HyperLogLog(), agregacion.HyperLogLog()
+    for i in range(50):
+        pequeno.agregar_bytes(f"p{i}".encode())
+    for i in range(5000):
+        grande.agregar_bytes(f"g{i}".encode())
+    assert pequeno.registros is None and len(pickle.dumps(pequeno)) < 1024
+    assert grande.registros is not None
+    assert pequeno.estimar() == pytest.approx(50, rel=0.05)
+
+    ambos = agregacion.HyperLogLog()
+    ambos.combinar(pequeno)
+    ambos.combinar(grande)
+    grande.combinar(pequeno)
+    assert ambos.registros == grande.registros
+    assert grande.estimar() == pytest.approx(5050, rel=0.05)
+
+
+@pytest.mark.parametrize("max_procesos", [0, 2])
+def test_agregador_procesos(max_procesos):
+    """
+    Prueba que AgregadorProcesos agrega por clave lotes con nulos y columnas de texto.
+
+    Teoría:
+    Con procesos trabajadores el GIL deja de limitar el cálculo a un núcleo. Cada proceso devuelve
+    parciales combinables, así que el resultado no depende de cómo se repartan los lotes.
+
+    ¿Qué hace este test?
+    - Envía varios lotes de filas (centro, paciente, importe) con algunos nulos.
+    - Verifica conteo, nulos, suma, mínimo y máximo exactos por centro.
+    - Verifica que los distintos y la mediana son aproximados y que el texto no tiene percentiles.
+    """
+    filas = [(i % 3, None if i % 10 == 0 else f"p{i % 50}", float(i)) for i in range(3000)]
+    with agregacion.AgregadorProcesos(
+        ["CENTRO", "PACIENTE", "IMPORTE"], ["PACIENTE", "IMPORTE"], clave="CENTRO", max_procesos=max_procesos
+    ) as agregador:
+        for inicio in range(0, len(filas), 500):
+            agregador.enviar(filas[inicio:inicio + 500])
+        resultado = agregador.resultado()
+
+    assert sorted(resultado) == [0, 1, 2]
+    importe = resultado[1]["IMPORTE"]
+    esperados = [f[2] for f in filas if f[0] == 1]
+    assert (importe.conteo, importe.suma) == (len(esperados), sum(esperados))
+    assert (importe.minimo, importe.maximo) == (1.0, 2998.0)
+    assert importe.percentil(50) == pytest.approx(1500, rel=0.02)
+    paciente = resultado[1]["PACIENTE"]
+    assert paciente.nulos == sum(1 for f in filas if f[0] == 1 and f[1] is None)
+    assert paciente.distintos() == len({f[1] for f in filas if f[0] == 1 and f[1] is not None})
+    assert paciente.percentil(50) != paciente.percentil(50)  # NaN
+    with pytest.raises(ValueError):
+        agregacion.AgregadorProcesos(["A"], ["B"], max_procesos=0)
@@ -0,0 +1,195 @@
+"""
+Archivo de pruebas automáticas para agregacion_externa.py
+
+Este archivo valida la agrupación con memoria acotada:
+- Comprueba que el resultado es el mismo en memoria y con volcados a particiones en disco.
+- Verifica que las particiones demasiado grandes se reparten de nuevo sin perder claves.
+- Asegura que los distintos de una clave muy frecuente se reparten por (clave, valor) sin romper el presupuesto.
+- Asegura que la salida ordenada está ordenada y que los temporales se borran.
+- Verifica que las claves enteras con patrón se reparten por igual entre particiones.
+
+Se usan listas de filas generadas, sin base de datos real.
+"""
+import random
+import tracemalloc
+
+import pytest
+
+from src import agregacion_externa
+from src.agregacion_externa import AgregacionExterna, agrupar_externo
+
+AGREGADOS = {
+    "filas": ("conteo", None),
+    "usuarios": ("distintos", 1),
+    "total": ("suma", 2),
+    "minimo": ("min", 2),
+    "maximo": ("max", 2),
+}
+
+
+def _filas(n):
+    rnd = random.Random(7)
+    return [(f"c{rnd.randrange(300)}", f"u{rnd.randrange(2000)}", rnd.randrange(1000)) for _ in range(n)] + [
+        ("c0", None, None)
+    ]
+
+
+def _esperado(filas):
+    esperado = {}
+    for categoria, usuario, importe in filas:
+        e = esperado.setdefault(categoria, {"filas": 0, "usuarios": set(), "total": 0, "minimo": None, "maximo": None})
+        e["filas"] += 1
+        if usuario is not None:
+            e["usuarios"].add(usuario)
+        if importe is not None:
+            e["total"] += importe
+            e["minimo"] = importe if e["minimo"] is None else min(e["minimo"], importe)
+            e["maximo"] = importe if e["maximo"] is None else max(e["maximo"], importe)
+    return {c: {**e, "usuarios": len(e["usuarios"])} for c, e in esperado.items()}
+
+
+@pytest.mark.parametrize("memoria_maxima", [10**9, 20_000])
+def test_resultado_igual_en_memoria_y_con_volcados(memoria_maxima, tmp_path):
+    """
+    Prueba que los volcados a disco no cambian el resultado de la agrupación.
+
+    Teoría:
+    Si los estados parciales son combinables (sumas, mínimos, uniones de conjuntos), se pueden
+    volcar a disco cuando no caben y combinar después. Repartirlos por el hash de la clave hace
+    que cada clave se combine dentro de una sola partición, que sí cabe en memoria.
+
+    ¿Qué hace este test?
+    - Agrupa 20.000 filas por categoría con conteo, distintos, suma, mínimo y máximo.
+    - Con un presupuesto de 20 KB, verifica que hay varios volcados.
+    - Verifica que el resultado coincide con el calculado con diccionarios y que los nulos se ignoran.
+    """
+    filas = _filas(20_000)
+    with AgregacionExterna((0,), AGREGADOS, memoria_maxima=memoria_maxima, particiones=4, directorio=tmp_path) as a:
+        for i in range(0, len(filas), 1000):
+            a.agregar(filas[i:i + 1000])
+        resultado = dict(a.resultados())
+        assert a.filas == len(filas)
+        assert (a.volcados > 1) == (memoria_maxima < 10**6)
+    assert resultado == _esperado(filas)
+    assert list(tmp_path.iterdir()) == []  # los temporales se borran
+
+
+def test_reparto_recursivo_y_salida_ordenada(tmp_path, monkeypatch):
+    """
+    Prueba que una partición que no cabe se reparte de nuevo y que la salida ordenada es correcta.
+
+    Teoría:
+    Con muchas claves y un presupuesto muy pequeño, una partición de primer nivel puede seguir sin
+    caber; repartirla con otra semilla del hash la divide en trozos más pequeños. Como las claves de
+    cada trozo son disjuntas, ordenarlos por separado y mezclarlos da la salida ordenada completa.
+
+    ¿Qué hace este test?
+    - Agrupa con clave compuesta (dos columnas), 2 particiones y un presupuesto de 5 KB.
+    - Cuenta las particiones de segundo nivel que se crean.
+    - Verifica que las claves salen ordenadas y que los conteos coinciden con los esperados.
+    """
+    creadas = []
+    original = agregacion_externa._Particiones.__init__
+
+    def espiar(self, directorio, prefijo, n, semilla):
+        creadas.append(semilla)
+        original(self, directorio, prefijo, n, semilla)
+
+    monkeypatch.setattr(agregacion_externa._Particiones, "__init__", espiar)
+    filas = [(i % 97, i % 13, i) for i in range(5000)]
+    resultado = list(
+        agrupar_externo(
+            filas, (0, 1), {"n": ("conteo", None), "suma": ("suma", 2)}, ordenado=True,
+            memoria_maxima=5_000, particiones=2, directorio=tmp_path,
+        )
+    )
+    assert any(semilla > 0 for semilla in creadas)
+    claves = [clave for clave, _ in resultado]
+    assert claves == sorted(claves) and len(claves) == len(set((i % 97, i % 13) for i in range(5000)))
+    esperado = {}
+    for a, b, v in filas:
+        n, s = esperado.get((a, b), (0, 0))
+        esperado[(a, b)] = (n + 1, s + v)
+    assert {clave: (v["n"], v["suma"]) for clave, v in resultado} == esperado
+
+
+def test_memoria_acotada_y_errores(tmp_path):
+    """
+    Prueba que el pico de memoria no crece con la entrada y que las opciones inválidas se rechazan.
+
+    Teoría:
+    El objetivo de la agregación externa es que la memoria dependa del presupuesto y no del número
+    de claves: la entrada se consume en streaming y lo que no cabe va a disco.
+
+    ¿Qué hace este test?
+    - Agrupa 20.000 filas con claves todas distintas y un presupuesto de 256 KB.
+    - Verifica que el pico medido con tracemalloc queda muy por debajo de lo que ocuparía en memoria.
+    - Verifica los errores por función desconocida, posición ausente y uso tras entregar resultados.
+    """
+    tracemalloc.start()
+    with AgregacionExterna((0,), {"usuarios": ("distintos", 1)}, memoria_maxima=2**18, directorio=tmp_path) as a:
+        a.agregar((i, f"usuario{i % 7}") for i in range(20_000))
+        claves = sum(1 for _ in a.resultados())
+        _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert claves == 20_000
+    assert a.volcados > 1
+    assert pico < 2 * 2**20  # en memoria serían unos 7 MB
+
+    with pytest.raises(ValueError, match="mediana"):
+        AgregacionExterna((0,), {"x": ("mediana", 1)}, directorio=tmp_path)
+    with pytest.raises(ValueError, match="posición"):
+        AgregacionExterna((0,), {"x": ("suma", None)}, directorio=tmp_path)
+    with AgregacionExterna((0,), {"n": ("conteo", None)}, directorio=tmp_path) as a:
+        list(a.resultados())
+        with pytest.raises(RuntimeError):
+            a.agregar([(1,)])
+
+
+def test_distintos_de_una_clave_muy_frecuente(tmp_path):
+    """
+    Prueba que los distintos de una sola clave muy frecuente no rompen el presupuesto de memoria.
+
+    Teoría:
+    Repartir por la clave no divide el conjunto de distintos de una clave: todos sus valores caerían en la
+    misma partición. Repartiendo los pares (clave, valor) por su hash, cada partición recibe una parte de
+    los valores, se deduplica por separado y solo se suman conteos por clave.
+
+    ¿Qué hace este test?
+    - Agrupa 50.000 filas de una única categoría con 40.000 usuarios distintos y un presupuesto de 256 KB.
+    - Verifica el número exacto de distintos y que hubo volcados.
+    - Verifica que el pico medido con tracemalloc queda por debajo de 1,5 MB (el conjunto en memoria ocupa unos 4 MB).
+    """
+    tracemalloc.start()
+    with AgregacionExterna((0,), {"usuarios": ("distintos", 1)}, memoria_maxima=2**18, particiones=8,
+                           directorio=tmp_path) as a:
+        a.agregar(("cat", f"usuario{i % 40_000}") for i in range(50_000))
+        resultado = list(a.resultados())
+        _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert resultado == [("cat", {"usuarios": 40_000})]
+    assert a.volcados > 1
+    assert pico < 1.5 * 2**20
+
+
+def test_claves_enteras_se_reparten_por_igual(tmp_path):
+    """
+    Prueba que claves enteras con un patrón (múltiplos del número de particiones) se reparten por igual.
+
+    Teoría:
+    `hash()` de un entero es el propio número y el de una tupla pequeña apenas mezcla los bits bajos: con
+    `hash((semilla, clave)) % n`, los múltiplos de n caen en pocas particiones y repartirlas de nuevo con otra
+    semilla las vuelve a juntar. Mezclar el hash (splitmix64) reparte cada nivel de forma independiente.
+
+    ¿Qué hace este test?
+    - Cuenta 40.000 claves múltiplos de 32 con 4 particiones y un presupuesto de 128 KB.
+    - Verifica que salen todas las claves y que el pico queda por debajo de 512 KB (con el hash sin mezclar pasa de 1 MB).
+    """
+    tracemalloc.start()
+    with AgregacionExterna((0,), {"n": ("conteo", None)}, memoria_maxima=2**17, particiones=4, directorio=tmp_path) as a:
+        a.agregar((i * 32, 1) for i in range(40_000))
+        claves = sum(1 for _ in a.resultados())
+        _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert claves == 40_000
+    assert pico < 2**19
@@ -0,0 +1,128 @@
+"""
+Archivo de pruebas automáticas para ajuste_fetch.py
+
+Este archivo valida el ajuste automático del tamaño de lote:
+- Comprueba la regla de decisión: lotes grandes si domina la latencia, acotados por la memoria si las filas son anchas.
+- Verifica que el coste fijo y el coste por fila se estiman a partir de lotes de dos tamaños y que la decisión se guarda y se registra en el log.
+- Asegura que `iterar_lotes(..., arraysize="auto")` entrega todas las filas y que la siguiente ejecución empieza con el tamaño aprendido.
+- Comprueba que un fichero de estado corrupto no impide crear el ajustador y que se sustituye al guardar.
+
+Se usa el driver simulado `benchmarks.fake_cx_oracle` con latencia por ida y vuelta.
+"""
+import logging
+
+from benchmarks import fake_cx_oracle
+from src import ajuste_fetch
+from src.ajuste_fetch import AjustadorFetch, clave_consulta
+from src.streaming import iterar_lotes
+
+
+def test_recomendar():
+    """
+    Prueba la regla que elige el tamaño de lote.
+
+    Teoría:
+    Cada lote cuesta una ida y vuelta fija más un coste por fila. Para que la ida y vuelta no pese más de un 5 % del
+    tiempo del lote, el lote debe tener al menos ida_vuelta * 0.95 / (0.05 * por_fila) filas; pero un lote no puede
+    ocupar más memoria de la permitida.
+
+    ¿Qué hace este test?
+    - Con 5 ms por ida y vuelta y 10 us por fila, verifica que se eligen 9500 filas.
+    - Con filas de 100 KB y 16 MB por lote, verifica que el límite de memoria manda (167 filas).
+    - Sin coste por fila medible, verifica que se usa el máximo; y que nunca se baja del mínimo.
+    """
+    ajustador = AjustadorFetch()
+    assert ajustador.recomendar(20, 0.005, 1e-5) == 9500
+    assert ajustador.recomendar(100_000, 0.005, 1e-5) == 167
+    assert ajustador.recomendar(20, 0.005, 0.0) == 100_000
+    assert ajustador.recomendar(20, 0.0, 1e-5) == 100
+
+
+def test_aprender_y_persistir(tmp_path, caplog):
+    """
+    Prueba que el ajustador estima los costes, decide, lo registra en el log y lo recuerda entre procesos.
+
+    ¿Qué hace este test?
+    - Le pasa muestras de lotes de 1000 y 2000 filas con t = 5 ms + filas * 10 us y 30 bytes por fila.
+    - Verifica las estimaciones, el arraysize elegido y el mensaje de log con la decisión.
+    - Crea otro ajustador sobre el mismo fichero y verifica que recupera los parámetros aprendidos.
+    """
+    ruta = tmp_path / "ajuste.json"
+    ajustador = AjustadorFetch(ruta)
+    muestras = [(1000, 0.015, 30_000), (2000, 0.025, 60_000), (1000, 0.015, 30_000)]
+    with caplog.at_level(logging.INFO, logger="src.ajuste_fetch"):
+        nuevo = ajustador.aprender("altas", muestras, anterior=1000)
+    assert round(nuevo.bytes_fila) == 30
+    assert abs(nuevo.segundos_ida_vuelta - 0.005) < 1e-9 and abs(nuevo.segundos_fila - 1e-5) < 1e-12
+    assert nuevo.arraysize == 9500 and nuevo.prefetchrows == 9501
+    assert "arraysize 9500 (antes 1000)" in caplog.text
+
+    assert AjustadorFetch(ruta).parametros("altas") == nuevo
+    assert AjustadorFetch(ruta).parametros("otra").arraysize == ajuste_fetch.ARRAYSIZE_INICIAL
+    # Un solo tamaño de lote no permite separar los costes: no se decide nada
+    assert ajustador.aprender("altas", muestras[:1], anterior=1000) is None
+
+
+def test_iterar_lotes_auto(tmp_path, monkeypatch):
+    """
+    Prueba el modo automático de principio a fin con el driver simulado y un reloj virtual.
+
+    Teoría:
+    El driver pide al servidor `arraysize` filas por ida y vuelta, así que cada lote medido debe pedirse con
+    `cursor.arraysize` igual a su tamaño; si no, el lote doble costaría dos idas y vueltas y el coste fijo
+    parecería nulo. Con un reloj virtual que avanza con la latencia simulada, la medida es exacta y no
+    depende de la carga de la máquina.
+
+    ¿Qué hace este test?
+    - Simula 2 ms por ida y vuelta y 1 us por fila, un caso dominado por la latencia.
+    - Lee 20 000 filas con arraysize="auto" y verifica que llegan todas, en orden.
+    - Verifica que se aprende exactamente 2 ms * 0.95 / (0.05 * 1 us) = 38 000 filas y que el último lote ya lo usa.
+    - Verifica que la siguiente ejecución empieza con el tamaño aprendido: todo llega en un lote.
+    """
+    reloj = [0.0]
+
+    def dormir(segundos):
+        reloj[0] += segundos
+
+    ajustador = AjustadorFetch(tmp_path / "ajuste.json", reloj=lambda: reloj[0])
+    monkeypatch.setattr(ajuste_fetch, "obtener_ajustador", lambda: ajustador)
+    monkeypatch.setattr(fake_cx_oracle, "DORMIR", dormir)
+    monkeypatch.setattr(fake_cx_oracle, "LATENCIA_IDA_VUELTA", 0.002)
+    monkeypatch.setattr(fake_cx_oracle, "LATENCIA_FILA", 1e-6)
+    monkeypatch.setattr(fake_cx_oracle, "FILAS_POR_DEFECTO", 20_000)
+    sql = "SELECT id, categoria, importe FROM eventos"
+
+    lotes = list(iterar_lotes(fake_cx_oracle.Connection(), sql, arraysize="auto"))
+    assert [f[0] for lote in lotes for f in lote] == list(range(20_000))
+    aprendido = ajustador.parametros(clave_consulta(sql))
+    assert abs(aprendido.segundos_ida_vuelta - 0.002) < 1e-9
+    assert aprendido.arraysize == 38_000
+    # 1000 filas con el execute y 1000 + 2000 + 1000 + 2000 medidas
+    assert [len(l) for l in lotes] == [1000, 1000, 2000, 1000, 2000, 13_000]
+
+    assert len(list(iterar_lotes(fake_cx_oracle.Connection(), sql, arraysize="auto"))) == 1
+
+
+def test_estado_corrupto(tmp_path, caplog):
+    """
+    Prueba que un fichero de estado truncado se ignora con un aviso en lugar de romper las consultas.
+
+    Teoría:
+    El estado aprendido es solo una optimización: si el fichero está dañado (por ejemplo, por un corte durante una
+    escritura antigua), lo correcto es empezar con los valores iniciales y volver a aprender, no fallar.
+
+    ¿Qué hace este test?
+    - Escribe un JSON truncado y crea el ajustador; verifica el aviso y los parámetros iniciales.
+    - Aprende una consulta y verifica que el fichero vuelve a ser válido y que no quedan temporales.
+    """
+    ruta = tmp_path / "ajuste.json"
+    ruta.write_text('{"altas": {"arraysize": 95', encoding="utf-8")
+    with caplog.at_level(logging.WARNING, logger="src.ajuste_fetch"):
+        ajustador = AjustadorFetch(ruta)
+    assert "ilegible" in caplog.text
+    assert ajustador.parametros("altas").arraysize == ajuste_fetch.ARRAYSIZE_INICIAL
+
+    muestras = [(1000, 0.015, 30_000), (2000, 0.025, 60_000)]
+    nuevo = ajustador.aprender("altas", muestras, anterior=1000)
+    assert AjustadorFetch(ruta).parametros("altas") == nuevo
+    assert [p.name for p in tmp_path.iterdir()] == ["ajuste.json"]
@@ -0,0 +1,182 @@
+"""
+Archivo de pruebas automáticas para async_connection.py
+
+Este archivo valida la API asíncrona sobre las conexiones del pool:
+- Comprueba que fetch_all devuelve las filas y devuelve la sesión al salir.
+- Verifica que un timeout cancela la consulta en el servidor, sin bloquear el bucle, y aun así devuelve la sesión.
+- Asegura que muchas consultas concurrentes no bloquean el bucle de eventos.
+
+Se sustituye `connection` por una versión simulada, sin bases de datos reales.
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from src import async_connection
+
+
+class ConexionSimulada:
+    """
+    Conexión simulada cuya consulta tarda `latencia` segundos, salvo que se cancele antes.
+    """
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.cancelada = threading.Event()
+
+    def cursor(self):
+        conn = self
+        class Cursor:
+            def execute(self, sql, params):
+                # Espera la latencia o hasta que llegue conn.cancel()
+                if conn.cancelada.wait(conn.latencia):
+                    raise RuntimeError("ORA-01013: user requested cancel of current operation")
+                self.fila = (sql, params)
+            def fetchall(self):
+                return [self.fila]
+            def close(self):
+                pass
+        return Cursor()
+
+    def cancel(self):
+        self.hilo_cancel = threading.current_thread()
+        self.cancelada.set()
+
+
+@pytest.fixture
+def sesiones(monkeypatch):
+    """
+    Sustituye `connection` por un context manager simulado y registra sesiones prestadas y devueltas.
+    """
+    registro = {"prestadas": 0, "devueltas": 0, "latencia": 0.05}
+
+    @contextmanager
+    def connection_simulada(nombre):
+        if nombre not in ("MEDIN", "Simbad"):
+            raise KeyError(nombre)
+        registro["prestadas"] += 1
+        conn = ConexionSimulada(registro["latencia"])
+        registro.setdefault("conexiones", []).append(conn)
+        try:
+            yield conn
+        finally:
+            registro["devueltas"] += 1
+
+    monkeypatch.setattr(async_connection, "connection", connection_simulada)
+    yield registro
+    async_connection.cerrar_executor()
+
+
+def test_fetch_all_ok(sesiones):
+    """
+    Prueba que fetch_all devuelve las filas de la consulta y devuelve la sesión al pool.
+
+    Teoría:
+    Un bucle asyncio no debe ejecutar código bloqueante. Delegar cada llamada a cx_Oracle en un executor de hilos permite esperar su resultado con `await` sin detener el resto de tareas.
+
+    ¿Qué hace este test?
+    - Ejecuta fetch_all contra Simbad y con amedin_connection().
+    - Verifica las filas obtenidas y que todas las sesiones prestadas se han devuelto.
+    """
+    async def escenario():
+        filas = await async_connection.fetch_all("SELECT :x FROM DUAL", {"x": 1}, base="Simbad")
+        async with async_connection.amedin_connection() as conn:
+            otras = await conn.fetch_all("SELECT 2 FROM DUAL")
+        return filas, otras
+
+    filas, otras = asyncio.run(escenario())
+    assert filas == [("SELECT :x FROM DUAL", {"x": 1})]
+    assert otras == [("SELECT 2 FROM DUAL", {})]
+    assert sesiones["prestadas"] == sesiones["devueltas"] == 2
+
+
+def test_timeout_cancela_consulta(sesiones):
+    """
+    Prueba que un timeout cancela la consulta en curso y devuelve la sesión.
+
+    Teoría:
+    Cancelar la tarea asyncio no detiene el hilo que espera a Oracle. Por eso, al vencer el timeout se llama a `conn.cancel()`, que interrumpe la llamada en el servidor, y se espera a que el hilo termine antes de devolver la sesión.
+
+    ¿Qué hace este test?
+    - Configura una consulta que tardaría 5 segundos.
+    - Ejecuta fetch_all con timeout de 0.1 segundos.
+    - Verifica que se lanza TimeoutError rápidamente y que la sesión se devuelve.
+    - Verifica que `conn.cancel()` se ejecutó en un hilo del executor y no en el del bucle.
+    """
+    sesiones["latencia"] = 5
+    inicio = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(async_connection.fetch_all("SELECT lenta FROM DUAL", timeout=0.1))
+    assert time.perf_counter() - inicio < 2
+    assert sesiones["prestadas"] == sesiones["devueltas"] == 1
+    hilo = sesiones["conexiones"][0].hilo_cancel
+    assert hilo is not threading.main_thread()
+    assert hilo.name.startswith("oracle-async")
+
+
+def test_concurrencia_no_bloquea_el_bucle(sesiones):
+    """
+    Prueba que muchas consultas concurrentes se solapan y el bucle sigue respondiendo.
+
+    ¿Qué hace este test?
+    - Lanza 16 consultas de 50 ms a la vez con el executor por defecto (8 hilos).
+    - Verifica que el tiempo total es muy inferior a ejecutarlas en serie (0.8 s).
+    """
+    async def escenario():
+        return await asyncio.gather(*(async_connection.fetch_all(f"SELECT {i} FROM DUAL") for i in range(16)))
+
+    inicio = time.perf_counter()
+    resultados = asyncio.run(escenario())
+    assert len(resultados) == 16
+    assert time.perf_counter() - inicio < 0.5
+
+
+def test_mas_tareas_que_sesiones(sesiones, monkeypatch):
+    """
+    Prueba que más tareas que sesiones no agotan los hilos del executor ni se bloquean.
+
+    Teoría:
+    Adquirir una sesión de un pool lleno bloquea el hilo hasta que otra se devuelve. Si las tareas
+    que esperan ocupan todos los hilos del executor, las que ya tienen sesión no pueden consultar
+    ni devolverla y todo se detiene. Un semáforo asyncio con el número de sesiones hace que las
+    tareas sobrantes esperen en el bucle, sin ocupar hilos.
+
+    ¿Qué hace este test?
+    - Simula un pool de 2 sesiones cuya adquisición bloquea, y un executor de 2 hilos.
+    - Lanza 12 consultas concurrentes y verifica que todas terminan y nunca hay más de 2 sesiones.
+    - Verifica que el error de una consulta llega al context manager de la sesión (para descartarla).
+    """
+    monkeypatch.setenv("ASYNC_MAX_HILOS", "2")
+    monkeypatch.setattr(async_connection, "limite_sesiones", lambda nombre: 2)
+    async_connection.cerrar_executor()
+    libres = threading.BoundedSemaphore(2)
+    errores = []
+
+    @contextmanager
+    def pool_lleno(nombre):
+        libres.acquire()  # como SPOOL_ATTRVAL_WAIT: espera una sesión libre
+        try:
+            yield ConexionSimulada(0.01)
+        except Exception as exc:
+            errores.append(exc)
+            raise
+        finally:
+            libres.release()
+
+    monkeypatch.setattr(async_connection, "connection", pool_lleno)
+
+    async def escenario():
+        consultas = [async_connection.fetch_all(f"SELECT {i} FROM DUAL") for i in range(12)]
+        return await asyncio.wait_for(asyncio.gather(*consultas), 5)
+
+    assert len(asyncio.run(escenario())) == 12
+
+    async def fallida():
+        async with async_connection.amedin_connection():
+            raise RuntimeError("ORA-03113: end-of-file on communication channel")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(fallida())
+    assert [str(e) for e in errores] == ["ORA-03113: end-of-file on communication channel"]
@@ -0,0 +1,112 @@
+"""
+Archivo de pruebas automáticas para backfill.py
+
+Este archivo valida la extracción de rangos de fechas en particiones:
+- Comprueba que el rango se divide en particiones de un día o una semana sin huecos ni solapes.
+- Verifica que las particiones se ejecutan en paralelo y las filas se entregan en orden de fecha.
+- Asegura que un backfill interrumpido se reanuda solo con las particiones pendientes.
+
+Se usa el driver simulado `benchmarks.fake_cx_oracle`, sin base de datos real.
+"""
+import datetime
+from contextlib import contextmanager
+
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src import backfill
+
+D = datetime.date
+
+
+def _filas_por_dia(sql, params):
+    """Tres filas (día, n) por cada día del intervalo [desde, hasta)."""
+    dia = params["desde"]
+    while dia < params["hasta"]:
+        for n in range(3):
+            yield (dia, n)
+        dia += datetime.timedelta(days=1)
+
+
+def test_particionar():
+    """
+    Prueba que particionar cubre el rango completo con intervalos semiabiertos consecutivos.
+
+    ¿Qué hace este test?
+    - Divide 10 días por semanas y verifica que la última partición es más corta.
+    - Verifica que cada partición empieza donde termina la anterior.
+    - Verifica que una granularidad desconocida o un rango invertido lanzan ValueError.
+    """
+    semanas = backfill.particionar(D(2024, 1, 1), D(2024, 1, 10), "semana")
+    assert [(p.desde, p.hasta) for p in semanas] == [
+        (D(2024, 1, 1), D(2024, 1, 8)), (D(2024, 1, 8), D(2024, 1, 11)),
+    ]
+    dias = backfill.particionar(D(2024, 1, 1), D(2024, 1, 10))
+    assert len(dias) == 10
+    assert all(a.hasta == b.desde for a, b in zip(dias, dias[1:]))
+    with pytest.raises(ValueError):
+        backfill.particionar(D(2024, 1, 1), D(2024, 1, 10), "hora")
+    with pytest.raises(ValueError):
+        backfill.particionar(D(2024, 1, 10), D(2024, 1, 1))
+
+
+def test_backfill_reanudable(monkeypatch, tmp_path):
+    """
+    Prueba que un backfill con particiones fallidas se reanuda sin repetir las completadas.
+
+    Teoría:
+    Un backfill de meses puede tardar horas. Guardar cada partición terminada y anotarla en un punto de
+    control permite que una interrupción solo cueste repetir las particiones en curso.
+
+    ¿Qué hace este test?
+    - Ejecuta un backfill de 6 días en el que falla la partición del día 3.
+    - Verifica que el resto se completa y que leer los resultados lanza RuntimeError.
+    - Reanuda con otra instancia y verifica que solo se ejecuta la partición pendiente.
+    - Verifica que las filas se entregan en orden de fecha y se pueden volcar a un escritor.
+    """
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", _filas_por_dia)
+    ejecutadas = []
+    fallar = {D(2024, 1, 3)}
+
+    @contextmanager
+    def abrir(base):
+        yield fake_cx_oracle.Connection()
+
+    class CursorQueFalla(fake_cx_oracle.Cursor):
+        def execute(self, sql, params=None):
+            ejecutadas.append(params["desde"])
+            if params["desde"] in fallar:
+                raise fake_cx_oracle.DatabaseError("ORA-03113")
+            super().execute(sql, params)
+
+    monkeypatch.setattr(fake_cx_oracle.Connection, "cursor", lambda self: CursorQueFalla())
+    trabajo = backfill.TrabajoBackfill(
+        "prueba", "TEST", "SELECT dia, n FROM t WHERE dia >= :desde AND dia < :hasta",
+        D(2024, 1, 1), D(2024, 1, 6),
+    )
+    resumen = backfill.Backfill(trabajo, tmp_path, abrir).ejecutar(max_hilos=3, arraysize=2)
+    assert not resumen.ok
+    assert (resumen.completadas, resumen.filas) == (5, 15)
+    assert [p.desde for p, _ in resumen.fallidas] == [D(2024, 1, 3)]
+    with pytest.raises(RuntimeError):
+        list(backfill.Backfill(trabajo, tmp_path, abrir).iterar_filas())
+
+    ejecutadas.clear()
+    fallar.clear()
+    reanudado = backfill.Backfill(trabajo, tmp_path, abrir)
+    resumen = reanudado.ejecutar()
+    assert resumen.ok and resumen.reanudadas == 5
+    assert ejecutadas == [D(2024, 1, 3)]
+    filas = list(reanudado.iterar_filas())
+    assert filas == sorted(filas) and len(filas) == 18
+
+    class Escritor(backfill.EscritorLotes):
+        def _volcar(self, lote):
+            return []
+    with Escritor(tamano_lote=4) as escritor:
+        assert reanudado.volcar(escritor) == 18
+    assert escritor.filas_escritas == 18
+
+    with pytest.raises(ValueError):
+        backfill.Backfill(trabajo._replace(fin=D(2024, 1, 7)), tmp_path, abrir)
+    assert backfill.Backfill(trabajo._replace(fin=D(2024, 1, 7)), tmp_path, abrir, reiniciar=True).pendientes()
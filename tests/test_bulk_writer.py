@@ -0,0 +1,98 @@
+"""
+Archivo de pruebas automáticas para bulk_writer.py
+
+Este archivo valida los escritores por lotes:
+- Comprueba que EscritorOracle envía lotes con executemany, hace un commit por lote y registra las filas rechazadas.
+- Verifica que EscritorSQLite y EscritorCSV escriben todas las filas con el mismo interfaz.
+- Asegura que si el bloque `with` falla, las filas pendientes no se escriben ni se confirman.
+
+Se usa el driver simulado `benchmarks.fake_cx_oracle` y ficheros en un directorio temporal.
+"""
+import csv
+import sqlite3
+from unittest import mock
+
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src.bulk_writer import EscritorCSV, EscritorLotes, EscritorOracle, EscritorSQLite
+
+
+def test_escritor_oracle_por_lotes():
+    """
+    Prueba que EscritorOracle agrupa las filas en lotes y registra los errores de lote.
+
+    Teoría:
+    Con array binding, `executemany` envía muchas filas en una sola ida y vuelta. Con `batcherrors=True`, Oracle inserta las filas válidas y devuelve la lista de las inválidas en lugar de abortar todo el lote.
+
+    ¿Qué hace este test?
+    - Escribe 25 filas con lotes de 10, una de ellas inválida (con un nulo).
+    - Verifica que hubo 3 lotes y 3 commits, 24 filas escritas y el error en la posición global correcta.
+    """
+    conn = fake_cx_oracle.Connection()
+    filas = [(i, "a", 1.0) for i in range(25)]
+    filas[13] = (13, None, 1.0)
+    with mock.patch.object(conn, "commit") as commit:
+        with EscritorOracle(conn, "INSERT INTO t VALUES (:1, :2, :3)", tamano_lote=10) as escritor:
+            escritor.escribir(filas)
+    assert escritor.lotes == 3
+    assert commit.call_count == 3
+    assert escritor.filas_escritas == 24
+    assert escritor.errores == [(13, "ORA-01400: cannot insert NULL")]
+
+
+def test_escritores_locales(tmp_path):
+    """
+    Prueba que los escritores SQLite y CSV escriben todas las filas.
+
+    ¿Qué hace este test?
+    - Escribe 7 filas con lotes de 3 en SQLite y en CSV.
+    - Verifica el contenido de la tabla y del fichero.
+    - Verifica que en SQLite una fila que viola una restricción se registra sin perder el resto del lote.
+    """
+    filas = [(i, f"c{i}") for i in range(7)]
+    with EscritorSQLite(tmp_path / "s.sqlite", "stats", ["id", "cat"], tamano_lote=3) as escritor:
+        escritor.escribir(filas)
+    db = sqlite3.connect(str(tmp_path / "s.sqlite"))
+    assert db.execute("SELECT COUNT(*) FROM stats").fetchone() == (7,)
+    db.execute("CREATE TABLE unica (id PRIMARY KEY, cat)")
+    db.commit()
+    db.close()
+    with EscritorSQLite(tmp_path / "s.sqlite", "unica", ["id", "cat"], tamano_lote=10) as escritor:
+        escritor.escribir([(1, "a"), (1, "b"), (2, "c")])
+    assert escritor.filas_escritas == 2
+    assert escritor.errores[0][0] == 1
+
+    with EscritorCSV(tmp_path / "s.csv", ["id", "cat"], tamano_lote=3) as escritor:
+        escritor.escribir(filas)
+    with open(tmp_path / "s.csv", newline="", encoding="utf-8") as f:
+        leidas = list(csv.reader(f))
+    assert leidas[0] == ["id", "cat"]
+    assert len(leidas) == 8
+
+
+def test_excepcion_descarta_pendientes():
+    """
+    Prueba que una excepción dentro del bloque `with` no vuelca ni confirma el lote pendiente.
+
+    Teoría:
+    Si el código que produce las filas falla a mitad, el lote incompleto puede ser incoherente;
+    confirmarlo al salir dejaría datos parciales. Los lotes completos ya enviados siguen confirmados,
+    pero lo pendiente se descarta y solo se liberan los recursos.
+
+    ¿Qué hace este test?
+    - Escribe 15 filas con lotes de 10 y lanza una excepción dentro del bloque.
+    - Verifica que solo hubo un lote y un commit, y que el cursor se cerró.
+    - Verifica que EscritorLotes es abstracto y no se puede instanciar.
+    """
+    conn = fake_cx_oracle.Connection()
+    with mock.patch.object(conn, "commit") as commit, mock.patch.object(fake_cx_oracle.Cursor, "close") as cerrar:
+        with pytest.raises(RuntimeError), EscritorOracle(conn, "INSERT INTO t VALUES (:1, :2, :3)", tamano_lote=10) as escritor:
+            escritor.escribir([(i, "a", 1.0) for i in range(15)])
+            raise RuntimeError("fallo al generar filas")
+    assert escritor.lotes == 1 and escritor.filas_escritas == 10
+    assert commit.call_count == 1
+    assert cerrar.call_count == 1
+
+    with pytest.raises(TypeError):
+        EscritorLotes()
@@ -0,0 +1,161 @@
+"""
+Archivo de pruebas automáticas para cache.py
+
+Este archivo valida la caché de resultados de consultas:
+- Comprueba que una consulta repetida se sirve desde la caché sin volver a la base.
+- Verifica la caducidad por TTL, las entradas inmutables y el desalojo LRU.
+- Asegura que el nivel en disco sobrevive a una nueva instancia de la caché.
+- Comprueba que la memoria se limita en bytes y no solo en entradas.
+- Verifica que el fichero en disco borra las filas caducadas y respeta su límite de filas.
+
+Se usa una conexión simulada y un directorio temporal para el fichero SQLite.
+"""
+from contextlib import contextmanager
+from unittest import mock
+
+from src import cache
+
+
+def crear_abridor(llamadas):
+    """
+    Devuelve una función con la firma de `connection(nombre)` que cuenta las consultas ejecutadas.
+    """
+    class Cursor:
+        def execute(self, sql, params):
+            llamadas.append((sql, params))
+        def fetchall(self):
+            return [(len(llamadas),)]
+
+    class Conn:
+        def cursor(self):
+            return Cursor()
+
+    @contextmanager
+    def abrir(base):
+        yield Conn()
+    return abrir
+
+
+def test_consulta_repetida_usa_cache():
+    """
+    Prueba que la segunda ejecución de la misma consulta no llega a la base de datos.
+
+    Teoría:
+    Una caché guarda el resultado de una operación costosa para devolverlo directamente la próxima vez. La clave debe incluir todo lo que determina el resultado: base, SQL y parámetros.
+
+    ¿Qué hace este test?
+    - Ejecuta dos veces la misma consulta y una vez con otros parámetros.
+    - Verifica que solo se consultó la base dos veces y los contadores de aciertos y fallos.
+    """
+    llamadas = []
+    c = cache.CacheResultados()
+    abrir = crear_abridor(llamadas)
+    primera = cache.consulta_cacheada(c, "MEDIN", "SELECT :f FROM DUAL", {"f": 1}, abrir=abrir)
+    segunda = cache.consulta_cacheada(c, "MEDIN", "SELECT  :f\nFROM DUAL", {"f": 1}, abrir=abrir)
+    cache.consulta_cacheada(c, "MEDIN", "SELECT :f FROM DUAL", {"f": 2}, abrir=abrir)
+    assert primera == segunda
+    assert len(llamadas) == 2
+    assert c.estadisticas()["aciertos"] == 1
+    assert c.estadisticas()["fallos"] == 2
+
+
+def test_ttl_inmutable_y_lru():
+    """
+    Prueba la caducidad por TTL, las entradas inmutables y el desalojo LRU.
+
+    ¿Qué hace este test?
+    - Guarda una entrada con TTL de 10 s y otra inmutable; avanza el reloj 20 s.
+    - Verifica que la primera caducó y la inmutable sigue.
+    - Con capacidad 2, verifica que se desaloja la entrada menos usada recientemente.
+    """
+    c = cache.CacheResultados(max_entradas=2)
+    with mock.patch("time.time", return_value=1000):
+        c.guardar("dia_abierto", 1, ttl=10)
+        c.guardar("dia_cerrado", 2, inmutable=True)
+    with mock.patch("time.time", return_value=1020):
+        assert c.obtener("dia_abierto") == (False, None)
+        assert c.obtener("dia_cerrado") == (True, 2)
+
+    c.guardar("a", 1)
+    c.guardar("b", 2)
+    c.obtener("a")  # "a" pasa a ser la más reciente
+    c.guardar("c", 3)
+    assert c.obtener("b") == (False, None)
+    assert c.obtener("a") == (True, 1)
+    assert c.estadisticas()["desalojos"] >= 1
+
+
+def test_nivel_en_disco_e_invalidacion(tmp_path):
+    """
+    Prueba que el nivel en disco conserva los resultados entre instancias y que se pueden invalidar.
+
+    ¿Qué hace este test?
+    - Guarda una entrada con una caché en disco y la cierra.
+    - Abre otra caché sobre el mismo directorio y verifica que la entrada se lee del disco.
+    - Invalida la entrada y verifica que desaparece.
+    """
+    c1 = cache.CacheResultados(en_disco=True, directorio=tmp_path)
+    c1.guardar("clave", [(1, "a")], inmutable=True)
+    c1.cerrar()
+    c2 = cache.CacheResultados(en_disco=True, directorio=tmp_path)
+    assert c2.obtener("clave") == (True, [(1, "a")])
+    assert c2.estadisticas()["aciertos_disco"] == 1
+    c2.invalidar("clave")
+    assert c2.obtener("clave") == (False, None)
+    c2.cerrar()
+
+
+def test_limite_de_bytes_en_memoria():
+    """
+    Prueba que la memoria se limita por el tamaño aproximado de los resultados.
+
+    Teoría:
+    Limitar solo el número de entradas no acota la memoria: un único resultado con millones de filas cabe en una entrada. Contar los bytes aproximados de cada valor y desalojar por LRU hasta quedar bajo el límite sí la acota.
+
+    ¿Qué hace este test?
+    - Con un límite de 2 KB, guarda dos resultados de ~800 bytes y un tercero que obliga a desalojar el más antiguo.
+    - Guarda un resultado de ~4 KB y verifica que no se queda en memoria.
+    - Verifica que los bytes contabilizados nunca superan el límite.
+    """
+    c = cache.CacheResultados(max_bytes_memoria=2048)
+    filas = [("x" * 100,)] * 8
+    c.guardar("a", filas)
+    c.guardar("b", filas)
+    c.guardar("c", filas)
+    assert c.obtener("a") == (False, None)
+    assert c.obtener("c") == (True, filas)
+    c.guardar("enorme", [("x" * 100,)] * 40)
+    assert c.obtener("enorme") == (False, None)
+    assert c.obtener("c") == (True, filas)
+    assert 0 < c.estadisticas()["bytes"] <= 2048
+
+
+def test_disco_borra_caducadas_y_respeta_limite(tmp_path):
+    """
+    Prueba que el fichero SQLite no crece sin límite.
+
+    ¿Qué hace este test?
+    - Guarda una entrada con TTL y avanza el reloj; al escribir otra, la caducada se borra del fichero.
+    - Con un límite de 3 filas, guarda 4 entradas leyendo la primera desde disco entre medias.
+    - Verifica que quedan 3 filas, que se conserva la leída y que se desalojaron las menos usadas.
+    """
+    c = cache.CacheResultados(en_disco=True, directorio=tmp_path, max_entradas_disco=3)
+    with mock.patch("time.time", return_value=1000):
+        c.guardar("caduca", 1, ttl=10)
+    with mock.patch("time.time", return_value=1020):
+        c.guardar("otra", 2, inmutable=True)
+    claves = [fila[0] for fila in c._disco.execute("SELECT clave FROM resultados")]
+    assert claves == ["otra"]
+
+    c.invalidar("otra")
+    for i, clave in enumerate(["k1", "k2", "k3", "k4"]):
+        with mock.patch("time.time", return_value=2000 + i):
+            c.guardar(clave, i, inmutable=True)
+        if clave == "k2":
+            c._memoria.clear()
+            with mock.patch("time.time", return_value=2001.5):
+                c.obtener("k1")  # "k1" pasa a ser la más reciente en disco
+    claves = sorted(fila[0] for fila in c._disco.execute("SELECT clave FROM resultados"))
+    assert claves == ["k1", "k3", "k4"]
+    assert c.estadisticas()["desalojos_disco"] == 1
+    c.cerrar()
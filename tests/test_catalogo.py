@@ -0,0 +1,106 @@
+"""
+Archivo de pruebas automáticas para catalogo.py
+
+Este archivo valida el catálogo declarativo de consultas:
+- Comprueba que se leen la cabecera de metadatos y el SQL de cada fichero.
+- Verifica que las variables de enlace declaradas deben coincidir con las del SQL y con las recibidas.
+- Asegura que las consultas se ejecutan con variables de enlace y que se acumula su duración.
+
+Se usan conexiones simuladas para no requerir una base Oracle real.
+"""
+from contextlib import contextmanager
+from unittest import mock
+
+import pytest
+
+from src import catalogo
+
+
+def _escribir(directorio, nombre, texto):
+    ruta = directorio / nombre
+    ruta.write_text(texto, encoding="utf-8")
+    return ruta
+
+
+def test_leer_consulta(tmp_path):
+    """
+    Prueba que un fichero .sql se lee con sus metadatos y que se validan sus variables de enlace.
+
+    Teoría:
+    Declarar las consultas en ficheros con metadatos, en lugar de cadenas repartidas por el código, permite
+    revisarlas, comprobarlas al arrancar y ejecutar siempre el mismo texto SQL.
+
+    ¿Qué hace este test?
+    - Lee una consulta con dos parámetros y un literal que contiene ':' (no es una variable).
+    - Verifica nombre, base, parámetros y SQL.
+    - Verifica que un parámetro no declarado o la falta de base lanzan ValueError.
+    """
+    ruta = _escribir(tmp_path, "altas.sql", (
+        "-- nombre: altas_diarias\n"
+        "-- base: MEDIN\n"
+        "-- descripcion: Altas de un día\n"
+        "-- parametros: dia, centro\n"
+        "SELECT COUNT(*) FROM altas\n"
+        "WHERE fecha = :dia AND centro = :centro AND hora > '08:00';\n"
+    ))
+    consulta = catalogo.leer_consulta(ruta)
+    assert consulta.nombre == "altas_diarias"
+    assert consulta.base == "MEDIN"
+    assert consulta.parametros == ("dia", "centro")
+    assert consulta.sql.endswith("'08:00'")
+
+    mala = _escribir(tmp_path, "mala.sql", "-- base: MEDIN\n-- parametros: dia\nSELECT :dia, :otro FROM DUAL\n")
+    with pytest.raises(ValueError):
+        catalogo.leer_consulta(mala)
+    sin_base = _escribir(tmp_path, "sin_base.sql", "SELECT 1 FROM DUAL\n")
+    with pytest.raises(ValueError):
+        catalogo.leer_consulta(sin_base)
+
+
+def test_ejecutar_con_variables_de_enlace(tmp_path):
+    """
+    Prueba que la consulta se ejecuta con el SQL fijo y los valores como variables de enlace.
+
+    Teoría:
+    Con variables de enlace el texto de la sentencia es idéntico en cada ejecución, así que Oracle la
+    encuentra en la caché de sentencias de la sesión y no la vuelve a analizar.
+
+    ¿Qué hace este test?
+    - Carga un catálogo con una consulta parametrizada.
+    - La ejecuta dos veces con valores distintos y verifica que el SQL enviado es el mismo.
+    - Verifica que pasar parámetros de más o de menos lanza ValueError.
+    - Verifica que se acumula la duración de la consulta.
+    """
+    _escribir(tmp_path, "total.sql", "-- base: MEDIN\n-- parametros: dia\nSELECT COUNT(*) FROM altas WHERE fecha = :dia\n")
+    cat = catalogo.cargar_catalogo(tmp_path)
+    cursor = mock.Mock()
+    cursor.fetchall.return_value = [(3,)]
+    conn = mock.Mock()
+    conn.cursor.return_value = cursor
+    bases = []
+
+    @contextmanager
+    def abrir(base):
+        bases.append(base)
+        yield conn
+
+    assert cat.ejecutar("total", {"dia": 1}, abrir=abrir) == [(3,)]
+    cat.ejecutar("total", {"DIA": 2}, abrir=abrir)
+    (sql1, params1), (sql2, params2) = [c.args for c in cursor.execute.call_args_list]
+    assert sql1 is sql2
+    assert params1 == {"dia": 1} and params2 == {"dia": 2}
+    assert bases == ["MEDIN", "MEDIN"]
+    with pytest.raises(ValueError):
+        cat.ejecutar("total", {}, abrir=abrir)
+    with pytest.raises(ValueError):
+        cat.ejecutar("total", {"dia": 1, "extra": 2}, abrir=abrir)
+    assert cat.tiempos()["total"]["cantidad"] == 2
+
+
+def test_catalogo_del_proyecto():
+    """
+    Prueba que el catálogo incluido en el proyecto (consultas/) es válido y se carga una sola vez.
+    """
+    cat = catalogo.obtener_catalogo()
+    assert "ping" in cat
+    assert catalogo.obtener_catalogo() is cat
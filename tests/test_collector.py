@@ -0,0 +1,110 @@
+"""
+Archivo de pruebas automáticas para collector.py
+
+Este archivo valida el motor de recolección concurrente de estadísticas:
+- Comprueba que las consultas independientes se ejecutan en paralelo y los resultados mantienen su orden.
+- Verifica que se respeta el límite de concurrencia por base de datos.
+- Asegura que el fallo de una consulta no impide recoger las demás.
+
+Se usa una conexión simulada con latencia artificial (time.sleep) para no requerir bases reales.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from src import collector
+from src.collector import ConsultaEstadistica
+
+
+class EstadoSimulado:
+    """
+    Registra cuántas consultas hay activas a la vez en cada base.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.activas = {}
+        self.maximo = {}
+
+
+def crear_abridor(estado, latencia=0.05):
+    """
+    Devuelve una función con la misma firma que `connection(nombre)` cuyo cursor tarda `latencia` segundos.
+    """
+    class Cursor:
+        def __init__(self, base):
+            self.base = base
+        def execute(self, sql, params):
+            if "FALLA" in sql:
+                raise RuntimeError("consulta rota")
+            with estado.lock:
+                estado.activas[self.base] = estado.activas.get(self.base, 0) + 1
+                estado.maximo[self.base] = max(estado.maximo.get(self.base, 0), estado.activas[self.base])
+            time.sleep(latencia)
+            with estado.lock:
+                estado.activas[self.base] -= 1
+            self.sql = sql
+        def fetchall(self):
+            return [(self.sql,)]
+
+    class Conn:
+        def __init__(self, base):
+            self.base = base
+        def cursor(self):
+            return Cursor(self.base)
+
+    @contextmanager
+    def abrir(base):
+        yield Conn(base)
+    return abrir
+
+
+def test_recolectar_en_paralelo():
+    """
+    Prueba que recolectar() ejecuta las consultas en paralelo y mejora al camino en serie.
+
+    Teoría:
+    Mientras una consulta espera la respuesta de la red, el hilo no necesita la CPU. Con varios hilos, las esperas se solapan y el tiempo total se acerca al de la consulta más lenta.
+
+    ¿Qué hace este test?
+    - Define 8 consultas de 50 ms repartidas entre MEDIN y Simbad.
+    - Las ejecuta con recolectar() y un límite de 4 por base.
+    - Verifica que los resultados están en el orden original y que la aceleración es claramente mayor que 1.
+    """
+    consultas = [ConsultaEstadistica(f"q{i}", "MEDIN" if i % 2 else "Simbad", f"SELECT {i}") for i in range(8)]
+    informe = collector.recolectar(consultas, limites={"MEDIN": 4, "Simbad": 4}, abrir=crear_abridor(EstadoSimulado()))
+    assert [r.nombre for r in informe.resultados] == [c.nombre for c in consultas]
+    assert all(r.ok for r in informe.resultados)
+    assert informe.aceleracion > 2
+    assert "aceleración" in informe.resumen()
+
+
+def test_limite_por_base():
+    """
+    Prueba que nunca hay más consultas simultáneas en una base que su límite.
+
+    ¿Qué hace este test?
+    - Lanza 6 consultas contra MEDIN con límite 2 y 8 hilos.
+    - Verifica que como máximo hubo 2 consultas activas a la vez en MEDIN.
+    """
+    estado = EstadoSimulado()
+    consultas = [ConsultaEstadistica(f"q{i}", "MEDIN", "SELECT 1") for i in range(6)]
+    collector.recolectar(consultas, max_hilos=8, limites={"MEDIN": 2}, abrir=crear_abridor(estado, 0.02))
+    assert estado.maximo["MEDIN"] == 2
+
+
+def test_error_no_detiene_el_resto():
+    """
+    Prueba que una consulta que falla queda registrada con su error sin afectar a las demás.
+
+    ¿Qué hace este test?
+    - Ejecuta en serie una consulta correcta y otra que lanza una excepción.
+    - Verifica que la primera tiene filas y la segunda guarda el error.
+    """
+    consultas = [
+        ConsultaEstadistica("bien", "MEDIN", "SELECT 1"),
+        ConsultaEstadistica("mal", "MEDIN", "FALLA"),
+    ]
+    informe = collector.recolectar_en_serie(consultas, abrir=crear_abridor(EstadoSimulado(), 0))
+    assert informe.resultados[0].ok and informe.resultados[0].filas == [("SELECT 1",)]
+    assert not informe.resultados[1].ok
+    assert isinstance(informe.resultados[1].error, RuntimeError)
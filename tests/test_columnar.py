@@ -0,0 +1,92 @@
+"""
+Archivo de pruebas automáticas para columnar.py
+
+Este archivo valida la materialización columnar de resultados:
+- Comprueba que el tipo de cada columna se deduce de cursor.description.
+- Verifica conteos, sumas, percentiles y agrupaciones, con y sin NumPy.
+- Asegura que los nulos se ignoran en los agregados.
+
+Se usa el cursor simulado de `benchmarks.fake_cx_oracle`, sin base de datos real.
+"""
+import math
+
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src import columnar
+
+FILAS = [
+    (1, "a", 10.0),
+    (2, "b", None),
+    (3, "a", 30.0),
+    (4, "b", 5.0),
+    (5, "a", 20.0),
+]
+
+
+@pytest.fixture(params=["numpy", "array"])
+def tabla(request, monkeypatch):
+    """
+    Devuelve la tabla de FILAS construida con NumPy y con el respaldo del módulo array.
+    """
+    if request.param == "array":
+        monkeypatch.setattr(columnar, "np", None)
+    elif columnar.np is None:
+        pytest.skip("NumPy no está instalado")
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", lambda sql, params: iter(FILAS))
+    return columnar.consultar_columnar(fake_cx_oracle.Connection(), "SELECT id, categoria, importe FROM t", arraysize=2)
+
+
+def test_tipos_desde_description(tabla):
+    """
+    Prueba que los tipos de columna se deducen de cursor.description.
+
+    Teoría:
+    cursor.description indica el tipo Oracle, la precisión y la escala de cada columna. NUMBER(10,0) cabe en un entero de 64 bits; NUMBER(12,2) necesita un real.
+
+    ¿Qué hace este test?
+    - Construye la tabla a partir del cursor simulado.
+    - Verifica el tipo de cada columna y el número de filas.
+    """
+    assert tabla.tipos == {"ID": "entero", "CATEGORIA": "texto", "IMPORTE": "real"}
+    assert len(tabla) == 5
+    assert list(tabla.filas())[0] == (1, "a", 10.0)
+
+
+def test_agregados(tabla):
+    """
+    Prueba los agregados vectorizados ignorando nulos.
+
+    ¿Qué hace este test?
+    - Verifica conteo de filas y de no nulos, suma y percentiles de IMPORTE.
+    - Verifica agrupaciones por CATEGORIA con count, sum, mean, min y max.
+    """
+    assert tabla.contar() == 5
+    assert tabla.contar("IMPORTE") == 4
+    assert tabla.sumar("IMPORTE") == 65.0
+    assert tabla.percentil("IMPORTE", 50) == 15.0
+    assert tabla.percentil("ID", 100) == 5.0
+    assert tabla.agrupar("CATEGORIA") == {"a": 3.0, "b": 2.0}
+    assert tabla.agrupar("CATEGORIA", "IMPORTE", "sum") == {"a": 60.0, "b": 5.0}
+    assert tabla.agrupar("CATEGORIA", "IMPORTE", "mean") == {"a": 20.0, "b": 5.0}
+    assert tabla.agrupar("CATEGORIA", "IMPORTE", "min") == {"a": 10.0, "b": 5.0}
+    assert tabla.agrupar("CATEGORIA", "IMPORTE", "max") == {"a": 30.0, "b": 5.0}
+    with pytest.raises(TypeError):
+        tabla.sumar("CATEGORIA")
+    with pytest.raises(ValueError):
+        tabla.agrupar("CATEGORIA", "IMPORTE", "mediana")
+
+
+def test_entero_con_nulos_pasa_a_real(monkeypatch):
+    """
+    Prueba que una columna entera con nulos se convierte en real con NaN.
+
+    ¿Qué hace este test?
+    - Genera una columna ID con un nulo en el segundo lote.
+    - Verifica que la columna pasa a ser real y que el nulo se representa como NaN.
+    """
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", lambda sql, params: iter([(1, "a", 1.0), (2, "a", 1.0), (None, "a", 1.0)]))
+    tabla = columnar.consultar_columnar(fake_cx_oracle.Connection(), "SELECT 1", arraysize=2)
+    assert tabla.tipos["ID"] == "real"
+    assert math.isnan(tabla["ID"][2])
+    assert tabla.contar("ID") == 2
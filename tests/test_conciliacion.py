@@ -0,0 +1,120 @@
+"""
+Archivo de pruebas automáticas para conciliacion.py
+
+Este archivo valida la conciliación de registros entre dos bases:
+- Comprueba los conteos de coincidentes, solo izquierda, solo derecha y duplicados.
+- Verifica que las claves se normalizan (espacios y números enteros guardados como float).
+- Asegura que el resultado es el mismo cuando el índice no cabe en memoria y se usan particiones en disco.
+- Verifica que una partición que tampoco cabe se reparte de nuevo sin romper el presupuesto.
+
+Se usan listas de filas y conexiones simuladas, sin base de datos real.
+"""
+import itertools
+import tracemalloc
+from contextlib import contextmanager
+
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src import conciliacion
+
+IZQUIERDA = [(i, f"paciente {i}") for i in range(100)] + [(5, "duplicado")]
+DERECHA = [(float(i), f" {i} ") for i in range(50, 130)]
+
+
+@pytest.mark.parametrize("memoria_maxima", [10**9, 500])
+def test_conciliar_filas(memoria_maxima, tmp_path):
+    """
+    Prueba que la conciliación cuenta bien cada categoría en memoria y con particiones en disco.
+
+    Teoría:
+    Un hash join construye un índice con un lado y lo consulta con el otro: coste lineal en lugar de
+    comparar todos con todos. Si el índice no cabe en memoria, repartir ambos lados por el hash de la
+    clave garantiza que las filas que pueden coincidir caen en la misma partición.
+
+    ¿Qué hace este test?
+    - Concilia 101 filas (una clave duplicada) con 80 filas cuya clave llega como float.
+    - Verifica 50 coincidentes, 51 solo a la izquierda, 30 solo a la derecha y 1 duplicada.
+    - Con un presupuesto de 500 bytes, verifica que se usan particiones y los conteos no cambian.
+    """
+    informe = conciliacion.conciliar_filas(
+        IZQUIERDA, DERECHA, memoria_maxima=memoria_maxima, particiones=4, muestras=3, directorio=tmp_path
+    )
+    assert (informe.filas_izquierda, informe.filas_derecha) == (101, 80)
+    assert (informe.coincidentes, informe.solo_izquierda, informe.solo_derecha) == (50, 51, 30)
+    assert informe.duplicadas_izquierda == 1
+    assert informe.particiones == (0 if memoria_maxima > 10**6 else 4)
+    assert len(informe.muestras_solo_derecha) == 3
+    assert all(izq[0] == int(der[0]) for izq, der in informe.muestras_coincidentes)
+    assert all(f[0] < 50 for f in informe.muestras_solo_izquierda)
+    assert list(tmp_path.iterdir()) == []  # los temporales se borran
+
+
+def test_conciliar_con_consultas(monkeypatch):
+    """
+    Prueba que conciliar() lee cada lado de su base y cruza por columnas de clave compuestas.
+
+    ¿Qué hace este test?
+    - Simula dos bases que devuelven filas distintas según la consulta.
+    - Concilia por una clave de dos columnas en posiciones distintas en cada lado.
+    - Verifica las bases abiertas y los conteos.
+    """
+    datos = {
+        "SELECT izq": [("a", 1, "x"), ("b", 2, "y")],
+        "SELECT der": [("z", "a ", 1), ("w", "c", 3)],
+    }
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", lambda sql, params: iter(datos[sql]))
+    bases = []
+
+    @contextmanager
+    def abrir(base):
+        bases.append(base)
+        yield fake_cx_oracle.Connection()
+
+    informe = conciliacion.conciliar(
+        conciliacion.LadoConciliacion("MEDIN", "SELECT izq", clave=(0, 1)),
+        conciliacion.LadoConciliacion("Simbad", "SELECT der", clave=(1, 2)),
+        abrir=abrir,
+    )
+    assert bases == ["MEDIN", "Simbad"]
+    assert (informe.coincidentes, informe.solo_izquierda, informe.solo_derecha) == (1, 1, 1)
+    assert informe.muestras_coincidentes == [(("a", 1, "x"), ("z", "a ", 1))]
+
+
+def test_particion_que_no_cabe_se_reparte_de_nuevo(tmp_path):
+    """
+    Prueba que una partición cuyo índice no cabe en el presupuesto se vuelve a repartir.
+
+    Teoría:
+    Repartir por el hash de la clave solo acota cada partición si hay suficientes particiones para las claves
+    y el hash las reparte por igual. Si una partición sigue sin caber, repartir ese par de particiones con otra
+    semilla del hash la divide de nuevo. Las filas repetidas de una clave muy frecuente solo suman a su
+    conteo, no al índice. Las claves son múltiplos del número de particiones: con `hash(clave) % n` (el hash
+    de un entero es el propio número) caerían todas en la misma partición.
+
+    ¿Qué hace este test?
+    - Concilia 20.000 claves distintas más una clave muy frecuente (10.000 filas) con 4 particiones y 512 KB.
+    - Verifica que hubo repartos de segundo nivel y que los conteos son exactos.
+    - Verifica que el pico medido con tracemalloc queda por debajo de 1 MB (sin repartir de nuevo pasa de 1,4 MB).
+    - Verifica que el reparto con semillas distintas es independiente.
+    """
+    izquierda = ((i * 32, f"paciente {i}") for i in range(20_000))
+    caliente = ((-1, "urgencias") for _ in range(10_000))
+    derecha = [(i * 32, "x") for i in range(10_000, 30_000)] + [(-1, "urgencias")] * 100
+
+    tracemalloc.start()
+    informe = conciliacion.conciliar_filas(
+        itertools.chain(izquierda, caliente), derecha, memoria_maxima=2**19, particiones=4, directorio=tmp_path
+    )
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert informe.repartos > 0
+    assert (informe.coincidentes, informe.solo_izquierda, informe.solo_derecha) == (10_100, 10_000, 10_000)
+    assert informe.duplicadas_izquierda == 9_999
+    assert pico < 2**20
+    assert list(tmp_path.iterdir()) == []
+
+    primera = [k for k in range(0, 40_000, 4) if conciliacion.particion_de(k, 0, 4) == 0]
+    segunda = [conciliacion.particion_de(k, 1, 4) for k in primera]
+    assert 0.2 < len(primera) / 10_000 < 0.3
+    assert all(0.2 < segunda.count(i) / len(segunda) < 0.3 for i in range(4))
@@ -5,13 +5,16 @@ Este archivo valida el correcto funcionamiento de la gestión de configuración
 - Comprueba que se leen correctamente las variables de entorno necesarias para una conexión.
 - Verifica que se detectan y reportan variables faltantes.
 - Testea que la función principal devuelve la configuración completa para todas las conexiones esperadas.
+- Asegura que al recargar se cierran solo los pools de las bases cuyas credenciales cambiaron.
 
 Se usan mocks para simular variables de entorno y evitar dependencias externas.
 """
 
 import os
 import pytest
+from benchmarks import fake_cx_oracle
 from db_connections import config_manager
+from src import pool
 from unittest import mock
 
 def test__leer_vars_ok():
@@ -76,3 +79,125 @@ def test_cargar_configuracion(monkeypatch):
     conf = config_manager.cargar_configuracion()
     assert conf['MEDIN'] == {'user': 'u1', 'password': 'p1', 'dsn': 'd1'}
     assert conf['Simbad'] == {'user': 'u2', 'password': 'p2', 'dsn': 'd2'}
+
+def test_prefijos_desde_entorno(monkeypatch):
+    """
+    Prueba que las bases configuradas se leen de DB_PREFIJOS y que una tercera base no requiere cambios de código.
+
+    Teoría:
+    Declarar las bases de datos en el entorno, en lugar de en un diccionario fijo en el código, permite añadir una nueva conexión solo con configuración.
+
+    ¿Qué hace este test?
+    - Simula DB_PREFIJOS con tres bases (con espacios y un duplicado).
+    - Verifica que prefijos_configurados devuelve la lista limpia.
+    - Verifica que cargar_configuracion incluye la tercera base.
+    - Verifica que sin DB_PREFIJOS se usan MEDIN y Simbad.
+    """
+    env = {
+        'DB_PREFIJOS': 'MEDIN, Simbad,OTRA,MEDIN',
+        'user_MEDIN': 'u1', 'password_MEDIN': 'p1', 'dsn_MEDIN': 'd1',
+        'user_Simbad': 'u2', 'password_Simbad': 'p2', 'dsn_Simbad': 'd2',
+        'user_OTRA': 'u3', 'password_OTRA': 'p3', 'dsn_OTRA': 'd3',
+    }
+    monkeypatch.setattr(os, 'environ', env)
+    assert config_manager.prefijos_configurados() == ['MEDIN', 'Simbad', 'OTRA']
+    assert config_manager.cargar_configuracion()['OTRA'] == {'user': 'u3', 'password': 'p3', 'dsn': 'd3'}
+    del env['DB_PREFIJOS']
+    assert config_manager.prefijos_configurados() == ['MEDIN', 'Simbad']
+
+@pytest.fixture
+def configuracion_limpia(monkeypatch):
+    """Descarta la configuración memorizada antes y después de cada test."""
+    monkeypatch.setattr(config_manager, '_configuracion', None)
+    monkeypatch.setattr(config_manager, '_env_cargado', True)
+    yield
+    config_manager._configuracion = None
+
+def test_obtener_configuracion_memorizada(monkeypatch, configuracion_limpia):
+    """
+    Prueba que la configuración se lee una sola vez por proceso y que cada base se valida por separado.
+
+    Teoría:
+    Leer y validar el entorno en cada conexión es trabajo repetido; además, si falta una base que no se usa, no debe impedir conectar a las demás.
+
+    ¿Qué hace este test?
+    - Simula un entorno en el que faltan las variables de Simbad.
+    - Verifica que MEDIN se obtiene sin error y que Simbad lanza EnvironmentError solo al pedirla.
+    - Verifica que las llamadas siguientes devuelven la misma instancia, que es de solo lectura.
+    - Verifica que una base desconocida lanza KeyError.
+    """
+    env = {'user_MEDIN': 'u1', 'password_MEDIN': 'p1', 'dsn_MEDIN': 'd1'}
+    monkeypatch.setattr(os, 'environ', env)
+    conf = config_manager.obtener_configuracion()
+    assert conf['MEDIN'] == {'user': 'u1', 'password': 'p1', 'dsn': 'd1'}
+    with pytest.raises(EnvironmentError):
+        conf['Simbad']
+    with pytest.raises(KeyError):
+        conf['OTRA']
+    with pytest.raises(TypeError):
+        conf['MEDIN']['user'] = 'x'
+    env['user_MEDIN'] = 'cambiado'
+    assert config_manager.obtener_configuracion() is conf
+    assert config_manager.obtener_configuracion()['MEDIN']['user'] == 'u1'
+
+def test_recargar_configuracion(monkeypatch, tmp_path, configuracion_limpia):
+    """
+    Prueba que la configuración se recarga de forma explícita o cuando cambia el .env.
+
+    Teoría:
+    Un proceso de larga duración puede necesitar credenciales nuevas sin reiniciarse.
+
+    ¿Qué hace este test?
+    - Recarga de forma explícita tras cambiar el entorno y verifica los valores nuevos.
+    - Con autorecarga, modifica el .env y verifica que se lee de nuevo.
+    """
+    env = {'DB_PREFIJOS': 'MEDIN', 'user_MEDIN': 'u1', 'password_MEDIN': 'p1', 'dsn_MEDIN': 'd1'}
+    monkeypatch.setattr(os, 'environ', env)
+    fichero = tmp_path / '.env'
+    fichero.write_text('user_MEDIN=u1\n')
+    monkeypatch.setattr(config_manager, 'env_path', fichero)
+    conf = config_manager.obtener_configuracion()
+    env['user_MEDIN'] = 'u2'
+    nueva = config_manager.recargar_configuracion()
+    assert nueva is not conf
+    assert nueva['MEDIN']['user'] == 'u1'  # el .env prevalece al recargar
+
+    fichero.write_text('user_MEDIN=u3\n')
+    os.utime(fichero, (0, 0))
+    assert config_manager.obtener_configuracion() is nueva
+    assert config_manager.obtener_configuracion(autorecarga=True)['MEDIN']['user'] == 'u3'
+
+def test_recargar_cierra_pools_cambiados(monkeypatch, tmp_path, configuracion_limpia):
+    """
+    Prueba que recargar la configuración cierra los pools cuyas credenciales o DSN cambiaron.
+
+    Teoría:
+    Un pool guarda las credenciales con las que se creó. Si tras recargar se siguiera usando, las credenciales nuevas no
+    tendrían efecto hasta reiniciar el proceso; cerrar solo los pools afectados evita reabrir los demás.
+
+    ¿Qué hace este test?
+    - Crea pools de MEDIN y Simbad con el driver simulado.
+    - Cambia el DSN de MEDIN en el .env y recarga.
+    - Verifica que el pool de MEDIN sale del registro y el de Simbad se conserva.
+    """
+    env = {
+        'DB_PREFIJOS': 'MEDIN,Simbad',
+        'user_MEDIN': 'u1', 'password_MEDIN': 'p1', 'dsn_MEDIN': 'd1',
+        'user_Simbad': 'u2', 'password_Simbad': 'p2', 'dsn_Simbad': 'd2',
+    }
+    monkeypatch.setattr(os, 'environ', env)
+    fichero = tmp_path / '.env'
+    fichero.write_text('dsn_MEDIN=d1\n')
+    monkeypatch.setattr(config_manager, 'env_path', fichero)
+    pool.cerrar_pools()
+    try:
+        conf = config_manager.obtener_configuracion()
+        simbad = pool.obtener_pool('Simbad', conf['Simbad'], driver=fake_cx_oracle)
+        pool.obtener_pool('MEDIN', conf['MEDIN'], driver=fake_cx_oracle)
+        fichero.write_text('dsn_MEDIN=d9\n')
+        nueva = config_manager.recargar_configuracion()
+        assert nueva['MEDIN']['dsn'] == 'd9'
+        assert 'MEDIN' not in pool._pools
+        assert pool._pools['Simbad'] is simbad
+    finally:
+        pool.cerrar_pools()
@@ -0,0 +1,68 @@
+"""
+Archivo de pruebas automáticas para connection.py
+
+Este archivo valida el punto de entrada genérico de conexiones:
+- Verifica que cada base configurada obtiene su propio pool y que se reutiliza entre bloques.
+- Comprueba que se lanza KeyError si se pide una base no configurada.
+
+Se usa el driver simulado `benchmarks.fake_cx_oracle` en lugar de cx_Oracle para no requerir bases reales.
+"""
+import pytest
+import cx_Oracle
+
+from benchmarks import fake_cx_oracle
+from src import connection, pool
+
+CONFIG = {
+    "MEDIN": {"user": "u1", "password": "p1", "dsn": "d1"},
+    "Simbad": {"user": "u2", "password": "p2", "dsn": "d2"},
+}
+
+
+@pytest.fixture(autouse=True)
+def entorno(monkeypatch):
+    """
+    Sustituye la configuración y el pool de cx_Oracle por versiones simuladas y limpia los pools.
+    """
+    pool.cerrar_pools()
+    monkeypatch.setattr(connection, "obtener_configuracion", lambda: CONFIG)
+    monkeypatch.setattr(cx_Oracle, "SessionPool", fake_cx_oracle.SessionPool)
+    monkeypatch.setattr(cx_Oracle, "DatabaseError", fake_cx_oracle.DatabaseError)
+    yield
+    pool.cerrar_pools()
+
+
+def test_un_pool_por_base():
+    """
+    Prueba que MEDIN y Simbad usan pools distintos y que cada pool se reutiliza.
+
+    Teoría:
+    Un registro de pools indexado por nombre de base permite que todos los trabajos que consultan la misma base compartan sesiones ya abiertas ("calientes").
+
+    ¿Qué hace este test?
+    - Abre una conexión a Simbad con simbad_connection() y otra a MEDIN con connection("MEDIN").
+    - Verifica que hay un pool por base y que son distintos.
+    - Abre de nuevo Simbad y verifica que se reutiliza el mismo pool.
+    """
+    with connection.simbad_connection():
+        pool_simbad = pool._pools["Simbad"]
+    with connection.connection("MEDIN"):
+        pass
+    assert set(pool._pools) == {"MEDIN", "Simbad"}
+    assert pool._pools["MEDIN"] is not pool_simbad
+    with connection.connection("Simbad"):
+        assert pool._pools["Simbad"] is pool_simbad
+
+
+def test_base_no_configurada():
+    """
+    Prueba que pedir una base que no está en la configuración lanza KeyError.
+
+    ¿Qué hace este test?
+    - Intenta abrir connection("OTRA"), que no está configurada.
+    - Verifica que se lanza KeyError y que no se crea ningún pool.
+    """
+    with pytest.raises(KeyError):
+        with connection.connection("OTRA"):
+            pass
+    assert pool._pools == {}
@@ -0,0 +1,203 @@
+"""
+Archivo de pruebas automáticas para exportacion.py
+
+Este archivo valida la exportación de resultados a ficheros en streaming:
+- Comprueba el contenido de los ficheros CSV y JSON Lines, con y sin gzip.
+- Verifica que la escritura es atómica: si falla, no queda fichero a medias ni temporal.
+- Asegura que las exportaciones de varias bases se ejecutan en paralelo y los errores se recogen.
+- Verifica que CSV y JSON Lines representan igual binarios y fechas, y que sin `resource` no falla.
+
+Se usan conexiones simuladas (benchmarks/fake_cx_oracle.py), sin base de datos real.
+"""
+import csv
+import datetime
+import gzip
+import io
+import json
+import sys
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src import exportacion
+from src.exportacion import Exportacion, exportar, exportar_en_paralelo, formato_de_ruta
+
+
+@contextmanager
+def abrir(base):
+    yield fake_cx_oracle.Connection()
+
+
+@pytest.fixture
+def filas(monkeypatch):
+    datos = [(i, f"cat{i % 3}", datetime.date(2024, 3, 1) if i % 2 else None) for i in range(2500)]
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", lambda sql, params: iter(datos))
+    monkeypatch.setattr(fake_cx_oracle, "LATENCIA_IDA_VUELTA", 0.0)
+    return datos
+
+
+@pytest.mark.parametrize("nombre", ["altas.csv", "altas.csv.gz", "altas.jsonl", "altas.jsonl.gz"])
+def test_exportar_formatos(nombre, filas, tmp_path):
+    """
+    Prueba que cada formato contiene todas las filas con la cabecera del cursor.
+
+    Teoría:
+    Leer el cursor con fetchmany y escribir cada lote en cuanto llega mantiene la memoria en el
+    tamaño de un lote. El formato y la compresión se deducen de la extensión del fichero.
+
+    ¿Qué hace este test?
+    - Exporta 2.500 filas en lotes de 1.000 a CSV y JSON Lines, con y sin gzip.
+    - Verifica las filas, la cabecera (nombres de columna) y que las fechas salen en ISO 8601.
+    - Verifica el resumen: filas, bytes del fichero y tamaño del mayor lote.
+    """
+    ruta = tmp_path / nombre
+    resumen = exportar(Exportacion("altas", "MEDIN", "SELECT * FROM altas", ruta), abrir, arraysize=1000)
+    assert resumen.ok and resumen.filas == 2500
+    assert resumen.bytes == ruta.stat().st_size
+    assert resumen.pico_lote_bytes > 0
+    assert [p.name for p in tmp_path.iterdir()] == [nombre]
+
+    contenido = ruta.read_bytes()
+    if nombre.endswith(".gz"):
+        contenido = gzip.decompress(contenido)
+    texto = contenido.decode("utf-8")
+    if formato_de_ruta(ruta) == "csv":
+        leidas = list(csv.reader(io.StringIO(texto)))
+        assert leidas[0] == ["ID", "CATEGORIA", "IMPORTE"]
+        assert leidas[2] == ["1", "cat1", "2024-03-01"]
+        assert len(leidas) == 2501
+    else:
+        leidas = [json.loads(linea) for linea in texto.splitlines()]
+        assert leidas[1] == {"ID": 1, "CATEGORIA": "cat1", "IMPORTE": "2024-03-01"}
+        assert leidas[0]["IMPORTE"] is None
+        assert len(leidas) == 2500
+
+
+def test_escritura_atomica_y_errores(filas, monkeypatch, tmp_path):
+    """
+    Prueba que una exportación fallida deja intacto el fichero anterior y no deja temporales.
+
+    Teoría:
+    Escribir en un temporal del mismo directorio y renombrarlo con os.replace al final es atómico:
+    quien lea la ruta ve el fichero anterior completo o el nuevo completo, nunca uno a medias.
+
+    ¿Qué hace este test?
+    - Crea un fichero previo y hace fallar el cursor a mitad de la lectura.
+    - Verifica que el error queda en el resumen, el fichero previo no cambia y no queda `.tmp`.
+    - Verifica que un formato desconocido, gzip con XLSX y XLSX sin openpyxl dan error.
+    """
+    ruta = tmp_path / "altas.csv"
+    ruta.write_text("anterior", encoding="utf-8")
+
+    def generador(sql, params):
+        yield from filas[:1500]
+        raise fake_cx_oracle.DatabaseError("ORA-01555: snapshot too old")
+
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", generador)
+    resumen = exportar(Exportacion("altas", "MEDIN", "SELECT * FROM altas", ruta), abrir, arraysize=1000)
+    assert not resumen.ok and "ORA-01555" in str(resumen.error)
+    assert ruta.read_text(encoding="utf-8") == "anterior"
+    assert [p.name for p in tmp_path.iterdir()] == ["altas.csv"]
+
+    for nombre, formato, comprimir in [("a.txt", None, None), ("a.xlsx", None, True)]:
+        resumen = exportar(Exportacion("x", "MEDIN", "SELECT 1", tmp_path / nombre, None, formato, comprimir), abrir)
+        assert isinstance(resumen.error, ValueError)
+    monkeypatch.setattr(exportacion, "openpyxl", None)
+    resumen = exportar(Exportacion("x", "MEDIN", "SELECT 1", tmp_path / "a.xlsx"), abrir)
+    assert isinstance(resumen.error, ImportError)
+    assert [p.name for p in tmp_path.iterdir()] == ["altas.csv"]
+
+
+def test_exportar_en_paralelo(filas, monkeypatch, tmp_path):
+    """
+    Prueba que las exportaciones de MEDIN y Simbad se solapan y el informe las resume.
+
+    Teoría:
+    Como en la recolección, la lectura del cursor libera el GIL durante la E/S de red, así que
+    exportar varias bases en paralelo tarda lo que la más lenta y no la suma de todas.
+
+    ¿Qué hace este test?
+    - Exporta dos consultas con 20 ms de latencia por ida y vuelta y cuenta las activas a la vez.
+    - Verifica que llegaron a ejecutarse simultáneamente y que el informe incluye filas/s y memoria.
+    - Verifica que dos exportaciones al mismo fichero se rechazan.
+    """
+    monkeypatch.setattr(fake_cx_oracle, "LATENCIA_IDA_VUELTA", 0.02)
+    activas, maximo, lock = [0], [0], threading.Lock()
+
+    @contextmanager
+    def abrir_contando(base):
+        with lock:
+            activas[0] += 1
+            maximo[0] = max(maximo[0], activas[0])
+        try:
+            yield fake_cx_oracle.Connection()
+        finally:
+            with lock:
+                activas[0] -= 1
+
+    exportaciones = [
+        Exportacion("altas", "MEDIN", "SELECT * FROM altas", tmp_path / "altas.csv"),
+        Exportacion("usuarios", "Simbad", "SELECT * FROM usuarios", tmp_path / "usuarios.jsonl.gz"),
+    ]
+    informe = exportar_en_paralelo(exportaciones, abrir=abrir_contando, arraysize=500)
+    assert informe.ok and maximo[0] == 2
+    assert informe.segundos_totales < sum(r.segundos for r in informe.resumenes)
+    assert [r.filas for r in informe.resumenes] == [2500, 2500]
+    assert informe.pico_rss_mb > 0
+    texto = informe.resumen()
+    assert "filas/s" in texto and "memoria máxima del proceso" in texto
+
+    with pytest.raises(ValueError):
+        exportar_en_paralelo(exportaciones + [exportaciones[0]], abrir=abrir)
+
+
+def test_binarios_y_fechas_iguales_en_csv_y_jsonl(monkeypatch, tmp_path):
+    """
+    Prueba que CSV y JSON Lines escriben binarios y fechas con la misma conversión.
+
+    Teoría:
+    Quien cruza una exportación CSV con otra JSON Lines espera los mismos textos: `str()` de un
+    bytes da su repr (`b'\\x..'`) y el de un datetime usa un espacio en lugar de la `T` de ISO 8601.
+
+    ¿Qué hace este test?
+    - Exporta una fila con un RAW y un DATE con hora a CSV y a JSON Lines.
+    - Verifica que ambos formatos dan el hexadecimal y la fecha en ISO 8601.
+    - Simula un sistema sin el módulo `resource` (Windows) y verifica que pico_rss_mb no falla.
+    """
+    fila = (1, b"\x00\xff", datetime.datetime(2024, 3, 1, 10, 30))
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", lambda sql, params: iter([fila]))
+    monkeypatch.setattr(fake_cx_oracle, "LATENCIA_IDA_VUELTA", 0.0)
+    for nombre in ["b.csv", "b.jsonl"]:
+        assert exportar(Exportacion("b", "MEDIN", "SELECT * FROM b", tmp_path / nombre), abrir).ok
+    csv_fila = list(csv.reader(io.StringIO((tmp_path / "b.csv").read_text(encoding="utf-8"))))[1]
+    json_fila = json.loads((tmp_path / "b.jsonl").read_text(encoding="utf-8"))
+    assert csv_fila[1:] == list(json_fila.values())[1:] == ["00ff", "2024-03-01T10:30:00"]
+
+    monkeypatch.setitem(sys.modules, "resource", None)
+    monkeypatch.setitem(sys.modules, "psutil", None)
+    assert exportacion.pico_rss_mb() == 0.0
+
+
+def test_exportar_xlsx(filas, tmp_path):
+    """
+    Prueba la exportación a XLSX en modo de solo escritura (si openpyxl está instalado).
+
+    Teoría:
+    En modo `write_only` openpyxl no construye el libro en memoria: cada fila añadida se
+    serializa a disco, así que la memoria no crece con el número de filas.
+
+    ¿Qué hace este test?
+    - Exporta 2.500 filas a XLSX y vuelve a leer el libro.
+    - Verifica la cabecera, el número de filas y una fila con fecha.
+    """
+    openpyxl = pytest.importorskip("openpyxl")
+    ruta = tmp_path / "altas.xlsx"
+    resumen = exportar(Exportacion("altas", "MEDIN", "SELECT * FROM altas", ruta), abrir, arraysize=1000)
+    assert resumen.ok and resumen.filas == 2500
+    hoja = openpyxl.load_workbook(ruta, read_only=True).active
+    leidas = list(hoja.iter_rows(values_only=True))
+    assert leidas[0] == ("ID", "CATEGORIA", "IMPORTE")
+    assert len(leidas) == 2501
+    assert leidas[2][:2] == (1, "cat1") and leidas[2][2].date() == datetime.date(2024, 3, 1)
@@ -0,0 +1,97 @@
+"""
+Archivo de pruebas automáticas para incremental.py
+
+Este archivo valida el cálculo incremental de estadísticas:
+- Comprueba que la primera ejecución procesa todo el histórico y fija la marca de agua.
+- Verifica que las siguientes ejecuciones solo piden el delta (más la ventana de recálculo).
+- Asegura que los datos que llegan tarde dentro de la ventana corrigen los totales.
+
+Se usa una "tabla" en memoria servida por una conexión simulada y un SQLite temporal como estado.
+"""
+import datetime
+from contextlib import contextmanager
+
+from src.incremental import EstadisticaIncremental, MotorIncremental
+
+D = datetime.date
+
+
+def crear_abridor(tabla, consultas):
+    """
+    Devuelve una función con la firma de `connection(nombre)` que filtra `tabla` por `:desde`.
+    """
+    class Cursor:
+        arraysize = prefetchrows = 0
+        def execute(self, sql, params):
+            consultas.append(params["desde"])
+            self.filas = [f for f in tabla if f[0] >= params["desde"]]
+        def fetchmany(self, n):
+            lote, self.filas = self.filas[:n], self.filas[n:]
+            return lote
+        def close(self):
+            pass
+
+    class Conn:
+        def cursor(self):
+            return Cursor()
+
+    @contextmanager
+    def abrir(base):
+        yield Conn()
+    return abrir
+
+
+def test_ejecucion_incremental(tmp_path):
+    """
+    Prueba que solo se consulta el delta y que los totales acumulados son correctos.
+
+    Teoría:
+    Una marca de agua recuerda hasta dónde se procesó. Guardando agregados parciales por día, cada ejecución solo lee los días nuevos y los combina con lo ya calculado, en vez de recalcular todo el histórico.
+
+    ¿Qué hace este test?
+    - Ejecuta la estadística sobre tres días y verifica la marca y los totales.
+    - Añade un día nuevo y un dato tardío del día anterior (dentro de la ventana de 1 día).
+    - Verifica que la segunda consulta empieza en marca - ventana y que los totales incluyen ambos datos.
+    """
+    tabla = [
+        (D(2024, 1, 1), "A", 10.0),
+        (D(2024, 1, 2), "A", 5.0),
+        (D(2024, 1, 3), "B", 1.0),
+    ]
+    consultas = []
+    abrir = crear_abridor(tabla, consultas)
+    est = EstadisticaIncremental("importe", "MEDIN", "SELECT ... WHERE fecha >= :desde", ventana_dias=1, inicio=D(2024, 1, 1))
+    motor = MotorIncremental(tmp_path / "estado.sqlite")
+
+    resumen = motor.ejecutar(est, abrir=abrir)
+    assert resumen.filas_leidas == 3 and resumen.marca == D(2024, 1, 3)
+    assert motor.totales(est)["A"] == {"conteo": 2, "suma": 15.0, "minimo": 5.0, "maximo": 10.0}
+
+    tabla.append((D(2024, 1, 2), "B", 2.0))   # dato tardío: dentro de la ventana de recálculo
+    tabla.append((D(2024, 1, 4), "A", 7.0))   # día nuevo
+    resumen = motor.ejecutar(est, abrir=abrir)
+    assert consultas == [D(2024, 1, 1), D(2024, 1, 2)]
+    assert resumen.filas_leidas == 4 and resumen.marca == D(2024, 1, 4)
+    totales = motor.totales(est)
+    assert totales["A"]["suma"] == 22.0 and totales["A"]["conteo"] == 3
+    assert totales["B"]["suma"] == 3.0
+    assert motor.totales(est, desde=D(2024, 1, 4))["A"]["suma"] == 7.0
+    motor.cerrar()
+
+
+def test_reiniciar(tmp_path):
+    """
+    Prueba que reiniciar borra la marca y la próxima ejecución vuelve a empezar desde `inicio`.
+
+    ¿Qué hace este test?
+    - Ejecuta la estadística, la reinicia y verifica que la marca desaparece y los totales quedan vacíos.
+    """
+    consultas = []
+    abrir = crear_abridor([(D(2024, 1, 1), "A", 1.0)], consultas)
+    est = EstadisticaIncremental("x", "Simbad", "SELECT ...", inicio=D(2024, 1, 1))
+    motor = MotorIncremental(tmp_path / "estado.sqlite")
+    motor.ejecutar(est, abrir=abrir)
+    motor.reiniciar(est)
+    assert motor.marca(est) is None
+    assert motor.totales(est) == {}
+    motor.cerrar()
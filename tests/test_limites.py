@@ -0,0 +1,153 @@
+"""
+Archivo de pruebas automáticas para limites.py
+
+Este archivo valida los límites de recursos de las consultas:
+- Comprueba que superar el máximo de filas, bytes o tiempo aborta la consulta con LimiteExcedido y se registra en el log.
+- Verifica que superar la memoria pasa la consulta a streaming si hay consumidor, o la aborta si no.
+- Asegura que el presupuesto de una recolección se comparte entre consultas y que una consulta cortada no retiene a las demás.
+
+Se usa el driver simulado `benchmarks.fake_cx_oracle`, cuya latencia respeta el callTimeout de la conexión.
+"""
+import logging
+from contextlib import contextmanager
+
+import cx_Oracle
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src import collector, connection, pool
+from src.collector import ConsultaEstadistica
+from src.limites import LimiteExcedido, LimitesConsulta, PresupuestoEjecucion, consultar_con_limites, leer_limites
+
+
+@pytest.fixture
+def filas(monkeypatch):
+    """100 filas de (id, texto de 10 caracteres) y sin latencia."""
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", lambda sql, params: ((i, "x" * 10) for i in range(100)))
+    monkeypatch.setattr(fake_cx_oracle, "LATENCIA_IDA_VUELTA", 0.0)
+
+
+def test_limites_de_filas_y_bytes(filas, caplog):
+    """
+    Prueba que una consulta que lee más filas o bytes de los permitidos se aborta.
+
+    ¿Qué hace este test?
+    - Sin límites, lee las 100 filas.
+    - Con max_filas=50 y con max_bytes=500 verifica que se lanza LimiteExcedido con el límite correspondiente.
+    - Verifica que el límite superado queda registrado en el log.
+    """
+    conn = fake_cx_oracle.Connection()
+    lectura = consultar_con_limites(conn, "SELECT", limites=LimitesConsulta(), arraysize=10)
+    assert lectura.total_filas == 100 and len(lectura.filas) == 100
+
+    with caplog.at_level(logging.WARNING, logger="src.limites"):
+        with pytest.raises(LimiteExcedido) as exc:
+            consultar_con_limites(conn, "SELECT", limites=LimitesConsulta(max_filas=50), descripcion="q", arraysize=10)
+    assert exc.value.limite == "filas"
+    assert "límite de filas" in caplog.text
+
+    with pytest.raises(LimiteExcedido) as exc:
+        consultar_con_limites(conn, "SELECT", limites=LimitesConsulta(max_bytes=500), arraysize=10)
+    assert exc.value.limite == "bytes"
+
+
+def test_memoria_pasa_a_streaming(filas):
+    """
+    Prueba que superar la memoria máxima pasa la consulta a streaming o la aborta.
+
+    Teoría:
+    Acumular un resultado enorme en una lista puede agotar la memoria del proceso. Si quien llama sabe procesar las
+    filas por lotes, basta con dejar de acumularlas y entregárselas a medida que llegan; la memoria queda acotada por
+    el tamaño del lote.
+
+    ¿Qué hace este test?
+    - Con un consumidor, verifica que no se pierde ninguna fila, que la lectura queda marcada en streaming y que no retiene filas.
+    - Sin consumidor, verifica que se lanza LimiteExcedido por memoria.
+    """
+    conn = fake_cx_oracle.Connection()
+    recibidas = []
+    lectura = consultar_con_limites(
+        conn, "SELECT", limites=LimitesConsulta(memoria_maxima=300), consumidor=recibidas.extend, arraysize=10
+    )
+    assert lectura.en_streaming and lectura.filas == []
+    assert [f[0] for f in recibidas] == list(range(100))
+
+    with pytest.raises(LimiteExcedido) as exc:
+        consultar_con_limites(conn, "SELECT", limites=LimitesConsulta(memoria_maxima=300), arraysize=10)
+    assert exc.value.limite == "memoria"
+
+
+def test_tiempo_de_llamada(filas, monkeypatch):
+    """
+    Prueba que el límite de tiempo se aplica con callTimeout y se restaura al terminar.
+
+    ¿Qué hace este test?
+    - Simula idas y vueltas de 200 ms y un límite de 20 ms.
+    - Verifica que la consulta termina con LimiteExcedido de tiempo, causado por el DPI-1067 del driver.
+    - Verifica que la sesión recupera su callTimeout anterior, porque vuelve al pool.
+    """
+    monkeypatch.setattr(fake_cx_oracle, "LATENCIA_IDA_VUELTA", 0.2)
+    conn = fake_cx_oracle.Connection()
+    with pytest.raises(LimiteExcedido) as exc:
+        consultar_con_limites(conn, "SELECT", limites=LimitesConsulta(segundos=0.02))
+    assert exc.value.limite == "tiempo"
+    assert "DPI-1067" in str(exc.value.__cause__)
+    assert conn.callTimeout == 0
+
+
+def test_connection_aplica_timeout_de_la_base(monkeypatch):
+    """
+    Prueba que connection() presta la sesión con el callTimeout configurado para la base y lo retira al devolverla.
+
+    ¿Qué hace este test?
+    - Configura timeout_consulta_MEDIN=2.5 y verifica que la sesión tiene callTimeout=2500 ms dentro del bloque.
+    - Verifica que, de vuelta en el pool, la sesión ya no tiene límite.
+    - Verifica que un valor no numérico se rechaza con EnvironmentError.
+    """
+    pool.cerrar_pools()
+    conf = {"MEDIN": {"user": "u", "password": "p", "dsn": "d"}}
+    monkeypatch.setattr(connection, "obtener_configuracion", lambda: conf)
+    monkeypatch.setattr(cx_Oracle, "SessionPool", fake_cx_oracle.SessionPool)
+    monkeypatch.setattr(cx_Oracle, "DatabaseError", fake_cx_oracle.DatabaseError)
+    monkeypatch.setenv("timeout_consulta_MEDIN", "2.5")
+    try:
+        with connection.connection("MEDIN") as conn:
+            assert conn.callTimeout == 2500
+        assert conn.callTimeout == 0
+    finally:
+        pool.cerrar_pools()
+
+    monkeypatch.setenv("timeout_consulta_MEDIN", "mucho")
+    with pytest.raises(EnvironmentError):
+        leer_limites("MEDIN")
+
+
+def test_recolectar_con_limites_y_presupuesto(filas, monkeypatch):
+    """
+    Prueba que una consulta que supera su límite no impide recoger las demás, y que el presupuesto es común.
+
+    Teoría:
+    En una recolección en paralelo, una estadística con un mal plan de ejecución retendría su sesión y alargaría la
+    ejecución entera. Con un límite propio se corta y queda como error en su resultado; el presupuesto de la
+    recolección acota además el total de filas leídas entre todas las consultas.
+
+    ¿Qué hace este test?
+    - Ejecuta 4 consultas de 100 filas, una de ellas limitada a 10 filas: solo esa falla.
+    - Repite con un presupuesto de 250 filas para toda la recolección en serie: las dos primeras terminan y las
+      siguientes fallan por presupuesto.
+    """
+    @contextmanager
+    def abrir(base):
+        yield fake_cx_oracle.Connection()
+
+    consultas = [ConsultaEstadistica(f"q{i}", "MEDIN", "SELECT") for i in range(4)]
+    consultas[1] = consultas[1]._replace(limites=LimitesConsulta(max_filas=10))
+    informe = collector.recolectar(consultas, limites={"MEDIN": 2}, abrir=abrir)
+    assert [r.ok for r in informe.resultados] == [True, False, True, True]
+    assert isinstance(informe.resultados[1].error, LimiteExcedido)
+    assert len(informe.resultados[0].filas) == 100
+
+    presupuesto = PresupuestoEjecucion(filas=250)
+    informe = collector.recolectar_en_serie(consultas[:1] * 4, abrir=abrir, presupuesto=presupuesto)
+    assert [r.ok for r in informe.resultados] == [True, True, False, False]
+    assert all(r.error.limite == "presupuesto" for r in informe.resultados[2:])
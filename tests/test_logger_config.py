@@ -4,12 +4,16 @@ Archivo de pruebas automáticas para logger_config.py
 Este archivo verifica que el sistema de logging de la aplicación:
 - Crea correctamente la carpeta y el archivo de logs al inicializarse.
 - Devuelve un logger configurado y funcional.
+- Se detiene sin errores en modo en cola aunque la cola esté llena.
 
 Se emplean pruebas que manipulan el sistema de archivos de manera controlada para asegurar que el logging funciona sin errores y no deja residuos.
 """
 import os
 import logging
+import logging.handlers
+import queue
 import shutil
+import threading
 from config import logger_config
 from pathlib import Path
 
@@ -52,3 +56,97 @@ def test_get_logger():
     logger_config.setup_logging()
     logger = logger_config.get_logger("test")
     assert isinstance(logger, logging.Logger)
+
+def test_setup_logging_idempotente():
+    """
+    Prueba que llamar dos veces a setup_logging no duplica los handlers.
+
+    Teoría:
+    Cada handler añadido al logger raíz escribe cada registro. Si la configuración se repite sin retirar los anteriores, cada línea se escribe dos veces y se duplica la E/S.
+
+    ¿Qué hace este test?
+    - Llama a setup_logging dos veces.
+    - Verifica que el número de handlers del logger raíz no cambia.
+    """
+    root = logging.getLogger()
+    logger_config.setup_logging()
+    cantidad = len(root.handlers)
+    logger_config.setup_logging()
+    assert len(root.handlers) == cantidad
+    logger_config.detener_logging()
+
+def test_setup_logging_en_cola():
+    """
+    Prueba el modo en cola: los registros llegan al fichero y la política 'descartar' cuenta los descartes.
+
+    Teoría:
+    Con un QueueHandler el hilo que registra solo encola el mensaje; un QueueListener en otro hilo hace la escritura a disco. Si la cola se llena, o se bloquea al emisor o se descarta el registro.
+
+    ¿Qué hace este test?
+    - Configura el modo en cola, registra un mensaje y detiene el logging (lo que vacía la cola).
+    - Verifica que el mensaje está en logs/app.log.
+    - Con una cola de 1 elemento sin listener y la política 'descartar', verifica que se cuentan los registros descartados.
+    """
+    logs_dir = Path(__file__).parent.parent / "logs"
+    logger_config.setup_logging(en_cola=True)
+    assert sum(isinstance(h, logging.handlers.QueueHandler) for h in logging.getLogger().handlers) == 1
+    logger_config.get_logger("test").debug("mensaje-en-cola")
+    logger_config.detener_logging()
+    assert "mensaje-en-cola" in (logs_dir / "app.log").read_text(encoding="utf-8")
+
+    manejador = logger_config._ManejadorCola(queue.Queue(maxsize=1), "descartar")
+    for i in range(3):
+        manejador.handle(logging.makeLogRecord({"msg": f"rafaga {i}"}))
+    assert manejador.descartados == 2
+    shutil.rmtree(logs_dir)
+
+
+def test_detener_logging_con_la_cola_llena():
+    """
+    Prueba que detener el logging con la cola llena espera a vaciarla en lugar de fallar.
+
+    Teoría:
+    QueueListener.stop() encola su marca de parada con put_nowait, que lanza queue.Full si la cola está llena:
+    justo la situación de sobrecarga para la que existe el modo en cola. Retirar antes el QueueHandler del
+    logger raíz impide que se siga llenando, y encolar la marca con un put bloqueante espera a que el
+    listener haga hueco.
+
+    ¿Qué hace este test?
+    - Configura una cola de 3 elementos y bloquea el listener en un handler que espera un evento.
+    - Llena la cola y llama a detener_logging() desde otro hilo; tras liberar el handler, verifica que termina sin error.
+    - Verifica que el hilo del listener se detuvo y que no queda ningún handler instalado.
+    """
+    liberar, empezado = threading.Event(), threading.Event()
+
+    class Bloqueante(logging.Handler):
+        def emit(self, record):
+            empezado.set()
+            liberar.wait(5)
+
+    logger_config.setup_logging(en_cola=True, tamano_cola=3, politica="descartar")
+    listener = logger_config._listener
+    listener.handlers = listener.handlers + (Bloqueante(),)
+    registro = logger_config.get_logger("test")
+    registro.info("primero")
+    assert empezado.wait(5)
+    for i in range(10):
+        registro.info("relleno %d", i)
+    assert listener.queue.full()
+
+    errores = []
+
+    def detener():
+        try:
+            logger_config.detener_logging()
+        except Exception as exc:
+            errores.append(exc)
+
+    hilo = threading.Thread(target=detener)
+    hilo.start()
+    hilo.join(0.2)  # con la cola llena, detener_logging() espera al listener
+    liberar.set()
+    hilo.join(5)
+    assert not hilo.is_alive() and errores == []
+    assert listener._thread is None
+    assert not any(isinstance(h, logging.handlers.QueueHandler) for h in logging.getLogger().handlers)
+    shutil.rmtree(Path(__file__).parent.parent / "logs", ignore_errors=True)
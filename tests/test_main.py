@@ -86,3 +86,132 @@ def test_main_db_error(monkeypatch):
             for call in mprint.call_args_list
         )
         assert found, "No se encontró el mensaje de error esperado en print."
+
+
+def test_importacion_perezosa():
+    """
+    Prueba que importar main.py no carga el driver de Oracle ni la configuración.
+
+    Teoría:
+    Cada invocación desde cron paga el tiempo de importar todo lo que el módulo principal importa, aunque el
+    subcomando no lo use. Posponer las importaciones pesadas al subcomando que las necesita reduce ese arranque.
+
+    ¿Qué hace este test?
+    - Importa main en un intérprete nuevo y verifica que cx_Oracle, dotenv y src no se han cargado.
+    """
+    import subprocess
+    import sys
+
+    codigo = "import main, sys; print(sorted(m for m in ('cx_Oracle', 'dotenv', 'src') if m in sys.modules))"
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    assert salida.stdout.strip() == "[]"
+
+
+def test_collect_con_parametros(monkeypatch, capsys):
+    """
+    Prueba el subcomando collect: qué consultas se ejecutan y con qué parámetros.
+
+    ¿Qué hace este test?
+    - Simula un catálogo con una consulta sin parámetros y otra que necesita :dia.
+    - Sin --dia, verifica que solo se ejecuta la primera; con --dia, ambas, y el día llega como fecha.
+    - Verifica que nombrar una consulta sin sus parámetros termina con código 2.
+    """
+    import datetime
+
+    from src import catalogo as modulo_catalogo
+    from src.catalogo import Catalogo, DefinicionConsulta
+
+    peticiones = []
+
+    class CatalogoSimulado(Catalogo):
+        def recolectar(self, pedidas, max_hilos=8, abrir=None):
+            peticiones.append(list(pedidas))
+            return mock.Mock(resumen=lambda: "resumen", resultados=[])
+
+    catalogo = CatalogoSimulado([
+        DefinicionConsulta("ping", "MEDIN", "SELECT 1 FROM DUAL", ()),
+        DefinicionConsulta("altas", "MEDIN", "SELECT COUNT(*) FROM altas WHERE fecha = :dia", ("dia",)),
+    ])
+    monkeypatch.setattr(modulo_catalogo, "obtener_catalogo", lambda: catalogo)
+
+    assert main.main(["collect"]) == 0
+    assert main.main(["collect", "--dia", "2024-03-01", "--hilos", "2"]) == 0
+    assert peticiones == [
+        [("ping", {})],
+        [("ping", {}), ("altas", {"dia": datetime.date(2024, 3, 1)})],
+    ]
+    assert main.main(["collect", "altas"]) == 2
+    assert "faltan parámetros" in capsys.readouterr().err
+
+
+def test_profile(monkeypatch, tmp_path):
+    """
+    Prueba que --profile guarda el perfil cProfile y el informe de importaciones del subcomando.
+
+    ¿Qué hace este test?
+    - Ejecuta ping con --profile y una conexión simulada.
+    - Verifica que se crean ping.prof (legible con pstats) y ping_importaciones.txt.
+    """
+    import pstats
+
+    dummy_conn = mock.MagicMock()
+    dummy_conn.cursor.return_value.fetchone.return_value = [1]
+    monkeypatch.setattr(main, "medin_connection", lambda: mock.MagicMock(__enter__=lambda s: dummy_conn))
+    assert main.main(["--profile", "--directorio-perfil", str(tmp_path), "ping"]) == 0
+    assert pstats.Stats(str(tmp_path / "ping.prof")).total_calls > 0
+    assert (tmp_path / "ping_importaciones.txt").read_text(encoding="utf-8").startswith("import time:")
+
+
+def test_export_en_paralelo(monkeypatch, capsys):
+    """
+    Prueba que export convierte los pares CONSULTA SALIDA en exportaciones paralelas.
+
+    ¿Qué hace este test?
+    - Simula un catálogo con una consulta de MEDIN y otra de Simbad, y el exportador.
+    - Verifica las exportaciones pedidas (base, ruta, parámetros, formato y gzip) y el código de salida.
+    - Verifica que un número impar de argumentos termina con código 2.
+    """
+    from pathlib import Path
+
+    from src import catalogo as modulo_catalogo
+    from src import exportacion
+    from src.catalogo import Catalogo, DefinicionConsulta
+
+    catalogo = Catalogo([
+        DefinicionConsulta("altas", "MEDIN", "SELECT * FROM altas WHERE fecha = :dia", ("dia",)),
+        DefinicionConsulta("usuarios", "Simbad", "SELECT * FROM usuarios", ()),
+    ])
+    monkeypatch.setattr(modulo_catalogo, "obtener_catalogo", lambda: catalogo)
+    pedidas = []
+
+    def exportar_en_paralelo(exportaciones, max_hilos):
+        pedidas.extend(exportaciones)
+        return mock.Mock(resumen=lambda: "resumen", ok=True)
+
+    monkeypatch.setattr(exportacion, "exportar_en_paralelo", exportar_en_paralelo)
+    codigo = main.main(["export", "altas", "altas.csv", "usuarios", "usuarios.jsonl", "--dia", "2024-03-01", "--gzip"])
+    assert codigo == 0
+    assert [(e.base, e.ruta, e.params, e.formato, e.comprimir) for e in pedidas] == [
+        ("MEDIN", Path("altas.csv"), {"dia": main._fecha("2024-03-01")}, None, True),
+        ("Simbad", Path("usuarios.jsonl"), {}, None, True),
+    ]
+    assert capsys.readouterr().out.strip() == "resumen"
+    assert main.main(["export", "altas"]) == 2
+
+
+def test_backfill_consulta_desconocida(monkeypatch, capsys):
+    """
+    Prueba que backfill con una consulta que no está en el catálogo termina con código 2.
+
+    ¿Qué hace este test?
+    - Simula un catálogo con una sola consulta.
+    - Verifica que pedir otra da código 2 y un mensaje de error, sin traza de KeyError.
+    """
+    from src import catalogo as modulo_catalogo
+    from src.catalogo import Catalogo, DefinicionConsulta
+
+    catalogo = Catalogo([DefinicionConsulta("altas", "MEDIN", "SELECT * FROM altas", ("desde", "hasta"))])
+    monkeypatch.setattr(modulo_catalogo, "obtener_catalogo", lambda: catalogo)
+    codigo = main.main(["backfill", "x", "noexiste", "--desde", "2024-01-01", "--hasta", "2024-01-31"])
+    assert codigo == 2
+    assert "noexiste" in capsys.readouterr().err
@@ -2,37 +2,48 @@
 Archivo de pruebas automáticas para medin_connection.py
 
 Este archivo contiene tests que aseguran el correcto funcionamiento del context manager para conexiones a la base de datos MEDIN:
-- Verifica que se abre y cierra la conexión correctamente con configuración válida.
+- Verifica que se toma una sesión del pool y se devuelve correctamente con configuración válida.
 - Comprueba que se lanza KeyError si falta la configuración.
 - Asegura que los errores de base de datos se propagan adecuadamente.
 
 Se utilizan mocks para simular tanto la configuración como la conexión a Oracle, permitiendo pruebas sin acceso real a la base de datos.
 """
 import pytest
-from src import medin_connection
+from src import connection, medin_connection, pool
 from unittest import mock
 import cx_Oracle
 
 
+@pytest.fixture(autouse=True)
+def limpiar_pools():
+    """
+    Vacía el registro de pools antes y después de cada test, para que ningún test reutilice el pool de otro.
+    """
+    pool.cerrar_pools()
+    yield
+    pool.cerrar_pools()
+
+
 def test_medin_connection_ok(monkeypatch):
     """
-    Prueba que el context manager abre y cierra la conexión correctamente cuando la configuración es válida.
+    Prueba que el context manager toma una sesión del pool y la devuelve al salir cuando la configuración es válida.
 
     Teoría:
-    Un context manager en Python (bloque 'with') se usa para manejar recursos que deben abrirse y cerrarse correctamente, como archivos o conexiones a bases de datos. Aquí, simulamos (mockeamos) la conexión para no depender de una base real.
+    Un context manager en Python (bloque 'with') se usa para manejar recursos que deben abrirse y cerrarse correctamente, como archivos o conexiones a bases de datos. Con un pool de sesiones, "cerrar" significa devolver la sesión al pool para que otro bloque la reutilice sin repetir el logon. Aquí simulamos (mockeamos) el pool para no depender de una base real.
 
     ¿Qué hace este test?
     - Simula una conexión a la base de datos usando una clase DummyConn.
+    - Simula un pool (DummyPool) que entrega siempre esa conexión.
     - Simula la función de configuración para que siempre devuelva datos válidos.
-    - Simula la función de conexión de cx_Oracle para que devuelva nuestro DummyConn.
-    - Usa el context manager y verifica que:
+    - Usa el context manager dos veces y verifica que:
         - Se obtiene la conexión simulada.
-        - La conexión no está cerrada dentro del bloque.
-        - Al salir del bloque, la conexión se cierra correctamente.
+        - La conexión no se ha devuelto al pool dentro del bloque.
+        - Al salir del bloque, la conexión vuelve al pool.
+        - El pool se crea una única vez.
     """
     class DummyConn:
         """
-        Clase simulada que representa una conexión a base de datos para pruebas.
+        Clase simulada que representa una sesión del pool para pruebas.
 
         ¿Por qué usar una clase dummy?
         En testing, a veces no queremos depender de recursos reales (como una base de datos),
@@ -41,19 +52,35 @@ def test_medin_connection_ok(monkeypatch):
         - cursor: devuelve a sí misma para simplificar el test.
         - execute: simula la ejecución de una consulta.
         - fetchone: simula la obtención de un resultado.
-        - close: marca la conexión como cerrada.
+        - ping: simula la comprobación de que la sesión está viva.
         """
         def cursor(self): return self
         def execute(self, q): return None
         def fetchone(self): return [1]
-        def close(self): self.closed = True
+        def ping(self): return None
+
+    class DummyPool:
+        """
+        Pool simulado que registra las sesiones prestadas y devueltas.
+        """
+        creados = 0
+        def __init__(self, **kwargs):
+            DummyPool.creados += 1
+            self.liberadas = []
+        def acquire(self): return dummy
+        def release(self, conn): self.liberadas.append(conn)
+        def close(self, force=False): pass
+
     dummy = DummyConn()
-    monkeypatch.setattr(medin_connection, "cargar_configuracion", lambda: {"MEDIN": {"user": "u", "password": "p", "dsn": "d"}})
-    monkeypatch.setattr(cx_Oracle, "connect", lambda **kwargs: dummy)
+    monkeypatch.setattr(connection, "obtener_configuracion", lambda: {"MEDIN": {"user": "u", "password": "p", "dsn": "d"}})
+    monkeypatch.setattr(cx_Oracle, "SessionPool", DummyPool)
     with medin_connection.medin_connection() as conn:
         assert conn is dummy
-        assert not hasattr(dummy, 'closed')  # No debe estar cerrada dentro del with
-    assert dummy.closed  # Debe estar cerrada al salir del with
+        assert pool._pools["MEDIN"].liberadas == []  # No debe devolverse dentro del with
+    assert pool._pools["MEDIN"].liberadas == [dummy]  # Debe volver al pool al salir del with
+    with medin_connection.medin_connection():
+        pass
+    assert DummyPool.creados == 1  # El pool se reutiliza entre bloques
 
 
 def test_medin_connection_keyerror(monkeypatch):
@@ -68,7 +95,7 @@ def test_medin_connection_keyerror(monkeypatch):
     - Intenta abrir la conexión usando el context manager.
     - Verifica que se lanza un KeyError, como se espera en este caso.
     """
-    monkeypatch.setattr(medin_connection, "cargar_configuracion", lambda: {})
+    monkeypatch.setattr(connection, "obtener_configuracion", lambda: {})
     with pytest.raises(KeyError):
         with medin_connection.medin_connection():
             pass
@@ -76,18 +103,18 @@ def test_medin_connection_keyerror(monkeypatch):
 
 def test_medin_connection_db_error(monkeypatch):
     """
-    Prueba que se propaga correctamente un error de base de datos (DatabaseError) si cx_Oracle falla al conectar.
+    Prueba que se propaga correctamente un error de base de datos (DatabaseError) si cx_Oracle falla al crear el pool.
 
     Teoría:
     Cuando ocurre un error al conectar a la base de datos, cx_Oracle lanza una excepción DatabaseError. Es importante que nuestro context manager no oculte este error, sino que lo deje pasar para que el programa pueda manejarlo.
 
     ¿Qué hace este test?
     - Simula la función de configuración para que devuelva datos válidos.
-    - Simula la función de conexión de cx_Oracle para que lance una excepción DatabaseError.
+    - Simula la creación del pool de cx_Oracle para que lance una excepción DatabaseError.
     - Verifica que al intentar abrir la conexión, se lanza la excepción esperada.
     """
-    monkeypatch.setattr(medin_connection, "cargar_configuracion", lambda: {"MEDIN": {"user": "u", "password": "p", "dsn": "d"}})
-    monkeypatch.setattr(cx_Oracle, "connect", lambda **kwargs: (_ for _ in ()).throw(cx_Oracle.DatabaseError("fail")))
+    monkeypatch.setattr(connection, "obtener_configuracion", lambda: {"MEDIN": {"user": "u", "password": "p", "dsn": "d"}})
+    monkeypatch.setattr(cx_Oracle, "SessionPool", lambda **kwargs: (_ for _ in ()).throw(cx_Oracle.DatabaseError("fail")))
     with pytest.raises(cx_Oracle.DatabaseError):
         with medin_connection.medin_connection():
             pass
@@ -0,0 +1,85 @@
+"""
+Archivo de pruebas automáticas para metricas.py
+
+Este archivo valida la instrumentación del camino caliente:
+- Comprueba que los histogramas calculan percentiles con un error pequeño.
+- Verifica que, desactivada, no se acumula nada.
+- Asegura que la lectura en streaming registra ejecución, lotes, filas y bytes.
+
+Se usa el cursor simulado de `benchmarks.fake_cx_oracle`, sin base de datos real.
+"""
+import logging
+
+import pytest
+
+from benchmarks import fake_cx_oracle
+from config import metricas
+from src.streaming import iterar_lotes
+
+
+@pytest.fixture(autouse=True)
+def estado_limpio():
+    """
+    Deja las métricas desactivadas y vacías antes y después de cada test.
+    """
+    metricas.habilitar(False)
+    metricas.reiniciar()
+    yield
+    metricas.habilitar(False)
+    metricas.reiniciar()
+
+
+def test_histograma_percentiles():
+    """
+    Prueba que los percentiles del histograma logarítmico tienen un error relativo pequeño.
+
+    Teoría:
+    Guardar todas las medidas para calcular percentiles exactos consume memoria sin límite. Un histograma con cubetas de ancho relativo fijo usa memoria constante y da percentiles con error acotado.
+
+    ¿Qué hace este test?
+    - Agrega los valores 1..1000.
+    - Verifica p50, p95 y p99 con un margen del 2 % y el máximo exacto.
+    """
+    h = metricas.Histograma()
+    for v in range(1, 1001):
+        h.agregar(float(v))
+    assert h.percentil(50) == pytest.approx(500, rel=0.02)
+    assert h.percentil(95) == pytest.approx(950, rel=0.02)
+    assert h.percentil(99) == pytest.approx(990, rel=0.02)
+    assert h.resumen()["max"] == 1000
+
+
+def test_desactivada_no_registra():
+    """
+    Prueba que con la instrumentación desactivada no se acumula ninguna medida.
+
+    ¿Qué hace este test?
+    - Usa cronometro y registrar con las métricas desactivadas.
+    - Verifica que el resumen está vacío.
+    """
+    with metricas.cronometro("x"):
+        pass
+    metricas.registrar("y", 1)
+    assert metricas.resumen() == {}
+
+
+def test_streaming_instrumentado(caplog):
+    """
+    Prueba que la lectura en streaming registra execute, fetch, filas y bytes, y que volcar escribe el resumen en el log.
+
+    ¿Qué hace este test?
+    - Activa las métricas y recorre las filas simuladas en lotes de 100.
+    - Verifica los eventos registrados y sus cantidades.
+    - Verifica que volcar() emite un registro estructurado por evento.
+    """
+    metricas.habilitar()
+    list(iterar_lotes(fake_cx_oracle.Connection(), "SELECT 1", arraysize=100))
+    resumen = metricas.resumen()
+    assert resumen["consulta.execute"]["cantidad"] == 1
+    assert resumen["consulta.fetch"]["cantidad"] == 1 + fake_cx_oracle.FILAS_POR_DEFECTO // 100
+    assert resumen["consulta.filas"]["suma"] == fake_cx_oracle.FILAS_POR_DEFECTO
+    assert resumen["consulta.bytes"]["suma"] > 0
+    with caplog.at_level(logging.INFO, logger="metricas"):
+        metricas.volcar()
+    eventos = [r.metrica["evento"] for r in caplog.records if r.levelno == logging.INFO and hasattr(r, "metrica")]
+    assert eventos == sorted(resumen)
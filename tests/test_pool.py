@@ -0,0 +1,148 @@
+"""
+Archivo de pruebas automáticas para pool.py
+
+Este archivo valida el pool de sesiones compartido por todo el proceso:
+- Comprueba que el pool se crea una sola vez por base de datos y se reutiliza.
+- Verifica que los tamaños del pool se leen de las variables de entorno y se validan.
+- Asegura que las sesiones inactivas se comprueban al adquirirlas y las muertas se descartan, sin ping en cada préstamo.
+
+Se usa el driver simulado `benchmarks.fake_cx_oracle` para no requerir una base Oracle real.
+"""
+import os
+import pytest
+from unittest import mock
+
+from benchmarks import fake_cx_oracle
+from src import pool
+
+CONF = {"user": "u", "password": "p", "dsn": "d"}
+
+
+@pytest.fixture(autouse=True)
+def limpiar_pools():
+    """
+    Vacía el registro de pools antes y después de cada test.
+    """
+    pool.cerrar_pools()
+    yield
+    pool.cerrar_pools()
+
+
+def test_pool_se_reutiliza():
+    """
+    Prueba que varias llamadas a sesion() comparten el mismo pool y devuelven la sesión al salir.
+
+    Teoría:
+    Abrir una conexión Oracle implica un handshake de logon costoso. Un pool mantiene sesiones abiertas
+    y las presta a quien las pide, de modo que ese coste se paga una sola vez por sesión y no por consulta.
+
+    ¿Qué hace este test?
+    - Abre dos bloques `with sesion(...)` consecutivos contra la misma base.
+    - Verifica que ambos usan el mismo objeto pool.
+    - Verifica que al salir no quedan sesiones ocupadas.
+    """
+    with pool.sesion("TEST", CONF, driver=fake_cx_oracle) as conn1:
+        primero = pool._pools["TEST"]
+        assert primero.busy == 1
+    with pool.sesion("TEST", CONF, driver=fake_cx_oracle) as conn2:
+        assert pool._pools["TEST"] is primero
+    assert conn1 is conn2
+    assert primero.busy == 0
+
+
+def test_tamanos_desde_entorno():
+    """
+    Prueba que los tamaños del pool se leen de las variables pool_min/pool_max/pool_increment.
+
+    ¿Qué hace este test?
+    - Simula las variables de entorno de tamaño para un prefijo de prueba.
+    - Verifica que _leer_tamanos devuelve esos valores.
+    - Verifica que un valor no entero o incoherente lanza EnvironmentError.
+    """
+    env = {"pool_min_TEST": "2", "pool_max_TEST": "8", "pool_increment_TEST": "2"}
+    with mock.patch.dict(os.environ, env):
+        assert pool._leer_tamanos("TEST") == {"min": 2, "max": 8, "increment": 2}
+    with mock.patch.dict(os.environ, {"pool_max_TEST": "muchos"}):
+        with pytest.raises(EnvironmentError):
+            pool._leer_tamanos("TEST")
+    with mock.patch.dict(os.environ, {"pool_min_TEST": "5", "pool_max_TEST": "2"}):
+        with pytest.raises(EnvironmentError):
+            pool._leer_tamanos("TEST")
+
+
+def test_sesion_muerta_se_descarta(monkeypatch):
+    """
+    Prueba que una sesión que no responde al ping se descarta y se entrega otra sana.
+
+    Teoría:
+    Las sesiones de un pool pueden morir mientras esperan (corte de red, reinicio del servidor).
+    Comprobar las que llevan tiempo inactivas al adquirirlas evita que la consulta falle con una sesión inservible.
+
+    ¿Qué hace este test?
+    - Con pool_ping_TEST=0 (comprobar siempre), marca la única sesión libre como muerta (su ping lanza DatabaseError).
+    - Adquiere una sesión y verifica que no es la muerta.
+    """
+    monkeypatch.setenv("pool_ping_TEST", "0")
+    with pool.sesion("TEST", CONF, driver=fake_cx_oracle) as conn:
+        muerta = conn
+    monkeypatch.setattr(muerta, "ping", lambda: (_ for _ in ()).throw(fake_cx_oracle.DatabaseError("ORA-03113")))
+    with pool.sesion("TEST", CONF, driver=fake_cx_oracle) as conn:
+        assert conn is not muerta
+        conn.ping()
+
+
+def test_stmtcache_desde_entorno():
+    """
+    Prueba que el tamaño de la caché de sentencias se lee de pool_stmtcache_{PREFIJO} y se pasa al pool.
+
+    ¿Qué hace este test?
+    - Verifica el valor por defecto y el leído del entorno.
+    - Verifica que un valor negativo lanza EnvironmentError.
+    - Crea el pool y verifica que recibe el tamaño configurado.
+    """
+    assert pool._leer_stmtcache("TEST") == pool.STMTCACHE_POR_DEFECTO
+    with mock.patch.dict(os.environ, {"pool_stmtcache_TEST": "-1"}):
+        with pytest.raises(EnvironmentError):
+            pool._leer_stmtcache("TEST")
+    with mock.patch.dict(os.environ, {"pool_stmtcache_TEST": "120"}):
+        assert pool.obtener_pool("TEST", CONF, driver=fake_cx_oracle).stmtcachesize == 120
+
+
+def test_ping_solo_tras_inactividad(monkeypatch):
+    """
+    Prueba que una sesión devuelta hace poco se presta sin ping y que el pool de cx_Oracle recibe ping_interval.
+
+    Teoría:
+    Hacer ping en cada préstamo añade una ida y vuelta completa a cada consulta y anula buena parte de lo que
+    se gana con el pool. Basta con comprobar las sesiones que llevan tiempo inactivas, que son las que pueden
+    haber perdido la conexión; cx_Oracle >= 8.2 lo hace dentro del propio pool con `ping_interval`.
+
+    ¿Qué hace este test?
+    - Presta la misma sesión tres veces seguidas y verifica que solo se hace ping la primera (nunca prestada).
+    - Simula que pasó más de pool_ping_TEST desde que se devolvió y verifica que se vuelve a comprobar.
+    - Con un driver de versión 8.3, verifica que el pool recibe ping_interval y no se hace ping al prestar.
+    - Verifica que un pool_ping_TEST negativo lanza EnvironmentError.
+    """
+    for _ in range(3):
+        with pool.sesion("TEST", CONF, driver=fake_cx_oracle) as conn:
+            pass
+    assert conn.pings == 1
+    pool._liberadas[id(conn)] -= pool.PING_INTERVALO_POR_DEFECTO
+    with pool.sesion("TEST", CONF, driver=fake_cx_oracle):
+        pass
+    assert conn.pings == 2
+
+    class PoolConPing(fake_cx_oracle.SessionPool):
+        def __init__(self, *args, ping_interval, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.ping_interval = ping_interval
+
+    driver = mock.Mock(version="8.3.0", SessionPool=PoolConPing, DatabaseError=fake_cx_oracle.DatabaseError)
+    monkeypatch.setenv("pool_ping_OTRA", "30")
+    with pool.sesion("OTRA", CONF, driver=driver) as conn:
+        assert conn.pings == 0
+    assert pool._pools["OTRA"].ping_interval == 30
+
+    monkeypatch.setenv("pool_ping_TEST", "-1")
+    with pytest.raises(EnvironmentError):
+        pool._leer_ping_intervalo("TEST")
@@ -0,0 +1,160 @@
+"""
+Archivo de pruebas automáticas para resiliencia.py
+
+Este archivo valida los reintentos ante errores transitorios de Oracle:
+- Comprueba la clasificación de errores por su código ORA/DPI.
+- Verifica que las esperas crecen de forma exponencial, con jitter, y respetan el plazo total.
+- Asegura que connection() reintenta la adquisición, usa el DSN secundario y descarta las sesiones perdidas.
+
+Se usa el driver simulado `benchmarks.fake_cx_oracle` y un reloj simulado, sin esperas reales.
+"""
+import cx_Oracle
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src import connection, pool, resiliencia
+
+Error = fake_cx_oracle.DatabaseError
+
+
+class Reloj:
+    """Reloj simulado: dormir avanza el tiempo sin esperar."""
+
+    def __init__(self):
+        self.ahora = 0.0
+        self.esperas = []
+
+    def __call__(self):
+        return self.ahora
+
+    def dormir(self, segundos):
+        self.esperas.append(segundos)
+        self.ahora += segundos
+
+
+def test_clasificacion_de_errores():
+    """
+    Prueba que los errores se clasifican por su código.
+
+    ¿Qué hace este test?
+    - Verifica que se extrae el código del mensaje y del atributo `code` del error de cx_Oracle.
+    - Verifica que un corte de red es reintentable y deja la sesión perdida.
+    - Verifica que un error de SQL o de credenciales no es reintentable.
+    """
+    class ErrorOracle:
+        code = 3113
+        message = "ORA-03113: end-of-file on communication channel"
+
+    assert resiliencia.codigo_error(Error(ErrorOracle())) == "ORA-03113"
+    assert resiliencia.codigo_error(Error("DPI-1080: connection was closed by ORA-3113")) == "DPI-1080"
+    assert resiliencia.es_sesion_perdida(Error("ORA-3113: end-of-file"))
+    assert resiliencia.es_reintentable(Error("ORA-12541: TNS:no listener"))
+    assert not resiliencia.es_sesion_perdida(Error("ORA-12541: TNS:no listener"))
+    assert not resiliencia.es_reintentable(Error("ORA-00942: table or view does not exist"))
+    assert not resiliencia.es_reintentable(Error("ORA-01017: invalid username/password"))
+    assert not resiliencia.es_reintentable(ValueError("ORA sin código"))
+
+
+def test_reintentar_con_espera_y_plazo():
+    """
+    Prueba que reintentar espera de forma exponencial y se detiene al agotar intentos o plazo.
+
+    Teoría:
+    Un corte breve se supera reintentando unos instantes después. Las esperas crecientes con un componente
+    aleatorio evitan saturar el servidor y que muchos procesos reintenten a la vez; el plazo total acota el
+    tiempo perdido si el corte es largo.
+
+    ¿Qué hace este test?
+    - Falla dos veces con ORA-03113 y verifica que al tercer intento devuelve el resultado.
+    - Verifica que las esperas no superan el tope exponencial.
+    - Verifica que un error no reintentable se propaga sin esperar.
+    - Verifica que no se empieza una espera que supere el plazo.
+    """
+    reloj = Reloj()
+    fallos = [Error("ORA-03113"), Error("ORA-03113")]
+
+    def operacion():
+        if fallos:
+            raise fallos.pop(0)
+        return "ok"
+
+    politica = resiliencia.PoliticaReintentos(intentos=4, espera_inicial=1.0, espera_maxima=10.0, plazo=60.0)
+    assert resiliencia.reintentar(operacion, politica, dormir=reloj.dormir, reloj=reloj) == "ok"
+    assert len(reloj.esperas) == 2
+    assert reloj.esperas[0] <= 1.0 and reloj.esperas[1] <= 2.0
+
+    reloj = Reloj()
+    with pytest.raises(Error):
+        resiliencia.reintentar(lambda: (_ for _ in ()).throw(Error("ORA-00942")), politica, dormir=reloj.dormir, reloj=reloj)
+    assert reloj.esperas == []
+
+    reloj = Reloj()
+    corto = politica._replace(intentos=100, plazo=3.0)
+    with pytest.raises(Error):
+        resiliencia.reintentar(lambda: (_ for _ in ()).throw(Error("ORA-03113")), corto,
+                               dormir=reloj.dormir, reloj=reloj)
+    assert reloj.ahora <= 3.0
+
+
+@pytest.fixture
+def entorno(monkeypatch):
+    """Configuración con DSN secundario, driver simulado y reintentos sin espera real."""
+    pool.cerrar_pools()
+    conf = {"MEDIN": {"user": "u", "password": "p", "dsn": "principal", "dsn_failover": "secundario"}}
+    monkeypatch.setattr(connection, "obtener_configuracion", lambda: conf)
+    monkeypatch.setattr(cx_Oracle, "DatabaseError", fake_cx_oracle.DatabaseError)
+    monkeypatch.setattr(resiliencia.time, "sleep", lambda s: None)
+    yield monkeypatch
+    pool.cerrar_pools()
+
+
+def test_connection_failover_y_reintentos(entorno):
+    """
+    Prueba que connection() usa el DSN secundario si el principal no responde y reintenta cortes breves.
+
+    ¿Qué hace este test?
+    - Simula que el pool del DSN principal no se puede crear (no hay listener).
+    - Verifica que la sesión se obtiene del pool del DSN secundario.
+    - Simula un corte breve en ambos DSN y verifica que un reintento posterior lo supera.
+    """
+    creados = []
+
+    def session_pool(**kwargs):
+        creados.append(kwargs["dsn"])
+        if kwargs["dsn"] == "principal" or len(creados) <= 3:
+            raise Error("ORA-12541: TNS:no listener")
+        return fake_cx_oracle.SessionPool(**kwargs)
+
+    entorno.setattr(cx_Oracle, "SessionPool", session_pool)
+    with connection.connection("MEDIN") as conn:
+        conn.ping()
+    assert creados == ["principal", "secundario", "principal", "secundario"]
+    assert pool._pools["MEDIN:failover"].dsn == "secundario"
+
+
+def test_sesion_perdida_se_descarta(entorno):
+    """
+    Prueba que una sesión que pierde la conexión dentro del bloque se descarta y con_reintentos repite el trabajo.
+
+    Teoría:
+    Devolver al pool una sesión rota haría fallar a la siguiente consulta que la reciba. Descartarla obliga al
+    pool a abrir una nueva.
+
+    ¿Qué hace este test?
+    - Ejecuta con con_reintentos un trabajo que falla con ORA-03113 la primera vez.
+    - Verifica que el trabajo se repite con otra sesión y que la primera no volvió al pool.
+    """
+    entorno.setattr(cx_Oracle, "SessionPool", fake_cx_oracle.SessionPool)
+    sesiones = []
+
+    def trabajo(conn):
+        sesiones.append(conn)
+        if len(sesiones) == 1:
+            raise Error("ORA-03113: end-of-file on communication channel")
+        return "hecho"
+
+    assert connection.con_reintentos("MEDIN", trabajo) == "hecho"
+    assert sesiones[0] is not sesiones[1]
+    principal = pool._pools["MEDIN"]
+    assert sesiones[0] not in principal._libres
+    assert principal.busy == 0
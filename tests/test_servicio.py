@@ -0,0 +1,238 @@
+"""
+Archivo de pruebas automáticas para servicio.py
+
+Este archivo valida el modo servicio:
+- Comprueba que el planificador calcula los días pendientes y recupera los que se perdieron mientras el proceso estaba parado.
+- Verifica que un día fallido no avanza el trabajo y que el último día completado sobrevive a un reinicio.
+- Asegura que el servidor HTTP sirve los resultados guardados y calcula a demanda los que faltan, solo dentro
+  de los días retenidos y una sola vez aunque lleguen peticiones simultáneas.
+
+Se usan trabajos simulados y un reloj fijo, sin bases de datos reales.
+"""
+import datetime
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+import pytest
+
+from src import servicio as modulo
+from src.servicio import AlmacenResultados, Resultado, Servicio, TrabajoDiario
+
+AHORA = datetime.datetime(2024, 3, 10, 7, 0)
+
+
+@contextmanager
+def abrir_simulado(base):
+    class Conn:
+        def ping(self):
+            pass
+    yield Conn()
+
+
+def crear_servicio(tmp_path, trabajos, ahora=AHORA, **opciones):
+    return Servicio(
+        trabajos, bases=("MEDIN",), puerto=None, ruta_estado=tmp_path / "servicio.json",
+        abrir=abrir_simulado, reloj=lambda: ahora, **opciones,
+    )
+
+
+def test_pendientes_y_recuperacion(tmp_path):
+    """
+    Prueba que el planificador calcula qué días faltan de cada trabajo.
+
+    Teoría:
+    Un planificador que solo mira "¿toca ahora?" pierde los días en que el proceso estuvo parado. Guardando el último
+    día completado, al volver a arrancar se sabe exactamente qué días faltan y se recuperan en orden.
+
+    ¿Qué hace este test?
+    - Sin ejecuciones previas, a las 7:00 solo está pendiente el día anterior; a las 5:00, aún no ha llegado la hora.
+    - Con el último día completado hace 5 días, verifica que se recuperan los 4 siguientes en orden.
+    - Verifica que la recuperación se limita a max_recuperacion_dias.
+    """
+    trabajos = [TrabajoDiario("altas", lambda dia: dia.day)]
+    s = crear_servicio(tmp_path, trabajos)
+    assert s.pendientes() == [("altas", datetime.date(2024, 3, 9))]
+    assert s.pendientes(AHORA.replace(hour=5)) == [("altas", datetime.date(2024, 3, 8))]
+
+    s.completados["altas"] = datetime.date(2024, 3, 5)
+    assert [d.day for _, d in s.pendientes()] == [6, 7, 8, 9]
+
+    s = crear_servicio(tmp_path, trabajos, max_recuperacion_dias=2)
+    s.completados["altas"] = datetime.date(2024, 2, 1)
+    assert [d.day for _, d in s.pendientes()] == [8, 9]
+
+
+def test_ejecutar_pendientes_persiste_y_reintenta(tmp_path):
+    """
+    Prueba que los días completados se guardan en disco y que un fallo no avanza el trabajo.
+
+    ¿Qué hace este test?
+    - Ejecuta dos trabajos con 3 días pendientes; uno de ellos falla el segundo día.
+    - Verifica que el trabajo correcto avanza hasta el último día y el fallido se queda en el primero, con su error en /salud.
+    - Crea un servicio nuevo con el mismo fichero de estado y verifica que solo quedan pendientes los días del fallido.
+    """
+    fallar = {datetime.date(2024, 3, 8)}
+
+    def fragil(dia):
+        if dia in fallar:
+            raise RuntimeError("ORA-00942")
+        return dia.day
+
+    trabajos = [TrabajoDiario("altas", lambda dia: dia.day), TrabajoDiario("bajas", fragil)]
+    s = crear_servicio(tmp_path, trabajos)
+    s.completados = {"altas": datetime.date(2024, 3, 6), "bajas": datetime.date(2024, 3, 6)}
+    assert s.ejecutar_pendientes() == 4
+    assert s.completados == {"altas": datetime.date(2024, 3, 9), "bajas": datetime.date(2024, 3, 7)}
+    assert s.salud()["estado"] == "degradado"
+    assert s.almacen.obtener("altas").valor == 9
+
+    reiniciado = crear_servicio(tmp_path, trabajos)
+    assert reiniciado.pendientes() == [("bajas", datetime.date(2024, 3, 8)), ("bajas", datetime.date(2024, 3, 9))]
+    fallar.clear()
+    assert reiniciado.ejecutar_pendientes() == 2
+    assert reiniciado.salud()["estado"] == "ok"
+
+
+def test_almacen_retiene_los_dias_mas_recientes():
+    """
+    Prueba que el almacén en memoria solo conserva los días más recientes de cada trabajo.
+
+    ¿Qué hace este test?
+    - Guarda 4 días con dias_retenidos=3 y verifica que se conservan los 3 más recientes.
+    - Guarda un día anterior a los demás (como un cálculo a demanda) y verifica que no se descarta en el acto.
+    - Verifica que sin día se devuelve el más reciente.
+    """
+    almacen = AlmacenResultados(dias_retenidos=3)
+    for dia in (5, 6, 7, 8):
+        almacen.guardar(Resultado("altas", datetime.date(2024, 3, dia), dia, AHORA, 0.0))
+    assert almacen.indice() == {"altas": ["2024-03-06", "2024-03-07", "2024-03-08"]}
+    almacen.guardar(Resultado("altas", datetime.date(2024, 3, 1), 1, AHORA, 0.0))
+    assert almacen.indice() == {"altas": ["2024-03-01", "2024-03-07", "2024-03-08"]}
+    assert almacen.obtener("altas").valor == 8
+
+
+def test_servidor_http(tmp_path, monkeypatch):
+    """
+    Prueba el servidor HTTP del servicio de principio a fin.
+
+    Teoría:
+    Un proceso que sigue vivo conserva los pools abiertos y los resultados en memoria: responder a una petición
+    repetida es leer un diccionario, sin logon ni consulta.
+
+    ¿Qué hace este test?
+    - Inicia el servicio en un puerto libre; el planificador calcula el día pendiente.
+    - Verifica /salud, /resultados y el último resultado de un trabajo.
+    - Pide un día que no estaba calculado y verifica que se calcula a demanda una sola vez.
+    - Verifica que un día futuro o anterior a los retenidos da 400 sin ejecutar el trabajo.
+    - Verifica los errores 404 y 400 y que el servicio se detiene limpiamente.
+    """
+    monkeypatch.setattr(modulo, "obtener_configuracion", lambda: {"MEDIN": {}})
+    llamadas = []
+
+    def calcular(dia):
+        llamadas.append(dia)
+        return [[dia.isoformat(), 10]]
+
+    s = Servicio([TrabajoDiario("altas", calcular)], puerto=0, ruta_estado=tmp_path / "servicio.json",
+                 abrir=abrir_simulado, reloj=lambda: AHORA, intervalo=0.01)
+    s.iniciar()
+
+    def get(ruta):
+        with urllib.request.urlopen(f"http://127.0.0.1:{s.puerto}{ruta}", timeout=5) as respuesta:
+            return json.loads(respuesta.read())
+
+    try:
+        for _ in range(200):
+            if s.completados:
+                break
+            time.sleep(0.01)
+        assert get("/salud")["trabajos"]["altas"]["completado"] == "2024-03-09"
+        assert get("/resultados") == {"altas": ["2024-03-09"]}
+        assert get("/resultados/altas")["valor"] == [["2024-03-09", 10]]
+
+        assert get("/resultados/altas?dia=2024-03-01")["valor"] == [["2024-03-01", 10]]
+        get("/resultados/altas?dia=2024-03-01")
+        assert llamadas.count(datetime.date(2024, 3, 1)) == 1
+
+        for ruta, estado in (
+            ("/resultados/otro", 404), ("/nada", 404), ("/resultados/altas?dia=ayer", 400),
+            ("/resultados/altas?dia=2024-03-10", 400), ("/resultados/altas?dia=2024-01-15", 400),
+        ):
+            with pytest.raises(urllib.error.HTTPError) as exc:
+                get(ruta)
+            assert exc.value.code == estado
+        assert len(llamadas) == 2
+        assert get("/resultados/altas")["dia"] == "2024-03-09"
+    finally:
+        s.detener()
+
+
+def test_calculo_a_demanda_compartido(tmp_path):
+    """
+    Prueba que varias peticiones simultáneas del mismo día ejecutan el trabajo una sola vez.
+
+    Teoría:
+    Sin coordinación, N peticiones del mismo día que aún no está en memoria lanzan N consultas idénticas contra
+    Oracle. Con un futuro compartido por (trabajo, día), la primera calcula y las demás esperan su resultado.
+
+    ¿Qué hace este test?
+    - Lanza 8 hilos que piden el mismo día mientras el trabajo está bloqueado en un evento.
+    - Verifica que el trabajo se ejecutó una vez y que todos recibieron el mismo resultado.
+    - Verifica que un día fuera del intervalo disponible da ValueError y que sin días completados no se admite ninguno.
+    """
+    liberar, llamadas = threading.Event(), []
+
+    def lento(dia):
+        llamadas.append(dia)
+        liberar.wait(5)
+        return dia.day
+
+    s = crear_servicio(tmp_path, [TrabajoDiario("altas", lento)])
+    with pytest.raises(ValueError):
+        s.calcular_a_demanda("altas", datetime.date(2024, 3, 5))
+    s.completados["altas"] = datetime.date(2024, 3, 9)
+
+    resultados = []
+    hilos = [
+        threading.Thread(target=lambda: resultados.append(s.calcular_a_demanda("altas", datetime.date(2024, 3, 5))))
+        for _ in range(8)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for _ in range(200):
+        if llamadas:
+            break
+        time.sleep(0.01)
+    time.sleep(0.05)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+    assert llamadas == [datetime.date(2024, 3, 5)]
+    assert len(resultados) == 8 and all(r is resultados[0] for r in resultados)
+    assert s._en_curso == {}
+
+    for dia in (datetime.date(2024, 3, 10), datetime.date(2024, 2, 1)):
+        with pytest.raises(ValueError):
+            s.calcular_a_demanda("altas", dia)
+
+
+def test_main_sin_trabajos(monkeypatch):
+    """
+    Prueba que el servicio no arranca si ninguna consulta del catálogo cumple el contrato de `:dia`.
+
+    ¿Qué hace este test?
+    - Simula un catálogo sin consultas con parámetro `dia` (como el que solo trae ping.sql).
+    - Verifica que main termina con código 2 en lugar de arrancar un servicio sin trabajos.
+    """
+    from src.catalogo import Catalogo, DefinicionConsulta
+
+    catalogo = Catalogo([DefinicionConsulta("ping", "MEDIN", "SELECT 1 FROM DUAL", ())])
+    monkeypatch.setattr(modulo, "setup_logging", lambda: None)
+    monkeypatch.setattr(modulo, "obtener_catalogo", lambda: catalogo)
+    with pytest.raises(SystemExit) as exc:
+        modulo.main([])
+    assert exc.value.code == 2
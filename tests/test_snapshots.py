@@ -0,0 +1,122 @@
+"""
+Archivo de pruebas automáticas para snapshots.py
+
+Este archivo valida los snapshots columnares en disco:
+- Comprueba que una tabla guardada se lee igual, con memoria mapeada.
+- Verifica la estructura de directorios particionada por día y la sustitución de un snapshot.
+- Asegura que tabla_del_dia solo consulta la base cuando no hay snapshot.
+- Comprueba que los diccionarios con fechas, decimales y binarios se leen con su tipo original.
+
+Se usa el cursor simulado de `benchmarks.fake_cx_oracle`, sin base de datos real.
+"""
+import datetime
+import decimal
+from contextlib import contextmanager
+
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src import snapshots
+from src.columnar import TablaColumnar
+
+pytest.importorskip("numpy")
+
+DIA = datetime.date(2024, 1, 31)
+FILAS = [(1, "a", 10.0), (2, "b", None), (3, "a", 30.0)]
+
+
+@pytest.fixture
+def abrir(monkeypatch):
+    """Abridor simulado que cuenta las conexiones abiertas."""
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", lambda sql, params: iter(FILAS))
+    aperturas = []
+
+    @contextmanager
+    def _abrir(base):
+        aperturas.append(base)
+        yield fake_cx_oracle.Connection()
+    _abrir.aperturas = aperturas
+    return _abrir
+
+
+@pytest.mark.parametrize("formato", ["npy", "parquet"])
+def test_guardar_y_leer(formato, tmp_path, abrir):
+    """
+    Prueba que un snapshot se guarda en su partición del día y se lee con los mismos agregados.
+
+    Teoría:
+    Guardar los datos de cada día en un formato columnar local permite repetir o cambiar un cálculo sin volver a
+    consultar producción. Con memoria mapeada, abrir el fichero no copia los datos: solo se leen las páginas que se usan.
+
+    ¿Qué hace este test?
+    - Guarda una tabla de tres filas y verifica la ruta dia=AAAA-MM-DD.
+    - La lee y verifica que las columnas están mapeadas y que los agregados coinciden.
+    - Verifica dias_disponibles y que un día sin snapshot lanza FileNotFoundError.
+    """
+    if formato == "parquet":
+        pytest.importorskip("pyarrow")
+    tabla = snapshots.tabla_del_dia("MEDIN", "altas", "SELECT id, categoria, importe FROM t", None, DIA,
+                                    abrir=abrir, formato=formato, directorio=tmp_path)
+    assert (tmp_path / "MEDIN" / "altas" / "dia=2024-01-31" / "meta.json").exists()
+    if formato == "npy":
+        assert type(tabla.columnas["ID"]).__name__ == "memmap"
+    assert tabla.sumar("IMPORTE") == 40.0
+    assert tabla.agrupar("CATEGORIA", "IMPORTE", "sum") == {"a": 40.0, "b": 0.0}
+    assert list(tabla["CATEGORIA"]) == ["a", "b", "a"]
+    assert snapshots.dias_disponibles("MEDIN", "altas", tmp_path) == [DIA]
+    with pytest.raises(FileNotFoundError):
+        snapshots.leer_snapshot("MEDIN", "altas", DIA + datetime.timedelta(days=1), tmp_path)
+
+
+def test_tabla_del_dia_evita_la_base(tmp_path, abrir):
+    """
+    Prueba que tabla_del_dia consulta la base solo la primera vez (o al refrescar).
+
+    ¿Qué hace este test?
+    - Pide dos veces la tabla del mismo día y verifica que solo se abre una conexión.
+    - Refresca con otros datos y verifica que el snapshot se sustituye.
+    """
+    sql = "SELECT id, categoria, importe FROM t"
+    snapshots.tabla_del_dia("MEDIN", "altas", sql, None, DIA, abrir=abrir, formato="npy", directorio=tmp_path)
+    snapshots.tabla_del_dia("MEDIN", "altas", sql, None, DIA, abrir=abrir, formato="npy", directorio=tmp_path)
+    assert abrir.aperturas == ["MEDIN"]
+    FILAS.append((4, "c", 1.0))
+    try:
+        tabla = snapshots.tabla_del_dia("MEDIN", "altas", sql, None, DIA, abrir=abrir, refrescar=True,
+                                        formato="npy", directorio=tmp_path)
+    finally:
+        FILAS.pop()
+    assert len(tabla) == 4
+    assert [p.name for p in (tmp_path / "MEDIN" / "altas").iterdir()] == ["dia=2024-01-31"]
+    assert [d for d, _ in snapshots.iterar_snapshots("MEDIN", "altas", desde=DIA, directorio=tmp_path)] == [DIA]
+
+
+def test_diccionarios_con_tipos_no_json(tmp_path):
+    """
+    Prueba que los valores de diccionario que JSON no representa vuelven con su tipo.
+
+    Teoría:
+    Los diccionarios de las columnas codificadas se guardan en meta.json. Convertirlos a texto sin más hace que una fecha
+    vuelva como '2024-01-31' y deje de ser igual al valor original; por eso se guardan etiquetados y se decodifican al leer.
+
+    ¿Qué hace este test?
+    - Guarda una tabla con diccionarios de fechas, fechas con hora, Decimal, binarios y nulos.
+    - La lee y verifica que cada valor es igual y del mismo tipo que el original.
+    """
+    np = pytest.importorskip("numpy")
+    diccionarios = {
+        "FECHA": [datetime.date(2024, 1, 31), datetime.datetime(2024, 1, 31, 8, 30), None],
+        "IMPORTE": [decimal.Decimal("10.50"), decimal.Decimal("-0.001")],
+        "FIRMA": [b"\x00\xff", "texto"],
+    }
+    tabla = TablaColumnar(
+        {"FECHA": np.array([0, 1, 2, 0]), "IMPORTE": np.array([1, 0, 0, 1]), "FIRMA": np.array([0, 1, 1, 0])},
+        {"FECHA": "texto", "IMPORTE": "texto", "FIRMA": "texto"},
+        diccionarios,
+    )
+    snapshots.guardar_snapshot(tabla, "MEDIN", "tipos", DIA, formato="npy", directorio=tmp_path)
+    leida = snapshots.leer_snapshot("MEDIN", "tipos", DIA, tmp_path)
+    assert leida.diccionarios == diccionarios
+    for nombre, valores in diccionarios.items():
+        assert [type(v) for v in leida.diccionarios[nombre]] == [type(v) for v in valores]
+        assert list(leida[nombre]) == list(tabla[nombre])
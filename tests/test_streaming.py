@@ -0,0 +1,76 @@
+"""
+Archivo de pruebas automáticas para streaming.py
+
+Este archivo valida la lectura de resultados por lotes:
+- Comprueba que se entregan todas las filas, en orden, en lotes de `arraysize` elementos.
+- Verifica que arraysize y prefetchrows se fijan en el cursor antes del execute.
+- Asegura que el cursor se cierra aunque el consumidor abandone el recorrido.
+
+Se usa el cursor simulado de `benchmarks.fake_cx_oracle`, sin base de datos real.
+"""
+import pytest
+
+from benchmarks import fake_cx_oracle
+from src import streaming
+
+
+def test_iterar_lotes(monkeypatch):
+    """
+    Prueba que iterar_lotes entrega todas las filas en lotes del tamaño pedido.
+
+    Teoría:
+    Cada lote de filas es una ida y vuelta a la base de datos. Lotes más grandes significan menos viajes; entregarlos uno a uno mantiene la memoria acotada al tamaño del lote.
+
+    ¿Qué hace este test?
+    - Configura el generador simulado para devolver 25 filas.
+    - Recorre la consulta con arraysize=10.
+    - Verifica que los lotes tienen 10, 10 y 5 filas y que iterar_filas devuelve las mismas filas.
+    """
+    monkeypatch.setattr(fake_cx_oracle, "GENERADOR_FILAS", lambda sql, params: ((i,) for i in range(25)))
+    conn = fake_cx_oracle.Connection()
+    lotes = list(streaming.iterar_lotes(conn, "SELECT id FROM t", arraysize=10))
+    assert [len(l) for l in lotes] == [10, 10, 5]
+    assert list(streaming.iterar_filas(conn, "SELECT id FROM t", arraysize=10)) == [(i,) for i in range(25)]
+
+
+def test_parametros_del_cursor(monkeypatch):
+    """
+    Prueba que arraysize y prefetchrows se aplican al cursor y se validan.
+
+    ¿Qué hace este test?
+    - Sustituye el cursor por uno que guarda sus atributos.
+    - Verifica que prefetchrows vale arraysize + 1 por defecto y que los parámetros se pasan al execute.
+    - Verifica que un arraysize no positivo lanza ValueError.
+    """
+    cursores = []
+    class CursorEspia(fake_cx_oracle.Cursor):
+        def execute(self, sql, params=None):
+            self.atributos = (self.arraysize, self.prefetchrows, params)
+            cursores.append(self)
+            super().execute(sql, params)
+    conn = fake_cx_oracle.Connection()
+    monkeypatch.setattr(conn, "cursor", CursorEspia)
+    list(streaming.iterar_lotes(conn, "SELECT 1", {"f": 1}, arraysize=500))
+    assert cursores[0].atributos == (500, 501, {"f": 1})
+    with pytest.raises(ValueError):
+        list(streaming.iterar_lotes(conn, "SELECT 1", arraysize=0))
+
+
+def test_cierra_cursor_al_abandonar(monkeypatch):
+    """
+    Prueba que el cursor se cierra si el consumidor deja de iterar antes del final.
+
+    ¿Qué hace este test?
+    - Lee solo el primer lote y cierra el generador.
+    - Verifica que se llamó a close() sobre el cursor.
+    """
+    cerrados = []
+    class CursorEspia(fake_cx_oracle.Cursor):
+        def close(self):
+            cerrados.append(self)
+    conn = fake_cx_oracle.Connection()
+    monkeypatch.setattr(conn, "cursor", CursorEspia)
+    generador = streaming.iterar_lotes(conn, "SELECT 1", arraysize=10)
+    next(generador)
+    generador.close()
+    assert len(cerrados) == 1